@@ -6,9 +6,6 @@ import asyncio
 from typing import Dict, List, Optional, Any, Callable
 from datetime import datetime
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 import json
 
 from aiogram import Bot, Dispatcher, types
@@ -19,9 +16,10 @@ from aiogram.utils.markdown import hbold, hitalic, hcode, hpre
 from bot_logging import logger
 from trading.trader import Trader
 from strategies.scanner import StrategyScanner
-from utils.time_utils import get_all_supported_timeframes
-from config import REPORTS_DIR, TRADES_EXCEL_FILE, EXCEL_STYLES
+from utils.time_utils import get_all_supported_timeframes, SERVER_CLOCK
+from config import REPORTS_DIR, TRADES_EXCEL_FILE
 from trade_reporter import TradeReporter
+from utils.excel_report import generate_excel_report
 
 
 class TelegramBot:
@@ -72,8 +70,10 @@ class TelegramBot:
         self.dp.message.register(self._cmd_timeframe, Command("timeframe"))
         self.dp.message.register(self._cmd_scan, Command("scan"))
         self.dp.message.register(self._cmd_report, Command("report"))
+        self.dp.message.register(self._cmd_stats, Command("stats"))
         self.dp.message.register(self._cmd_reload_data, Command("reload_data"))
         self.dp.message.register(self._cmd_check_indicators, Command("check_indicators"))
+        self.dp.message.register(self._cmd_health, Command("health"))
         
         logger.info("Зарегистрированы обработчики команд")
     
@@ -204,8 +204,10 @@ class TelegramBot:
 - ⏱ Изменить таймфрейм (/timeframe <символ> <таймфрейм>)
 - 🔍 Запустить ручное сканирование (/scan <символ>)
 - 📝 Получить отчет о торговле (/report)
+- 📉 Статистика сделок: просадка, Шарп, серии (/stats [strategy|symbol|timeframe])
 - 📊 Перезагрузить исторические данные (/reload_data [таймфрейм] [лимит])
 - 📈 Проверить индикаторы (/check_indicators)
+- 🩺 Задержка цикла событий (/health)
 """
         await message.answer(welcome_text)
     
@@ -213,7 +215,7 @@ class TelegramBot:
         """Обработчик команды /balance"""
         try:
             async with self._message_lock:
-                balance = await self.trader.exchange.get_usdt_balance()
+                balance = await self.trader.exchange.get_usdt_balance(max_age=0)
                 await message.reply(f"💰 Баланс фьючерсов: {balance:.2f} USDT")
                 logger.info(f"Пользователь {message.from_user.id} запросил баланс: {balance:.2f} USDT")
         except Exception as e:
@@ -355,6 +357,22 @@ class TelegramBot:
                 f"   *Таймфрейм:* {info['timeframe']}\n"
                 f"   *Статус:* {active_status}\n\n"
             )
+        
+        # Время обработки последнего закрытия свечи по всем символам
+        scan_stats = self.scanner.get_scan_stats()
+        if scan_stats:
+            response += (
+                f"⏱ *Последнее закрытие свечи ({scan_stats['timeframe']}):* "
+                f"{len(scan_stats['symbols'])} символов за {scan_stats['total']:.2f} с\n"
+            )
+        
+        # Точность расписания свечей зависит от синхронизации с сервером биржи
+        clock = SERVER_CLOCK.get_metrics()
+        if clock['samples']:
+            response += (
+                f"🕒 *Время биржи:* смещение {clock['offset_ms']:+.1f} мс, "
+                f"джиттер {clock['jitter_ms']:.1f} мс, RTT {clock['rtt_ms']:.0f} мс\n"
+            )
             
         await message.reply(response, parse_mode="Markdown")
     
@@ -434,266 +452,76 @@ class TelegramBot:
             except Exception as e:
                 logger.error(f"Ошибка при загрузке времени последнего обновления: {e}")
             
-            # Получаем доступные символы для запроса истории сделок
-            all_trades = []
-            
+            # Синхронизируем журнал с биржей: новые исполнения сохраняются в журнал
             try:
-                # Пробуем сначала использовать TradeReporter для получения истории сделок
                 await status_msg.edit_text("📊 Получаю историю сделок через TradeReporter...")
-                trade_reporter = TradeReporter(self.trader.exchange.exchange)
+                trade_reporter = self._get_trade_reporter()
                 
                 # Обновляем время последнего обновления в TradeReporter
                 trade_reporter.last_update_time = start_time
                 
-                # Получаем новые сделки
                 new_trades = await trade_reporter.fetch_new_trades()
-                
-                if new_trades and len(new_trades) > 0:
-                    logger.info(f"Получено {len(new_trades)} сделок через TradeReporter")
-                    
-                    # Преобразуем сделки в формат для отчета
-                    for trade in new_trades:
-                        # Создаем структуру, аналогичную ccxt
-                        formatted_trade = {
-                            'symbol': trade.get('symbol', 'Unknown'),
-                            'side': 'buy' if trade.get('side') == 'long' else 'sell',
-                            'price': trade.get('price', 0),
-                            'amount': trade.get('amount', 0),
-                            'cost': trade.get('cost', 0),
-                            'fee': {'cost': trade.get('fee', 0)},
-                            'timestamp': int(trade.get('timestamp').timestamp() * 1000) if isinstance(trade.get('timestamp'), datetime) else 0,
-                            'order': trade.get('trade_id', ''),
-                            'info': {'pnl': trade.get('pnl', 0)}
-                        }
-                        all_trades.append(formatted_trade)
-                else:
-                    logger.info("TradeReporter не вернул новых сделок, попробуем прямой API запрос")
-                    # Если TradeReporter не вернул сделок, используем прямой API запрос
-                    await status_msg.edit_text("📊 Запрашиваю историю сделок напрямую с биржи...")
-                    # Инициализируем пустой список для символов, _fetch_trades_via_api определит символы автоматически
-                    symbols = []
-                    await self._fetch_trades_via_api(all_trades, symbols, start_time, status_msg)
+                logger.info(f"Получено {len(new_trades)} новых сделок через TradeReporter")
             except Exception as e:
                 logger.error(f"Ошибка при использовании TradeReporter: {e}")
                 logger.exception(e)
-                
-                # Если произошла ошибка, используем прямой API запрос
+            
+            # Отчет строится по журналу: повторный /report за тот же период выгружает те же сделки
+            trade_reporter = self._get_trade_reporter()
+            fills = trade_reporter.ledger.fills(since=start_time)
+            if fills.empty:
+                # Журнал пуст за период - запрашиваем исполнения напрямую с биржи (они сохраняются в журнал)
                 await status_msg.edit_text("📊 Запрашиваю историю сделок напрямую с биржи...")
-                # Инициализируем пустой список для символов
-                symbols = []
-                await self._fetch_trades_via_api(all_trades, symbols, start_time, status_msg)
+                await self._fetch_trades_via_api([], [], start_time, status_msg)
+                fills = trade_reporter.ledger.fills(since=start_time)
             
-            # Если нет сделок, сообщаем об этом
-            if not all_trades:
-                await status_msg.edit_text("ℹ️ За указанный период новых сделок не найдено.")
+            # Если в журнале нет сделок за период, сообщаем об этом
+            if fills.empty:
+                await status_msg.edit_text("ℹ️ За указанный период сделок не найдено.")
                 return
-                
-            # Сортируем сделки по времени
-            all_trades.sort(key=lambda x: x['timestamp'], reverse=True)
             
             # Сохраняем время последнего обновления
-            latest_timestamp = max(trade['timestamp'] for trade in all_trades)
+            latest_timestamp = int(fills['timestamp'].max())
             with open(timestamp_file, 'w') as f:
                 json.dump({"last_update": latest_timestamp}, f)
                 logger.info(f"Сохранено время последнего обновления: {datetime.fromtimestamp(latest_timestamp/1000)}")
             
-            # Создаем структурированные данные для отчета
-            trade_data = []
-            
-            # Группируем сделки по ордерам
-            orders = {}
-            for trade in all_trades:
-                order_id = trade.get('order')
-                if order_id not in orders:
-                    orders[order_id] = []
-                orders[order_id].append(trade)
-            
-            # Обрабатываем сделки по каждому ордеру
-            for order_id, trades in orders.items():
-                if len(trades) == 0:
-                    continue
-                    
-                # Определяем, лонг или шорт
-                side = trades[0]['side']
-                position_side = "LONG" if side == "buy" else "SHORT"
-                symbol = trades[0]['symbol'].split(':')[0] if ':' in trades[0]['symbol'] else trades[0]['symbol']
-                
-                # Собираем все необходимые данные
-                entry_price = sum(t['price'] * t['amount'] for t in trades) / sum(t['amount'] for t in trades)
-                total_amount = sum(t['amount'] for t in trades)
-                exit_price = sum(t.get('exit_price', t['price']) * t['amount'] for t in trades) / total_amount if total_amount > 0 else 0
-                
-                # Рассчитываем комиссию и PNL
-                total_fee = sum(float(t['fee']['cost']) if t['fee'] and 'cost' in t['fee'] else 0 for t in trades)
-                total_pnl = sum(float(t.get('info', {}).get('pnl', 0)) for t in trades)
-                
-                # Определяем время открытия и закрытия
-                open_time = min(t['timestamp'] for t in trades)
-                close_time = max(t['timestamp'] for t in trades)
-                
-                # Добавляем запись в отчет
-                trade_data.append({
-                    'Символ': symbol,
-                    'Позиция': position_side,
-                    'Объем': total_amount,
-                    'Цена входа': entry_price,
-                    'Цена выхода': exit_price,
-                    'Комиссия': total_fee,
-                    'PNL': total_pnl,
-                    'Дата открытия': datetime.fromtimestamp(open_time / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                    'Дата закрытия': datetime.fromtimestamp(close_time / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                    'ID ордера': order_id
-                })
-            
-            # Создаем DataFrame из собранных данных
-            df = pd.DataFrame(trade_data)
+            # Закрытые сделки восстанавливаются из журнала исполнений (FIFO) в рабочем потоке
+            await asyncio.to_thread(trade_reporter.update_round_trips)
+            trips = trade_reporter.ledger.round_trips(since=start_time)
             
             # Если данных нет, сообщаем об этом
-            if len(df) == 0:
+            if trips.empty:
                 await status_msg.edit_text("ℹ️ За указанный период не найдено завершенных сделок.")
                 return
             
+            df = trade_reporter.round_trip_frame(trips)
+            
             # Путь к отчету
             excel_path = os.path.join(REPORTS_DIR, TRADES_EXCEL_FILE)
             
             # Обновляем статус
             await status_msg.edit_text(f"📊 Формирую отчет для {len(df)} сделок...")
             
-            # Создаем Excel-отчет с красивым форматированием
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Торговые сделки"
-            
-            # Записываем заголовки
-            headers = list(df.columns)
-            for col_idx, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_idx, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="000080", end_color="000080", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-                cell.border = Border(
-                    left=Side(style="thin"), 
-                    right=Side(style="thin"),
-                    top=Side(style="thin"),
-                    bottom=Side(style="thin")
-                )
-            
-            # Записываем данные
-            for row_idx, row in enumerate(df.values, 2):
-                for col_idx, value in enumerate(row, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                    cell.alignment = Alignment(horizontal="center")
-                    cell.border = Border(
-                        left=Side(style="thin"), 
-                        right=Side(style="thin"),
-                        top=Side(style="thin"),
-                        bottom=Side(style="thin")
-                    )
-                    
-                    # Добавляем цветовое форматирование для PNL
-                    if headers[col_idx-1] == "PNL":
-                        if value > 0:
-                            cell.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-                        elif value < 0:
-                            cell.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-            
-            # Настраиваем ширину столбцов
-            for col_idx, column in enumerate(ws.columns, 1):
-                max_length = 0
-                column_letter = get_column_letter(col_idx)
-                
-                for cell in column:
-                    if cell.value:
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                
-                adjusted_width = max_length + 4
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Добавляем лист со статистикой
-            stats_ws = wb.create_sheet(title="Статистика")
-            
-            # Рассчитываем статистику
+            # Итоги периода для подписи; показатели за всю историю - из накопленной аналитики
             total_trades = len(df)
-            winning_trades = len(df[df["PNL"] > 0])
-            losing_trades = len(df[df["PNL"] < 0])
-            win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-            total_pnl = df["PNL"].sum()
-            avg_profit = df[df["PNL"] > 0]["PNL"].mean() if winning_trades > 0 else 0
-            avg_loss = df[df["PNL"] < 0]["PNL"].mean() if losing_trades > 0 else 0
-            total_fee = df["Комиссия"].sum()
-            
-            # Статистика по символам
-            symbol_stats = df.groupby("Символ").agg({
-                "PNL": ["sum", "mean", "count"],
-                "Комиссия": "sum"
-            })
-            
-            # Записываем общую статистику
-            stats_data = [
-                ["Общая статистика", ""],
-                ["Всего сделок", total_trades],
-                ["Прибыльные сделки", winning_trades],
-                ["Убыточные сделки", losing_trades],
-                ["Процент успеха", f"{win_rate:.2f}%"],
-                ["Общий PNL", f"{total_pnl:.4f} USDT"],
-                ["Средняя прибыль", f"{avg_profit:.4f} USDT"],
-                ["Средний убыток", f"{avg_loss:.4f} USDT"],
-                ["Общая комиссия", f"{total_fee:.4f} USDT"],
-                ["", ""],
-                ["Статистика по символам", ""]
-            ]
-            
-            for r_idx, row in enumerate(stats_data, 1):
-                for c_idx, value in enumerate(row, 1):
-                    cell = stats_ws.cell(row=r_idx, column=c_idx, value=value)
-                    if r_idx == 1 or r_idx == 11:
-                        cell.font = Font(bold=True)
-                        if c_idx == 1:
-                            cell.fill = PatternFill(start_color="000080", end_color="000080", fill_type="solid")
-                            cell.font = Font(bold=True, color="FFFFFF")
-            
-            # Добавляем статистику по символам
-            headers = ["Символ", "Всего сделок", "Общий PNL", "Средний PNL", "Комиссия"]
-            for c_idx, header in enumerate(headers, 1):
-                cell = stats_ws.cell(row=12, column=c_idx, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="000080", end_color="000080", fill_type="solid")
-            
-            row_idx = 13
-            for symbol, data in symbol_stats.iterrows():
-                stats_ws.cell(row=row_idx, column=1, value=symbol)
-                stats_ws.cell(row=row_idx, column=2, value=data[("PNL", "count")])
-                stats_ws.cell(row=row_idx, column=3, value=data[("PNL", "sum")])
-                stats_ws.cell(row=row_idx, column=4, value=data[("PNL", "mean")])
-                stats_ws.cell(row=row_idx, column=5, value=data[("Комиссия", "sum")])
-                
-                # Добавляем цветовое форматирование для PNL
-                pnl_cell = stats_ws.cell(row=row_idx, column=3)
-                if pnl_cell.value > 0:
-                    pnl_cell.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-                elif pnl_cell.value < 0:
-                    pnl_cell.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-                
-                row_idx += 1
-            
-            # Настраиваем ширину столбцов в листе статистики
-            for col_idx, column in enumerate(stats_ws.columns, 1):
-                max_length = 0
-                column_letter = get_column_letter(col_idx)
-                
-                for cell in column:
-                    if cell.value:
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                
-                adjusted_width = max_length + 4
-                stats_ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Сохраняем файл
-            wb.save(excel_path)
+            total_pnl = trips['pnl'].sum()
+            win_rate = (trips['pnl'] > 0).mean() * 100
+            
+            # Лист сделок: заголовок и строки DataFrame
+            trades_rows = [list(df.columns)] + df.values.tolist()
+            
+            # Лист статистики: показатели счета и таблицы по стратегиям, таймфреймам и символам
+            stats_rows, header_rows = trade_reporter.statistics_rows()
+            
+            # Книга строится в рабочем потоке, обработчик лишь ожидает готовый файл
+            report_path = await generate_excel_report(excel_path, [
+                {"title": "Торговые сделки", "rows": trades_rows, "pnl_column": list(df.columns).index("PNL")},
+                {"title": "Статистика", "rows": stats_rows, "header_rows": header_rows, "pnl_column": 2}
+            ])
+            if report_path is None:
+                await status_msg.edit_text("⚠️ Не удалось сформировать Excel-отчет")
+                return
             
             # Отправляем отчет
             caption = f"📊 Отчет о торговле за период с {datetime.fromtimestamp(start_time/1000).strftime('%Y-%m-%d')} по {datetime.now().strftime('%Y-%m-%d')}\n"
@@ -719,6 +547,70 @@ class TelegramBot:
             except:
                 pass
 
+    async def _cmd_stats(self, message: Message) -> None:
+        """
+        Показывает статистику закрытых сделок из накопленной аналитики:
+        /stats - весь счет и стратегии, /stats symbol|timeframe|strategy - разбивка по группе.
+        
+        Args:
+            message: Объект сообщения
+        """
+        try:
+            args = message.text.split()[1:]
+            group = args[0].lower() if args else "strategy"
+            titles = {"strategy": "стратегиям", "symbol": "символам", "timeframe": "таймфреймам"}
+            if group not in titles:
+                await message.reply("⚠️ Использование: /stats [strategy|symbol|timeframe]")
+                return
+            
+            # Новые исполнения из журнала превращаются в закрытые сделки вне цикла событий
+            trade_reporter = self._get_trade_reporter()
+            await asyncio.to_thread(trade_reporter.update_round_trips)
+            
+            stats = trade_reporter.get_trade_statistics()
+            if not stats['total_trades']:
+                await message.reply("ℹ️ Закрытых сделок пока нет")
+                return
+            
+            profit_factor = stats['profit_factor']
+            response = (
+                "📉 *Статистика закрытых сделок*\n\n"
+                f"Сделок: {stats['total_trades']} (✅ {stats['winning_trades']} / ❌ {stats['losing_trades']}), "
+                f"винрейт {stats['win_rate']:.1f}%\n"
+                f"PNL: {stats['total_pnl']:.2f} USDT, комиссии: {stats['total_fees']:.2f} USDT\n"
+                f"Ожидание сделки: {stats['expectancy']:.4f} USDT\n"
+                f"Средняя прибыль / убыток: {stats['average_profit']:.4f} / {stats['average_loss']:.4f} USDT\n"
+                f"Фактор прибыли: {'∞' if profit_factor == float('inf') else f'{profit_factor:.2f}'}\n"
+                f"Макс. просадка: {stats['max_drawdown']:.2f} USDT "
+                f"({trade_reporter.format_duration(stats['max_drawdown_duration_ms'])}), "
+                f"текущая: {stats['current_drawdown']:.2f} USDT\n"
+                f"Шарп / Сортино (по дням, годовые): {stats['sharpe']:.2f} / {stats['sortino']:.2f}\n"
+                f"Серии: лучшая {stats['max_win_streak']}, худшая {stats['max_loss_streak']}, "
+                f"текущая {stats['current_streak']:+d}\n\n"
+                f"*По {titles[group]}:*\n"
+            )
+            for item in trade_reporter.analytics.breakdown(group)[:10]:
+                response += (
+                    f"   • `{item['name']}`: {item['total_trades']} сд., PNL {item['total_pnl']:.2f}, "
+                    f"винрейт {item['win_rate']:.0f}%, просадка {item['max_drawdown']:.2f}, "
+                    f"Шарп {item['sharpe']:.2f}\n"
+                )
+            
+            await message.reply(response, parse_mode="Markdown")
+            
+        except Exception as e:
+            logger.error(f"Ошибка при получении статистики сделок: {str(e)}")
+            await message.reply(f"⚠️ Ошибка при получении статистики сделок: {str(e)}")
+
+    def _get_trade_reporter(self) -> TradeReporter:
+        """Возвращает репортер сделок (создается один раз, журнал сделок общий с трейдером)."""
+        if getattr(self, '_trade_reporter', None) is None:
+            self._trade_reporter = TradeReporter(
+                self.trader.exchange.exchange,
+                ledger=getattr(self.trader, 'ledger', None)
+            )
+        return self._trade_reporter
+
     async def _fetch_trades_via_api(self, all_trades: list, symbols: list, start_time: int, status_msg: Message) -> None:
         """
         Вспомогательный метод для запроса сделок через API биржи
@@ -761,73 +653,24 @@ class TelegramBot:
             if not symbols:
                 symbols = ["BTC/USDT", "ETH/USDT"]
             
-            # Удаляем дубликаты
-            symbols = list(set(symbols))
+            # Удаляем дубликаты (BTC/USDT:USDT и BTC/USDT - один символ)
+            symbols = list(dict.fromkeys(symbol.split(':')[0] for symbol in symbols))
             
             await status_msg.edit_text(f"📊 Запрашиваю историю сделок для {len(symbols)} символов...")
             
-            # Пытаемся сначала получить все сделки без указания символа
+            # История каждого символа загружается постранично от его курсора, символы - параллельно
             try:
-                all_symbol_trades = await self.trader.exchange.exchange.fetch_my_trades(
-                    params={"marginCoin": "USDT", "limit": 100}
+                trade_reporter = self._get_trade_reporter()
+                symbol_trades = await trade_reporter.collector.collect(
+                    symbols,
+                    since=start_time,
+                    record=trade_reporter.record_trades
                 )
-                
-                if all_symbol_trades:
-                    all_trades.extend(all_symbol_trades)
-                    logger.info(f"Получено {len(all_symbol_trades)} сделок для всех символов")
-                    return
+                all_trades.extend(symbol_trades)
+                logger.info(f"Получено {len(symbol_trades)} сделок для {len(symbols)} символов")
             except Exception as e:
-                logger.warning(f"Ошибка при запросе всех сделок: {e}, продолжаем с отдельными символами")
+                logger.error(f"Ошибка при запросе сделок: {e}")
             
-            # Запрашиваем историю сделок для каждого символа отдельно
-            for symbol in symbols:
-                try:
-                    symbol_trades = await self.trader.exchange.exchange.fetch_my_trades(
-                        symbol=symbol, 
-                        since=start_time,
-                        params={"marginCoin": "USDT"}
-                    )
-                    
-                    if symbol_trades:
-                        all_trades.extend(symbol_trades)
-                        logger.info(f"Получено {len(symbol_trades)} сделок для {symbol}")
-                except Exception as e:
-                    logger.error(f"Ошибка при запросе сделок для {symbol}: {e}")
-            
-            # Если не удалось получить сделки, пробуем другие методы
-            if not all_trades:
-                logger.warning("Не удалось получить сделки через стандартные методы, пробуем альтернативные пути")
-                
-                try:
-                    # Прямой вызов API для получения истории сделок
-                    orders_history = await self.trader.exchange.exchange.private_get_mix_order_history({
-                        "instType": "swap", 
-                        "marginCoin": "USDT",
-                        "startTime": str(start_time),
-                        "limit": "100"
-                    })
-                    
-                    if orders_history and 'data' in orders_history:
-                        logger.info(f"Получена история ордеров: {len(orders_history['data'])} ордеров")
-                        # Конвертируем ордера в формат сделок
-                        for order in orders_history['data']:
-                            if order.get('state') == 'filled':
-                                trade = {
-                                    'id': order.get('orderId', ''),
-                                    'order': order.get('orderId', ''),
-                                    'symbol': order.get('symbol', ''),
-                                    'side': order.get('side', ''),
-                                    'price': float(order.get('price', 0)),
-                                    'amount': float(order.get('size', 0)),
-                                    'cost': float(order.get('size', 0)) * float(order.get('price', 0)),
-                                    'fee': {'cost': float(order.get('fee', 0))},
-                                    'timestamp': int(order.get('cTime', 0)),
-                                    'info': {'pnl': float(order.get('profit', 0))}
-                                }
-                                all_trades.append(trade)
-                except Exception as e:
-                    logger.error(f"Ошибка при получении истории ордеров: {e}")
-                    logger.exception(e)
         except Exception as e:
             logger.error(f"Ошибка в _fetch_trades_via_api: {e}")
             logger.exception(e)
@@ -877,11 +720,12 @@ class TelegramBot:
             if result["loaded"] > 0:
                 details = []
                 for symbol, data in result["details"].items():
+                    timing = f" ({data['seconds']:.2f} с)" if "seconds" in data else ""
                     if "error" in data:
-                        details.append(f"❌ {symbol}: {data['error']}")
+                        details.append(f"❌ {symbol}: {data['error']}{timing}")
                     else:
                         details.append(
-                            f"✅ {symbol}: загружено {data['candles']} свечей\n"
+                            f"✅ {symbol}: загружено {data['candles']} свечей{timing}\n"
                             f"   с {data['from']} по {data['to']}"
                         )
                 
@@ -948,4 +792,53 @@ class TelegramBot:
             
         except Exception as e:
             logger.error(f"Ошибка при проверке индикаторов: {str(e)}")
-            await message.reply(f"⚠️ Ошибка при проверке индикаторов: {str(e)}") 
\ No newline at end of file
+            await message.reply(f"⚠️ Ошибка при проверке индикаторов: {str(e)}") 
+
+    async def _cmd_health(self, message: Message) -> None:
+        """
+        Показывает задержку цикла событий и корутины, которые его блокировали.
+        
+        Args:
+            message: Объект сообщения
+        """
+        try:
+            watchdog = getattr(self, 'loop_watchdog', None)
+            if watchdog is None:
+                await message.reply("⚠️ Сторожевой таймер цикла событий не запущен")
+                return
+            
+            health = watchdog.get_health()
+            lag = health["lag"]
+            
+            response = "🩺 *Цикл событий*\n\n"
+            if lag["count"]:
+                response += (
+                    f"⏱ *Задержка:* p50 {lag['p50_ms']:.1f} мс, p99 {lag['p99_ms']:.1f} мс, "
+                    f"макс. {lag['max_ms']:.1f} мс\n"
+                    f"   последняя {lag['last_ms']:.1f} мс, измерений: {lag['count']}\n\n"
+                )
+            else:
+                response += "⏱ Измерений задержки пока нет\n\n"
+            
+            if health["slow_callback_ms"] is None:
+                response += "Отслеживание медленных вызовов отключено\n"
+            elif not health["top"]:
+                response += f"✅ Медленных вызовов (> {health['slow_callback_ms']:.0f} мс) не было\n"
+            else:
+                response += f"🐢 *Медленные вызовы (> {health['slow_callback_ms']:.0f} мс):* {health['slow_count']}\n"
+                for item in health["top"]:
+                    response += (
+                        f"   • `{item['name']}`: {item['count']} раз, "
+                        f"всего {item['total_ms']:.0f} мс, макс. {item['max_ms']:.0f} мс\n"
+                    )
+                
+                response += "\n*Последние:*\n"
+                for item in reversed(health["recent"]):
+                    moment = datetime.fromtimestamp(item["time"]).strftime('%H:%M:%S')
+                    response += f"   {moment} `{item['name']}` {item['duration'] * 1000:.0f} мс\n"
+            
+            await message.reply(response, parse_mode="Markdown")
+            
+        except Exception as e:
+            logger.error(f"Ошибка при получении состояния цикла событий: {str(e)}")
+            await message.reply(f"⚠️ Ошибка при получении состояния цикла событий: {str(e)}")
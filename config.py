@@ -78,6 +78,26 @@ TRADE_DIRECTION = "both"  # Options: "both", "long", "short"
 # Excel report settings
 REPORTS_DIR = "reports"
 TRADES_EXCEL_FILE = "trades_history.xlsx"
+TRADES_DB_FILE = "trades.db"  # SQLite trade ledger (source of truth); the Excel file is an export
+
+# Local candle store (one memory-mapped .candles file per symbol and timeframe)
+CANDLES_DIR = os.path.join("data", "candles")
+
+# Universe mode: scan every active USDT-M perpetual with the ETH rule set in one vectorized pass
+UNIVERSE_MODE = False
+UNIVERSE_TIMEFRAME = "4h"
+UNIVERSE_HISTORY = 1000  # Candles kept per symbol
+UNIVERSE_TOP_SIGNALS = 3  # Ranked signals passed to the signal handler per candle close
+
+# Full indicator recomputes run off the event loop: "process", "thread" or None (on the loop)
+INDICATOR_EXECUTOR = "process"
+INDICATOR_WORKERS = 2
+
+# Event loop watchdog: a background thread samples the loop's stack when it stalls longer than this (seconds)
+LOOP_STALL_THRESHOLD = 0.1
+# asyncio slow-callback reports (seconds, None = off). They need loop debug mode, which adds
+# bookkeeping to every callback and task, so enable it only while diagnosing
+LOOP_SLOW_CALLBACK_DURATION = None
 
 # Last time trades were fetched (default to 7 days ago to get recent trade history on first run)
 LAST_TIME = datetime.now().timestamp() - 7 * 24 * 60 * 60  # 7 days ago in milliseconds
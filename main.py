@@ -3,6 +3,7 @@
 Поддерживает множественные стратегии и асинхронную работу.
 """
 import asyncio
+import os
 import sys
 import winloop
 winloop.install()
@@ -11,11 +12,21 @@ from dotenv import load_dotenv
 from bot_logging import logger
 from trading.exchange import BitgetExchange
 from trading.trader import Trader
+from trade_ledger import TradeLedger
 from strategies.scanner import StrategyScanner
 from strategies.BTC_strategy import BTCStrategy
 from strategies.ETH_strategy import ETHStrategy
 from bot.telegram_bot import TelegramBot
 from utils.data_loader import HistoricalDataLoader, preload_data_for_trading
+from utils.candle_store import CandleStore
+from utils.time_utils import SERVER_CLOCK
+from strategies.universe import UniverseScanner
+from strategies.offload import create_executor, set_executor
+from utils.loop_monitor import LoopWatchdog
+from config import (
+    CANDLES_DIR, UNIVERSE_MODE, UNIVERSE_TIMEFRAME, UNIVERSE_HISTORY, UNIVERSE_TOP_SIGNALS,
+    INDICATOR_EXECUTOR, INDICATOR_WORKERS, REPORTS_DIR, TRADES_DB_FILE
+)
 
 
 # Глобальные переменные для доступа к объектам из любой части программы
@@ -89,7 +100,7 @@ async def reload_historical_data(exchange, base_timeframe: str = "4h", limit: in
         
         # Создаем новый загрузчик данных, если он еще не существует
         if DATA_LOADER is None:
-            DATA_LOADER = HistoricalDataLoader(exchange)
+            DATA_LOADER = HistoricalDataLoader(exchange, store=CandleStore(CANDLES_DIR))
         
         # Загружаем данные с учетом специфических таймфреймов для каждого символа
         symbols = ["BTC/USDT", "ETH/USDT"]
@@ -98,45 +109,31 @@ async def reload_historical_data(exchange, base_timeframe: str = "4h", limit: in
             "ETH/USDT": 240   # 4 часа в минутах
         }
         
-        historical_data = {}
-        for symbol in symbols:
-            target_minutes = target_timeframes.get(symbol, 240)
-            df = await DATA_LOADER.preload_historical_data(
-                symbol=symbol, 
-                base_timeframe=base_timeframe, 
-                target_minutes=target_minutes,
-                limit=limit
-            )
-            if df is not None:
-                historical_data[symbol] = df
+        # Символы загружаются параллельно с ограничением числа одновременных запросов
+        historical_data, report = await DATA_LOADER.load_symbols(
+            symbols,
+            base_timeframe=base_timeframe,
+            target_minutes=target_timeframes,
+            limit=limit
+        )
         
-        # Счетчики для результата
-        result = {"loaded": 0, "failed": 0, "details": {}}
+        # Счетчики для результата (details - отчет загрузчика с временем загрузки каждого символа)
+        result = {"loaded": len(historical_data), "failed": len(symbols) - len(historical_data), "details": report}
         
         # Обновляем данные в стратегиях
-        for symbol in symbols:
-            if symbol in historical_data and historical_data[symbol] is not None:
-                # Добавляем информацию в результат
-                candle_count = len(historical_data[symbol])
-                result["loaded"] += 1
-                result["details"][symbol] = {
-                    "candles": candle_count,
-                    "from": historical_data[symbol].index[0].strftime("%Y-%m-%d %H:%M"),
-                    "to": historical_data[symbol].index[-1].strftime("%Y-%m-%d %H:%M")
-                }
+        for symbol, df in historical_data.items():
+            candle_count = len(df)
+            if symbol == "BTC/USDT" and BTC_STRATEGY is not None:
+                BTC_STRATEGY.set_preloaded_data(df)
+                logger.info(f"Обновлены исторические данные для BTC стратегии: {candle_count} свечей")
                 
-                # Обновляем данные в соответствующей стратегии
-                if symbol == "BTC/USDT" and BTC_STRATEGY is not None:
-                    BTC_STRATEGY.set_preloaded_data(historical_data[symbol])
-                    logger.info(f"Обновлены исторические данные для BTC стратегии: {candle_count} свечей")
-                    
-                elif symbol == "ETH/USDT" and ETH_STRATEGY is not None:
-                    ETH_STRATEGY.set_preloaded_data(historical_data[symbol])
-                    logger.info(f"Обновлены исторические данные для ETH стратегии: {candle_count} свечей")
-            else:
-                result["failed"] += 1
-                result["details"][symbol] = {"error": "Не удалось загрузить данные"}
-                logger.warning(f"Не удалось загрузить исторические данные для {symbol}")
+            elif symbol == "ETH/USDT" and ETH_STRATEGY is not None:
+                ETH_STRATEGY.set_preloaded_data(df)
+                logger.info(f"Обновлены исторические данные для ETH стратегии: {candle_count} свечей")
+        
+        for symbol, details in report.items():
+            if "error" in details:
+                logger.warning(f"Не удалось загрузить исторические данные для {symbol}: {details['error']}")
                 
         return result
         
@@ -153,12 +150,26 @@ async def main():
         load_dotenv()
         logger.info("Загружены переменные окружения")
         
+        # Пул для полного пересчета индикаторов вне цикла событий
+        indicator_executor = create_executor(INDICATOR_EXECUTOR, INDICATOR_WORKERS)
+        set_executor(indicator_executor)
+        
         # Инициализируем биржу
         exchange = BitgetExchange()
         logger.info("Инициализирована биржа")
         
+        # Загружаем метаданные рынков (шаги объема и цены, минимумы) один раз при старте
+        await exchange.load_markets()
+        
+        # Расписание свечей считается по времени сервера биржи
+        SERVER_CLOCK.fetch_time = exchange.fetch_time
+        await SERVER_CLOCK.sync()
+        logger.info(f"Смещение часов относительно сервера биржи: {SERVER_CLOCK.get_metrics()}")
+        
         # Создаем трейдера
         trader = Trader(exchange)
+        # Журнал сделок (SQLite) - общий для трейдера и отчетов
+        trader.ledger = TradeLedger(os.path.join(REPORTS_DIR, TRADES_DB_FILE))
         logger.info("Инициализирован трейдер")
         
         # Предзагрузка исторических данных для BTC и ETH (4-часовой таймфрейм)
@@ -200,6 +211,14 @@ async def main():
             eth_strategy.set_preloaded_data(historical_data["ETH/USDT"])
             logger.info("Установлены предзагруженные данные для ETH стратегии")
         
+        # Подключаем общие файлы свечей: стратегии читают последние свечи из памяти,
+        # а загрузчик (единственный писатель) дописывает в файлы новые свечи
+        if data_loader.store is not None:
+            for strategy in (btc_strategy, eth_strategy):
+                candle_file = data_loader.store.open_reader(strategy.symbol, strategy.timeframe)
+                if candle_file is not None:
+                    strategy.attach_candle_file(candle_file)
+        
         # Добавляем стратегии в сканер
         scanner.add_strategy(btc_strategy)
         scanner.add_strategy(eth_strategy)
@@ -222,15 +241,42 @@ async def main():
             logger.info("TEST_MODE включен. Выполняется тестовый сигнал...")
             await generate_test_btc_signal(exchange, trader)
         
+        # Сторожевой таймер цикла событий: задержка p50/p99 и корутины, блокирующие цикл
+        # (сводка пишется в лог и доступна по команде /health)
+        loop_watchdog = LoopWatchdog()
+        telegram_bot.loop_watchdog = loop_watchdog
+        
         # Задачи для запуска
         tasks = [
             # Запускаем сканер стратегий
             asyncio.create_task(scanner.start()),
             
             # Запускаем Telegram бота
-            asyncio.create_task(telegram_bot.start())
+            asyncio.create_task(telegram_bot.start()),
+            
+            # Обновляем файлы свечей стратегий (их символы и текущие таймфреймы)
+            asyncio.create_task(data_loader.keep_store_fresh([btc_strategy, eth_strategy])),
+            
+            # Синхронизируем часы с сервером биржи
+            asyncio.create_task(SERVER_CLOCK.run()),
+            
+            # Следим за задержкой цикла событий и медленными обратными вызовами
+            asyncio.create_task(loop_watchdog.run())
         ]
         
+        # Режим вселенной: все активные фьючерсы USDT-M одним векторизованным расчетом
+        if UNIVERSE_MODE:
+            universe = UniverseScanner(
+                exchange, data_loader,
+                timeframe=UNIVERSE_TIMEFRAME,
+                capacity=UNIVERSE_HISTORY,
+                top_signals=UNIVERSE_TOP_SIGNALS
+            )
+            await universe.load()
+            # Сигналы вселенной обрабатываются так же, как сигналы сканера стратегий
+            universe.register_signal_callback(scanner.signal_callback)
+            tasks.append(asyncio.create_task(universe.run()))
+        
         logger.info("Бот успешно запущен")
         
         # Ожидаем завершения всех задач
@@ -253,6 +299,13 @@ async def main():
             if 'exchange' in locals():
                 await exchange.close()
                 
+            if 'trader' in locals() and trader.ledger is not None:
+                trader.ledger.close()
+                
+            if 'indicator_executor' in locals() and indicator_executor is not None:
+                set_executor(None)
+                indicator_executor.shutdown(cancel_futures=True)
+                
             logger.info("Бот успешно остановлен")
         except Exception as e:
             logger.error(f"Ошибка при остановке: {e}")
@@ -6,11 +6,68 @@
 from typing import Dict, Optional
 import pandas as pd
 import numpy as np
-import math
 from datetime import datetime
 from strategies import Strategy
+from strategies.frama import calculate_frama, FRAMA_MODE_EXCLUSIVE
+from strategies.streaming import IndicatorStream, StreamingFrama, EwmMean, RollingMean, RollingRange, NAN
 from config import BTC_CONFIG
 
+class BTCIndicatorStream(IndicatorStream):
+    """
+    Потоковый расчет FRAMA, STC и VFI для BTCStrategy.
+    Повторяет формулы BTCStrategy.calculate_indicators.
+    """
+    columns = ('frama', 'stc', 'vfi')
+
+    def __init__(self, frama_length: int, stc_length: int, vfi_length: int):
+        """
+        Args:
+            frama_length: Период FRAMA
+            stc_length: Период STC
+            vfi_length: Период VFI
+        """
+        self.frama_length = frama_length
+        self.stc_length = stc_length
+        self.vfi_length = vfi_length
+        super().__init__()
+
+    def _reset_state(self) -> None:
+        """Создает примитивы индикаторов заново."""
+        self._frama = StreamingFrama(self.frama_length, FRAMA_MODE_EXCLUSIVE)
+        self._ema12 = EwmMean(span=12, adjust=False)
+        self._ema26 = EwmMean(span=26, adjust=False)
+        self._macd_range = RollingRange(self.stc_length)
+        self._vf_sma = RollingMean(10)
+        self._vfi = EwmMean(span=self.vfi_length, adjust=False)
+        self._prev_close = NAN
+        self._index = 0
+
+    def _update(self, high: float, low: float, close: float, volume: float, commit: bool):
+        """Рассчитывает FRAMA, STC и VFI для свечи."""
+        frama = self._frama.update(high, low, close, commit)
+
+        # STC: стохастик MACD
+        macd = self._ema12.update(close, commit) - self._ema26.update(close, commit)
+        macd_min, macd_max = self._macd_range.update(macd, commit)
+        macd_range = macd_max - macd_min
+        stc = 100 * (macd - macd_min) / macd_range if macd_range != 0 else 50.0
+
+        # VFI: логарифмическое изменение цены, ограниченное сверху 2x SMA(10)
+        delta = float(np.log(close / self._prev_close)) if self._prev_close == self._prev_close else NAN
+        vf_raw = delta * volume
+        vf_sma = self._vf_sma.update(vf_raw, commit)
+        vf_capped = NAN
+        if self._index >= 10:
+            cap_value = 2 * vf_sma
+            vf_capped = cap_value if vf_raw > cap_value else vf_raw
+        vfi = self._vfi.update(vf_capped, commit)
+
+        if commit:
+            self._prev_close = close
+            self._index += 1
+        return frama, stc, vfi
+
+
 class BTCStrategy(Strategy):
     """
     Стратегия для торговли BTC/USDT на основе FRAMA + STC + VFI.
@@ -36,6 +93,15 @@ class BTCStrategy(Strategy):
         self.trail_step_pct = params["trail_step_percent"]      # 0.3%
         self.trade_direction = trade_direction
         
+    def create_indicator_stream(self) -> BTCIndicatorStream:
+        """
+        Создает потоковый расчет индикаторов FRAMA, STC и VFI.
+        
+        Returns:
+            BTCIndicatorStream: Новое состояние индикаторов
+        """
+        return BTCIndicatorStream(self.frama_length, self.stc_length, self.vfi_length)
+        
     async def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Рассчитывает индикаторы FRAMA, STC и VFI.
@@ -199,7 +265,8 @@ class BTCStrategy(Strategy):
     
     def _calculate_frama(self, df: pd.DataFrame, length: int) -> pd.Series:
         """
-        Реализация FRAMA (Fractal Adaptive Moving Average) точно как в Pine Script
+        Реализация FRAMA (Fractal Adaptive Moving Average) точно как в Pine Script.
+        Окно N1/N2 не включает текущую свечу (см. strategies.frama).
         
         Args:
             df: DataFrame с данными OHLCV
@@ -208,54 +275,14 @@ class BTCStrategy(Strategy):
         Returns:
             pd.Series: Значения FRAMA
         """
-        price = df['close']
-        high = df['high']
-        low = df['low']
-        
-        frama = pd.Series(index=df.index, dtype=float)
-        
-        # Инициализируем первое значение первой доступной ценой закрытия
-        # (в Pine Script: frama_val := na(frama_val[1]) ? src : frama_val[1]...)
-        frama.iloc[0] = price.iloc[0]
-        
-        for i in range(length, len(price)):
-            # Расчет высшей и низшей цены за период (n1) - точно как в Pine Script
-            high1 = high.iloc[i-length:i].max()
-            low1 = low.iloc[i-length:i].min()
-            n1 = (high1 - low1) / length
-            
-            # Расчет для половины периода (n2) - точно как в Pine Script
-            half_len = length // 2
-            
-            # Рассчитываем mid = (high + low) / 2, как в Pine Script
-            mid = (high.iloc[i-length:i] + low.iloc[i-length:i]) / 2
-            
-            # Используем mid для расчета high2 и low2, как в оригинальном Pine Script:
-            # mid = (high + low) / 2
-            # high2 = highest(mid, half_len)
-            # low2 = lowest(mid, half_len)
-            high2 = mid.tail(half_len).max()  # highest(mid, half_len)
-            low2 = mid.tail(half_len).min()   # lowest(mid, half_len)
-            
-            n2 = (high2 - low2) / half_len
-            
-            # Расчет фрактальной размерности (d) - точно как в Pine Script
-            # d = log(n1 + n2) / log(2)
-            d = 0
-            if (n1 + n2) > 0:
-                d = math.log(n1 + n2) / math.log(2)
-            
-            # Расчет alpha на основе фрактальной размерности - точно как в Pine Script
-            # alpha = exp(-4.6 * (d - 1))
-            alpha = math.exp(-4.6 * (d - 1))
-            alpha = max(0.01, min(1.0, alpha))  # Ограничиваем alpha между 0.01 и 1.0
-            
-            # Расчет FRAMA с экспоненциальным сглаживанием - точно как в Pine Script
-            # frama = alpha * src + (1 - alpha) * frama[1]
-            prev_frama = frama.iloc[i-1] if not pd.isna(frama.iloc[i-1]) else price.iloc[i]
-            frama.iloc[i] = alpha * price.iloc[i] + (1 - alpha) * prev_frama
-        
-        return frama
+        frama = calculate_frama(
+            df['high'].to_numpy(dtype=float),
+            df['low'].to_numpy(dtype=float),
+            df['close'].to_numpy(dtype=float),
+            length,
+            mode=FRAMA_MODE_EXCLUSIVE
+        )
+        return pd.Series(frama, index=df.index)
     
     def _calculate_stc(self, df: pd.DataFrame, length: int) -> pd.Series:
         """Реализация Schaff Trend Cycle"""
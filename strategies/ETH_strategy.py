@@ -6,10 +6,81 @@
 from typing import Dict, Optional
 import pandas as pd
 import numpy as np
-import math
 from strategies import Strategy
+from strategies.frama import calculate_frama, FRAMA_MODE_INCLUSIVE
+from strategies.streaming import IndicatorStream, StreamingFrama, EwmMean, RollingMean, NAN, safe_div
 from config import ETH_CONFIG
 
+class ETHIndicatorStream(IndicatorStream):
+    """
+    Потоковый расчет FRAMA, EMA200, RSI и ADX для ETHStrategy.
+    Повторяет формулы ETHStrategy.calculate_indicators.
+    """
+    columns = ('frama', 'ema200', 'rsi', 'adx')
+
+    def __init__(self, frama_length: int, ema_length: int, rsi_length: int, adx_length: int):
+        """
+        Args:
+            frama_length: Период FRAMA
+            ema_length: Период EMA
+            rsi_length: Период RSI
+            adx_length: Период ADX
+        """
+        self.frama_length = frama_length
+        self.ema_length = ema_length
+        self.rsi_length = rsi_length
+        self.adx_length = adx_length
+        super().__init__()
+
+    def _reset_state(self) -> None:
+        """Создает примитивы индикаторов заново."""
+        self._frama = StreamingFrama(self.frama_length, FRAMA_MODE_INCLUSIVE)
+        self._ema = EwmMean(span=self.ema_length)
+        self._avg_gain = RollingMean(self.rsi_length)
+        self._avg_loss = RollingMean(self.rsi_length)
+        self._trur = EwmMean(alpha=1 / self.adx_length)
+        self._plus_dm = EwmMean(alpha=1 / self.adx_length)
+        self._minus_dm = EwmMean(alpha=1 / self.adx_length)
+        self._adx = EwmMean(alpha=1 / self.adx_length)
+        self._prev_high = NAN
+        self._prev_low = NAN
+        self._prev_close = NAN
+
+    def _update(self, high: float, low: float, close: float, volume: float, commit: bool):
+        """Рассчитывает FRAMA, EMA200, RSI и ADX для свечи."""
+        frama = self._frama.update(high, low, close, commit)
+        ema = self._ema.update(close, commit)
+
+        # RSI на простых скользящих средних роста и падения
+        delta = close - self._prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        rs = safe_div(self._avg_gain.update(gain, commit), self._avg_loss.update(loss, commit))
+        rsi = 100 - (100 / (1 + rs))
+
+        # ADX со сглаживанием RMA
+        true_range = max(
+            (v for v in (high - low, abs(high - self._prev_close), abs(low - self._prev_close)) if v == v),
+            default=NAN
+        )
+        up = high - self._prev_high
+        down = -(low - self._prev_low)
+        plus_dm = up if (up > down) and (up > 0) else 0.0
+        minus_dm = down if (down > up) and (down > 0) else 0.0
+
+        trur = self._trur.update(true_range, commit)
+        plus_di = safe_div(100 * self._plus_dm.update(plus_dm, commit), trur)
+        minus_di = safe_div(100 * self._minus_dm.update(minus_dm, commit), trur)
+        dx = safe_div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        adx = self._adx.update(dx, commit)
+
+        if commit:
+            self._prev_high = high
+            self._prev_low = low
+            self._prev_close = close
+        return frama, ema, rsi, adx
+
+
 class ETHStrategy(Strategy):
     """
     Стратегия для торговли ETH/USDT на основе FRAMA + ADX + RSI + EMA.
@@ -40,6 +111,15 @@ class ETHStrategy(Strategy):
         
         self.trade_direction = trade_direction
         
+    def create_indicator_stream(self) -> ETHIndicatorStream:
+        """
+        Создает потоковый расчет индикаторов FRAMA, EMA200, RSI и ADX.
+        
+        Returns:
+            ETHIndicatorStream: Новое состояние индикаторов
+        """
+        return ETHIndicatorStream(self.frama_length, self.ema_length, self.rsi_length, self.adx_length)
+        
     async def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Рассчитывает индикаторы FRAMA, ADX, RSI и EMA.
@@ -198,42 +278,15 @@ class ETHStrategy(Strategy):
     def _calculate_frama(self, df: pd.DataFrame, length: int) -> pd.Series:
         """
         Реализация FRAMA (Fractal Adaptive Moving Average) как в Pine Script.
+        Окно N1/N2 включает текущую свечу (см. strategies.frama).
         """
-        high = df['high']
-        low = df['low']
-        close = df['close']
-        
-        # Инициализация результата
-        frama = np.full(len(df), np.nan)
-        
-        for i in range(length, len(df)):
-            # Расчет N1
-            high1 = high.iloc[i-length+1:i+1].max()
-            low1 = low.iloc[i-length+1:i+1].min()
-            n1 = (high1 - low1) / length
-            
-            # Расчет N2
-            mid_points = (high.iloc[i-length//2+1:i+1] + low.iloc[i-length//2+1:i+1]) / 2
-            high2 = mid_points.max()
-            low2 = mid_points.min()
-            n2 = (high2 - low2) / (length // 2)
-            
-            # Расчет фрактальной размерности
-            if n1 + n2 > 0:
-                d = math.log(n1 + n2) / math.log(2)
-            else:
-                d = 0
-                
-            # Расчет alpha
-            alpha_raw = math.exp(-4.6 * (d - 1))
-            alpha = max(0.01, min(1.0, alpha_raw))
-            
-            # FRAMA
-            if i == length:
-                frama[i] = close.iloc[i]
-            else:
-                frama[i] = alpha * close.iloc[i] + (1 - alpha) * frama[i-1]
-        
+        frama = calculate_frama(
+            df['high'].to_numpy(dtype=float),
+            df['low'].to_numpy(dtype=float),
+            df['close'].to_numpy(dtype=float),
+            length,
+            mode=FRAMA_MODE_INCLUSIVE
+        )
         return pd.Series(frama, index=df.index)
     
     def _calculate_rsi(self, df: pd.DataFrame, length: int) -> pd.Series:
@@ -5,11 +5,23 @@
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Tuple, Any, Union
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import asyncio
+import time
 import traceback
 import aiohttp
 from bot_logging import logger, setup_strategy_logger
+from utils.time_utils import get_timeframe_seconds, SERVER_CLOCK
+from strategies.streaming import IndicatorStream
+from strategies.candles import CandleBuffer, DEFAULT_CANDLE_CAPACITY, OHLCV_COLUMNS
+from strategies.offload import get_executor, replay_indicator_stream, run_offloaded
+from utils.candle_store import MappedCandleFile
+
+# Количество последних свечей, запрашиваемых для обновления предзагруженных данных
+RECENT_CANDLES_LIMIT = 5
+# Количество попыток пересчета индикаторов в пуле, если свечи меняются во время расчета
+INDICATOR_REBUILD_ATTEMPTS = 3
 
 class Strategy(ABC):
     """
@@ -37,10 +49,27 @@ class Strategy(ABC):
         self.name = self.__class__.__name__
         self.next_scan_time = None  # Время следующего сканирования для этой стратегии
         
-        # Добавляем поле для хранения предзагруженных данных
+        # Предзагруженные данные хранятся в колоночном буфере свечей (CandleBuffer)
         self.preloaded_data = None
         self.is_preloaded = False
         
+        # Общий файл свечей в памяти (обновляется процессом-писателем), если подключен
+        self.candle_file = None
+        # Последние свечи из события закрытия свечи (используются вместо одного запроса к бирже)
+        self._recent_candles = None
+        
+        # Потоковое состояние индикаторов (создается при установке предзагруженных данных)
+        self.indicator_stream = None
+        # Пересчет индикаторов в пуле не удался (свечи менялись) - повторить при следующем обновлении
+        self._indicator_rebuild_pending = False
+        
+        # Кеш рассчитанных индикаторов: повторные сканирования в пределах одной свечи
+        # используют готовый результат, пока последняя свеча не изменилась
+        self._indicator_cache_key = None
+        self._indicator_cache = None
+        self.indicator_cache_hits = 0
+        self.indicator_cache_misses = 0
+        
         # Инициализация специального логгера для этой стратегии
         self.logger = setup_strategy_logger(self.name)
         self.logger.info(f"Стратегия {self.name} для {self.symbol} инициализирована (таймфрейм: {timeframe})")
@@ -53,17 +82,379 @@ class Strategy(ABC):
             data: DataFrame с историческими данными OHLCV
         """
         if data is not None and not data.empty:
-            self.preloaded_data = data
+            self.preloaded_data = CandleBuffer.from_frame(data, max(DEFAULT_CANDLE_CAPACITY, len(data)))
             self.is_preloaded = True
             self.logger.info(f"Установлены предзагруженные данные для {self.symbol}: "
                            f"{len(data)} свечей (с {data.index[0]} по {data.index[-1]})")
             
-            # Примечание: индикаторы будут рассчитаны автоматически при первом запросе данных
-            # через fetch_data или при выполнении стратегии через execute
-            # Не нужно рассчитывать их здесь, так как это асинхронная операция
+            # Полный пересчет потоковых индикаторов по новой истории
+            self.clear_indicator_cache()
+            self._rebuild_indicator_stream()
         else:
             self.logger.warning(f"Попытка установить пустые предзагруженные данные для {self.symbol}")
+    
+    def attach_candle_file(self, candle_file: MappedCandleFile) -> None:
+        """
+        Подключает общий файл свечей, отображенный в память (только для чтения).
+        Если данные еще не предзагружены, ими становятся свечи файла;
+        дальше последние свечи читаются из файла вместо запросов к бирже.
+        
+        Args:
+            candle_file: Файл свечей таймфрейма стратегии
+        """
+        self.candle_file = candle_file
+        if self.is_preloaded:
+            self.logger.info(f"Подключен файл свечей {candle_file.path} для {self.symbol}")
+            return
+        
+        length = len(candle_file)
+        if not length:
+            self.logger.warning(f"Файл свечей {candle_file.path} для {self.symbol} пока пуст")
+            return
+        
+        # Представления файла копируются в рабочий буфер один раз: столбцы индикаторов у каждой стратегии свои
+        capacity = max(DEFAULT_CANDLE_CAPACITY, length)
+        columns = {name: candle_file.column(name) for name in OHLCV_COLUMNS}
+        self.preloaded_data = CandleBuffer.from_arrays(candle_file.timestamps * 1_000_000, columns, capacity)
+        self.is_preloaded = True
+        self.logger.info(f"Подключен файл свечей {candle_file.path} для {self.symbol}: {length} свечей")
+        
+        self.clear_indicator_cache()
+        self._rebuild_indicator_stream()
+    
+    def _read_candle_file(self, limit: int) -> Optional[pd.DataFrame]:
+        """
+        Читает последние свечи из подключенного файла, если он содержит текущую свечу.
+        
+        Args:
+            limit: Количество свечей
+            
+        Returns:
+            DataFrame с OHLCV данными или None, если файла нет или он отстал
+        """
+        candle_file = self.candle_file
+        if candle_file is None:
+            return None
+        if candle_file.timeframe is not None and candle_file.timeframe != self.timeframe:
+            self.logger.warning(f"Файл свечей {candle_file.path} ({candle_file.timeframe}) не соответствует "
+                                f"таймфрейму {self.timeframe}, запрашиваем биржу")
+            return None
+        candle_file.refresh()
+        # Писатель увеличивает или перезаписывает файл - его содержимое сейчас не согласовано
+        generation = candle_file.generation
+        if generation % 2:
+            self.logger.warning(f"Файл свечей {self.symbol} перезаписывается, запрашиваем биржу")
+            return None
+        
+        last_timestamp = candle_file.last_timestamp
+        timeframe_ms = get_timeframe_seconds(self.timeframe) * 1000
+        # Свечи закрываются по часам биржи, а не по локальным часам
+        now_ms = int(SERVER_CLOCK.now() * 1000)
+        if last_timestamp is None or last_timestamp < now_ms - now_ms % timeframe_ms:
+            self.logger.warning(f"Файл свечей {self.symbol} отстал (последняя свеча {last_timestamp}), запрашиваем биржу")
+            return None
+        df = candle_file.to_frame(limit)
+        if candle_file.generation != generation:
+            self.logger.warning(f"Файл свечей {self.symbol} изменился во время чтения, запрашиваем биржу")
+            return None
+        return df
+    
+    def push_recent_candles(self, ohlcv: Optional[List[list]]) -> None:
+        """
+        Передает последние свечи, уже полученные с биржи (например, часами закрытия свечей).
+        Следующее обновление данных использует их вместо собственного запроса.
+        
+        Args:
+            ohlcv: Последние свечи в формате ccxt
+        """
+        self._recent_candles = ohlcv or None
+    
+    def clear_indicator_cache(self) -> None:
+        """Сбрасывает кеш рассчитанных индикаторов."""
+        self._indicator_cache_key = None
+        self._indicator_cache = None
+    
+    def create_indicator_stream(self) -> Optional[IndicatorStream]:
+        """
+        Создает потоковый расчет индикаторов стратегии.
+        Стратегии без потоковой реализации возвращают None и используют calculate_indicators.
+        
+        Returns:
+            Optional[IndicatorStream]: Новое состояние индикаторов или None
+        """
+        return None
+    
+    def _indicator_inputs(self) -> Tuple[np.ndarray, ...]:
+        """Возвращает массивы предзагруженных свечей для расчета индикаторов (время, high, low, close, volume)."""
+        buffer = self.preloaded_data
+        return (
+            buffer.timestamps,
+            buffer.column('high'),
+            buffer.column('low'),
+            buffer.column('close'),
+            buffer.column('volume')
+        )
+    
+    def _store_indicator_values(self, stream: IndicatorStream, values: np.ndarray) -> None:
+        """
+        Сохраняет результат полного пересчета индикаторов в буфер свечей.
+        
+        Args:
+            stream: Состояние индикаторов после пересчета
+            values: Матрица значений (свечи x stream.columns)
+        """
+        self.indicator_stream = stream
+        buffer = self.preloaded_data
+        for i, column in enumerate(stream.columns):
+            buffer.add_column(column)
+            buffer.column(column)[:] = values[:, i]
+        
+        self.logger.info(f"Потоковые индикаторы пересчитаны для {self.symbol} по {len(buffer)} свечам")
+    
+    def _rebuild_indicator_stream(self) -> None:
+        """
+        Полностью пересчитывает потоковые индикаторы по предзагруженным данным.
+        Вызывается при установке данных (в текущем потоке).
+        """
+        self.indicator_stream = self.create_indicator_stream()
+        if self.indicator_stream is None or self.preloaded_data is None:
+            return
+        
+        stream, values = replay_indicator_stream(self.indicator_stream, *self._indicator_inputs())
+        self._store_indicator_values(stream, values)
+    
+    async def _rebuild_indicator_stream_async(self) -> None:
+        """
+        Полностью пересчитывает потоковые индикаторы в пуле расчета индикаторов
+        (после разрыва в истории свечей), не блокируя цикл событий.
+        Если свечи изменились во время расчета, расчет повторяется по новому снимку
+        (не более INDICATOR_REBUILD_ATTEMPTS раз).
+        """
+        self._indicator_rebuild_pending = False
+        buffer = self.preloaded_data
+        if buffer is None or self.create_indicator_stream() is None:
+            self.indicator_stream = None
+            return
+        
+        # Пока идет расчет, стратегия не должна использовать устаревшее состояние
+        self.indicator_stream = None
+        for attempt in range(1, INDICATOR_REBUILD_ATTEMPTS + 1):
+            snapshot = (len(buffer), buffer.last_timestamp, buffer.last_row())
+            # В пул передаются копии: буфер может измениться, пока идет расчет
+            inputs = [np.array(values) for values in self._indicator_inputs()]
+            stream, values = await run_offloaded(replay_indicator_stream, self.create_indicator_stream(), *inputs)
+            
+            if (len(buffer), buffer.last_timestamp, buffer.last_row()) == snapshot:
+                self._store_indicator_values(stream, values)
+                return
+            # Свечи изменились во время расчета - результат не соответствует буферу
+            self.logger.warning(f"Свечи {self.symbol} изменились во время пересчета индикаторов "
+                                f"(попытка {attempt} из {INDICATOR_REBUILD_ATTEMPTS})")
+        
+        # Индикаторы до следующего обновления рассчитываются полностью (_prepare_indicators)
+        self._indicator_rebuild_pending = True
+        self.logger.warning(f"Не удалось пересчитать потоковые индикаторы для {self.symbol}, "
+                            f"повторим при следующем обновлении свечей")
+    
+    def _update_indicator_stream(self) -> bool:
+        """
+        Досчитывает потоковые индикаторы для новых и обновленных свечей,
+        начиная с последней обработанной свечи.
+        
+        Returns:
+            bool: False если состояние индикаторов не совпадает с историей (нужен полный пересчет)
+        """
+        stream = self.indicator_stream
+        buffer = self.preloaded_data
+        
+        start = buffer.index_of(stream.last_timestamp) if stream.last_timestamp is not None else None
+        if start is None:
+            self.logger.warning(f"Состояние индикаторов {self.symbol} не совпадает с историей свечей, выполняем полный пересчет")
+            return False
+        
+        values = np.array([
+            stream.update(ts, high, low, close, volume)
+            for ts, high, low, close, volume in zip(
+                buffer.timestamps[start:].tolist(),
+                buffer.column('high')[start:].tolist(),
+                buffer.column('low')[start:].tolist(),
+                buffer.column('close')[start:].tolist(),
+                buffer.column('volume')[start:].tolist()
+            )
+        ])
+        for i, column in enumerate(stream.columns):
+            buffer.column(column)[start:] = values[:, i]
+        
+        self.logger.info(f"Потоковые индикаторы обновлены для {self.symbol}: {len(values)} свечей "
+                         f"с {pd.Timestamp(int(buffer.timestamps[start]))}")
+        return True
+    
+    async def _merge_candles(self, df: pd.DataFrame) -> None:
+        """
+        Записывает новые свечи в буфер предзагруженных данных и обновляет индикаторы.
+        Известные свечи обновляются на месте, новые добавляются в конец.
+        
+        Args:
+            df: DataFrame с новыми OHLCV данными
+        """
+        buffer = self.preloaded_data
+        last_timestamp = buffer.last_timestamp
+        timestamps = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+        
+        # Разрыв: новые свечи не продолжают сохраненную историю
+        timeframe_ns = get_timeframe_seconds(self.timeframe) * 1_000_000_000
+        has_gap = int(timestamps[0]) > last_timestamp + timeframe_ns
         
+        last_row = buffer.last_row()
+        rows = df[list(OHLCV_COLUMNS)].to_numpy(dtype=np.float64).tolist()
+        for timestamp, row in zip(timestamps.tolist(), rows):
+            buffer.upsert(timestamp, *row)
+        
+        # Последняя свеча не изменилась - индикаторы пересчитывать не нужно
+        if buffer.last_timestamp == last_timestamp and buffer.last_row() == last_row:
+            return
+        
+        if self._indicator_rebuild_pending:
+            await self._rebuild_indicator_stream_async()
+        elif self.indicator_stream is not None:
+            if has_gap:
+                self.logger.warning(f"Обнаружен разрыв в свечах {self.symbol}: {pd.Timestamp(last_timestamp)} -> {df.index[0]}, "
+                                    f"выполняем полный пересчет индикаторов")
+                await self._rebuild_indicator_stream_async()
+            elif not self._update_indicator_stream():
+                await self._rebuild_indicator_stream_async()
+    
+    async def _fetch_ohlcv_frame(self, limit: int) -> Optional[pd.DataFrame]:
+        """
+        Запрашивает OHLCV свечи фьючерсного рынка и преобразует их в DataFrame.
+        
+        Args:
+            limit: Количество запрашиваемых свечей
+            
+        Returns:
+            DataFrame с OHLCV данными или None, если биржа не вернула данных
+        """
+        # Свечи из события закрытия свечи используются один раз
+        recent_candles, self._recent_candles = self._recent_candles, None
+        if recent_candles is not None and len(recent_candles) >= limit:
+            return self._ohlcv_to_frame(recent_candles[-limit:])
+        
+        # Свежий общий файл свечей избавляет от запроса к бирже
+        df = self._read_candle_file(limit)
+        if df is not None:
+            return df
+        
+        # Параметры для фьючерсного рынка
+        params = {
+            "instType": "swap",  # Указываем тип инструмента - фьючерсы
+            "marginCoin": "USDT"  # Маржинальная валюта
+        }
+        
+        # Получаем исторические данные с явными параметрами для фьючерсов
+        ohlcv = await self.exchange.fetch_ohlcv(
+            symbol=self.symbol, 
+            timeframe=self.timeframe, 
+            limit=limit,
+            params=params
+        )
+        
+        if not ohlcv or len(ohlcv) == 0:
+            return None
+        
+        return self._ohlcv_to_frame(ohlcv)
+    
+    @staticmethod
+    def _ohlcv_to_frame(ohlcv: List[list]) -> pd.DataFrame:
+        """
+        Преобразует свечи в формате ccxt в DataFrame с индексом по времени открытия.
+        
+        Args:
+            ohlcv: Свечи [время (мс), open, high, low, close, volume]
+            
+        Returns:
+            DataFrame с OHLCV данными
+        """
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        return df
+    
+    @staticmethod
+    def _indicator_cache_key_for(df: pd.DataFrame) -> Tuple[int, int, int]:
+        """
+        Формирует ключ кеша индикаторов: время и хеш OHLCV последней свечи.
+        
+        Args:
+            df: DataFrame с OHLCV данными
+            
+        Returns:
+            Tuple[int, int, int]: (время последней свечи в нс, количество свечей, хеш OHLCV)
+        """
+        last_bar = tuple(float(df[column].iat[-1]) for column in OHLCV_COLUMNS)
+        return df.index[-1].value, len(df), hash(last_bar)
+    
+    async def _prepare_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Возвращает данные с индикаторами: из кеша, если последняя свеча не изменилась,
+        из потокового состояния, если оно соответствует последней свече,
+        иначе выполняет полный расчет.
+        
+        Args:
+            df: DataFrame с OHLCV данными
+            
+        Returns:
+            DataFrame с индикаторами
+        """
+        cache_key = self._indicator_cache_key_for(df)
+        if cache_key == self._indicator_cache_key and self._indicator_cache is not None:
+            self.indicator_cache_hits += 1
+            self.logger.info(f"Индикаторы для {self.symbol} взяты из кеша (последняя свеча {df.index[-1]} не изменилась)")
+            return self._indicator_cache
+        
+        self.indicator_cache_misses += 1
+        stream = self.indicator_stream
+        if (stream is not None and stream.last_timestamp == df.index[-1].value
+                and all(column in df.columns for column in stream.columns)):
+            self.logger.info(f"Используются потоковые индикаторы для {self.symbol} (последняя свеча {df.index[-1]})")
+        else:
+            self.logger.info(f"Расчет индикаторов для {self.symbol} на {len(df)} свечах")
+            df = await self._calculate_indicators_offloaded(df)
+        
+        self._indicator_cache_key = cache_key
+        self._indicator_cache = df
+        return df
+        
+    async def _calculate_indicators_offloaded(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Полный расчет индикаторов в пуле расчета индикаторов.
+        В пул передаются только массивы OHLCV, расчет выполняют потоковые индикаторы
+        (результат совпадает с calculate_indicators). Без пула или потоковой
+        реализации используется calculate_indicators.
+        
+        Args:
+            df: DataFrame с OHLCV данными
+            
+        Returns:
+            DataFrame с индикаторами
+        """
+        stream = self.create_indicator_stream()
+        if stream is None or get_executor() is None:
+            return await self.calculate_indicators(df)
+        
+        _, values = await run_offloaded(
+            replay_indicator_stream,
+            stream,
+            pd.DatetimeIndex(df.index).as_unit('ns').asi8,
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64),
+            df['volume'].to_numpy(dtype=np.float64)
+        )
+        df = df.copy()
+        for i, column in enumerate(stream.columns):
+            df[column] = values[:, i]
+        return df
+    
     @abstractmethod
     async def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -106,24 +497,17 @@ class Strategy(ABC):
         if self.is_preloaded and self.preloaded_data is not None and len(self.preloaded_data) >= limit:
             self.logger.info(f"Использование предзагруженных данных для {self.symbol}: возвращаем {limit} из {len(self.preloaded_data)} свечей")
             
-            # Проверяем, рассчитаны ли индикаторы для предзагруженных данных
-            if self.symbol == "ETH/USDT":
-                required_indicators = ['frama', 'adx', 'rsi', 'ema200']
-            else:  # BTC/USDT и другие
-                required_indicators = ['frama', 'stc', 'vfi']
-            missing_indicators = [ind for ind in required_indicators if ind not in self.preloaded_data.columns]
-            
-            # Если индикаторы не рассчитаны, рассчитываем их
-            if missing_indicators:
-                self.logger.info(f"Расчет отсутствующих индикаторов для предзагруженных данных {self.symbol}: {', '.join(missing_indicators)}")
-                try:
-                    # Рассчитываем индикаторы для предзагруженных данных
-                    self.preloaded_data = await self.calculate_indicators(self.preloaded_data)
-                    self.logger.info(f"Индикаторы успешно рассчитаны для {self.symbol}")
-                except Exception as e:
-                    self.logger.error(f"Ошибка при расчете индикаторов: {e}")
+            # Догружаем последние свечи: обновляем текущую и добавляем закрывшиеся
+            try:
+                recent_df = await self._fetch_ohlcv_frame(RECENT_CANDLES_LIMIT)
+                if recent_df is not None:
+                    await self._merge_candles(recent_df)
+                else:
+                    self.logger.warning(f"Не удалось получить последние свечи для {self.symbol}, используем сохраненные данные")
+            except Exception as e:
+                self.logger.warning(f"Ошибка при обновлении последних свечей для {self.symbol}: {e}")
             
-            return self.preloaded_data.iloc[-limit:]
+            return self.preloaded_data.to_frame(limit)
         
         # Если предзагруженные данные отсутствуют или недостаточны, получаем данные с биржи
         try:
@@ -136,41 +520,19 @@ class Strategy(ABC):
                 
             # Получаем данные через стандартный метод биржи
             try:
-                # Параметры для фьючерсного рынка
-                params = {
-                    "instType": "swap",  # Указываем тип инструмента - фьючерсы
-                    "marginCoin": "USDT"  # Маржинальная валюта
-                }
-                
-                # Получаем исторические данные с явными параметрами для фьючерсов
-                ohlcv = await self.exchange.fetch_ohlcv(
-                    symbol=self.symbol, 
-                    timeframe=self.timeframe, 
-                    limit=limit,
-                    params=params
-                )
+                df = await self._fetch_ohlcv_frame(limit)
                 
                 # Проверяем, получены ли данные
-                if not ohlcv or len(ohlcv) == 0:
+                if df is None:
                     self.logger.warning(f"Не удалось получить OHLCV данные для {self.symbol} через стандартный метод, пробуем альтернативный")
                     raise Exception("Нет данных")
-                    
-                # Преобразуем данные в pandas DataFrame
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
                 
                 # Если были предзагруженные данные, обновляем их новыми данными
                 if self.is_preloaded and self.preloaded_data is not None:
                     self.logger.info(f"Объединение предзагруженных данных с новыми данными для {self.symbol}")
-                    # Объединяем старые и новые данные, удаляя дубликаты
-                    combined_df = pd.concat([self.preloaded_data, df])
-                    combined_df = combined_df[~combined_df.index.duplicated(keep='last')]
-                    combined_df = combined_df.sort_index()
-                    # Обновляем предзагруженные данные
-                    self.preloaded_data = combined_df
+                    await self._merge_candles(df)
                     # Используем объединенные данные
-                    df = combined_df.iloc[-limit:] if len(combined_df) > limit else combined_df
+                    df = self.preloaded_data.to_frame(limit)
                 
                 self.logger.info(f"Получено {len(df)} свечей для {self.symbol} (с {df.index[0]} по {df.index[-1]})")
                 return df
@@ -292,9 +654,8 @@ class Strategy(ABC):
             return None
         
         try:
-            # Расчет индикаторов
-            self.logger.info(f"Расчет индикаторов для {self.symbol} на {len(df)} свечах")
-            df = await self.calculate_indicators(df)
+            # Расчет индикаторов (или готовые значения из потокового состояния)
+            df = await self._prepare_indicators(df)
             
             # Определяем необходимые индикаторы в зависимости от стратегии
             if self.symbol == "ETH/USDT":
@@ -349,9 +710,8 @@ class Strategy(ABC):
             return None, [f"Недостаточно данных для анализа: получено {len(df)}, требуется минимум 10"]
         
         try:
-            # Расчет индикаторов
-            self.logger.info(f"Расчет индикаторов для {self.symbol} на {len(df)} свечах")
-            df = await self.calculate_indicators(df)
+            # Расчет индикаторов (или готовые значения из потокового состояния)
+            df = await self._prepare_indicators(df)
             
             # Определяем необходимые индикаторы в зависимости от стратегии
             if self.symbol == "ETH/USDT":
@@ -471,4 +831,18 @@ class Strategy(ABC):
         old_timeframe = self.timeframe
         self.timeframe = new_timeframe
         self.next_scan_time = None  # Сбрасываем время следующего сканирования
+        self.clear_indicator_cache()
+        
+        # Файл свечей прежнего таймфрейма больше не источник последних свечей;
+        # загрузчик подключит файл нового таймфрейма (keep_store_fresh)
+        if self.candle_file is not None and self.candle_file.timeframe != new_timeframe:
+            self.logger.info(f"Файл свечей {self.candle_file.path} отключен после смены таймфрейма")
+            self.candle_file = None
+        
+        # Свечи прежнего таймфрейма нельзя объединять со свечами нового
+        if new_timeframe != old_timeframe and self.is_preloaded:
+            self.preloaded_data = None
+            self.is_preloaded = False
+            self.indicator_stream = None
+            self._indicator_rebuild_pending = False
         self.logger.info(f"Таймфрейм изменен: {old_timeframe} -> {new_timeframe}") 
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+Колоночное хранилище свечей фиксированной емкости.
+
+Каждое поле OHLCV хранится в отдельном массиве NumPy, время открытия свечи -
+в массиве int64 (наносекунды, как в pandas). Массивы имеют двойную емкость:
+новые свечи дописываются в конец, а при заполнении последние capacity-1 свечей
+один раз переносятся в начало. Поэтому добавление выполняется за амортизированное
+O(1), а актуальные данные всегда лежат непрерывно и отдаются как представления
+(view) без копирования.
+"""
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Емкость буфера по умолчанию (свечей)
+DEFAULT_CANDLE_CAPACITY = 2000
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleBuffer:
+    """Кольцевой колоночный буфер OHLCV свечей с дополнительными столбцами индикаторов."""
+
+    def __init__(self, capacity: int = DEFAULT_CANDLE_CAPACITY, columns: Iterable[str] = ()):
+        """
+        Args:
+            capacity: Максимальное количество хранимых свечей
+            columns: Дополнительные столбцы (например, индикаторы)
+        """
+        if capacity < 1:
+            raise ValueError(f"Емкость буфера свечей должна быть положительной: {capacity}")
+
+        self.capacity = capacity
+        self._start = 0
+        self._end = 0
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._columns: Dict[str, np.ndarray] = {}
+        for name in OHLCV_COLUMNS:
+            self._columns[name] = np.full(2 * capacity, np.nan)
+        for name in columns:
+            self.add_column(name)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, capacity: int = DEFAULT_CANDLE_CAPACITY) -> 'CandleBuffer':
+        """
+        Создает буфер из DataFrame с OHLCV данными (индекс - время открытия свечи).
+        Если свечей больше емкости, сохраняются последние.
+
+        Args:
+            df: DataFrame с OHLCV данными
+            capacity: Емкость буфера
+
+        Returns:
+            CandleBuffer: Заполненный буфер
+        """
+        buffer = cls(capacity)
+        df = df.iloc[-capacity:]
+        count = len(df)
+        buffer._timestamps[:count] = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+        for name in OHLCV_COLUMNS:
+            buffer._columns[name][:count] = df[name].to_numpy(dtype=np.float64)
+        buffer._end = count
+        return buffer
+
+    @classmethod
+    def from_arrays(cls, timestamps: np.ndarray, columns: Dict[str, np.ndarray],
+                    capacity: int = DEFAULT_CANDLE_CAPACITY) -> 'CandleBuffer':
+        """
+        Создает буфер из массивов OHLCV (например, представлений файла свечей в памяти).
+        Данные копируются один раз, без промежуточного DataFrame.
+
+        Args:
+            timestamps: Время открытия свечей (int64, нс)
+            columns: Массивы 'open', 'high', 'low', 'close', 'volume'
+            capacity: Емкость буфера
+
+        Returns:
+            CandleBuffer: Заполненный буфер
+        """
+        buffer = cls(capacity)
+        count = min(len(timestamps), capacity)
+        buffer._timestamps[:count] = timestamps[len(timestamps) - count:]
+        for name in OHLCV_COLUMNS:
+            values = columns[name]
+            buffer._columns[name][:count] = values[len(values) - count:]
+        buffer._end = count
+        return buffer
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def columns(self) -> list:
+        """Список всех столбцов буфера."""
+        return list(self._columns)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Время открытия свечей (int64, нс) - представление без копирования."""
+        return self._timestamps[self._start:self._end]
+
+    @property
+    def first_timestamp(self) -> Optional[int]:
+        """Время первой хранимой свечи или None для пустого буфера."""
+        return int(self._timestamps[self._start]) if len(self) else None
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Время последней свечи или None для пустого буфера."""
+        return int(self._timestamps[self._end - 1]) if len(self) else None
+
+    def last_row(self) -> Optional[tuple]:
+        """
+        Возвращает OHLCV последней свечи.
+
+        Returns:
+            Optional[tuple]: (open, high, low, close, volume) или None для пустого буфера
+        """
+        if not len(self):
+            return None
+        row = self._end - 1
+        return tuple(float(self._columns[name][row]) for name in OHLCV_COLUMNS)
+
+    def add_column(self, name: str) -> None:
+        """
+        Добавляет столбец, заполненный NaN (если его еще нет).
+
+        Args:
+            name: Имя столбца
+        """
+        if name not in self._columns:
+            self._columns[name] = np.full(2 * self.capacity, np.nan)
+
+    def column(self, name: str, last: Optional[int] = None) -> np.ndarray:
+        """
+        Возвращает столбец как представление без копирования.
+        Запись в представление изменяет данные буфера.
+
+        Args:
+            name: Имя столбца
+            last: Количество последних свечей (по умолчанию все)
+
+        Returns:
+            np.ndarray: Значения столбца
+        """
+        start = self._start if last is None else max(self._start, self._end - last)
+        return self._columns[name][start:self._end]
+
+    def index_of(self, timestamp: int) -> Optional[int]:
+        """
+        Ищет позицию свечи по времени открытия (бинарный поиск).
+
+        Args:
+            timestamp: Время открытия свечи (int64, нс)
+
+        Returns:
+            Optional[int]: Позиция относительно первой хранимой свечи или None
+        """
+        timestamps = self.timestamps
+        position = int(np.searchsorted(timestamps, timestamp))
+        if position < len(timestamps) and timestamps[position] == timestamp:
+            return position
+        return None
+
+    def upsert(self, timestamp: int, open_price: float, high: float, low: float,
+               close: float, volume: float) -> Optional[int]:
+        """
+        Добавляет новую свечу или обновляет уже сохраненную на месте
+        (в первую очередь - еще не закрытую последнюю свечу).
+
+        Args:
+            timestamp: Время открытия свечи (int64, нс)
+            open_price: Цена открытия
+            high: Максимальная цена
+            low: Минимальная цена
+            close: Цена закрытия
+            volume: Объем
+
+        Returns:
+            Optional[int]: Позиция свечи относительно первой хранимой
+            или None, если свеча старше хранимой истории
+        """
+        if len(self) and timestamp <= self._timestamps[self._end - 1]:
+            position = self.index_of(timestamp)
+            if position is None:
+                return None
+            row = self._start + position
+        else:
+            if self._end == 2 * self.capacity:
+                self._compact()
+            elif len(self) == self.capacity:
+                self._start += 1
+            row = self._end
+            self._end += 1
+            self._timestamps[row] = timestamp
+            # Значения индикаторов для новой свечи еще не рассчитаны
+            for name in self._columns:
+                if name not in OHLCV_COLUMNS:
+                    self._columns[name][row] = np.nan
+
+        columns = self._columns
+        columns['open'][row] = open_price
+        columns['high'][row] = high
+        columns['low'][row] = low
+        columns['close'][row] = close
+        columns['volume'][row] = volume
+        return row - self._start
+
+    def _compact(self) -> None:
+        """Переносит последние capacity-1 свечей в начало массивов."""
+        keep = self.capacity - 1
+        source = slice(self._end - keep, self._end)
+        self._timestamps[:keep] = self._timestamps[source]
+        for values in self._columns.values():
+            values[:keep] = values[source]
+        self._start = 0
+        self._end = keep
+
+    def to_frame(self, last: Optional[int] = None) -> pd.DataFrame:
+        """
+        Преобразует последние свечи в DataFrame (для pandas-кода, Telegram и отладки).
+
+        Args:
+            last: Количество последних свечей (по умолчанию все)
+
+        Returns:
+            pd.DataFrame: Копия данных с индексом по времени открытия свечи
+        """
+        start = self._start if last is None else max(self._start, self._end - last)
+        index = pd.DatetimeIndex(self._timestamps[start:self._end].astype('datetime64[ns]'), name='timestamp')
+        data = {name: values[start:self._end].copy() for name, values in self._columns.items()}
+        return pd.DataFrame(data, index=index)
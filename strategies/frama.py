@@ -0,0 +1,151 @@
+"""
+Векторизованный расчет FRAMA (Fractal Adaptive Moving Average) на NumPy.
+Общий движок для BTCStrategy и ETHStrategy.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Окно N1/N2 заканчивается на предыдущей свече (вариант BTCStrategy)
+FRAMA_MODE_EXCLUSIVE = "exclusive"
+# Окно N1/N2 включает текущую свечу (вариант ETHStrategy)
+FRAMA_MODE_INCLUSIVE = "inclusive"
+
+FRAMA_MODES = (FRAMA_MODE_EXCLUSIVE, FRAMA_MODE_INCLUSIVE)
+
+_LOG2 = math.log(2)
+
+
+def frama_dimension_ranges(high: np.ndarray, low: np.ndarray, length: int, mode: str):
+    """
+    Рассчитывает N1 и N2 для всех баров, начиная с индекса length.
+
+    Используются скользящие окна (sliding_window_view) без копирования данных,
+    максимум/минимум считаются одним проходом по каждому окну.
+
+    Args:
+        high: Массив максимальных цен
+        low: Массив минимальных цен
+        length: Период FRAMA
+        mode: FRAMA_MODE_EXCLUSIVE или FRAMA_MODE_INCLUSIVE
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Значения N1 и N2 для баров length..len-1
+    """
+    if mode not in FRAMA_MODES:
+        raise ValueError(f"Неизвестный режим FRAMA: {mode}")
+    if length < 2:
+        raise ValueError(f"Период FRAMA должен быть не меньше 2: {length}")
+
+    n = len(high)
+    half_len = length // 2
+    if n <= length:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+
+    # Смещение окна: 0 - окно заканчивается на i-1, 1 - окно заканчивается на i
+    offset = 1 if mode == FRAMA_MODE_INCLUSIVE else 0
+    count = n - length
+
+    # Окна длины length для N1: для бара i окно начинается с i - length + offset
+    high_windows = sliding_window_view(high, length)[offset:offset + count]
+    low_windows = sliding_window_view(low, length)[offset:offset + count]
+    n1 = (high_windows.max(axis=1) - low_windows.min(axis=1)) / length
+
+    # Окна длины half_len по mid = (high + low) / 2 для N2
+    mid = (high + low) / 2
+    start = length - half_len + offset
+    mid_windows = sliding_window_view(mid, half_len)[start:start + count]
+    n2 = (mid_windows.max(axis=1) - mid_windows.min(axis=1)) / half_len
+
+    return n1, n2
+
+
+def frama_alpha(n1: float, n2: float) -> float:
+    """
+    Рассчитывает alpha FRAMA по N1 и N2 (как в Pine Script).
+
+    Args:
+        n1: Диапазон полного окна, деленный на длину
+        n2: Диапазон половины окна, деленный на половину длины
+
+    Returns:
+        float: Alpha, ограниченная диапазоном [0.01, 1.0]
+    """
+    # d = log(n1 + n2) / log(2)
+    d = 0
+    if (n1 + n2) > 0:
+        d = math.log(n1 + n2) / _LOG2
+    # alpha = exp(-4.6 * (d - 1))
+    alpha = math.exp(-4.6 * (d - 1))
+    return max(0.01, min(1.0, alpha))
+
+
+def calculate_frama(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                    length: int, mode: str = FRAMA_MODE_EXCLUSIVE,
+                    out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Рассчитывает FRAMA для всего ряда.
+
+    Режимы повторяют исходные реализации стратегий бит в бит:
+    - FRAMA_MODE_EXCLUSIVE (BTC): окно не включает текущую свечу, первое значение
+      ряда равно первой цене закрытия, первый рассчитанный бар сглаживается от close.
+    - FRAMA_MODE_INCLUSIVE (ETH): окно включает текущую свечу, первое рассчитанное
+      значение (бар length) равно цене закрытия.
+
+    Args:
+        high: Массив максимальных цен
+        low: Массив минимальных цен
+        close: Массив цен закрытия
+        length: Период FRAMA
+        mode: Режим расчета окна
+        out: Необязательный массив для записи результата
+
+    Returns:
+        np.ndarray: Значения FRAMA (NaN там, где значение не определено)
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    frama = out if out is not None else np.empty(n, dtype=np.float64)
+    frama[:] = np.nan
+    if n == 0:
+        return frama
+
+    if mode == FRAMA_MODE_EXCLUSIVE:
+        # Инициализируем первое значение первой доступной ценой закрытия
+        frama[0] = close[0]
+
+    n1_values, n2_values = frama_dimension_ranges(high, low, length, mode)
+    if len(n1_values) == 0:
+        return frama
+
+    # Рекуррентная часть EMA с переменным alpha выполняется одним проходом
+    # по python-float, что дает точное совпадение с исходным расчетом
+    prices = close[length:].tolist()
+    prev = float(frama[length - 1])
+    result = []
+    append = result.append
+
+    if mode == FRAMA_MODE_EXCLUSIVE:
+        for price, n1, n2 in zip(prices, n1_values.tolist(), n2_values.tolist()):
+            alpha = frama_alpha(n1, n2)
+            prev_frama = prev if prev == prev else price
+            prev = alpha * price + (1 - alpha) * prev_frama
+            append(prev)
+    else:
+        first = True
+        for price, n1, n2 in zip(prices, n1_values.tolist(), n2_values.tolist()):
+            alpha = frama_alpha(n1, n2)
+            if first:
+                prev = price
+                first = False
+            else:
+                prev = alpha * price + (1 - alpha) * prev
+            append(prev)
+
+    frama[length:] = result
+    return frama
@@ -0,0 +1,108 @@
+"""
+Вынос расчета индикаторов из цикла событий.
+
+Полный пересчет индикаторов - чисто вычислительная работа. Выполненный в потоке
+цикла событий, он задерживает команды Telegram и мониторинг трейлинг-стопов.
+Поэтому пересчет передается в пул процессов (или потоков): на вход идут только
+массивы NumPy и объект потоковых индикаторов, на выход - матрица значений
+и состояние индикаторов, а цикл событий лишь ожидает результат.
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from bot_logging import logger
+from strategies.streaming import IndicatorStream
+
+# Типы пулов для расчета индикаторов
+EXECUTOR_PROCESS = "process"
+EXECUTOR_THREAD = "thread"
+
+# Пул для расчета индикаторов (None - расчет в потоке цикла событий)
+_executor: Optional[Executor] = None
+
+
+def create_executor(kind: Optional[str], workers: int) -> Optional[Executor]:
+    """
+    Создает пул для расчета индикаторов.
+
+    Args:
+        kind: EXECUTOR_PROCESS, EXECUTOR_THREAD или None (без пула)
+        workers: Количество рабочих процессов или потоков
+
+    Returns:
+        Optional[Executor]: Пул или None
+    """
+    if kind is None:
+        return None
+    if kind == EXECUTOR_PROCESS:
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == EXECUTOR_THREAD:
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="indicators")
+    raise ValueError(f"Неизвестный тип пула для расчета индикаторов: {kind}")
+
+
+def set_executor(executor: Optional[Executor]) -> None:
+    """
+    Устанавливает пул для расчета индикаторов всех стратегий.
+
+    Args:
+        executor: Пул или None (расчет в потоке цикла событий)
+    """
+    global _executor
+    _executor = executor
+    if executor is not None:
+        logger.info(f"Расчет индикаторов выполняется в пуле {type(executor).__name__}")
+
+
+def get_executor() -> Optional[Executor]:
+    """Возвращает текущий пул для расчета индикаторов."""
+    return _executor
+
+
+async def run_offloaded(func: Callable, *args):
+    """
+    Выполняет функцию в пуле расчета индикаторов и ожидает результат.
+    Без пула (или если пул процессов сломан) функция выполняется в текущем потоке.
+
+    Args:
+        func: Функция уровня модуля (для пула процессов аргументы и результат сериализуются)
+        *args: Аргументы функции
+
+    Returns:
+        Результат функции
+    """
+    global _executor
+    if _executor is None:
+        return func(*args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    except BrokenProcessPool as e:
+        logger.error(f"Пул расчета индикаторов недоступен, расчет переносится в цикл событий: {e}")
+        _executor = None
+        return func(*args)
+
+
+def replay_indicator_stream(stream: IndicatorStream, timestamps: np.ndarray, high: np.ndarray,
+                            low: np.ndarray, close: np.ndarray,
+                            volume: np.ndarray) -> Tuple[IndicatorStream, np.ndarray]:
+    """
+    Полный пересчет потоковых индикаторов (выполняется в пуле).
+
+    Args:
+        stream: Потоковые индикаторы стратегии
+        timestamps: Время открытия свечей
+        high: Максимальные цены
+        low: Минимальные цены
+        close: Цены закрытия
+        volume: Объемы
+
+    Returns:
+        Tuple[IndicatorStream, np.ndarray]: Состояние индикаторов после пересчета
+        и матрица значений (свечи x stream.columns)
+    """
+    values = stream.replay(timestamps, high, low, close, volume)
+    return stream, values
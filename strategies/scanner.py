@@ -2,14 +2,21 @@
 Сканер для выполнения стратегий и поиска сигналов.
 """
 import asyncio
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Callable
 import traceback
 
 from bot_logging import logger
 from trading.exchange import BitgetExchange
-from strategies import Strategy
-from utils.time_utils import wait_for_candle_close
+from strategies import Strategy, RECENT_CANDLES_LIMIT
+from utils.time_utils import CandleClock
+
+# Максимальное число стратегий, одновременно загружающих данные и считающих индикаторы
+SCAN_CONCURRENCY = 4
+# Количество последних закрытий свечей, для которых хранится время сканирования
+SCAN_TIMING_HISTORY = 20
 
 class StrategyScanner:
     """Сканер для выполнения стратегий и поиска сигналов."""
@@ -20,7 +27,14 @@ class StrategyScanner:
         self.active_tasks = {}  # {symbol: Task}
         self.running = False
         self.signal_callback = None
-        self._lock = asyncio.Lock()
+        # Символы сканируются независимо: блокировка не дает запустить
+        # второе сканирование того же символа, пока идет первое
+        self._symbol_locks = {}  # {symbol: Lock}
+        self._scan_semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+        # Время от закрытия свечи до конца сканирования: {(timeframe, время свечи): {symbol: секунды}}
+        self.scan_timings = OrderedDict()
+        # Общие часы закрытия свечей: один опрос биржи на символ и таймфрейм
+        self.candle_clock = CandleClock(self._fetch_recent_candles)
         
         logger.info("Инициализирован сканер стратегий")
     
@@ -45,9 +59,36 @@ class StrategyScanner:
         self.signal_callback = callback
         logger.info("Зарегистрирован обработчик сигналов")
         
+    async def _fetch_recent_candles(self, symbol: str, timeframe: str) -> Optional[List[list]]:
+        """
+        Запрашивает последние свечи для часов закрытия свечей.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            
+        Returns:
+            Optional[List[list]]: Последние свечи в формате ccxt
+        """
+        strategy = self.strategies[symbol]
+        return await strategy.exchange.fetch_ohlcv(
+            symbol=symbol,
+            timeframe=timeframe,
+            limit=RECENT_CANDLES_LIMIT,
+            params={"instType": "swap", "marginCoin": "USDT"}
+        )
+    
+    def _symbol_lock(self, symbol: str) -> asyncio.Lock:
+        """Возвращает блокировку сканирования символа (создается при первом обращении)."""
+        lock = self._symbol_locks.get(symbol)
+        if lock is None:
+            lock = self._symbol_locks[symbol] = asyncio.Lock()
+        return lock
+    
     async def scan_symbol(self, symbol: str) -> Optional[Dict]:
         """
         Сканирует указанный символ на наличие сигналов.
+        Разные символы сканируются параллельно (не больше SCAN_CONCURRENCY расчетов одновременно).
         
         Args:
             symbol: Торговый символ
@@ -55,7 +96,7 @@ class StrategyScanner:
         Returns:
             Optional[Dict]: Словарь с информацией о сигнале или None
         """
-        async with self._lock:
+        async with self._symbol_lock(symbol):
             if symbol not in self.strategies:
                 logger.warning(f"Стратегия для {symbol} не найдена")
                 return None
@@ -63,8 +104,16 @@ class StrategyScanner:
             try:
                 strategy = self.strategies[symbol]
                 
+                cache_hits = strategy.indicator_cache_hits
+                cache_misses = strategy.indicator_cache_misses
+                
                 # Используем execute_with_conditions вместо execute для получения информации о причинах отсутствия сигнала
-                signal, failed_conditions = await strategy.execute_with_conditions()
+                async with self._scan_semaphore:
+                    signal, failed_conditions = await strategy.execute_with_conditions()
+                
+                logger.info(f"Кеш индикаторов {symbol}: попаданий {strategy.indicator_cache_hits - cache_hits}, "
+                            f"промахов {strategy.indicator_cache_misses - cache_misses} "
+                            f"(всего {strategy.indicator_cache_hits}/{strategy.indicator_cache_misses})")
                 
                 if signal:
                     logger.info(f"Найден сигнал для {symbol}: {signal.get('side', 'unknown')} {signal.get('type', 'unknown')} по цене {signal.get('price', 0):.4f}")
@@ -91,7 +140,7 @@ class StrategyScanner:
     
     async def _continuous_scan(self, symbol: str) -> None:
         """
-        Непрерывно сканирует указанный символ с учетом таймфрейма.
+        Непрерывно сканирует указанный символ по событиям закрытия свечей.
         
         Args:
             symbol: Торговый символ
@@ -101,39 +150,71 @@ class StrategyScanner:
             return
             
         strategy = self.strategies[symbol]
-        logger.info(f"Запуск непрерывного сканирования для {symbol} (таймфрейм: {strategy.timeframe})")
+        timeframe = strategy.timeframe
+        logger.info(f"Запуск непрерывного сканирования для {symbol} (таймфрейм: {timeframe})")
         
-        while self.running:
-            try:
-                # Ожидаем закрытия свечи + 1 секунда
-                await wait_for_candle_close(strategy.timeframe)
-                
-                # Выполняем несколько сканирований с задержкой
-                num_scans = 3  # Количество сканирований
-                scan_delay = 5  # Задержка между сканированиями в секундах
-                
-                signal = None
-                for scan_num in range(1, num_scans + 1):
-                    # Сканируем символ
-                    logger.info(f"Сканирование {scan_num}/{num_scans} для {symbol} на таймфрейме {strategy.timeframe} в {datetime.now().strftime('%H:%M:%S.%f')}")
-                    signal = await self.scan_symbol(symbol)
+        queue = self.candle_clock.subscribe(symbol, timeframe)
+        try:
+            while self.running:
+                try:
+                    # Ожидаем, пока биржа вернет закрытую свечу
+                    event = await queue.get()
                     
-                    # Если сигнал найден или это последнее сканирование, завершаем цикл
-                    if signal or scan_num == num_scans:
-                        break
+                    # Сканируем по уже полученным свечам, без повторного запроса
+                    strategy.push_recent_candles(event['candles'])
+                    logger.info(f"Сканирование {symbol} на таймфрейме {timeframe} в {datetime.now().strftime('%H:%M:%S.%f')} "
+                                f"(закрытие свечи +{event['delay']:.2f} с)")
+                    received = time.monotonic()
+                    await self.scan_symbol(symbol)
+                    self._record_scan_time(event, event['delay'] + time.monotonic() - received)
                     
-                    # Если это не последнее сканирование, ждем перед следующим
-                    if scan_num < num_scans:
-                        logger.info(f"Ожидание {scan_delay} секунд перед следующим сканированием {symbol}")
-                        await asyncio.sleep(scan_delay)
-                
-            except asyncio.CancelledError:
-                logger.info(f"Сканирование {symbol} отменено")
-                break
-            except Exception as e:
-                logger.error(f"Ошибка при непрерывном сканировании {symbol}: {str(e)}")
-                logger.error(traceback.format_exc())
-                await asyncio.sleep(10)  # Пауза перед повторной попыткой
+                except asyncio.CancelledError:
+                    logger.info(f"Сканирование {symbol} отменено")
+                    break
+                except Exception as e:
+                    logger.error(f"Ошибка при непрерывном сканировании {symbol}: {str(e)}")
+                    logger.error(traceback.format_exc())
+                    await asyncio.sleep(10)  # Пауза перед повторной попыткой
+        finally:
+            self.candle_clock.unsubscribe(symbol, timeframe, queue)
+    
+    def _record_scan_time(self, event: Dict, seconds: float) -> None:
+        """
+        Сохраняет время от закрытия свечи до конца сканирования символа.
+        
+        Args:
+            event: Событие закрытия свечи
+            seconds: Время от границы свечи до конца сканирования (секунды)
+        """
+        key = (event['timeframe'], event['timestamp'])
+        cycle = self.scan_timings.get(key)
+        if cycle is None:
+            cycle = self.scan_timings[key] = {}
+            while len(self.scan_timings) > SCAN_TIMING_HISTORY:
+                self.scan_timings.popitem(last=False)
+        cycle[event['symbol']] = seconds
+        
+        if len(cycle) == sum(1 for strategy in self.strategies.values() if strategy.timeframe == event['timeframe']):
+            logger.info(f"Закрытие свечи {event['timeframe']} обработано по {len(cycle)} символам "
+                        f"за {max(cycle.values()):.2f} с после границы")
+    
+    def get_scan_stats(self) -> Dict:
+        """
+        Возвращает время сканирования по последнему закрытию свечи.
+        
+        Returns:
+            Dict: timeframe, timestamp, symbols (секунды по символам), total (до конца последнего символа)
+            или пустой словарь, если сканирований еще не было
+        """
+        if not self.scan_timings:
+            return {}
+        (timeframe, timestamp), cycle = next(reversed(self.scan_timings.items()))
+        return {
+            "timeframe": timeframe,
+            "timestamp": timestamp,
+            "symbols": {symbol: round(seconds, 3) for symbol, seconds in cycle.items()},
+            "total": round(max(cycle.values()), 3)
+        }
     
     async def start(self) -> None:
         """Запускает непрерывное сканирование для всех стратегий."""
@@ -168,6 +249,7 @@ class StrategyScanner:
                     pass
                     
         self.active_tasks.clear()
+        await self.candle_clock.stop()
         logger.info("Сканер стратегий остановлен")
         
     def set_timeframe(self, symbol: str, timeframe: str) -> bool:
@@ -0,0 +1,397 @@
+"""
+Потоковые (инкрементальные) индикаторы.
+
+Каждый примитив хранит только состояние, необходимое для расчета следующего значения,
+поэтому новая или обновленная свеча обрабатывается за O(1) относительно длины истории.
+Формулы повторяют pandas (ewm/rolling), чтобы результат совпадал с пакетным расчетом.
+
+Примитивы поддерживают два режима update():
+- commit=True: свеча закрыта, состояние сдвигается;
+- commit=False: расчет для текущей (еще не закрытой) свечи без изменения состояния,
+  поэтому последнюю свечу можно пересчитывать сколько угодно раз.
+"""
+import math
+from collections import deque
+from itertools import islice
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from strategies.frama import FRAMA_MODE_EXCLUSIVE, FRAMA_MODE_INCLUSIVE, FRAMA_MODES, frama_alpha
+
+NAN = float('nan')
+
+
+def safe_div(a: float, b: float) -> float:
+    """
+    Деление по правилам IEEE (как в NumPy/pandas): x/0 -> ±inf, 0/0 -> NaN.
+
+    Args:
+        a: Делимое
+        b: Делитель
+
+    Returns:
+        float: Результат деления
+    """
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class EwmMean:
+    """
+    Потоковый аналог Series.ewm(...).mean() (ignore_na=False, min_periods=0).
+    Повторяет алгоритм pandas: взвешенное среднее и накопленный вес.
+    """
+    __slots__ = ('_factor', '_new_wt', '_adjust', '_weighted', '_old_wt')
+
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None, adjust: bool = True):
+        """
+        Args:
+            span: Период сглаживания (как span в pandas)
+            alpha: Коэффициент сглаживания (как alpha в pandas)
+            adjust: Режим adjust pandas
+        """
+        if span is not None:
+            com = (span - 1) / 2.0
+        elif alpha is not None:
+            com = (1 - alpha) / alpha
+        else:
+            raise ValueError("Необходимо указать span или alpha")
+
+        smoothing = 1.0 / (1.0 + com)
+        self._factor = 1.0 - smoothing
+        self._new_wt = 1.0 if adjust else smoothing
+        self._adjust = adjust
+        self.reset()
+
+    def reset(self) -> None:
+        """Сбрасывает состояние."""
+        self._weighted = NAN
+        self._old_wt = 1.0
+
+    def update(self, value: float, commit: bool = True) -> float:
+        """
+        Рассчитывает значение для нового наблюдения.
+
+        Args:
+            value: Новое значение ряда
+            commit: Сохранить ли состояние
+
+        Returns:
+            float: Значение EMA
+        """
+        weighted = self._weighted
+        old_wt = self._old_wt
+
+        if weighted == weighted:
+            old_wt *= self._factor
+            if value == value:
+                # Как в pandas: на постоянном ряде значение не пересчитывается
+                if weighted != value:
+                    weighted = old_wt * weighted + self._new_wt * value
+                    weighted /= (old_wt + self._new_wt)
+                if self._adjust:
+                    old_wt += self._new_wt
+                else:
+                    old_wt = 1.0
+        elif value == value:
+            weighted = value
+
+        if commit:
+            self._weighted = weighted
+            self._old_wt = old_wt
+        return weighted
+
+
+class RollingMean:
+    """
+    Потоковый аналог Series.rolling(window).mean().
+    Использует ту же сумму с компенсацией Кэхэна, что и pandas.
+    """
+    __slots__ = ('window', '_values', '_state')
+
+    def __init__(self, window: int):
+        """
+        Args:
+            window: Размер окна
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        """Сбрасывает состояние."""
+        self._values = deque(maxlen=self.window)
+        # sum_x, compensation_add, compensation_remove, nobs, neg_ct, same_count, prev_value
+        self._state = (0.0, 0.0, 0.0, 0, 0, 0, NAN)
+
+    def update(self, value: float, commit: bool = True) -> float:
+        """
+        Рассчитывает среднее окна с новым значением.
+
+        Args:
+            value: Новое значение ряда
+            commit: Сохранить ли состояние
+
+        Returns:
+            float: Среднее по окну или NaN, если окно еще не заполнено
+        """
+        sum_x, comp_add, comp_remove, nobs, neg_ct, same_count, prev_value = self._state
+
+        # Сначала удаляем выпадающее из окна значение, затем добавляем новое (как в pandas)
+        if len(self._values) == self.window:
+            old = self._values[0]
+            if old == old:
+                nobs -= 1
+                y = -old - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if math.copysign(1.0, old) < 0:
+                    neg_ct -= 1
+
+        if value == value:
+            nobs += 1
+            y = value - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if math.copysign(1.0, value) < 0:
+                neg_ct += 1
+            if value == prev_value:
+                same_count += 1
+            else:
+                same_count = 1
+            prev_value = value
+
+        if nobs >= self.window and nobs > 0:
+            result = sum_x / nobs
+            if same_count >= nobs:
+                result = prev_value
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+        else:
+            result = NAN
+
+        if commit:
+            self._values.append(value)
+            self._state = (sum_x, comp_add, comp_remove, nobs, neg_ct, same_count, prev_value)
+        return result
+
+
+class RollingRange:
+    """Потоковый аналог пары Series.rolling(window).min() / .max()."""
+    __slots__ = ('window', '_values')
+
+    def __init__(self, window: int):
+        """
+        Args:
+            window: Размер окна
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        """Сбрасывает состояние."""
+        self._values = deque(maxlen=self.window)
+
+    def update(self, value: float, commit: bool = True) -> Tuple[float, float]:
+        """
+        Рассчитывает минимум и максимум окна с новым значением.
+
+        Args:
+            value: Новое значение ряда
+            commit: Сохранить ли состояние
+
+        Returns:
+            Tuple[float, float]: Минимум и максимум (NaN, пока окно не заполнено)
+        """
+        window = list(islice(self._values, 1, None)) if len(self._values) == self.window else list(self._values)
+        window.append(value)
+
+        if commit:
+            self._values.append(value)
+
+        if len(window) < self.window or any(v != v for v in window):
+            return NAN, NAN
+        return min(window), max(window)
+
+
+class StreamingFrama:
+    """Потоковая версия strategies.frama.calculate_frama."""
+    __slots__ = ('length', 'half_len', 'mode', '_highs', '_lows', '_mids', '_count', '_prev')
+
+    def __init__(self, length: int, mode: str = FRAMA_MODE_EXCLUSIVE):
+        """
+        Args:
+            length: Период FRAMA
+            mode: FRAMA_MODE_EXCLUSIVE или FRAMA_MODE_INCLUSIVE
+        """
+        if mode not in FRAMA_MODES:
+            raise ValueError(f"Неизвестный режим FRAMA: {mode}")
+        if length < 2:
+            raise ValueError(f"Период FRAMA должен быть не меньше 2: {length}")
+        self.length = length
+        self.half_len = length // 2
+        self.mode = mode
+        self.reset()
+
+    def reset(self) -> None:
+        """Сбрасывает состояние."""
+        self._highs = deque(maxlen=self.length)
+        self._lows = deque(maxlen=self.length)
+        self._mids = deque(maxlen=self.half_len)
+        self._count = 0
+        self._prev = NAN
+
+    def update(self, high: float, low: float, close: float, commit: bool = True) -> float:
+        """
+        Рассчитывает FRAMA для новой свечи.
+
+        Args:
+            high: Максимальная цена свечи
+            low: Минимальная цена свечи
+            close: Цена закрытия свечи
+            commit: Сохранить ли состояние
+
+        Returns:
+            float: Значение FRAMA
+        """
+        index = self._count
+        mid = (high + low) / 2
+
+        if self.mode == FRAMA_MODE_EXCLUSIVE:
+            if index == 0:
+                value = close
+            elif index < self.length:
+                value = NAN
+            else:
+                # Окно - ровно последние length закрытых свечей
+                n1 = (max(self._highs) - min(self._lows)) / self.length
+                n2 = (max(self._mids) - min(self._mids)) / self.half_len
+                alpha = frama_alpha(n1, n2)
+                prev_frama = self._prev if self._prev == self._prev else close
+                value = alpha * close + (1 - alpha) * prev_frama
+        else:
+            if index < self.length:
+                value = NAN
+            else:
+                # Окно - последние length-1 закрытых свечей плюс текущая
+                high1 = max(max(islice(self._highs, 1, None)), high)
+                low1 = min(min(islice(self._lows, 1, None)), low)
+                n1 = (high1 - low1) / self.length
+                mids = list(islice(self._mids, 1, None))
+                mids.append(mid)
+                n2 = (max(mids) - min(mids)) / self.half_len
+                alpha = frama_alpha(n1, n2)
+                if index == self.length:
+                    value = close
+                else:
+                    value = alpha * close + (1 - alpha) * self._prev
+
+        if commit:
+            self._highs.append(high)
+            self._lows.append(low)
+            self._mids.append(mid)
+            self._count += 1
+            self._prev = value
+        return value
+
+
+class IndicatorStream:
+    """
+    Базовый класс набора потоковых индикаторов стратегии.
+
+    Хранит состояние по всем закрытым свечам и отдельно последнюю (текущую) свечу.
+    Новая свеча фиксирует предыдущую и рассчитывается поверх состояния,
+    повторная свеча с тем же временем пересчитывает только себя.
+    """
+    columns: Tuple[str, ...] = ()
+
+    def __init__(self):
+        """Инициализирует пустое состояние."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Полностью сбрасывает состояние индикаторов."""
+        self.last_timestamp = None
+        self.committed = 0
+        self._pending = None
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        """Создает примитивы индикаторов заново."""
+        raise NotImplementedError
+
+    def _update(self, high: float, low: float, close: float, volume: float, commit: bool) -> Tuple[float, ...]:
+        """
+        Рассчитывает значения индикаторов для свечи.
+
+        Returns:
+            Tuple[float, ...]: Значения в порядке self.columns
+        """
+        raise NotImplementedError
+
+    def update(self, timestamp, high: float, low: float, close: float, volume: float) -> Tuple[float, ...]:
+        """
+        Обрабатывает новую или обновленную свечу.
+
+        Args:
+            timestamp: Время открытия свечи
+            high: Максимальная цена
+            low: Минимальная цена
+            close: Цена закрытия
+            volume: Объем
+
+        Returns:
+            Tuple[float, ...]: Значения индикаторов в порядке self.columns
+        """
+        if self.last_timestamp is not None:
+            if timestamp < self.last_timestamp:
+                raise ValueError(f"Свеча {timestamp} старше последней обработанной {self.last_timestamp}")
+            if timestamp > self.last_timestamp:
+                # Предыдущая свеча закрылась - фиксируем ее в состоянии
+                self._update(*self._pending, commit=True)
+                self.committed += 1
+
+        self._pending = (float(high), float(low), float(close), float(volume))
+        self.last_timestamp = timestamp
+        return self._update(*self._pending, commit=False)
+
+    def replay(self, timestamps: Sequence, high: np.ndarray, low: np.ndarray,
+               close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        """
+        Полный пересчет: сбрасывает состояние и прогоняет всю историю.
+
+        Args:
+            timestamps: Время открытия свечей
+            high: Максимальные цены
+            low: Минимальные цены
+            close: Цены закрытия
+            volume: Объемы
+
+        Returns:
+            np.ndarray: Матрица значений (свечи x self.columns)
+        """
+        self.reset()
+        count = len(timestamps)
+        result = np.full((count, len(self.columns)), np.nan)
+        if count == 0:
+            return result
+
+        high = high.tolist()
+        low = low.tolist()
+        close = close.tolist()
+        volume = volume.tolist()
+
+        # Все свечи, кроме последней, сразу фиксируются в состоянии
+        for i in range(count - 1):
+            result[i] = self._update(high[i], low[i], close[i], volume[i], commit=True)
+        self.committed = count - 1
+
+        result[-1] = self.update(timestamps[-1], high[-1], low[-1], close[-1], volume[-1])
+        return result
@@ -0,0 +1,600 @@
+"""
+Сканер всей вселенной фьючерсов USDT-M Bitget.
+
+Свечи всех символов хранятся в одной матрице (символы x время) на общей сетке
+времени открытия свечей. Правила ETHStrategy (FRAMA + ADX + RSI + EMA200)
+рассчитываются векторизованно сразу по всем символам: рекуррентные индикаторы
+(EMA, RMA, FRAMA) делают один проход по времени, на каждом шаге обрабатывая
+столбец всех символов. Поэтому закрытие свечи стоит одного пакетного расчета,
+а не отдельного конвейера pandas на каждый символ.
+"""
+import asyncio
+import math
+import time
+import traceback
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bot_logging import logger
+from config import ETH_CONFIG
+from strategies import RECENT_CANDLES_LIMIT
+from strategies.candles import OHLCV_COLUMNS
+from utils.time_utils import (CANDLE_CLOSE_TIMEOUT, CANDLE_POLL_INTERVAL, CandleClock,
+                              get_timeframe_seconds)
+
+# Емкость матрицы свечей вселенной по умолчанию (свечей на символ)
+DEFAULT_UNIVERSE_CAPACITY = 1000
+# Сколько лучших сигналов передавать обработчику за одно закрытие свечи
+DEFAULT_TOP_SIGNALS = 3
+# Опорный символ часов закрытия свечей: его новая свеча запускает сканирование вселенной
+CLOCK_SYMBOL = "BTC/USDT"
+
+_LOG2 = math.log(2)
+
+
+class UniverseCandles:
+    """
+    Матрица OHLCV свечей множества символов на общей сетке времени.
+
+    Массивы имеют двойную емкость по времени (как CandleBuffer): новые свечи
+    дописываются справа, при заполнении последние capacity-1 столбцов один раз
+    переносятся в начало. Отсутствующие свечи символа хранятся как NaN.
+    """
+
+    def __init__(self, symbols: List[str], capacity: int = DEFAULT_UNIVERSE_CAPACITY):
+        """
+        Args:
+            symbols: Торговые символы (строки матрицы)
+            capacity: Максимальное количество хранимых свечей
+        """
+        if capacity < 1:
+            raise ValueError(f"Емкость матрицы свечей должна быть положительной: {capacity}")
+
+        self.symbols = list(symbols)
+        self.index = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.capacity = capacity
+        self._start = 0
+        self._end = 0
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._columns = {name: np.full((len(self.symbols), 2 * capacity), np.nan) for name in OHLCV_COLUMNS}
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame],
+                    capacity: int = DEFAULT_UNIVERSE_CAPACITY) -> 'UniverseCandles':
+        """
+        Создает матрицу из DataFrame символов (индекс - время открытия свечи).
+        Сетка времени - объединение времени всех символов (последние capacity свечей).
+
+        Args:
+            frames: {symbol: DataFrame с OHLCV данными}
+            capacity: Емкость матрицы
+
+        Returns:
+            UniverseCandles: Заполненная матрица
+        """
+        candles = cls(list(frames), capacity)
+        if not frames:
+            return candles
+
+        # Время в мс, как в ccxt
+        grid = np.unique(np.concatenate([
+            pd.DatetimeIndex(df.index).as_unit('ms').asi8 for df in frames.values()
+        ]))[-capacity:]
+        count = len(grid)
+        candles._timestamps[:count] = grid
+        candles._end = count
+
+        for row, df in enumerate(frames.values()):
+            timestamps = pd.DatetimeIndex(df.index).as_unit('ms').asi8
+            mask = timestamps >= grid[0]
+            positions = np.searchsorted(grid, timestamps[mask])
+            for name in OHLCV_COLUMNS:
+                candles._columns[name][row, positions] = df[name].to_numpy(dtype=np.float64)[mask]
+        return candles
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Время открытия свечей сетки (int64, мс) - представление без копирования."""
+        return self._timestamps[self._start:self._end]
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Время последней свечи сетки или None для пустой матрицы."""
+        return int(self._timestamps[self._end - 1]) if len(self) else None
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Возвращает матрицу значений поля (символы x время) как представление без копирования.
+
+        Args:
+            name: Имя поля ('open', 'high', 'low', 'close', 'volume')
+
+        Returns:
+            np.ndarray: Значения поля
+        """
+        return self._columns[name][:, self._start:self._end]
+
+    def _append_slot(self, timestamp: int) -> int:
+        """Добавляет справа столбец сетки для новой свечи и возвращает его позицию в массивах."""
+        if self._end == 2 * self.capacity:
+            keep = self.capacity - 1
+            source = slice(self._end - keep, self._end)
+            self._timestamps[:keep] = self._timestamps[source]
+            for values in self._columns.values():
+                values[:, :keep] = values[:, source]
+            self._start = 0
+            self._end = keep
+        elif len(self) == self.capacity:
+            self._start += 1
+
+        slot = self._end
+        self._end += 1
+        self._timestamps[slot] = timestamp
+        for values in self._columns.values():
+            values[:, slot] = np.nan
+        return slot
+
+    def update(self, symbol: str, ohlcv: List[list]) -> None:
+        """
+        Записывает свечи символа: известные обновляются на месте,
+        более новые добавляют столбцы сетки (у остальных символов там NaN до их обновления).
+
+        Args:
+            symbol: Торговый символ
+            ohlcv: Свечи в формате ccxt по возрастанию времени
+        """
+        row = self.index.get(symbol)
+        if row is None:
+            return
+
+        for candle in ohlcv:
+            timestamp = int(candle[0])
+            last_timestamp = self.last_timestamp
+            if last_timestamp is None or timestamp > last_timestamp:
+                slot = self._append_slot(timestamp)
+            else:
+                position = int(np.searchsorted(self.timestamps, timestamp))
+                if position == len(self) or self.timestamps[position] != timestamp:
+                    # Свеча старше сетки или не попадает на сетку
+                    continue
+                slot = self._start + position
+            for i, name in enumerate(OHLCV_COLUMNS, start=1):
+                self._columns[name][row, slot] = candle[i]
+
+
+def ewm_mean_2d(values: np.ndarray, span: Optional[float] = None, alpha: Optional[float] = None,
+                adjust: bool = True) -> np.ndarray:
+    """
+    Аналог Series.ewm(...).mean() (ignore_na=False) для каждой строки матрицы.
+    Повторяет алгоритм strategies.streaming.EwmMean, обрабатывая все строки за шаг.
+
+    Args:
+        values: Матрица (символы x время)
+        span: Период сглаживания (как span в pandas)
+        alpha: Коэффициент сглаживания (как alpha в pandas)
+        adjust: Режим adjust pandas
+
+    Returns:
+        np.ndarray: Матрица значений EMA
+    """
+    if span is not None:
+        com = (span - 1) / 2.0
+    elif alpha is not None:
+        com = (1 - alpha) / alpha
+    else:
+        raise ValueError("Необходимо указать span или alpha")
+
+    smoothing = 1.0 / (1.0 + com)
+    factor = 1.0 - smoothing
+    new_wt = 1.0 if adjust else smoothing
+
+    rows, count = values.shape
+    result = np.empty((rows, count))
+    weighted = np.full(rows, np.nan)
+    old_wt = np.ones(rows)
+
+    for t in range(count):
+        value = values[:, t]
+        has_weighted = weighted == weighted
+        has_value = value == value
+        old_wt = np.where(has_weighted, old_wt * factor, old_wt)
+
+        both = has_weighted & has_value
+        blended = (old_wt * weighted + new_wt * value) / (old_wt + new_wt)
+        # Как в pandas: на постоянном ряде значение не пересчитывается
+        weighted = np.where(both & (weighted != value), blended, weighted)
+        if adjust:
+            old_wt = np.where(both, old_wt + new_wt, old_wt)
+        else:
+            old_wt = np.where(both, 1.0, old_wt)
+        weighted = np.where(~has_weighted & has_value, value, weighted)
+        result[:, t] = weighted
+    return result
+
+
+def rolling_mean_2d(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Аналог Series.rolling(window).mean() для каждой строки матрицы.
+
+    Args:
+        values: Матрица (символы x время)
+        window: Размер окна
+
+    Returns:
+        np.ndarray: Средние по окну (NaN, пока окно не заполнено или содержит NaN)
+    """
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        result[:, window - 1:] = sliding_window_view(values, window, axis=1).mean(axis=-1)
+    return result
+
+
+def frama_inclusive_2d(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    """
+    FRAMA в режиме FRAMA_MODE_INCLUSIVE (как в ETHStrategy) для каждой строки матрицы.
+    Пропущенные свечи символа (NaN) не входят в его историю: расчет идет по известным
+    свечам строки, как ETHStrategy по ряду без этих свечей, а на пропусках
+    сохраняется последнее значение.
+
+    Args:
+        high: Матрица максимальных цен
+        low: Матрица минимальных цен
+        close: Матрица цен закрытия
+        length: Период FRAMA
+
+    Returns:
+        np.ndarray: Матрица значений FRAMA
+    """
+    rows, count = close.shape
+    result = np.full((rows, count), np.nan)
+    half_len = length // 2
+    if count < length:
+        return result
+
+    # Известные свечи каждой строки сдвигаются в начало с сохранением порядка,
+    # пропуски уходят в конец: позиция в сжатой строке - номер бара символа
+    known = close == close
+    order = np.argsort(~known, axis=1, kind='stable')
+    high = np.take_along_axis(high, order, axis=1)
+    low = np.take_along_axis(low, order, axis=1)
+    close = np.take_along_axis(close, order, axis=1)
+
+    # Alpha для бара t по окну [t - length + 1, t] (N1) и [t - half_len + 1, t] (N2)
+    alpha = np.ones((rows, count))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        high_windows = sliding_window_view(high, length, axis=1)
+        low_windows = sliding_window_view(low, length, axis=1)
+        n1 = (high_windows.max(axis=-1) - low_windows.min(axis=-1)) / length
+        mid_windows = sliding_window_view((high + low) / 2, half_len, axis=1)[:, length - half_len:]
+        n2 = (mid_windows.max(axis=-1) - mid_windows.min(axis=-1)) / half_len
+        total = n1 + n2
+        dimension = np.where(total > 0, np.log(np.where(total > 0, total, 1.0)) / _LOG2, 0.0)
+        alpha[:, length - 1:] = np.clip(np.exp(-4.6 * (dimension - 1)), 0.01, 1.0)
+
+    # Первое значение (бар length) - цена закрытия, дальше рекуррентное сглаживание;
+    # после последней известной свечи строки значения NaN
+    compact = np.full((rows, count), np.nan)
+    if count > length:
+        compact[:, length] = close[:, length]
+    for t in range(length + 1, count):
+        compact[:, t] = alpha[:, t] * close[:, t] + (1 - alpha[:, t]) * compact[:, t - 1]
+    np.put_along_axis(result, order, compact, axis=1)
+
+    # На пропущенных свечах - значение последней известной свечи
+    last_known = np.maximum.accumulate(np.where(known, np.arange(count), 0), axis=1)
+    return np.take_along_axis(result, last_known, axis=1)
+
+
+def eth_indicators_2d(candles: UniverseCandles, frama_length: int, ema_length: int,
+                      rsi_length: int, adx_length: int) -> Dict[str, np.ndarray]:
+    """
+    Рассчитывает индикаторы ETHStrategy (FRAMA, EMA200, RSI, ADX) для всех символов.
+    Формулы повторяют ETHStrategy.calculate_indicators.
+
+    Args:
+        candles: Матрица свечей вселенной
+        frama_length: Период FRAMA
+        ema_length: Период EMA
+        rsi_length: Период RSI
+        adx_length: Период ADX
+
+    Returns:
+        Dict[str, np.ndarray]: {'frama', 'ema200', 'rsi', 'adx'} - матрицы (символы x время)
+    """
+    high = candles.column('high')
+    low = candles.column('low')
+    close = candles.column('close')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Предыдущие значения (первый столбец - NaN, как shift(1))
+        prev_close = np.full(close.shape, np.nan)
+        prev_close[:, 1:] = close[:, :-1]
+        prev_high = np.full(high.shape, np.nan)
+        prev_high[:, 1:] = high[:, :-1]
+        prev_low = np.full(low.shape, np.nan)
+        prev_low[:, 1:] = low[:, :-1]
+
+        # До первой свечи символа (и на пропущенных свечах) значений нет,
+        # первая свеча символа дает нулевые рост/падение и DM, как в pandas
+        known = close == close
+
+        # RSI на простых скользящих средних роста и падения
+        delta = close - prev_close
+        gain = np.where(known, np.where(delta > 0, delta, 0.0), np.nan)
+        loss = np.where(known, -np.where(delta < 0, delta, 0.0), np.nan)
+        rs = rolling_mean_2d(gain, rsi_length) / rolling_mean_2d(loss, rsi_length)
+        rsi = 100 - (100 / (1 + rs))
+
+        # ADX со сглаживанием RMA
+        true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+        up = high - prev_high
+        down = -(low - prev_low)
+        plus_dm = np.where(known, np.where((up > down) & (up > 0), up, 0.0), np.nan)
+        minus_dm = np.where(known, np.where((down > up) & (down > 0), down, 0.0), np.nan)
+
+        trur = ewm_mean_2d(true_range, alpha=1 / adx_length)
+        plus_di = 100 * ewm_mean_2d(plus_dm, alpha=1 / adx_length) / trur
+        minus_di = 100 * ewm_mean_2d(minus_dm, alpha=1 / adx_length) / trur
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+        adx = ewm_mean_2d(dx, alpha=1 / adx_length)
+
+    return {
+        'frama': frama_inclusive_2d(high, low, close, frama_length),
+        'ema200': ewm_mean_2d(close, span=ema_length),
+        'rsi': rsi,
+        'adx': adx
+    }
+
+
+class UniverseScanner:
+    """
+    Сканер правил ETHStrategy по всем активным фьючерсам USDT-M Bitget.
+    Сигналы ранжируются по силе тренда (ADX).
+    """
+
+    def __init__(self, exchange, data_loader, timeframe: str = "4h",
+                 capacity: int = DEFAULT_UNIVERSE_CAPACITY, top_signals: int = DEFAULT_TOP_SIGNALS,
+                 trade_direction: str = "both"):
+        """
+        Args:
+            exchange: Объект BitgetExchange (метаданные рынков)
+            data_loader: HistoricalDataLoader (история и последние свечи)
+            timeframe: Таймфрейм сканирования
+            capacity: Количество хранимых свечей на символ
+            top_signals: Сколько лучших сигналов передавать обработчику
+            trade_direction: Направление торговли ("long", "short", "both")
+        """
+        self.exchange = exchange
+        self.data_loader = data_loader
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self.top_signals = top_signals
+        self.trade_direction = trade_direction
+
+        params = ETH_CONFIG.get(timeframe, ETH_CONFIG["4h"])
+        self.frama_length = params["frama_length"]
+        self.adx_length = params["adx_length"]
+        self.rsi_length = params["rsi_length"]
+        self.ema_length = params["ema_length"]
+        self.stop_loss_percent = params["stop_loss_percent"]
+        self.trail_trigger_percent = params["trail_trigger_percent"]
+        self.trail_step_percent = params["trail_step_percent"]
+        self.adx_min = params["adx_min"]
+        self.rsi_entry_margin = params["rsi_entry_margin"]
+        # Минимум свечей символа для сигнала (как в ETHStrategy.check_entry_signals)
+        self.min_history = max(self.frama_length, self.ema_length, self.rsi_length, self.adx_length) + 5
+
+        self.symbols = []
+        self.candles = None
+        self.signal_callback = None
+        self.running = False
+        self.last_scan_stats = {}
+        self.candle_clock = CandleClock(self._fetch_recent_candles)
+
+    async def _fetch_recent_candles(self, symbol: str, timeframe: str) -> Optional[List[list]]:
+        """
+        Запрашивает последние свечи для часов закрытия свечей.
+
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+
+        Returns:
+            Optional[List[list]]: Последние свечи в формате ccxt
+        """
+        latest = await self.data_loader.fetch_latest([symbol], timeframe, RECENT_CANDLES_LIMIT)
+        return latest.get(symbol)
+
+    def register_signal_callback(self, callback: Callable) -> None:
+        """
+        Регистрирует функцию обратного вызова для обработки сигналов.
+
+        Args:
+            callback: Функция, которая будет вызвана для каждого отобранного сигнала
+        """
+        self.signal_callback = callback
+
+    async def load(self) -> int:
+        """
+        Загружает список активных фьючерсов USDT-M и их историю свечей.
+
+        Returns:
+            int: Количество символов с загруженной историей
+        """
+        markets = await self.exchange.load_markets()
+        symbols = sorted(info['symbol'].split(':')[0] for info in markets.values() if info.get('active', True))
+        logger.info(f"Вселенная сканирования: {len(symbols)} активных фьючерсов USDT-M")
+
+        minutes = get_timeframe_seconds(self.timeframe) // 60
+        frames, report = await self.data_loader.load_symbols(symbols, self.timeframe, minutes, self.capacity)
+        failed = [symbol for symbol, info in report.items() if 'error' in info]
+        if failed:
+            logger.warning(f"Не удалось загрузить историю {len(failed)} символов: {', '.join(failed[:10])}")
+
+        self.symbols = list(frames)
+        self.candles = UniverseCandles.from_frames(frames, self.capacity)
+        logger.info(f"Матрица свечей вселенной: {len(self.symbols)} символов x {len(self.candles)} свечей")
+        return len(self.symbols)
+
+    async def refresh(self, boundary_ms: Optional[int] = None,
+                      timeout: float = CANDLE_CLOSE_TIMEOUT) -> int:
+        """
+        Догружает последние свечи всех символов. Если указана граница свечи,
+        символы опрашиваются повторно, пока биржа не вернет свечу, открытую на границе.
+
+        Args:
+            boundary_ms: Время открытия новой свечи (мс)
+            timeout: Максимальное ожидание закрытых свечей (секунды)
+
+        Returns:
+            int: Количество символов, по которым получены закрытые свечи
+        """
+        pending = list(self.symbols)
+        started = time.monotonic()
+        while pending:
+            latest = await self.data_loader.fetch_latest(pending, self.timeframe, RECENT_CANDLES_LIMIT)
+            for symbol, ohlcv in latest.items():
+                self.candles.update(symbol, ohlcv)
+
+            if boundary_ms is None:
+                break
+            pending = [symbol for symbol in pending
+                       if symbol not in latest or int(latest[symbol][-1][0]) < boundary_ms]
+            if not pending or time.monotonic() - started >= timeout:
+                break
+            await asyncio.sleep(CANDLE_POLL_INTERVAL)
+
+        if pending and boundary_ms is not None:
+            logger.warning(f"Закрытые свечи не получены для {len(pending)} символов: {', '.join(pending[:10])}")
+        return len(self.symbols) - len(pending)
+
+    def evaluate(self) -> List[Dict]:
+        """
+        Рассчитывает индикаторы и правила входа для всех символов одним пакетом.
+        Используется последняя свеча сетки (как df.iloc[-1] в ETHStrategy).
+
+        Returns:
+            List[Dict]: Сигналы в формате стратегий, по убыванию ADX
+        """
+        if self.candles is None or not len(self.candles):
+            return []
+
+        indicators = eth_indicators_2d(self.candles, self.frama_length, self.ema_length,
+                                       self.rsi_length, self.adx_length)
+        close_matrix = self.candles.column('close')
+        close = close_matrix[:, -1]
+        frama = indicators['frama'][:, -1]
+        ema = indicators['ema200'][:, -1]
+        rsi = indicators['rsi'][:, -1]
+        adx = indicators['adx'][:, -1]
+
+        # Символы с недостаточной историей не торгуются
+        enough_history = (close_matrix == close_matrix).sum(axis=1) >= self.min_history
+
+        can_trade = enough_history & (adx > self.adx_min)
+        long_condition = can_trade & (close > ema) & (close > frama) & (rsi > 50 + self.rsi_entry_margin)
+        short_condition = can_trade & (close < ema) & (close < frama) & (rsi < 50 - self.rsi_entry_margin)
+        if self.trade_direction not in ("long", "both"):
+            long_condition[:] = False
+        if self.trade_direction not in ("short", "both"):
+            short_condition[:] = False
+
+        rows = np.flatnonzero(long_condition | short_condition)
+        rows = rows[np.argsort(-adx[rows], kind='stable')]
+
+        # Время формирования сигнала - для замера задержки сигнал -> ордер в Trader
+        now = datetime.now()
+        signals = []
+        for rank, row in enumerate(rows.tolist(), start=1):
+            entry_price = float(close[row])
+            side = "buy" if long_condition[row] else "sell"
+            sl_points = entry_price * self.stop_loss_percent / 100
+            signals.append({
+                "symbol": self.symbols[row],
+                "side": side,
+                "tradeSide": "open",
+                "type": "market",
+                "price": entry_price,
+                "stop_loss": entry_price - sl_points if side == "buy" else entry_price + sl_points,
+                "trail_points": entry_price * self.trail_trigger_percent / 100,
+                "trail_offset": entry_price * self.trail_step_percent / 100,
+                "trail_mode": True,
+                "strategy_name": "UniverseScanner",
+                "timeframe": self.timeframe,
+                "rank": rank,
+                "adx": float(adx[row]),
+                "rsi": float(rsi[row]),
+                "timestamp": now
+            })
+        return signals
+
+    async def scan(self, boundary_ms: Optional[int] = None) -> List[Dict]:
+        """
+        Обновляет свечи, рассчитывает сигналы и передает лучшие обработчику.
+
+        Args:
+            boundary_ms: Время открытия новой свечи (мс), если сканирование идет по закрытию свечи
+
+        Returns:
+            List[Dict]: Все найденные сигналы по убыванию ADX
+        """
+        started = time.monotonic()
+        refreshed = await self.refresh(boundary_ms)
+        fetched = time.monotonic()
+        signals = self.evaluate()
+        computed = time.monotonic()
+
+        self.last_scan_stats = {
+            "symbols": len(self.symbols),
+            "refreshed": refreshed,
+            "signals": len(signals),
+            "fetch_seconds": round(fetched - started, 3),
+            "compute_seconds": round(computed - fetched, 3)
+        }
+        logger.info(f"Сканирование вселенной: {len(signals)} сигналов по {len(self.symbols)} символам, "
+                    f"загрузка {fetched - started:.2f} с, расчет {computed - fetched:.3f} с")
+
+        if self.signal_callback:
+            for signal in signals[:self.top_signals]:
+                logger.info(f"Сигнал вселенной #{signal['rank']}: {signal['symbol']} {signal['side']} "
+                            f"(ADX={signal['adx']:.2f}, RSI={signal['rsi']:.2f})")
+                await self.signal_callback(signal)
+        return signals
+
+    async def run(self) -> None:
+        """
+        Сканирует вселенную на каждом закрытии свечи таймфрейма. Сканирование
+        запускается событием CandleClock по опорному символу, когда биржа уже вернула
+        новую свечу; остальные символы догружаются в refresh до той же границы.
+        """
+        if self.candles is None:
+            await self.load()
+
+        self.running = True
+        clock_symbol = CLOCK_SYMBOL if CLOCK_SYMBOL in self.symbols or not self.symbols else self.symbols[0]
+        timeframe_ms = get_timeframe_seconds(self.timeframe) * 1000
+        logger.info(f"Запуск сканера вселенной ({len(self.symbols)} символов, таймфрейм {self.timeframe}, "
+                    f"опорный символ {clock_symbol})")
+        queue = self.candle_clock.subscribe(clock_symbol, self.timeframe)
+        try:
+            while self.running:
+                try:
+                    # Ожидаем, пока биржа вернет закрытую свечу опорного символа
+                    event = await queue.get()
+                    await self.scan(event['timestamp'] + timeframe_ms)
+                except asyncio.CancelledError:
+                    logger.info("Сканер вселенной остановлен")
+                    break
+                except Exception as e:
+                    logger.error(f"Ошибка при сканировании вселенной: {e}")
+                    logger.error(traceback.format_exc())
+                    await asyncio.sleep(10)
+        finally:
+            self.candle_clock.unsubscribe(clock_symbol, self.timeframe, queue)
@@ -0,0 +1,90 @@
+"""
+Файл свечей не подменяется другим файлом, пока его отображают читатели
+(на Windows os.replace отображенного файла завершается PermissionError),
+а читатели не получают свечи, перемешанные с перезаписью.
+"""
+import os
+
+import numpy as np
+
+import trade_reporter
+import utils.candle_store as candle_store
+from trade_reporter import TradeReporter
+from utils.candle_store import CandleStore
+
+
+def _candles(start: int, count: int) -> np.ndarray:
+    index = np.arange(start, start + count)
+    return np.column_stack([index * 60_000, index + 0.1, index + 0.5, index - 0.5, index + 0.2, index * 2.0])
+
+
+def _forbid_replacing_existing(monkeypatch):
+    replace = os.replace
+
+    def windows_replace(src, dst):
+        if os.path.exists(dst):
+            raise PermissionError(f"Процесс не может получить доступ к файлу: {dst}")
+        replace(src, dst)
+
+    monkeypatch.setattr(candle_store.os, "replace", windows_replace)
+
+
+def test_grow_in_place_with_attached_reader(tmp_path, monkeypatch):
+    _forbid_replacing_existing(monkeypatch)
+    monkeypatch.setattr(candle_store, "DEFAULT_FILE_CAPACITY", 16)
+    store = CandleStore(str(tmp_path))
+    store.save("BTC/USDT", "1m", _candles(0, 10))
+    reader = store.open_reader("BTC/USDT", "1m")
+    generation = reader.generation
+
+    # Рост емкости 20 -> 40 -> 80 при уже открытом читателе
+    for start in range(10, 70, 12):
+        store.merge("BTC/USDT", "1m", _candles(start, 12).tolist())
+
+    assert reader.refresh()
+    assert reader.generation > generation and reader.generation % 2 == 0
+    assert reader.capacity >= 70
+    np.testing.assert_array_equal(reader.to_matrix(), _candles(0, 70))
+    assert not reader.refresh()
+
+
+def test_save_rewrites_mapped_file_in_place(tmp_path, monkeypatch):
+    _forbid_replacing_existing(monkeypatch)
+    store = CandleStore(str(tmp_path))
+    store.save("ETH/USDT", "4h", _candles(100, 50))
+    reader = store.open_reader("ETH/USDT", "4h")
+
+    # Более ранние свечи: merge перезаписывает файл целиком
+    store.merge("ETH/USDT", "4h", _candles(0, 30).tolist())
+    assert reader.refresh()
+    np.testing.assert_array_equal(reader.to_matrix(), np.concatenate([_candles(0, 30), _candles(100, 50)]))
+
+    # Новое хранилище (перезапуск бота) перезаписывает существующий файл
+    CandleStore(str(tmp_path)).save("ETH/USDT", "4h", _candles(5, 3))
+    assert reader.refresh()
+    np.testing.assert_array_equal(reader.to_matrix(), _candles(5, 3))
+
+
+def test_price_path_retries_read_torn_by_rewrite(tmp_path, monkeypatch):
+    store = CandleStore(str(tmp_path))
+    store.save("BTC/USDT", "1m", _candles(0, 40))
+    reader = store.open_reader("BTC/USDT", "1m")
+    column = reader.column
+    rewrites = []
+
+    def column_during_rewrite(name, last=None):
+        # Писатель перезаписывает файл между чтением времени и столбцов
+        if not rewrites:
+            rewrites.append(name)
+            store.save("BTC/USDT", "1m", _candles(500, 40))
+        return column(name, last)
+
+    monkeypatch.setattr(reader, "column", column_during_rewrite)
+    monkeypatch.setattr(trade_reporter, "PRICE_PATH_RETRY_DELAY", 0)
+    timestamps, high, low = TradeReporter._read_price_path(reader)
+
+    assert rewrites
+    expected = _candles(500, 40)
+    np.testing.assert_array_equal(timestamps, expected[:, 0])
+    np.testing.assert_array_equal(high, expected[:, 2])
+    np.testing.assert_array_equal(low, expected[:, 3])
@@ -0,0 +1,85 @@
+"""
+Загрузка истории свечей с биржи: постраничная склейка, пропуски в ответах биржи
+и замена устаревшего файла хранилища.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from utils.candle_store import CandleStore
+from utils.data_loader import HistoricalDataLoader
+from utils.time_utils import get_timeframe_seconds
+
+
+class FakeExchange:
+    """Свечи биржи: без since - последние limit свечей, с since - первые limit начиная с since."""
+
+    def __init__(self, timeframe: str, count: int, missing=()):
+        step = get_timeframe_seconds(timeframe) * 1000
+        now = int(time.time() * 1000)
+        opens = now - now % step - np.arange(count)[::-1] * step
+        self.candles = [[int(ts), 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 1.0]
+                        for i, ts in enumerate(opens) if i not in set(missing)]
+        self.requests = []
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None, params=None):
+        self.requests.append((since, limit))
+        if since is None:
+            return self.candles[-limit:]
+        return [candle for candle in self.candles if candle[0] >= since][:limit]
+
+
+def test_stale_store_is_replaced_without_gap(tmp_path):
+    exchange = FakeExchange('1h', 3000)
+    store = CandleStore(str(tmp_path))
+    # Сохраненные свечи отстали больше чем на limit свечей
+    store.save('BTC/USDT', '1h', np.array(exchange.candles[:1500], dtype=np.float64))
+    loader = HistoricalDataLoader(exchange, store=store)
+
+    ohlcv = asyncio.run(loader._load_with_store('BTC/USDT', '1h', 1000, {}))
+
+    assert ohlcv == exchange.candles[-1000:]
+    stored = store.load('BTC/USDT', '1h')
+    np.testing.assert_array_equal(stored, np.array(exchange.candles[-1000:], dtype=np.float64))
+    assert (np.diff(stored[:, 0]) == 3600 * 1000).all()
+
+
+def test_backfill_stitches_pages_beyond_request_limit():
+    exchange = FakeExchange('4h', 3000)
+    loader = HistoricalDataLoader(exchange)
+
+    ohlcv = asyncio.run(loader.backfill_ohlcv('BTC/USDT', '4h', 2500))
+
+    assert ohlcv == exchange.candles[-2500:]
+    # Последняя страница и недостающие страницы по 200 свечей
+    assert len(exchange.requests) == 1 + 12
+    assert all(limit <= 200 for _, limit in exchange.requests)
+
+
+def test_backfill_fills_isolated_missing_candle():
+    # Биржа не отдает одну свечу за 10 свечей до конца ряда
+    exchange = FakeExchange('1h', 500, missing=[489])
+    loader = HistoricalDataLoader(exchange)
+
+    ohlcv = asyncio.run(loader.backfill_ohlcv('ETH/USDT', '1h', 100))
+
+    assert len(ohlcv) == 100
+    assert (np.diff([candle[0] for candle in ohlcv]) == 3600 * 1000).all()
+    filled = ohlcv[89]
+    previous_close = ohlcv[88][4]
+    assert filled[1:] == [previous_close] * 4 + [0.0]
+
+
+def test_preload_fails_when_gap_leaves_short_history():
+    # Пропуск длиннее заполняемого: остается непрерывный хвост из 10 свечей
+    exchange = FakeExchange('4h', 500, missing=range(480, 490))
+    loader = HistoricalDataLoader(exchange)
+
+    ohlcv = asyncio.run(loader.backfill_ohlcv('ETH/USDT', '4h', 100))
+    assert ohlcv == exchange.candles[-10:]
+
+    df = asyncio.run(loader.preload_historical_data('ETH/USDT', '4h', 240, limit=300))
+    assert df is None
+    assert 'ETH/USDT' in loader.load_errors
+    assert 'ETH/USDT' not in loader.cached_data
@@ -0,0 +1,124 @@
+"""
+Сверка векторного FRAMA (strategies.frama) с исходными циклами _calculate_frama
+BTCStrategy и ETHStrategy: значения, включая NaN на участке прогрева.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from strategies.frama import FRAMA_MODE_EXCLUSIVE, FRAMA_MODE_INCLUSIVE, calculate_frama
+
+
+def _reference_btc_frama(df: pd.DataFrame, length: int) -> pd.Series:
+    """Исходный расчет BTCStrategy: окно N1/N2 заканчивается на предыдущей свече."""
+    price = df['close']
+    high = df['high']
+    low = df['low']
+
+    frama = pd.Series(index=df.index, dtype=float)
+    frama.iloc[0] = price.iloc[0]
+
+    for i in range(length, len(price)):
+        high1 = high.iloc[i-length:i].max()
+        low1 = low.iloc[i-length:i].min()
+        n1 = (high1 - low1) / length
+
+        half_len = length // 2
+        mid = (high.iloc[i-length:i] + low.iloc[i-length:i]) / 2
+        high2 = mid.tail(half_len).max()
+        low2 = mid.tail(half_len).min()
+        n2 = (high2 - low2) / half_len
+
+        d = 0
+        if (n1 + n2) > 0:
+            d = math.log(n1 + n2) / math.log(2)
+        alpha = math.exp(-4.6 * (d - 1))
+        alpha = max(0.01, min(1.0, alpha))
+
+        prev_frama = frama.iloc[i-1] if not pd.isna(frama.iloc[i-1]) else price.iloc[i]
+        frama.iloc[i] = alpha * price.iloc[i] + (1 - alpha) * prev_frama
+
+    return frama
+
+
+def _reference_eth_frama(df: pd.DataFrame, length: int) -> pd.Series:
+    """Исходный расчет ETHStrategy: окно N1/N2 включает текущую свечу."""
+    high = df['high']
+    low = df['low']
+    close = df['close']
+
+    frama = np.full(len(df), np.nan)
+
+    for i in range(length, len(df)):
+        high1 = high.iloc[i-length+1:i+1].max()
+        low1 = low.iloc[i-length+1:i+1].min()
+        n1 = (high1 - low1) / length
+
+        mid_points = (high.iloc[i-length//2+1:i+1] + low.iloc[i-length//2+1:i+1]) / 2
+        high2 = mid_points.max()
+        low2 = mid_points.min()
+        n2 = (high2 - low2) / (length // 2)
+
+        if n1 + n2 > 0:
+            d = math.log(n1 + n2) / math.log(2)
+        else:
+            d = 0
+
+        alpha_raw = math.exp(-4.6 * (d - 1))
+        alpha = max(0.01, min(1.0, alpha_raw))
+
+        if i == length:
+            frama[i] = close.iloc[i]
+        else:
+            frama[i] = alpha * close.iloc[i] + (1 - alpha) * frama[i-1]
+
+    return pd.Series(frama, index=df.index)
+
+
+def _random_ohlc(count: int, seed: int) -> pd.DataFrame:
+    """Случайное блуждание цены с участками без движения (n1 + n2 = 0)."""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + rng.normal(0, 1, count).cumsum(), 2)
+    close[count // 3:count // 3 + 20] = close[count // 3]
+    spread = np.round(np.abs(rng.normal(0, 0.5, count)), 2)
+    spread[count // 3:count // 3 + 20] = 0
+    return pd.DataFrame({'high': close + spread, 'low': close - spread, 'close': close})
+
+
+def _assert_matches_reference(df: pd.DataFrame, length: int) -> None:
+    high, low, close = df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()
+    np.testing.assert_array_equal(calculate_frama(high, low, close, length, FRAMA_MODE_EXCLUSIVE),
+                                  _reference_btc_frama(df, length).to_numpy())
+    np.testing.assert_array_equal(calculate_frama(high, low, close, length, FRAMA_MODE_INCLUSIVE),
+                                  _reference_eth_frama(df, length).to_numpy())
+
+
+def test_strategy_lengths_match_reference_loops():
+    df = _random_ohlc(500, 0)
+    for length in (12, 14):
+        _assert_matches_reference(df, length)
+
+
+def test_odd_lengths_and_seeds_match_reference_loops():
+    for seed in range(1, 4):
+        df = _random_ohlc(300, seed)
+        for length in (2, 5, 13, 30):
+            _assert_matches_reference(df, length)
+
+
+def test_warmup_region():
+    df = _random_ohlc(40, 7)
+    high, low, close = df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()
+
+    btc = calculate_frama(high, low, close, 14, FRAMA_MODE_EXCLUSIVE)
+    assert btc[0] == close[0]
+    assert np.isnan(btc[1:14]).all()
+
+    eth = calculate_frama(high, low, close, 14, FRAMA_MODE_INCLUSIVE)
+    assert np.isnan(eth[:14]).all()
+    assert eth[14] == close[14]
+
+    # Свечей не больше периода: рассчитанных значений нет, как и в исходных циклах
+    for length in (40, 60):
+        _assert_matches_reference(df, length)
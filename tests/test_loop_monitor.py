@@ -0,0 +1,36 @@
+"""
+Сторожевой таймер цикла событий: блокировки находятся фоновым потоком
+без режима отладки asyncio.
+"""
+import asyncio
+import time
+
+from utils.loop_monitor import LoopWatchdog
+
+
+def _blocking_step() -> None:
+    time.sleep(0.3)
+
+
+def test_stalls_recorded_without_debug_mode():
+    async def scenario():
+        watchdog = LoopWatchdog(interval=0.01, slow_callback_duration=None, stall_threshold=0.05)
+        task = asyncio.create_task(watchdog.run())
+        await asyncio.sleep(0.1)
+        assert not asyncio.get_running_loop().get_debug()
+
+        _blocking_step()
+        for _ in range(50):
+            await asyncio.sleep(0.02)
+            if watchdog.slow_callback_totals:
+                break
+        watchdog.stop()
+        await task
+        return watchdog.get_health()
+
+    health = asyncio.run(scenario())
+    assert health["slow_callback_ms"] == 50
+    assert health["slow_count"] == 1
+    stall = health["recent"][0]
+    assert "_blocking_step" in stall["name"]
+    assert stall["duration"] >= 0.25
@@ -0,0 +1,60 @@
+"""
+Регрессионный тест супервизора мониторинга позиций: сбой получения снимка счета
+не должен останавливать супервизор.
+"""
+import asyncio
+
+import ccxt.async_support as ccxt
+
+import trading.exchange as exchange_module
+from trading.exchange import BitgetExchange, MONITOR_PENDING_FILL, MONITOR_TRAILING_ARMED
+from trading.simulator import SimulatedExchange
+
+
+def _candles(count: int = 50, price: float = 100.0) -> list:
+    start = 1_700_000_000_000
+    return [[start + i * 60_000, price, price + 0.5, price - 0.5, price, 10.0] for i in range(count)]
+
+
+def test_supervisor_survives_snapshot_failure(monkeypatch):
+    monkeypatch.setattr(exchange_module, "MONITOR_TICK_INTERVAL", 0.01)
+
+    async def scenario():
+        simulator = SimulatedExchange({"BTC/USDT": _candles()}, balance=1000)
+        exchange = BitgetExchange(client=simulator)
+
+        # После отправки ордера первый запрос позиций супервизора завершается сетевой ошибкой
+        fetch_positions = simulator.fetch_positions
+        failures = []
+        inject = asyncio.Event()
+
+        async def flaky_fetch_positions(*args, **kwargs):
+            if inject.is_set() and not failures:
+                failures.append(True)
+                raise ccxt.NetworkError("bitget fetch_positions timed out")
+            return await fetch_positions(*args, **kwargs)
+
+        simulator.fetch_positions = flaky_fetch_positions
+
+        try:
+            await exchange.create_market_order("BTC/USDT", "buy", 0.1, price=100.0,
+                                               trail_activation=101.0, trail_callback=0.5)
+            exchange._account_state.invalidate()
+            inject.set()
+            record = exchange._monitors.records()[0]
+            assert record.state == MONITOR_PENDING_FILL
+
+            for _ in range(200):
+                if record.state == MONITOR_TRAILING_ARMED:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert failures, "сбой не был внедрен"
+            assert not exchange._supervisor_task.done()
+            assert record.state == MONITOR_TRAILING_ARMED
+            assert record.trailing_order_id is not None
+        finally:
+            exchange._supervisor_task.cancel()
+            await asyncio.gather(exchange._supervisor_task, return_exceptions=True)
+
+    asyncio.run(scenario())
@@ -0,0 +1,170 @@
+"""
+Сверка векторного восстановления закрытых сделок с эталонным FIFO на цикле Python:
+режим hedge, перевороты позиции в одностороннем режиме, закрытия без открытия
+(история с середины позиции) и незакрытые циклы.
+"""
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+
+from utils.round_trips import HEDGE_MODE, QTY_SCALE, reconstruct_round_trips
+
+FILL_COLUMNS = ['trade_id', 'order_id', 'symbol', 'side', 'amount', 'price', 'fee', 'timestamp',
+                'trade_side', 'pos_mode']
+
+
+def _reference_legs(fills: pd.DataFrame) -> dict:
+    """Части позиций по книгам (символ, лонг) в порядке исполнений."""
+    books = defaultdict(list)
+    position = defaultdict(int)
+    for fill in fills.sort_values('timestamp', kind='stable').itertuples(index=False):
+        symbol = fill.symbol.split(':')[0]
+        units = int(round(fill.amount * QTY_SCALE))
+        is_buy = fill.side == 'buy'
+        fee_per_unit = fill.fee / units
+        if fill.pos_mode == HEDGE_MODE:
+            trade_side = (fill.trade_side or '').lower()
+            long = False if 'short' in trade_side else True if 'long' in trade_side else is_buy
+            parts = [('close' in trade_side, long, units)]
+        else:
+            before = position[symbol]
+            after = before + (units if is_buy else -units)
+            position[symbol] = after
+            close_units = min(abs(before), units) if before and (before > 0) != is_buy else 0
+            parts = [(True, before > 0, close_units), (False, after > 0, units - close_units)]
+        for is_close, long, part_units in parts:
+            if part_units:
+                books[(symbol, long)].append((is_close, part_units, fill.price, fee_per_unit * part_units,
+                                              fill.timestamp, fill.trade_id, fill.order_id))
+    return books
+
+
+def _reference_trips(fills: pd.DataFrame) -> pd.DataFrame:
+    """Закрытые сделки эталонного FIFO: цикл позиции от нуля до нуля."""
+    trips = []
+    for (symbol, long), legs in _reference_legs(fills).items():
+        lots = deque()
+        cycle = None
+        for is_close, units, price, fee, timestamp, trade_id, order_id in legs:
+            if not is_close:
+                if not lots:
+                    cycle = {'trade_id': trade_id, 'order_id': order_id, 'open_time': timestamp,
+                             'units': 0, 'entry_value': 0.0, 'exit_value': 0.0, 'fees': 0.0}
+                lots.append([units, price, fee / units])
+                continue
+            if not lots:
+                # Закрытие без открытия в журнале отбрасывается
+                continue
+            close_fee_per_unit = fee / units
+            while units and lots:
+                lot = lots[0]
+                take = min(lot[0], units)
+                cycle['units'] += take
+                cycle['entry_value'] += take * lot[1]
+                cycle['exit_value'] += take * price
+                cycle['fees'] += take * (lot[2] + close_fee_per_unit)
+                cycle['close_time'] = timestamp
+                lot[0] -= take
+                units -= take
+                if not lot[0]:
+                    lots.popleft()
+            if not lots:
+                side = 'long' if long else 'short'
+                entry_price = cycle['entry_value'] / cycle['units']
+                exit_price = cycle['exit_value'] / cycle['units']
+                amount = cycle['units'] / QTY_SCALE
+                trips.append({
+                    'trip_id': f"{symbol}:{side}:{cycle['trade_id']}",
+                    'side': side,
+                    'amount': amount,
+                    'entry_price': entry_price,
+                    'exit_price': exit_price,
+                    'fees': cycle['fees'],
+                    'gross_pnl': (1 if long else -1) * (exit_price - entry_price) * amount,
+                    'open_time': cycle['open_time'],
+                    'close_time': cycle['close_time'],
+                    'order_id': cycle['order_id']
+                })
+    return pd.DataFrame(trips)
+
+
+def _random_fills(count: int, seed: int) -> pd.DataFrame:
+    """Случайные исполнения: BTC в режиме hedge, ETH и SOL в одностороннем."""
+    rng = np.random.default_rng(seed)
+    symbol = rng.choice(['BTC/USDT:USDT', 'ETH/USDT:USDT', 'SOL/USDT:USDT'], count)
+    hedge = symbol == 'BTC/USDT:USDT'
+    side = rng.choice(['buy', 'sell'], count)
+    # В hedge направление то из стороны исполнения, то из tradeSide (в том числе ликвидации)
+    trade_side = np.where(hedge, rng.choice(['open', 'close', 'close_long', 'burst_close_short', 'open_short'], count),
+                          None)
+    amount = rng.integers(1, 2000, count) / 1000
+    price = np.round(100 + rng.normal(0, 1, count).cumsum(), 2)
+    return pd.DataFrame({
+        'trade_id': [f"t{i}" for i in range(count)],
+        'order_id': [f"o{i // 3}" for i in range(count)],
+        'symbol': symbol,
+        'side': side,
+        'amount': amount,
+        'price': price,
+        'fee': amount * price * 0.0006,
+        'timestamp': 1_700_000_000_000 + np.arange(count) * 1000,
+        'trade_side': trade_side,
+        'pos_mode': np.where(hedge, HEDGE_MODE, 'one_way_mode')
+    }, columns=FILL_COLUMNS)
+
+
+def _assert_matches_reference(fills: pd.DataFrame) -> pd.DataFrame:
+    trips = reconstruct_round_trips(fills).sort_values('trip_id').reset_index(drop=True)
+    expected = _reference_trips(fills).sort_values('trip_id').reset_index(drop=True)
+
+    assert trips['trip_id'].tolist() == expected['trip_id'].tolist()
+    assert trips['side'].tolist() == expected['side'].tolist()
+    assert trips['order_id'].tolist() == expected['order_id'].tolist()
+    for column in ('open_time', 'close_time'):
+        assert trips[column].astype(np.int64).tolist() == expected[column].tolist()
+    for column in ('amount', 'entry_price', 'exit_price', 'fees', 'gross_pnl'):
+        np.testing.assert_allclose(trips[column].to_numpy(dtype=np.float64), expected[column].to_numpy(),
+                                   rtol=1e-9, atol=1e-9, err_msg=column)
+    return trips
+
+
+def test_one_way_flip_and_partial_close():
+    fills = pd.DataFrame([
+        ('1', 'o1', 'BTC/USDT:USDT', 'buy', 1.0, 100.0, 0.1, 1, None, None),
+        ('2', 'o1', 'BTC/USDT:USDT', 'buy', 1.0, 110.0, 0.1, 2, None, None),
+        ('3', 'o2', 'BTC/USDT:USDT', 'sell', 1.5, 120.0, 0.15, 3, None, None),
+        # Переворот: закрывает остаток лонга 0.5 и открывает шорт 0.5
+        ('4', 'o3', 'BTC/USDT:USDT', 'sell', 1.0, 90.0, 0.1, 4, None, None),
+        ('5', 'o4', 'BTC/USDT:USDT', 'buy', 0.5, 80.0, 0.05, 5, None, None),
+        # Незакрытый цикл сделкой не становится
+        ('6', 'o5', 'BTC/USDT:USDT', 'buy', 2.0, 85.0, 0.2, 6, None, None),
+        ('7', 'o6', 'BTC/USDT:USDT', 'sell', 1.0, 95.0, 0.1, 7, None, None)
+    ], columns=FILL_COLUMNS)
+    trips = _assert_matches_reference(fills).set_index('side')
+
+    assert list(trips.index) == ['long', 'short']
+    assert trips.loc['long', 'entry_price'] == 105.0
+    assert trips.loc['long', 'exit_price'] == 112.5
+    np.testing.assert_allclose(trips.loc['long', 'fees'], 0.4)
+    np.testing.assert_allclose(trips.loc['short', 'gross_pnl'], 5.0)
+
+
+def test_hedge_mode_with_orphan_closes():
+    fills = pd.DataFrame([
+        # История начинается с середины позиции: закрытие без открытия
+        ('a', 'x', 'ETH/USDT:USDT', 'buy', 2.0, 50.0, 0.0, 10, 'close', HEDGE_MODE),
+        ('b', 'y', 'ETH/USDT:USDT', 'buy', 1.0, 40.0, 0.0, 11, 'open', HEDGE_MODE),
+        ('c', 'z', 'ETH/USDT:USDT', 'sell', 1.0, 60.0, 0.0, 12, 'open', HEDGE_MODE),
+        ('d', 'w', 'ETH/USDT:USDT', 'sell', 1.0, 45.0, 0.0, 13, 'close', HEDGE_MODE),
+        ('e', 'v', 'ETH/USDT:USDT', 'buy', 1.0, 55.0, 0.0, 14, 'close', HEDGE_MODE),
+        ('f', 'u', 'ETH/USDT:USDT', 'buy', 1.0, 41.0, 0.0, 15, 'open', HEDGE_MODE)
+    ], columns=FILL_COLUMNS)
+    trips = _assert_matches_reference(fills)
+
+    assert sorted(trips['trip_id']) == ['ETH/USDT:long:b', 'ETH/USDT:short:c']
+
+
+def test_random_fills_match_reference_fifo():
+    for seed in range(3):
+        _assert_matches_reference(_random_fills(3000, seed))
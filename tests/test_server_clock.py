@@ -0,0 +1,42 @@
+"""
+Оценка смещения часов относительно сервера биржи (ServerClock.add_sample):
+компенсация половины задержки ответа, отбрасывание медленных замеров
+и экспоненциальное сглаживание смещения и джиттера.
+"""
+import pytest
+
+from utils.time_utils import SERVER_TIME_MAX_RTT, ServerClock
+
+
+def test_first_sample_compensates_half_rtt():
+    clock = ServerClock()
+    # Запрос отправлен в 1000.0 с, ответ пришел через 0.4 с: сервер отвечал в 1000.2 по локальным часам
+    assert clock.add_sample(1_000_700, sent_at=1000.0, rtt=0.4)
+
+    assert clock.offset == pytest.approx(0.5)
+    assert clock.jitter == 0.0
+    assert clock.last_rtt == 0.4
+    assert clock.samples == 1
+
+
+def test_slow_sample_is_rejected():
+    clock = ServerClock()
+    clock.add_sample(1_000_500, sent_at=1000.0, rtt=0.2)
+
+    assert not clock.add_sample(2_000_000, sent_at=1000.0, rtt=SERVER_TIME_MAX_RTT + 0.1)
+    assert clock.offset == pytest.approx(0.4)
+    assert (clock.samples, clock.rejected, clock.last_rtt) == (1, 1, 0.2)
+
+
+def test_offset_and_jitter_are_smoothed():
+    clock = ServerClock(smoothing=0.25)
+    clock.add_sample(1_001_000, sent_at=1000.0, rtt=0.0)
+    # Замер со смещением 2 с: смещение сдвигается на четверть разницы, джиттер - на четверть отклонения
+    clock.add_sample(1_002_000, sent_at=1000.0, rtt=0.0)
+    assert clock.offset == pytest.approx(1.25)
+    assert clock.jitter == pytest.approx(0.25)
+
+    clock.add_sample(1_001_250, sent_at=1000.0, rtt=0.0)
+    assert clock.offset == pytest.approx(1.25)
+    assert clock.jitter == pytest.approx(0.1875)
+    assert clock.samples == 3
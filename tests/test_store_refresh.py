@@ -0,0 +1,58 @@
+"""
+Обновление файлов свечей идет по текущим символам и таймфреймам стратегий:
+после смены таймфрейма стратегия подключается к файлу нового таймфрейма.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from strategies.ETH_strategy import ETHStrategy
+from utils.candle_store import CandleStore
+from utils.data_loader import HistoricalDataLoader
+from utils.time_utils import get_timeframe_seconds
+
+
+def _candles(timeframe: str, count: int = 300) -> np.ndarray:
+    step = get_timeframe_seconds(timeframe) * 1000
+    now = int(time.time() * 1000)
+    opens = now - now % step - np.arange(count)[::-1] * step
+    return np.column_stack([opens, np.full(count, 100.0), np.full(count, 101.0),
+                            np.full(count, 99.0), np.full(count, 100.5), np.ones(count)])
+
+
+def test_strategy_follows_timeframe_change(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.save("ETH/USDT", "4h", _candles("4h"))
+    strategy = ETHStrategy(None)
+    strategy.attach_candle_file(store.open_reader("ETH/USDT", "4h"))
+
+    loader = HistoricalDataLoader(None, store=store)
+    updated = []
+
+    async def update_store(symbol, timeframe):
+        # Файл нового таймфрейма создается загрузкой истории с биржи
+        updated.append((symbol, timeframe))
+        if store.last_timestamp(symbol, timeframe) is None:
+            store.save(symbol, timeframe, _candles(timeframe))
+        return 0
+
+    loader.update_store = update_store
+    strategy.set_timeframe("1h")
+    assert strategy.candle_file is None and not strategy.is_preloaded
+
+    async def scenario():
+        task = asyncio.create_task(loader.keep_store_fresh([strategy], interval=0.01))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if strategy.candle_file is not None:
+                break
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert ("ETH/USDT", "1h") in updated and ("ETH/USDT", "4h") not in updated
+    assert strategy.candle_file.timeframe == "1h"
+    frame = strategy._read_candle_file(10)
+    assert frame is not None
+    assert (np.diff(frame.index.asi8) == 3600 * 10 ** 9).all()
+    assert (np.diff(strategy.preloaded_data.timestamps) == 3600 * 10 ** 9).all()
@@ -0,0 +1,73 @@
+"""
+Сверка потоковых индикаторов (IndicatorStream) с расчетом стратегий на pandas:
+полный пересчет (replay_indicator_stream, в том числе в пуле) и обновление
+по одной свече с пересчетом незакрытой последней свечи.
+"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from strategies.BTC_strategy import BTCStrategy
+from strategies.ETH_strategy import ETHStrategy
+from strategies.offload import replay_indicator_stream
+
+
+def _random_candles(count: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(rng.normal(0, 0.01, count).cumsum())
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, count))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, count))
+    # Участок без движения: нулевые диапазоны и изменения цены
+    high[count // 2:count // 2 + 15] = low[count // 2:count // 2 + 15] = close[count // 2:count // 2 + 15] = close[count // 2]
+    index = pd.date_range('2025-01-01', periods=count, freq='4h', name='timestamp')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': rng.uniform(10, 1000, count)}, index=index)
+
+
+def _arrays(df: pd.DataFrame):
+    return (df.index.asi8, df['high'].to_numpy(), df['low'].to_numpy(),
+            df['close'].to_numpy(), df['volume'].to_numpy())
+
+
+def _assert_close(actual: np.ndarray, expected: np.ndarray, column: str) -> None:
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
+
+
+def _assert_replay_matches(strategy, df: pd.DataFrame) -> None:
+    expected = asyncio.run(strategy.calculate_indicators(df))
+    stream, values = replay_indicator_stream(strategy.create_indicator_stream(), *_arrays(df))
+    for i, column in enumerate(stream.columns):
+        _assert_close(values[:, i], expected[column].to_numpy(), column)
+
+
+def _assert_updates_match(strategy, df: pd.DataFrame, tail: int) -> None:
+    expected = asyncio.run(strategy.calculate_indicators(df))
+    stream, _ = replay_indicator_stream(strategy.create_indicator_stream(), *_arrays(df.iloc[:-tail]))
+
+    for position in range(len(df) - tail, len(df)):
+        timestamp = df.index.asi8[position]
+        candle = df.iloc[position]
+        # Незакрытая свеча приходит несколько раз, пока не закроется
+        stream.update(timestamp, candle['high'] * 1.01, candle['low'] * 0.99, candle['close'] * 1.005,
+                      candle['volume'] / 2)
+        values = stream.update(timestamp, candle['high'], candle['low'], candle['close'], candle['volume'])
+        for i, column in enumerate(stream.columns):
+            _assert_close(values[i], expected[column].iloc[position], column)
+
+
+def test_btc_replay_matches_calculate_indicators():
+    for seed in range(3):
+        _assert_replay_matches(BTCStrategy(None), _random_candles(600, seed))
+
+
+def test_eth_replay_matches_calculate_indicators():
+    for seed in range(3):
+        _assert_replay_matches(ETHStrategy(None), _random_candles(600, seed))
+
+
+def test_updates_with_revised_last_candle_match_calculate_indicators():
+    df = _random_candles(400, 7)
+    _assert_updates_match(BTCStrategy(None), df, 20)
+    _assert_updates_match(ETHStrategy(None), df, 20)
@@ -0,0 +1,141 @@
+"""
+Сверка инкрементальной аналитики закрытых сделок (RunningStats) с векторным
+пересчетом по всей истории.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.trade_analytics import GROUP_ALL, MS_PER_DAY, TRADING_DAYS_PER_YEAR, TradeAnalytics
+
+
+def _random_trips(count: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    pnl = rng.normal(0.2, 5, count)
+    # Нулевой PnL прерывает серию
+    pnl[::50] = 0.0
+    return pd.DataFrame({
+        'trip_id': [f"trip{i}" for i in range(count)],
+        'pnl': pnl,
+        'fees': rng.uniform(0, 0.1, count),
+        'close_time': np.sort(rng.integers(1_700_000_000_000, 1_700_000_000_000 + 120 * MS_PER_DAY, count)),
+        'strategy_name': rng.choice(['ETH_FRAMA', 'BTC_FRAMA', None], count),
+        'symbol': rng.choice(['BTC/USDT', 'ETH/USDT'], count),
+        'timeframe': rng.choice(['1h', '4h'], count)
+    })
+
+
+def _expected_stats(trips: pd.DataFrame) -> dict:
+    """Показатели группы, рассчитанные векторно по всем ее сделкам."""
+    pnl = trips['pnl'].to_numpy()
+    times = trips['close_time'].to_numpy()
+    wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+
+    # Просадка от пика кривой капитала (начальный пик - ноль)
+    equity = pnl.cumsum()
+    peak = np.maximum.accumulate(np.maximum(equity, 0))
+    prev_equity = np.concatenate(([0.0], equity[:-1]))
+    prev_peak = np.concatenate(([0.0], peak[:-1]))
+    # Время пика: последняя сделка, на которой капитал обновил максимум (до первой - первая сделка)
+    new_high = equity >= prev_peak
+    peak_index = np.maximum.accumulate(np.where(new_high, np.arange(len(pnl)), 0))
+    prev_peak_index = np.concatenate(([0], peak_index[:-1]))
+    in_drawdown = (equity < peak) | (prev_equity < prev_peak)
+    durations = times - times[prev_peak_index]
+
+    # Дневной PnL, дни без сделок - нулевые
+    daily = trips.groupby(trips['close_time'] // MS_PER_DAY)['pnl'].sum()
+    daily = daily.reindex(range(daily.index.min(), daily.index.max() + 1), fill_value=0.0)
+    annualization = np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    # Серии: длины участков с одинаковым знаком PnL
+    sign = pd.Series(np.sign(pnl))
+    runs = sign.groupby((sign != sign.shift()).cumsum()).agg(['first', 'size'])
+    last_run = runs.iloc[-1]
+
+    return {
+        'total_trades': len(pnl),
+        'winning_trades': len(wins),
+        'losing_trades': len(losses),
+        'win_rate': len(wins) / len(pnl) * 100,
+        'average_profit': wins.mean(),
+        'average_loss': losses.mean(),
+        'profit_factor': wins.sum() / -losses.sum(),
+        'total_pnl': pnl.sum(),
+        'total_fees': trips['fees'].sum(),
+        'expectancy': pnl.mean(),
+        'max_drawdown': (peak - equity).max(),
+        'current_drawdown': peak[-1] - equity[-1],
+        'max_drawdown_duration_ms': durations[in_drawdown].max() if in_drawdown.any() else 0,
+        'sharpe': daily.mean() / daily.std() * annualization,
+        'sortino': daily.mean() / np.sqrt((np.minimum(daily, 0) ** 2).mean()) * annualization,
+        'days': len(daily),
+        'current_streak': int(last_run['first'] * last_run['size']),
+        'max_win_streak': runs.loc[runs['first'] > 0, 'size'].max(),
+        'max_loss_streak': runs.loc[runs['first'] < 0, 'size'].max()
+    }
+
+
+def _assert_stats(actual: dict, expected: dict) -> None:
+    for key, value in expected.items():
+        np.testing.assert_allclose(actual[key], value, rtol=1e-9, atol=1e-9, err_msg=key)
+
+
+def test_running_stats_match_full_recalculation():
+    trips = _random_trips(5000, 1)
+    analytics = TradeAnalytics()
+    assert analytics.rebuild(trips) == len(trips)
+
+    _assert_stats(analytics.get(), _expected_stats(trips))
+    for name, group in trips.groupby(trips['strategy_name'].fillna('Unknown')):
+        _assert_stats(analytics.get('strategy', name), _expected_stats(group))
+    for name, group in trips.groupby('timeframe'):
+        _assert_stats(analytics.get('timeframe', name), _expected_stats(group))
+
+    assert [row['name'] for row in analytics.breakdown('symbol')] == \
+        trips.groupby('symbol')['pnl'].sum().sort_values(ascending=False).index.tolist()
+    curve = np.array(analytics.equity_curve())
+    np.testing.assert_array_equal(curve[:, 0], trips['close_time'])
+    np.testing.assert_allclose(curve[:, 1], trips['pnl'].cumsum(), rtol=1e-9, atol=1e-9)
+
+
+def test_incremental_updates_match_rebuild():
+    trips = _random_trips(2000, 2)
+    rebuilt = TradeAnalytics()
+    rebuilt.rebuild(trips)
+
+    incremental = TradeAnalytics()
+    for start in range(0, len(trips), 300):
+        incremental.add_trips(trips.iloc[start:start + 300])
+    # Повторно переданные сделки не учитываются
+    assert incremental.add_trips(trips.iloc[:100]) == 0
+
+    for group, name in ((GROUP_ALL, GROUP_ALL), ('symbol', 'BTC/USDT'), ('strategy', 'Unknown')):
+        assert incremental.get(group, name) == rebuilt.get(group, name)
+
+
+def test_out_of_order_batch_matches_rebuild():
+    day = 1_700_000_000_000 // MS_PER_DAY * MS_PER_DAY
+    trips = pd.DataFrame({
+        'trip_id': ['a', 'b', 'c', 'd'],
+        'pnl': [10.0, -5.0, 3.0, -20.0],
+        'fees': [0.1, 0.1, 0.1, 0.1],
+        'close_time': [day + MS_PER_DAY, day + 3 * MS_PER_DAY, day + 5 * MS_PER_DAY, day + 2 * MS_PER_DAY],
+        'strategy_name': ['ETH_FRAMA', 'ETH_FRAMA', 'BTC_FRAMA', 'ETH_FRAMA'],
+        'symbol': ['ETH/USDT', 'ETH/USDT', 'BTC/USDT', 'ETH/USDT'],
+        'timeframe': ['1h', '1h', '1h', '1h']
+    })
+    rebuilt = TradeAnalytics()
+    rebuilt.rebuild(trips)
+
+    # История символа догружена позже: сделка d закрылась раньше уже учтенных b и c
+    incremental = TradeAnalytics()
+    incremental.add_trips(trips.iloc[:3])
+    assert incremental.add_trips(trips.iloc[3:]) == 1
+
+    for group, name in ((GROUP_ALL, GROUP_ALL), ('strategy', 'ETH_FRAMA'), ('strategy', 'BTC_FRAMA')):
+        assert incremental.get(group, name) == rebuilt.get(group, name)
+    stats = incremental.get()
+    assert (stats['max_drawdown'], stats['current_drawdown'], stats['max_loss_streak']) == (25.0, 22.0, 2)
+    assert incremental.equity_curve() == rebuilt.equity_curve()
+    assert [time for time, _ in incremental.equity_curve()] == sorted(trips['close_time'])
+    _assert_stats(stats, _expected_stats(trips.sort_values('close_time')))
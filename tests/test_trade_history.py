@@ -0,0 +1,76 @@
+"""
+Постраничный сбор исполнений (TradeHistoryCollector): полная загрузка окна,
+в котором исполнений больше страницы, удаление повторов и продолжение
+с сохраненного курсора после сбоя.
+"""
+import asyncio
+
+import ccxt.async_support as ccxt
+
+from trade_ledger import TradeLedger
+from utils.trade_history import TradeHistoryCollector
+
+START = 1_700_000_000_000
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class FakeTradesExchange:
+    """Исполнения счета: since/until - границы интервала, страница - первые limit исполнений."""
+
+    def __init__(self, trades, fail_on_request=None):
+        self.trades = trades
+        self.fail_on_request = fail_on_request
+        self.requests = []
+
+    async def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        until = params['until']
+        self.requests.append((since, until))
+        if len(self.requests) == self.fail_on_request:
+            raise ccxt.NetworkError("Соединение разорвано")
+        page = [trade for trade in self.trades if since <= trade['timestamp'] <= until][:limit]
+        # Биржа может повторить исполнение на границе страницы
+        return page + page[-1:] if len(page) < limit and page else page
+
+
+def _trades(count: int, spacing: int) -> list:
+    return [{'id': f"t{i}", 'symbol': 'BTC/USDT:USDT', 'timestamp': START + i * spacing} for i in range(count)]
+
+
+def test_window_with_more_fills_than_page_is_split(tmp_path):
+    # 350 исполнений, часть - в одну миллисекунду, в одном окне запроса
+    trades = _trades(350, 1000)
+    trades[10]['timestamp'] = trades[11]['timestamp']
+    exchange = FakeTradesExchange(trades)
+    collector = TradeHistoryCollector(exchange, TradeLedger(str(tmp_path / "trades.db")))
+    recorded = []
+
+    result = asyncio.run(collector.collect(['BTC/USDT'], since=START, record=recorded.extend,
+                                           until=START + DAY_MS))
+
+    assert sorted(trade['id'] for trade in result) == sorted(trade['id'] for trade in trades)
+    assert len({trade['id'] for trade in recorded}) == len(recorded) == 350
+    assert len(exchange.requests) > 1
+    assert collector.get_cursor('BTC/USDT', 0) == START + DAY_MS + 1
+
+
+def test_collect_resumes_from_cursor_after_failure(tmp_path):
+    trades = _trades(250, DAY_MS // 50)
+    ledger = TradeLedger(str(tmp_path / "trades.db"))
+    until = START + 5 * DAY_MS - 1
+    recorded = []
+
+    # Третье окно (сутки) обрывается: первые два уже записаны, курсор - на начале третьего
+    exchange = FakeTradesExchange(trades, fail_on_request=3)
+    collector = TradeHistoryCollector(exchange, ledger, window_ms=DAY_MS)
+    assert asyncio.run(collector.collect(['BTC/USDT'], since=START, record=recorded.extend, until=until)) == []
+    assert len(recorded) == 100
+    assert collector.get_cursor('BTC/USDT', 0) == START + 2 * DAY_MS
+
+    # Повторный сбор начинается с курсора, а не с since
+    exchange = FakeTradesExchange(trades)
+    collector = TradeHistoryCollector(exchange, ledger, window_ms=DAY_MS)
+    result = asyncio.run(collector.collect(['BTC/USDT'], since=START, record=recorded.extend, until=until))
+
+    assert exchange.requests[0] == (START + 2 * DAY_MS, START + 3 * DAY_MS - 1)
+    assert len(result) == 150
+    assert sorted(trade['id'] for trade in recorded) == sorted(trade['id'] for trade in trades)
@@ -0,0 +1,73 @@
+"""
+Журнал сделок (TradeLedger): идемпотентная вставка исполнений и закрытых сделок,
+обновление ордера без затирания известных полей и перенос Excel-файла прежних
+версий с пропуском некорректных строк.
+"""
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from trade_ledger import LEGACY_EXCEL_COLUMNS, TradeLedger
+
+START = 1_700_000_000_000
+
+
+def _fill(trade_id: str, timestamp: int) -> dict:
+    return {'trade_id': trade_id, 'order_id': 1, 'symbol': 'BTC/USDT:USDT', 'side': 'buy', 'amount': 0.01,
+            'price': 50000.0, 'cost': 500.0, 'fee': 0.3, 'pnl': None, 'timestamp': timestamp,
+            'info': {'tradeSide': 'open'}}
+
+
+def test_inserts_are_idempotent(tmp_path):
+    ledger = TradeLedger(str(tmp_path / "trades.db"))
+
+    assert ledger.insert_fills([_fill('a', START), _fill('b', START + 1)]) == ['a', 'b']
+    assert ledger.insert_fills([_fill('b', START + 1), _fill('c', START + 2)]) == ['c']
+    assert ledger.insert_fills([_fill('a', START)]) == []
+    assert ledger.count('fills') == 3
+    assert ledger.fills()['order_id'].tolist() == ['1', '1', '1']
+
+    trip = {'trip_id': 'BTC/USDT:long:a', 'symbol': 'BTC/USDT', 'side': 'long', 'amount': 0.01,
+            'pnl': 5.0, 'open_time': START, 'close_time': START + 2}
+    assert ledger.insert_round_trips([trip]) == ['BTC/USDT:long:a']
+    assert ledger.insert_round_trips([dict(trip, pnl=7.0)]) == []
+    assert ledger.round_trips()['pnl'].tolist() == [5.0]
+
+
+def test_record_order_keeps_known_fields(tmp_path):
+    ledger = TradeLedger(str(tmp_path / "trades.db"))
+    ledger.record_order({'order_id': 42, 'symbol': 'ETH/USDT', 'side': 'buy', 'amount': 1.0,
+                         'status': 'open', 'strategy_name': 'ETH_FRAMA', 'timeframe': '4h', 'timestamp': START})
+    # Обновление статуса без стратегии и таймфрейма не стирает их
+    ledger.record_order({'order_id': '42', 'symbol': 'ETH/USDT', 'price': 3000.0, 'status': 'closed',
+                         'timestamp': START + 1})
+
+    orders = ledger.orders()
+    assert len(orders) == 1
+    order = orders.iloc[0]
+    assert (order['status'], order['strategy_name'], order['timeframe']) == ('closed', 'ETH_FRAMA', '4h')
+    assert (order['amount'], order['price'], order['timestamp']) == (1.0, 3000.0, START + 1)
+
+
+def test_legacy_import_skips_bad_rows(tmp_path):
+    path = str(tmp_path / "trades.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.append(list(LEGACY_EXCEL_COLUMNS))
+    ws.append(['t1', 'BTC/USDT', 'ЛОНГ', 0.01, 50000, 500, 0.3, datetime(2024, 1, 1, 12), 1.5])
+    ws.append(['t2', 'BTC/USDT', 'ШОРТ', 0.01, 50100, 501, 0.3, None, None])
+    ws.append(['t3', 'BTC/USDT', 'ШОРТ', 0.01, 50100, 501, 0.3, 'не дата', None])
+    ws.append(['t4', 'BTC/USDT', 'ШОРТ', 'много', 50100, 501, 0.3, datetime(2024, 1, 2), None])
+    ws.append(['t5', 'ETH/USDT', 'ШОРТ', 0.5, 3000, 1500, 0.9, datetime(2024, 1, 3), -2.0])
+    wb.save(path)
+
+    ledger = TradeLedger(str(tmp_path / "trades.db"))
+    assert ledger.import_legacy_excel(path) == 2
+    fills = ledger.fills()
+    assert fills['trade_id'].tolist() == ['t1', 't5']
+    assert fills['side'].tolist() == ['buy', 'sell']
+    assert fills['timestamp'].iloc[0] == int(datetime(2024, 1, 1, 12).timestamp() * 1000)
+
+    # Перенос выполнен один раз
+    assert ledger.get_meta('legacy_excel_imported')
+    assert ledger.import_legacy_excel(path) == 0
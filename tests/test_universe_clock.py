@@ -0,0 +1,50 @@
+"""
+Сканер вселенной запускается событием CandleClock: сканирование начинается только
+после того, как биржа вернула новую свечу опорного символа.
+"""
+import asyncio
+
+from strategies.universe import CLOCK_SYMBOL, UniverseScanner
+from utils.time_utils import CandleClock
+
+TIMEFRAME_MS = 4 * 3600 * 1000
+BOUNDARY_MS = 1_700_006_400_000
+
+
+class _DataLoader:
+    """Биржа отдает новую свечу опорного символа только с третьего запроса."""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def fetch_latest(self, symbols, timeframe, limit=5):
+        self.requests += 1
+        timestamp = BOUNDARY_MS if self.requests >= 3 else BOUNDARY_MS - TIMEFRAME_MS
+        return {symbol: [[timestamp, 1.0, 1.0, 1.0, 1.0, 1.0]] for symbol in symbols}
+
+
+def test_run_scans_after_clock_event():
+    async def scenario():
+        loader = _DataLoader()
+        universe = UniverseScanner(None, loader)
+        universe.symbols = ['AAA/USDT', CLOCK_SYMBOL]
+        universe.candles = object()
+        # Граница свечи наступает через 50 мс
+        universe.candle_clock = CandleClock(universe._fetch_recent_candles, poll_interval=0.01,
+                                            time_source=lambda: BOUNDARY_MS / 1000 - 0.05)
+        scans = []
+
+        async def scan(boundary_ms=None):
+            scans.append((boundary_ms, loader.requests))
+            universe.running = False
+
+        universe.scan = scan
+        await asyncio.wait_for(universe.run(), 5)
+        subscribers = dict(universe.candle_clock._subscribers)
+        await universe.candle_clock.stop()
+        return scans, subscribers
+
+    scans, subscribers = asyncio.run(scenario())
+    assert scans == [(BOUNDARY_MS, 3)]
+    # Подписка снимается при выходе из цикла
+    assert not subscribers
@@ -0,0 +1,50 @@
+"""
+Регрессионный тест FRAMA вселенной: пропущенные свечи символа не должны обнулять
+его историю, результат совпадает с ETHStrategy.calculate_indicators по ряду без пропусков.
+"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from strategies.ETH_strategy import ETHStrategy
+from strategies.universe import UniverseCandles, frama_inclusive_2d
+
+
+def _frame(index: pd.DatetimeIndex, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(len(index)).cumsum()
+    spread = rng.random(len(index)) + 0.1
+    return pd.DataFrame({
+        'open': close,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.random(len(index)) * 10
+    }, index=index)
+
+
+def test_frama_skips_gaps_like_eth_strategy():
+    index = pd.date_range('2024-01-01', periods=200, freq='4h')
+    full = _frame(index, 1)
+    # Пропуски в середине истории и в конце, плюс символ, появившийся позже
+    gapped = _frame(index, 2).drop(index[[40, 41, 42, 97, 150, 199]])
+    late = _frame(index[60:], 3)
+    frames = {'AAA/USDT': full, 'BBB/USDT': gapped, 'CCC/USDT': late}
+
+    candles = UniverseCandles.from_frames(frames)
+    strategy = ETHStrategy(None)
+    length = strategy.frama_length
+    frama = frama_inclusive_2d(candles.column('high'), candles.column('low'),
+                               candles.column('close'), length)
+
+    for row, df in enumerate(frames.values()):
+        expected = asyncio.run(strategy.calculate_indicators(df))['frama']
+        positions = np.searchsorted(candles.timestamps, pd.DatetimeIndex(df.index).as_unit('ms').asi8)
+        np.testing.assert_allclose(frama[row, positions], expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+    # На пропущенной свече сохраняется значение предыдущей известной свечи
+    gap_row = frama[1]
+    assert np.isfinite(gap_row[-1])
+    assert gap_row[41] == gap_row[39]
+    assert gap_row[-1] == gap_row[-2]
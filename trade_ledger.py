@@ -0,0 +1,398 @@
+"""
+Журнал сделок во встроенной базе SQLite.
+
+Журнал - единственный источник данных о сделках: исполнения (fills), ордера
+и закрытые сделки (round-trips) хранятся в таблицах с индексами по символу,
+времени и ID ордера. Вставка идемпотентна по ID исполнения, поэтому повторная
+загрузка истории не создает дубликатов. Excel-файл - лишь выгрузка из журнала.
+База работает в режиме WAL: чтение для отчета не блокирует запись новых сделок.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from bot_logging import logger
+
+# Таблицы и индексы журнала
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    trade_id TEXT PRIMARY KEY,
+    order_id TEXT,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    amount REAL NOT NULL,
+    price REAL NOT NULL,
+    cost REAL,
+    fee REAL DEFAULT 0,
+    pnl REAL,
+    timestamp INTEGER NOT NULL,
+    info TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_fills_symbol_time ON fills (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_fills_time ON fills (timestamp);
+CREATE INDEX IF NOT EXISTS idx_fills_order ON fills (order_id);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    side TEXT,
+    amount REAL,
+    price REAL,
+    status TEXT,
+    strategy_name TEXT,
+    timeframe TEXT,
+    timestamp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_symbol_time ON orders (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_orders_time ON orders (timestamp);
+
+CREATE TABLE IF NOT EXISTS round_trips (
+    trip_id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    amount REAL NOT NULL,
+    entry_price REAL,
+    exit_price REAL,
+    fees REAL DEFAULT 0,
+    pnl REAL,
+    open_time INTEGER NOT NULL,
+    close_time INTEGER NOT NULL,
+    order_id TEXT,
+    strategy_name TEXT,
+    timeframe TEXT,
+    mae REAL,
+    mfe REAL
+);
+CREATE INDEX IF NOT EXISTS idx_round_trips_symbol_time ON round_trips (symbol, close_time);
+CREATE INDEX IF NOT EXISTS idx_round_trips_time ON round_trips (close_time);
+CREATE INDEX IF NOT EXISTS idx_round_trips_order ON round_trips (order_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+FILL_COLUMNS = ('trade_id', 'order_id', 'symbol', 'side', 'amount', 'price', 'cost', 'fee', 'pnl', 'timestamp', 'info')
+ORDER_COLUMNS = ('order_id', 'symbol', 'side', 'amount', 'price', 'status', 'strategy_name', 'timeframe', 'timestamp')
+ROUND_TRIP_COLUMNS = ('trip_id', 'symbol', 'side', 'amount', 'entry_price', 'exit_price', 'fees', 'pnl',
+                      'open_time', 'close_time', 'order_id', 'strategy_name', 'timeframe', 'mae', 'mfe')
+
+# Столбцы, добавленные в таблицы после первой версии журнала (для баз прежних версий)
+ADDED_COLUMNS = {
+    'round_trips': {'mae': 'REAL', 'mfe': 'REAL'}
+}
+
+# Заголовки листа сделок в Excel-файле прежних версий -> столбцы журнала
+LEGACY_EXCEL_COLUMNS = {
+    "ID сделки": 'trade_id',
+    "Символ": 'symbol',
+    "Тип": 'side',
+    "Объем": 'amount',
+    "Цена": 'price',
+    "Стоимость": 'cost',
+    "Комиссия": 'fee',
+    "Дата и время": 'timestamp',
+    "PNL": 'pnl'
+}
+
+
+class TradeLedger:
+    """Журнал исполнений, ордеров и закрытых сделок в SQLite (режим WAL)."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к файлу базы данных
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        # Соединение используется и циклом событий, и рабочим потоком выгрузки отчета
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row['name'] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                for column, column_type in columns.items():
+                    if column not in existing:
+                        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            self._conn.commit()
+
+        logger.info(f"Журнал сделок открыт: {path} ({self.count('fills')} исполнений)")
+
+    def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, table: str, columns: tuple, rows: Iterable[Dict[str, Any]], key: str) -> List[str]:
+        """
+        Вставляет строки, пропуская уже существующие ключи.
+
+        Args:
+            table: Таблица
+            columns: Столбцы таблицы
+            rows: Строки (словари)
+            key: Столбец первичного ключа
+
+        Returns:
+            List[str]: Ключи действительно добавленных строк
+        """
+        sql = f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        inserted = []
+        with self._lock:
+            with self._conn:
+                for row in rows:
+                    cursor = self._conn.execute(sql, [row.get(column) for column in columns])
+                    if cursor.rowcount:
+                        inserted.append(row[key])
+        return inserted
+
+    def insert_fills(self, fills: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Добавляет исполнения (идемпотентно по trade_id).
+
+        Args:
+            fills: Исполнения со столбцами FILL_COLUMNS (timestamp - мс, info - словарь или None)
+
+        Returns:
+            List[str]: ID новых исполнений
+        """
+        rows = []
+        for fill in fills:
+            row = dict(fill)
+            row['trade_id'] = str(row['trade_id'])
+            if row.get('order_id') is not None:
+                row['order_id'] = str(row['order_id'])
+            if isinstance(row.get('info'), dict):
+                row['info'] = json.dumps(row['info'], default=str)
+            rows.append(row)
+        return self._insert('fills', FILL_COLUMNS, rows, 'trade_id')
+
+    def record_order(self, order: Dict[str, Any]) -> None:
+        """
+        Сохраняет ордер или обновляет его статус.
+
+        Args:
+            order: Ордер со столбцами ORDER_COLUMNS
+        """
+        columns = ', '.join(ORDER_COLUMNS)
+        placeholders = ', '.join('?' * len(ORDER_COLUMNS))
+        updates = ', '.join(f"{column} = COALESCE(excluded.{column}, {column})"
+                            for column in ORDER_COLUMNS if column != 'order_id')
+        sql = (f"INSERT INTO orders ({columns}) VALUES ({placeholders}) "
+               f"ON CONFLICT(order_id) DO UPDATE SET {updates}")
+        values = [order.get(column) for column in ORDER_COLUMNS]
+        values[0] = str(values[0])
+        with self._lock:
+            with self._conn:
+                self._conn.execute(sql, values)
+
+    def insert_round_trips(self, trips: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Добавляет закрытые сделки (идемпотентно по trip_id).
+
+        Args:
+            trips: Закрытые сделки со столбцами ROUND_TRIP_COLUMNS
+
+        Returns:
+            List[str]: ID новых закрытых сделок
+        """
+        return self._insert('round_trips', ROUND_TRIP_COLUMNS, trips, 'trip_id')
+
+    def _frame(self, table: str, time_column: str, since: Optional[int] = None,
+               symbol: Optional[str] = None) -> pd.DataFrame:
+        """Читает таблицу в DataFrame с фильтром по времени и символу."""
+        conditions, params = [], []
+        if since is not None:
+            conditions.append(f"{time_column} >= ?")
+            params.append(int(since))
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT * FROM {table}{where} ORDER BY {time_column}"
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def fills(self, since: Optional[int] = None, symbol: Optional[str] = None) -> pd.DataFrame:
+        """
+        Возвращает исполнения по времени.
+
+        Args:
+            since: Время начала (мс), по умолчанию вся история
+            symbol: Символ (по умолчанию все)
+
+        Returns:
+            pd.DataFrame: Исполнения (столбцы FILL_COLUMNS)
+        """
+        return self._frame('fills', 'timestamp', since, symbol)
+
+    def position_fills(self, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Возвращает исполнения с режимом позиции из ответа биржи
+        (tradeSide и posMode Bitget, извлекаются средствами SQLite).
+
+        Args:
+            symbols: Символы (по умолчанию все)
+
+        Returns:
+            pd.DataFrame: Исполнения по времени (столбцы FILL_COLUMNS без info,
+            trade_side и pos_mode - None, если поля нет)
+        """
+        columns = ', '.join(column for column in FILL_COLUMNS if column != 'info')
+        where, params = "", []
+        if symbols is not None:
+            params = list(symbols)
+            where = f"WHERE symbol IN ({', '.join('?' * len(params))}) "
+        sql = (f"SELECT {columns}, "
+               f"CASE WHEN json_valid(info) THEN json_extract(info, '$.tradeSide') END AS trade_side, "
+               f"CASE WHEN json_valid(info) THEN json_extract(info, '$.posMode') END AS pos_mode "
+               f"FROM fills {where}ORDER BY timestamp")
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def fill_watermark(self) -> int:
+        """Номер (rowid) последнего добавленного исполнения, 0 для пустого журнала."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM fills").fetchone()[0]
+
+    def fill_symbols(self, after: int = 0) -> List[str]:
+        """
+        Символы исполнений, добавленных после указанного номера.
+
+        Args:
+            after: Номер исполнения (см. fill_watermark)
+
+        Returns:
+            List[str]: Символы
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT symbol FROM fills WHERE rowid > ?", (int(after),)).fetchall()
+        return [row['symbol'] for row in rows]
+
+    def orders(self, since: Optional[int] = None, symbol: Optional[str] = None) -> pd.DataFrame:
+        """Возвращает ордера по времени (столбцы ORDER_COLUMNS)."""
+        return self._frame('orders', 'timestamp', since, symbol)
+
+    def round_trips(self, since: Optional[int] = None, symbol: Optional[str] = None) -> pd.DataFrame:
+        """Возвращает закрытые сделки по времени закрытия (столбцы ROUND_TRIP_COLUMNS)."""
+        return self._frame('round_trips', 'close_time', since, symbol)
+
+    def symbols(self, since: int) -> List[str]:
+        """
+        Символы ордеров и исполнений начиная с указанного времени.
+
+        Args:
+            since: Время начала (мс)
+
+        Returns:
+            List[str]: Символы
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT symbol FROM orders WHERE timestamp >= ? "
+                "UNION SELECT DISTINCT symbol FROM fills WHERE timestamp >= ?",
+                (int(since), int(since))
+            ).fetchall()
+        return [row['symbol'] for row in rows]
+
+    def count(self, table: str) -> int:
+        """Количество строк в таблице журнала."""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        """
+        Возвращает служебное значение журнала (например, время последнего обновления).
+
+        Args:
+            key: Ключ
+            default: Значение по умолчанию
+
+        Returns:
+            Any: Значение (JSON) или default
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row is not None else default
+
+    def set_meta(self, key: str, value: Any) -> None:
+        """
+        Сохраняет служебное значение журнала.
+
+        Args:
+            key: Ключ
+            value: Значение (сериализуется в JSON)
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def import_legacy_excel(self, path: str) -> int:
+        """
+        Однократно переносит сделки из Excel-файла прежних версий в журнал.
+
+        Args:
+            path: Путь к Excel-файлу со сделками
+
+        Returns:
+            int: Количество перенесенных исполнений
+        """
+        if self.get_meta('legacy_excel_imported') or not os.path.exists(path):
+            return 0
+
+        try:
+            from openpyxl import load_workbook
+
+            wb = load_workbook(path, read_only=True)
+            rows = wb.active.iter_rows(values_only=True)
+            headers = next(rows, None) or ()
+            if "ID сделки" not in headers:
+                # Файл - выгрузка другого формата (например, отчет /report), переносить нечего
+                wb.close()
+                self.set_meta('legacy_excel_imported', True)
+                return 0
+
+            fills = []
+            for row in rows:
+                record = {LEGACY_EXCEL_COLUMNS[header]: value for header, value in zip(headers, row)
+                          if header in LEGACY_EXCEL_COLUMNS}
+                if not record.get('trade_id'):
+                    continue
+                # Время в файле - локальное (datetime.fromtimestamp); строки без даты пропускаются
+                timestamp = pd.to_datetime(record.get('timestamp'), errors='coerce')
+                if pd.isna(timestamp):
+                    logger.warning(f"Пропущена сделка {record['trade_id']} из {path}: некорректная дата")
+                    continue
+                record['timestamp'] = int(timestamp.to_pydatetime().timestamp() * 1000)
+                record['side'] = 'buy' if record.get('side') == 'ЛОНГ' else 'sell'
+                try:
+                    for column in ('amount', 'price', 'cost', 'fee', 'pnl'):
+                        value = record.get(column)
+                        record[column] = float(value) if value not in (None, '') else None
+                except (TypeError, ValueError):
+                    logger.warning(f"Пропущена сделка {record['trade_id']} из {path}: некорректные числовые значения")
+                    continue
+                fills.append(record)
+            wb.close()
+
+            inserted = self.insert_fills(fills)
+            self.set_meta('legacy_excel_imported', True)
+            logger.info(f"Перенесено {len(inserted)} сделок из {path} в журнал {self.path}")
+            return len(inserted)
+        except Exception as e:
+            logger.error(f"Ошибка при переносе сделок из {path}: {e}")
+            return 0
@@ -1,63 +1,66 @@
+import asyncio
+import numpy as np
 import pandas as pd
 import os
 import json
+import time
 from datetime import datetime
 import traceback
-from typing import Dict, Optional
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from config import REPORTS_DIR, TRADES_EXCEL_FILE, EXCEL_STYLES
+from typing import Dict, List, Optional
+from config import REPORTS_DIR, TRADES_EXCEL_FILE, TRADES_DB_FILE, CANDLES_DIR
 from bot_logging import logger
+from trade_ledger import TradeLedger, ROUND_TRIP_COLUMNS
+from utils.candle_store import CandleStore
+from utils.excel_report import generate_excel_report
+from utils.round_trips import ROUND_TRIP_FRAME_COLUMNS, PricePath, reconstruct_round_trips
+from utils.time_utils import TIMEFRAME_SECONDS
+from utils.trade_analytics import GROUP_ALL, TradeAnalytics
+from utils.trade_history import TradeHistoryCollector
+
+# Ключ журнала: номер последнего исполнения, учтенного при восстановлении закрытых сделок
+ROUND_TRIPS_WATERMARK_KEY = "round_trips_fill_watermark"
+# Попытки согласованного чтения файла свечей, который писатель увеличивает или перезаписывает
+PRICE_PATH_READ_ATTEMPTS = 3
+PRICE_PATH_RETRY_DELAY = 0.05
 
 class TradeReporter:
-    def __init__(self, exchange):
+    def __init__(self, exchange, ledger: Optional[TradeLedger] = None,
+                 candle_store: Optional[CandleStore] = None):
         """
         Инициализация репортера торговли
         
         Args:
             exchange: объект для работы с биржей (ccxt)
+            ledger: журнал сделок (по умолчанию открывается журнал в REPORTS_DIR)
+            candle_store: хранилище свечей для MAE/MFE (по умолчанию CANDLES_DIR)
         """
         self.exchange = exchange
-        self.trades = []
+        self.candle_store = candle_store if candle_store is not None else CandleStore(CANDLES_DIR)
         self.excel_path = os.path.join(REPORTS_DIR, TRADES_EXCEL_FILE)
+        self.ledger = ledger if ledger is not None else TradeLedger(os.path.join(REPORTS_DIR, TRADES_DB_FILE))
         
-        # Путь к файлу для хранения timestamp последнего обновления
+        # Путь к файлу прежних версий с timestamp последнего обновления
         self.timestamp_file = os.path.join(REPORTS_DIR, "last_update_time.json")
         
-        # Загружаем существующие сделки и timestamp последнего обновления
-        self._load_existing_trades()
+        # Сделки из Excel-файла прежних версий переносятся в журнал один раз
+        self.ledger.import_legacy_excel(self.excel_path)
         self.last_update_time = self._load_last_update_time()
         
+        # Постраничный сбор истории исполнений с курсором по каждому символу
+        self.collector = TradeHistoryCollector(exchange, self.ledger)
+        
+        # Показатели строятся по журналу один раз, далее обновляются каждой новой закрытой сделкой
+        self.analytics = TradeAnalytics()
+        self.analytics.rebuild(self.ledger.round_trips())
+        
         logger.info(f"TradeReporter инициализирован. Последнее обновление: {datetime.fromtimestamp(self.last_update_time / 1000).strftime('%Y-%m-%d %H:%M:%S') if self.last_update_time else 'Нет данных'}")
 
-    def _load_existing_trades(self):
-        """Загрузка существующих сделок из Excel файла, если он существует"""
-        if os.path.exists(self.excel_path):
-            try:
-                # Если файл существует, загружаем данные из него
-                wb = load_workbook(self.excel_path)
-                ws = wb.active
-                
-                # Извлекаем заголовки
-                headers = [cell.value for cell in ws[1]]
-                
-                # Извлекаем данные начиная с второй строки
-                self.trades = []
-                for row in ws.iter_rows(min_row=2, values_only=True):
-                    trade_dict = {headers[i]: value for i, value in enumerate(row) if i < len(headers)}
-                    self.trades.append(trade_dict)
-                
-                logger.info(f"Загружены существующие сделки из {self.excel_path}: {len(self.trades)} сделок")
-            except Exception as e:
-                logger.error(f"Ошибка при загрузке существующих сделок: {e}")
-                logger.error(traceback.format_exc())
-                self.trades = []
-        else:
-            logger.info(f"Файл отчета {self.excel_path} не существует. Будет создан новый.")
-            self.trades = []
-
     def _load_last_update_time(self):
-        """Загрузка времени последнего обновления из JSON файла"""
+        """Загрузка времени последнего обновления из журнала (или JSON файла прежних версий)"""
+        timestamp = self.ledger.get_meta('last_update_time')
+        if timestamp is not None:
+            return timestamp
+        
         if os.path.exists(self.timestamp_file):
             try:
                 with open(self.timestamp_file, 'r') as f:
@@ -72,134 +75,148 @@ class TradeReporter:
         else:
             # Если файл не существует, возвращаем время недельной давности
             timestamp = int((datetime.now().timestamp() - 7 * 24 * 60 * 60) * 1000)  # 7 дней назад в миллисекундах
-            logger.info(f"Файл с временем последнего обновления не найден, используем время 7 дней назад: {datetime.fromtimestamp(timestamp / 1000).strftime('%Y-%m-%d %H:%M:%S')}")
+            logger.info(f"Время последнего обновления не найдено, используем время 7 дней назад: {datetime.fromtimestamp(timestamp / 1000).strftime('%Y-%m-%d %H:%M:%S')}")
             return timestamp
 
     def _save_last_update_time(self, timestamp):
-        """Сохранение времени последнего обновления в JSON файл"""
+        """Сохранение времени последнего обновления в журнал"""
         try:
-            with open(self.timestamp_file, 'w') as f:
-                json.dump({'last_update_time': timestamp}, f)
+            self.ledger.set_meta('last_update_time', timestamp)
             logger.info(f"Сохранено время последнего обновления: {datetime.fromtimestamp(timestamp / 1000).strftime('%Y-%m-%d %H:%M:%S')}")
         except Exception as e:
             logger.error(f"Ошибка при сохранении времени последнего обновления: {e}")
             logger.error(traceback.format_exc())
 
-    async def fetch_new_trades(self):
-        """Получение новых закрытых сделок с биржи с момента последнего обновления"""
-        try:
-            logger.info(f"Запрос истории сделок с {datetime.fromtimestamp(self.last_update_time / 1000).strftime('%Y-%m-%d %H:%M:%S')}")
+    def record_trades(self, trades: List[Dict]) -> List[Dict]:
+        """
+        Сохраняет сделки биржи (формат ccxt) в журнал.
+        
+        Args:
+            trades: Сделки от API биржи
             
-            # Bitget требует символ для получения истории сделок, запросим историю для каждого популярного символа
-            all_closed_trades = []
+        Returns:
+            List[Dict]: Только новые сделки (ранее не сохраненные) в формате отчета
+        """
+        fills = {}
+        for trade in trades:
+            fee = trade.get('fee') or {}
+            fills[str(trade['id'])] = {
+                'trade_id': str(trade['id']),
+                'order_id': trade.get('order'),
+                'symbol': trade['symbol'],
+                'side': trade['side'],
+                'amount': trade['amount'],
+                'price': trade['price'],
+                'cost': trade.get('cost'),
+                'fee': fee.get('cost') or 0,
+                'pnl': self._exchange_pnl(trade),
+                'timestamp': int(trade['timestamp']),
+                'info': trade.get('info')
+            }
+        
+        # Вставка идемпотентна: уже известные сделки пропускаются
+        inserted = self.ledger.insert_fills(fills.values())
+        
+        new_trades = []
+        for trade_id in inserted:
+            fill = fills[trade_id]
+            new_trades.append({
+                'trade_id': trade_id,
+                'symbol': fill['symbol'],
+                'side': fill['side'],
+                'amount': fill['amount'],
+                'price': fill['price'],
+                'cost': fill['cost'],
+                'fee': fill['fee'],
+                'timestamp': datetime.fromtimestamp(fill['timestamp'] / 1000),
+                'pnl': fill['pnl']
+            })
+        return new_trades
+
+    async def _discover_symbols(self) -> List[str]:
+        """
+        Определяет символы для запроса истории сделок: открытые позиции и ордера,
+        символы из журнала с момента последнего обновления.
+        
+        Returns:
+            List[str]: Символы (без суффикса :USDT)
+        """
+        symbols = []
+        try:
+            positions = await self.exchange.fetch_positions(params={"marginCoin": "USDT"})
+            symbols = [pos['symbol'] for pos in positions if pos['symbol']]
+            
+            # Добавляем символы из активных ордеров
+            open_orders = await self.exchange.fetch_open_orders(params={"marginCoin": "USDT"})
+            symbols += [order['symbol'] for order in open_orders if order['symbol']]
+        except Exception as pos_error:
+            logger.error(f"Ошибка при получении позиций: {pos_error}")
+            logger.error(traceback.format_exc())
             
-            # Получаем список всех символов из открытых позиций
+            # Запасной вариант - используем Fetch Balance для получения списка валют
             try:
-                positions = await self.exchange.fetch_positions(params={"marginCoin": "USDT"})
-                symbols = [pos['symbol'] for pos in positions if pos['symbol']]
-                
-                # Добавляем символы из активных ордеров
-                open_orders = await self.exchange.fetch_open_orders(params={"marginCoin": "USDT"})
-                for order in open_orders:
-                    if order['symbol'] and order['symbol'] not in symbols:
-                        symbols.append(order['symbol'])
+                balance = await self.exchange.fetch_balance({'type': 'swap', 'marginCoin': 'USDT'})
+                currencies = [curr for curr in balance['total'].keys() if float(balance['total'][curr]) > 0]
                 
-                # Если нет активных позиций или ордеров, используем дефолтный список
-                if not symbols:
-                    # Используем символы по умолчанию для USDT-маржинальной торговли
-                    symbols = ["BTC/USDT", "ETH/USDT"]
-                
-                logger.info(f"Запрос истории сделок для символов: {symbols}")
-                
-                for symbol in symbols:
-                    try:
-                        # Получаем историю сделок для конкретного символа
-                        symbol_trades = await self.exchange.fetch_my_trades(symbol=symbol, since=self.last_update_time, params={"marginCoin": "USDT"})
-                        logger.info(f"Получено {len(symbol_trades)} сделок для {symbol}")
-                        all_closed_trades.extend(symbol_trades)
-                    except Exception as symbol_error:
-                        logger.error(f"Ошибка при получении сделок для {symbol}: {symbol_error}")
-                        continue
-            except Exception as pos_error:
-                logger.error(f"Ошибка при получении позиций: {pos_error}")
+                # Строим пары для USDT-маржинальной торговли
+                symbols = [f"{curr}/USDT" for curr in currencies if curr != 'USDT']
+            except Exception as balance_error:
+                logger.error(f"Ошибка при получении баланса: {balance_error}")
                 logger.error(traceback.format_exc())
-                
-                # Запасной вариант - используем Fetch Balance для получения списка валют
-                try:
-                    balance = await self.exchange.fetch_balance({'type': 'swap', 'marginCoin': 'USDT'})
-                    currencies = [curr for curr in balance['total'].keys() if float(balance['total'][curr]) > 0]
-                    
-                    # Строим пары для USDT-маржинальной торговли
-                    symbols = [f"{curr}/USDT" for curr in currencies if curr != 'USDT']
-                    
-                    # Если нет валют, используем основные
-                    if not symbols:
-                        symbols = ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
-                    
-                    logger.info(f"Используем альтернативный список символов: {symbols}")
-                    
-                    for symbol in symbols:
-                        try:
-                            # Получаем историю сделок для конкретного символа
-                            symbol_trades = await self.exchange.fetch_my_trades(symbol=symbol, since=self.last_update_time, params={"marginCoin": "USDT"})
-                            logger.info(f"Получено {len(symbol_trades)} сделок для {symbol}")
-                            all_closed_trades.extend(symbol_trades)
-                        except Exception as symbol_error:
-                            logger.error(f"Ошибка при получении сделок для {symbol}: {symbol_error}")
-                            continue
-                except Exception as balance_error:
-                    logger.error(f"Ошибка при получении баланса: {balance_error}")
-                    logger.error(traceback.format_exc())
-                    return []
-            
-            closed_trades = all_closed_trades
+        
+        # Символы, по которым бот торговал с момента последнего обновления
+        symbols += self.ledger.symbols(since=self.last_update_time)
+        
+        # Если нет активных позиций или ордеров, используем дефолтный список
+        if not symbols:
+            symbols = ["BTC/USDT", "ETH/USDT"]
+        
+        # Удаляем дубликаты (BTC/USDT:USDT и BTC/USDT - один символ)
+        return list(dict.fromkeys(symbol.split(':')[0] for symbol in symbols))
+
+    async def fetch_new_trades(self, symbols: Optional[List[str]] = None):
+        """
+        Получение новых сделок с биржи: для каждого символа история загружается
+        постранично от курсора символа, символы загружаются параллельно.
+        
+        Args:
+            symbols: Символы для запроса (по умолчанию определяются автоматически)
             
-            if not closed_trades:
-                logger.info("Новых сделок не найдено")
-                return []
+        Returns:
+            List[Dict]: Новые сделки (ранее не сохраненные в журнале)
+        """
+        try:
+            logger.info(f"Запрос истории сделок с {datetime.fromtimestamp(self.last_update_time / 1000).strftime('%Y-%m-%d %H:%M:%S')}")
             
-            logger.info(f"Всего получено {len(closed_trades)} сделок")
-                
-            # Обновляем время последнего обновления (берем timestamp последней сделки + 1 мс)
-            if closed_trades:
-                latest_trade_time = max(trade['timestamp'] for trade in closed_trades)
-                self.last_update_time = latest_trade_time + 1
-                self._save_last_update_time(self.last_update_time)
+            # Bitget требует символ для получения истории сделок
+            if not symbols:
+                symbols = await self._discover_symbols()
+            logger.info(f"Запрос истории сделок для символов: {symbols}")
             
-            # Преобразуем сделки в удобный формат и добавляем только новые
+            # Каждое окно истории сохраняется в журнал сразу после загрузки (вместе с курсором символа)
             new_trades = []
-            existing_trade_ids = {trade.get('trade_id') for trade in self.trades if trade.get('trade_id')}
-            
-            for trade in closed_trades:
-                # Проверяем, что сделка уже не существует в нашем списке
-                if trade['id'] in existing_trade_ids:
-                    continue
-                
-                # Извлекаем необходимые данные
-                trade_info = {
-                    'trade_id': trade['id'],
-                    'symbol': trade['symbol'],
-                    'side': trade['side'],
-                    'amount': trade['amount'],
-                    'price': trade['price'],
-                    'cost': trade['cost'],
-                    'fee': trade['fee']['cost'] if trade['fee'] else 0,
-                    'timestamp': datetime.fromtimestamp(trade['timestamp'] / 1000),
-                }
-                
-                # Рассчитываем PnL более точным способом
-                trade_info['pnl'] = self._calculate_trade_pnl(trade)
-                
-                # Добавляем сделку в список новых сделок
-                new_trades.append(trade_info)
-                
-                # Добавляем сделку в общий список
-                self.trades.append(trade_info)
+            closed_trades = await self.collector.collect(
+                symbols,
+                since=self.last_update_time,
+                record=lambda trades: new_trades.extend(self.record_trades(trades))
+            )
             
-            # Сохраняем обновленный список сделок
+            # Новые исполнения могли закрыть позиции - закрытые сделки восстанавливаются в рабочем потоке
             if new_trades:
-                logger.info(f"Добавлено {len(new_trades)} новых сделок")
-                self._generate_excel_report()
+                await asyncio.to_thread(self.update_round_trips)
+            
+            if not closed_trades:
+                # Окна символов, загрузка которых прервалась, уже записаны в журнал
+                logger.info(f"Новых сделок не найдено (записано в журнал: {len(new_trades)})")
+                return new_trades
+            
+            logger.info(f"Всего получено {len(closed_trades)} сделок, новых: {len(new_trades)}")
+            
+            # Обновляем время последнего обновления (timestamp последней сделки + 1 мс)
+            latest_trade_time = max(trade['timestamp'] for trade in closed_trades)
+            if latest_trade_time + 1 > self.last_update_time:
+                self.last_update_time = latest_trade_time + 1
+                self._save_last_update_time(self.last_update_time)
             
             return new_trades
             
@@ -208,262 +225,256 @@ class TradeReporter:
             logger.error(traceback.format_exc())
             return []
     
-    def _calculate_trade_pnl(self, trade: Dict) -> float:
+    @staticmethod
+    def _exchange_pnl(trade: Dict) -> Optional[float]:
         """
-        Рассчитывает PNL для сделки, используя различные источники данных.
+        PNL исполнения по данным биржи (поле profit в истории исполнений Bitget).
+        Реализованный PNL закрытых сделок рассчитывается по исполнениям (update_round_trips).
         
         Args:
             trade: Данные о сделке от API биржи
             
         Returns:
-            float: Значение PNL или 0, если не удалось рассчитать
+            Optional[float]: PNL или None, если биржа его не передала
         """
         try:
-            # Извлекаем информацию из API ответа
-            info = trade.get('info', {})
-            
-            # Список полей, которые могут содержать PNL в Bitget API
-            pnl_fields = [
-                'pnl',           # Основное поле PNL
-                'profit',        # Прибыль
-                'realizedPnl',   # Реализованная прибыль/убыток
-                'totalPnl',      # Общий PNL
-                'netProfit',     # Чистая прибыль
-                'realPnl',       # Реальный PNL (возможная вариация)
-                'tradePnl',      # PNL сделки
-                'closePnl'       # PNL при закрытии
-            ]
-            
-            # Пытаемся найти PNL в различных полях
-            for field in pnl_fields:
-                if field in info and info[field] is not None:
-                    try:
-                        pnl_value = float(info[field])
-                        if pnl_value != 0:  # Если найдено ненулевое значение
-                            logger.debug(f"PNL найден в поле '{field}': {pnl_value} для сделки {trade.get('id')}")
-                            return pnl_value
-                    except (ValueError, TypeError):
-                        continue
-            
-            # Если PNL не найден в API, пытаемся рассчитать вручную для фьючерсов
-            calculated_pnl = self._manual_pnl_calculation(trade)
-            if calculated_pnl is not None:
-                logger.debug(f"PNL рассчитан вручную: {calculated_pnl} для сделки {trade.get('id')}")
-                return calculated_pnl
-            
-            # Логируем отсутствие PNL для отладки
-            logger.warning(f"Не удалось найти или рассчитать PNL для сделки {trade.get('id')} ({trade.get('symbol')})")
-            logger.debug(f"Доступные поля в info: {list(info.keys()) if info else 'info отсутствует'}")
-            
-            return 0.0
-            
-        except Exception as e:
-            logger.error(f"Ошибка при расчете PNL для сделки {trade.get('id')}: {e}")
-            return 0.0
-    
-    def _manual_pnl_calculation(self, trade: Dict) -> Optional[float]:
+            profit = (trade.get('info') or {}).get('profit')
+            return float(profit) if profit not in (None, '') else None
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def _price_paths(self, symbols) -> Dict[str, PricePath]:
         """
-        Ручной расчет PNL для фьючерсных сделок.
+        Свечи символов для расчета MAE/MFE: для каждого символа берется
+        самый мелкий таймфрейм из локального хранилища свечей.
         
         Args:
-            trade: Данные о сделке
+            symbols: Символы (без суффикса :USDT)
             
         Returns:
-            float: Рассчитанный PNL или None, если расчет невозможен
+            Dict[str, PricePath]: Символ -> (время открытия, максимумы, минимумы)
         """
-        try:
-            info = trade.get('info', {})
-            
-            # Для фьючерсов нужны данные о входной и выходной цене
-            # Пытаемся извлечь данные о позиции
-            side = trade.get('side')  # buy или sell
-            amount = float(trade.get('amount', 0))
-            price = float(trade.get('price', 0))
-            
-            # Для точного расчета PNL фьючерсов нужна информация о:
-            # 1. Цене входа в позицию (может отличаться от цены текущей сделки)
-            # 2. Размере позиции
-            # 3. Направлении позиции (long/short)
-            
-            # Пытаемся найти дополнительную информацию в info
-            entry_price = None
-            position_side = None
-            
-            # Возможные поля для цены входа и направления позиции
-            for price_field in ['entryPrice', 'avgPrice', 'openPrice', 'posSide']:
-                if price_field in info:
-                    if price_field == 'posSide':
-                        position_side = info[price_field]
-                    else:
-                        try:
-                            entry_price = float(info[price_field])
-                        except (ValueError, TypeError):
-                            continue
-            
-            # Если у нас есть достаточно данных для расчета
-            if entry_price and position_side and amount > 0:
-                # Расчет PNL для фьючерсов
-                if position_side.lower() == 'long':
-                    # Для длинной позиции: PNL = (цена_закрытия - цена_входа) * размер
-                    pnl = (price - entry_price) * amount
-                elif position_side.lower() == 'short':
-                    # Для короткой позиции: PNL = (цена_входа - цена_закрытия) * размер
-                    pnl = (entry_price - price) * amount
-                else:
-                    return None
-                
-                logger.debug(f"Ручной расчет PNL: {position_side} позиция, вход={entry_price}, выход={price}, размер={amount}, PNL={pnl}")
-                return pnl
+        paths = {}
+        for symbol in symbols:
+            for timeframe in TIMEFRAME_SECONDS:
+                try:
+                    candles = self.candle_store.open_reader(symbol, timeframe)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Не удалось открыть свечи {symbol} {timeframe}: {e}")
+                    continue
+                if candles is None:
+                    continue
+                path = self._read_price_path(candles)
+                if path is not None and len(path[0]):
+                    paths[symbol] = path
+                    break
+        return paths
+
+    @staticmethod
+    def _read_price_path(candles) -> Optional[PricePath]:
+        """
+        Копирует время, максимумы и минимумы из файла свечей. Как и у стратегий,
+        согласованность проверяется по поколению файла до и после чтения: если
+        писатель увеличивал или перезаписывал файл, чтение повторяется.
+        
+        Args:
+            candles: Файл свечей, открытый для чтения (MappedCandleFile)
             
-            return None
+        Returns:
+            Optional[PricePath]: (время открытия, максимумы, минимумы) или None,
+            если согласованно прочитать файл не удалось
+        """
+        for attempt in range(PRICE_PATH_READ_ATTEMPTS):
+            if attempt:
+                time.sleep(PRICE_PATH_RETRY_DELAY)
+            candles.refresh()
+            generation = candles.generation
+            if generation % 2:
+                continue
+            # Копии одной длины: писатель может дописать свечи между чтением столбцов
+            timestamps = np.array(candles.timestamps)
+            count = len(timestamps)
+            high = np.array(candles.column('high')[:count])
+            low = np.array(candles.column('low')[:count])
+            if candles.generation == generation:
+                return timestamps, high, low
+        logger.warning(f"Файл свечей {candles.path} перезаписывается, MAE/MFE по нему не рассчитываются")
+        return None
+
+    def update_round_trips(self) -> pd.DataFrame:
+        """
+        Восстанавливает закрытые сделки (FIFO) по символам с новыми исполнениями
+        и сохраняет новые в журнал. Без новых исполнений журнала не выполняет
+        расчет. Выполняется в рабочем потоке.
+        
+        Returns:
+            pd.DataFrame: Новые закрытые сделки (столбцы ROUND_TRIP_FRAME_COLUMNS)
+        """
+        # Номер последнего учтенного исполнения: исполнения добавляются только в конец
+        watermark = self.ledger.get_meta(ROUND_TRIPS_WATERMARK_KEY, 0)
+        latest = self.ledger.fill_watermark()
+        if latest == watermark:
+            return pd.DataFrame(columns=list(ROUND_TRIP_FRAME_COLUMNS))
+        
+        # Для FIFO нужна вся история символа, поэтому читаются все его исполнения
+        fills = self.ledger.position_fills(self.ledger.fill_symbols(watermark))
+        symbols = fills['symbol'].str.split(':').str[0].unique() if not fills.empty else []
+        trips = reconstruct_round_trips(fills, self.ledger.orders(), self._price_paths(symbols))
+        
+        records = trips[[column for column in ROUND_TRIP_COLUMNS if column in trips]].astype(object)
+        records = records.where(records.notna(), None).to_dict('records')
+        inserted = set(self.ledger.insert_round_trips(records))
+        new_trips = trips[trips['trip_id'].isin(inserted)]
+        if inserted:
+            self.analytics.add_trips(new_trips)
+            logger.info(f"Восстановлено закрытых сделок по {len(symbols)} символам: {len(trips)}, новых: {len(inserted)}")
+        self.ledger.set_meta(ROUND_TRIPS_WATERMARK_KEY, latest)
+        return new_trips
+
+    @staticmethod
+    def round_trip_frame(trips: pd.DataFrame) -> pd.DataFrame:
+        """
+        Таблица закрытых сделок для отчета (заголовки на русском, время - локальное).
+        
+        Args:
+            trips: Закрытые сделки из журнала (столбцы ROUND_TRIP_COLUMNS)
             
-        except Exception as e:
-            logger.error(f"Ошибка при ручном расчете PNL: {e}")
-            return None
+        Returns:
+            pd.DataFrame: Таблица отчета
+        """
+        def local_time(column: pd.Series) -> pd.Series:
+            return column.map(lambda ms: datetime.fromtimestamp(ms / 1000).strftime('%Y-%m-%d %H:%M:%S'))
+        
+        holding = pd.to_timedelta(trips['close_time'] - trips['open_time'], unit='ms').dt.floor('s')
+        return pd.DataFrame({
+            'Символ': trips['symbol'],
+            'Позиция': trips['side'].str.upper(),
+            'Объем': trips['amount'].round(6),
+            'Цена входа': trips['entry_price'].round(6),
+            'Цена выхода': trips['exit_price'].round(6),
+            'Комиссия': trips['fees'].fillna(0).round(4),
+            'PNL': trips['pnl'].round(4),
+            'MAE': trips['mae'].round(4).astype(object).where(trips['mae'].notna(), ''),
+            'MFE': trips['mfe'].round(4).astype(object).where(trips['mfe'].notna(), ''),
+            'Время удержания': holding.astype(str),
+            'Дата открытия': local_time(trips['open_time']),
+            'Дата закрытия': local_time(trips['close_time']),
+            'Стратегия': trips['strategy_name'].fillna(''),
+            'Таймфрейм': trips['timeframe'].fillna(''),
+            'ID ордера': trips['order_id'].fillna('')
+        })
 
-    def _generate_excel_report(self):
-        """Создает Excel-отчет со всеми сделками и форматирует его"""
+    def _report_rows(self) -> list:
+        """Строки листа сделок из журнала: заголовок и по строке на каждое исполнение."""
+        df = self.ledger.fills()
+        rows = [[
+            "ID сделки", "Символ", "Тип", "Объем", "Цена", "Стоимость", "Комиссия",
+            "Дата и время", "PNL"
+        ]]
+        if df.empty:
+            return rows
+        
+        # Столбцы форматируются целиком, без обхода строк
+        export = pd.DataFrame({
+            'trade_id': df['trade_id'],
+            'symbol': df['symbol'],
+            'side': df['side'].map({'buy': 'ЛОНГ'}).fillna('ШОРТ'),
+            'amount': df['amount'].round(6),
+            'price': df['price'].round(4),
+            'cost': df['cost'].fillna(0).round(4),
+            'fee': df['fee'].fillna(0).round(4),
+            'timestamp': df['timestamp'].map(lambda ms: datetime.fromtimestamp(ms / 1000).strftime('%Y-%m-%d %H:%M:%S')),
+            'pnl': df['pnl'].round(4).astype(object).where(df['pnl'].notna(), '')
+        })
+        return rows + export.values.tolist()
+
+    def _round_trip_rows(self) -> list:
+        """Строки листа закрытых сделок из журнала: заголовок и по строке на сделку."""
+        df = self.round_trip_frame(self.ledger.round_trips())
+        return [list(df.columns)] + df.values.tolist()
+
+    async def _generate_excel_report(self):
+        """Создает Excel-отчет со всеми сделками (в рабочем потоке, без блокировки цикла событий)"""
         try:
-            # Создаем новую рабочую книгу
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Торговые сделки"
-            
-            # Определяем стили
-            header_font = Font(bold=True, size=12, color=EXCEL_STYLES['font_color'])
-            header_fill = PatternFill(start_color=EXCEL_STYLES['header_color'], 
-                                    end_color=EXCEL_STYLES['header_color'], fill_type="solid")
-            
-            profit_fill = PatternFill(start_color=EXCEL_STYLES['profit_color'], 
-                                    end_color=EXCEL_STYLES['profit_color'], fill_type="solid")
-            loss_fill = PatternFill(start_color=EXCEL_STYLES['loss_color'],
-                                end_color=EXCEL_STYLES['loss_color'], fill_type="solid")
-            
-            center_alignment = Alignment(horizontal='center', vertical='center')
-            border_style = EXCEL_STYLES['border_style']
-            thin_border = Border(
-                left=Side(style=border_style),
-                right=Side(style=border_style),
-                top=Side(style=border_style),
-                bottom=Side(style=border_style)
-            )
-            
-            # Задаем заголовки
-            headers = [
-                "ID сделки", "Символ", "Тип", "Объем", "Цена", "Стоимость", "Комиссия", 
-                "Дата и время", "PNL"
+            # Чтение журнала и сборка строк тоже выполняются вне цикла событий
+            rows, trip_rows = await asyncio.to_thread(lambda: (self._report_rows(), self._round_trip_rows()))
+            stats_rows, header_rows = self.statistics_rows()
+            sheets = [
+                {"title": "Торговые сделки", "rows": rows, "pnl_column": 8},
+                {"title": "Закрытые сделки", "rows": trip_rows, "pnl_column": 6},
+                {"title": "Статистика", "rows": stats_rows, "header_rows": header_rows, "pnl_column": 2}
             ]
-            
-            # Применяем заголовки
-            for col_idx, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_idx, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = center_alignment
-                cell.border = thin_border
-            
-            # Заполняем данными
-            for row_idx, trade in enumerate(self.trades, 2):
-                trade_data = [
-                    trade.get('trade_id', ''),
-                    trade.get('symbol', ''),
-                    'ЛОНГ' if trade.get('side') == 'buy' else 'ШОРТ',
-                    f"{trade.get('amount', 0):.6f}",
-                    f"{trade.get('price', 0):.4f}",
-                    f"{trade.get('cost', 0):.4f}",
-                    f"{trade.get('fee', 0):.4f}",
-                    trade.get('timestamp', '').strftime('%Y-%m-%d %H:%M:%S') if isinstance(trade.get('timestamp'), datetime) else '',
-                    f"{trade.get('pnl', 0):.4f}" if trade.get('pnl') is not None else ''
-                ]
-                
-                for col_idx, value in enumerate(trade_data, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                    cell.alignment = center_alignment
-                    cell.border = thin_border
-                    
-                    # Подсветка для PNL
-                    if col_idx == 9 and trade.get('pnl') is not None:
-                        if trade.get('pnl', 0) > 0:
-                            cell.fill = profit_fill
-                        elif trade.get('pnl', 0) < 0:
-                            cell.fill = loss_fill
-            
-            # Автоподбор ширины столбцов
-            for col in ws.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    if cell.value:
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                adjusted_width = (max_length + 2)
-                ws.column_dimensions[column].width = adjusted_width
-            
-            # Сохраняем файл
-            wb.save(self.excel_path)
-            logger.info(f"Отчет успешно сохранен в {self.excel_path}")
-            return self.excel_path
+            return await generate_excel_report(self.excel_path, sheets)
         except Exception as e:
             logger.error(f"Ошибка при создании Excel-отчета: {e}")
             logger.error(traceback.format_exc())
             return None
 
-    def get_trade_statistics(self):
-        """Расчет статистики по сделкам"""
-        if not self.trades:
-            return {
-                'total_trades': 0,
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'win_rate': 0,
-                'average_profit': 0,
-                'average_loss': 0,
-                'profit_factor': 0,
-                'total_pnl': 0
-            }
-
-        # Создаем DataFrame из списка сделок
-        df = pd.DataFrame(self.trades)
-        
-        # Если нет колонки pnl, возвращаем базовую статистику
-        if 'pnl' not in df.columns:
-            return {
-                'total_trades': len(df),
-                'total_volume': df['amount'].sum() if 'amount' in df.columns else 0,
-                'average_price': df['price'].mean() if 'price' in df.columns else 0
-            }
-        
-        # Расчет основной статистики
-        total_trades = len(df)
-        winning_trades = len(df[df['pnl'] > 0])
-        losing_trades = len(df[df['pnl'] < 0])
-        
-        # Расчет процента выигрышных сделок
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+    def get_trade_statistics(self, group: str = GROUP_ALL, name: str = GROUP_ALL) -> Dict:
+        """
+        Статистика закрытых сделок из накопленной аналитики (без пересчета истории).
         
-        # Расчет среднего профита и убытка
-        avg_profit = df[df['pnl'] > 0]['pnl'].mean() if winning_trades > 0 else 0
-        avg_loss = df[df['pnl'] < 0]['pnl'].mean() if losing_trades > 0 else 0
+        Args:
+            group: GROUP_ALL (весь счет), "strategy", "symbol" или "timeframe"
+            name: Имя стратегии, символа или таймфрейма
+            
+        Returns:
+            Dict: Показатели группы (см. RunningStats.snapshot)
+        """
+        return self.analytics.get(group, name)
+
+    @staticmethod
+    def format_duration(ms: int) -> str:
+        """Длительность в мс -> строка вида '2d 03:15:00'."""
+        return str(pd.Timedelta(milliseconds=int(ms)).floor('s')).replace(' days ', 'd ').replace(' day ', 'd ')
+
+    def statistics_rows(self) -> tuple:
+        """
+        Строки листа статистики: показатели счета и таблицы по стратегиям,
+        таймфреймам и символам.
         
-        # Расчет фактора прибыли
-        total_profit = df[df['pnl'] > 0]['pnl'].sum() if winning_trades > 0 else 0
-        total_loss = abs(df[df['pnl'] < 0]['pnl'].sum()) if losing_trades > 0 else 0
-        profit_factor = total_profit / total_loss if total_loss > 0 else float('inf')
+        Returns:
+            tuple: (строки, номера строк заголовков)
+        """
+        stats = self.analytics.get()
+        rows = [
+            ["Общая статистика", ""],
+            ["Всего сделок", stats['total_trades']],
+            ["Прибыльные сделки", stats['winning_trades']],
+            ["Убыточные сделки", stats['losing_trades']],
+            ["Процент успеха", f"{stats['win_rate']:.2f}%"],
+            ["Общий PNL", f"{stats['total_pnl']:.4f} USDT"],
+            ["Средняя прибыль", f"{stats['average_profit']:.4f} USDT"],
+            ["Средний убыток", f"{stats['average_loss']:.4f} USDT"],
+            ["Фактор прибыли", f"{stats['profit_factor']:.2f}"],
+            ["Ожидание сделки", f"{stats['expectancy']:.4f} USDT"],
+            ["Общая комиссия", f"{stats['total_fees']:.4f} USDT"],
+            ["Макс. просадка", f"{stats['max_drawdown']:.4f} USDT"],
+            ["Длительность макс. просадки", self.format_duration(stats['max_drawdown_duration_ms'])],
+            ["Шарп (дневной, годовой)", f"{stats['sharpe']:.2f}"],
+            ["Сортино (дневной, годовой)", f"{stats['sortino']:.2f}"],
+            ["Серии (прибыльная / убыточная)", f"{stats['max_win_streak']} / {stats['max_loss_streak']}"]
+        ]
+        header_rows = [0]
         
-        # Общий PnL
-        total_pnl = df['pnl'].sum()
-
-        return {
-            'total_trades': total_trades,
-            'winning_trades': winning_trades,
-            'losing_trades': losing_trades,
-            'win_rate': win_rate,
-            'average_profit': avg_profit,
-            'average_loss': avg_loss,
-            'profit_factor': profit_factor,
-            'total_pnl': total_pnl
-        }
+        titles = {"strategy": "Стратегия", "timeframe": "Таймфрейм", "symbol": "Символ"}
+        for group, title in titles.items():
+            rows.append(["", ""])
+            header_rows.append(len(rows))
+            rows.append([title, "Всего сделок", "Общий PNL", "Процент успеха", "Ожидание",
+                         "Макс. просадка", "Шарп", "Сортино"])
+            for item in self.analytics.breakdown(group):
+                rows.append([
+                    item['name'],
+                    item['total_trades'],
+                    round(item['total_pnl'], 4),
+                    round(item['win_rate'], 2),
+                    round(item['expectancy'], 4),
+                    round(item['max_drawdown'], 4),
+                    round(item['sharpe'], 2),
+                    round(item['sortino'], 2)
+                ])
+        return rows, header_rows
     
     async def generate_trade_report(self):
         """
@@ -486,7 +497,7 @@ class TradeReporter:
             logger.info(f"Получено {len(new_trades)} новых сделок для отчета")
             
             # Генерируем отчет вне зависимости от наличия новых сделок
-            report_path = self._generate_excel_report()
+            report_path = await self._generate_excel_report()
             
             if report_path:
                 logger.info(f"Отчет о сделках успешно создан: {report_path}")
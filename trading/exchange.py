@@ -10,43 +10,397 @@ import hmac
 import base64
 import time
 import asyncio
+from collections import deque
 from typing import Dict, List, Optional, Any, Union
-from decimal import Decimal
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP, ROUND_UP
 
 from bot_logging import logger
 
+# Допустимый возраст снимка состояния счета по умолчанию (секунды)
+ACCOUNT_STATE_MAX_AGE = 1.0
+# Допустимый возраст закешированного баланса USDT (секунды)
+BALANCE_TTL = 30.0
+
+# Период одного тика супервизора мониторинга (секунды)
+MONITOR_TICK_INTERVAL = 1.0
+# Максимальная пауза супервизора мониторинга после повторяющихся ошибок (секунды)
+MONITOR_ERROR_BACKOFF_MAX = 30.0
+# Максимальное время ожидания исполнения ордера (секунды)
+ORDER_FILL_TIMEOUT = 600
+
+# Состояния позиции под наблюдением супервизора
+MONITOR_PENDING_FILL = "pending_fill"          # Ордер отправлен, ждем исполнения
+MONITOR_SL_ARMED = "sl_armed"                  # Позиция открыта, защищена стоп-лоссом
+MONITOR_TRAILING_ARMED = "trailing_armed"      # Трейлинг-стоп выставлен
+MONITOR_REARM_TRAILING = "rearm_trailing"      # Трейлинг-стоп исполнен частично, нужен новый
+MONITOR_CLOSED = "closed"                      # Позиция закрыта, мониторинг завершен
+
+# Максимальное время ожидания подтверждения отмены ордеров (секунды)
+CANCEL_CONFIRM_TIMEOUT = 3.0
+# Интервал проверки отмены ордеров (секунды)
+CANCEL_CONFIRM_INTERVAL = 0.2
+# Количество последних замеров задержки, хранимых для статистики
+LATENCY_HISTORY = 100
+
+
+def round_to_step(value: float, step: float, rounding: str = ROUND_DOWN) -> float:
+    """
+    Округляет значение до кратного шагу (шаг объема или цены рынка).
+    
+    Args:
+        value: Исходное значение
+        step: Шаг (например, 0.0001)
+        rounding: Режим округления decimal (ROUND_DOWN, ROUND_UP, ROUND_HALF_UP)
+        
+    Returns:
+        float: Значение, кратное шагу
+    """
+    step_decimal = Decimal(str(step))
+    steps = (Decimal(str(value)) / step_decimal).quantize(Decimal(1), rounding=rounding)
+    return float(steps * step_decimal)
+
+
+def format_decimal(value: float) -> str:
+    """Форматирует число без научной нотации и лишних нулей (для параметров API)."""
+    return format(Decimal(str(value)).normalize(), 'f')
+
+
+def summarize_latencies(samples) -> Dict:
+    """
+    Сводная статистика замеров задержки.
+    
+    Args:
+        samples: Замеры задержки в миллисекундах
+        
+    Returns:
+        Dict: count, last, avg, p50, p95, max (миллисекунды, None если замеров нет)
+    """
+    values = list(samples)
+    if not values:
+        return {'count': 0, 'last': None, 'avg': None, 'p50': None, 'p95': None, 'max': None}
+    
+    ordered = sorted(values)
+    return {
+        'count': len(values),
+        'last': values[-1],
+        'avg': sum(values) / len(values),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1]
+    }
+
+
+class AccountSnapshot:
+    """Снимок состояния счета: все позиции и открытые ордера на момент запроса."""
+    
+    def __init__(self, positions: List, orders: List, version: int):
+        """
+        Args:
+            positions: Позиции счета (ответ fetch_positions)
+            orders: Открытые ордера счета (ответ fetch_open_orders)
+            version: Порядковый номер снимка
+        """
+        self.positions = positions
+        self.orders = orders
+        self.version = version
+        self.created_at = time.monotonic()
+    
+    @property
+    def age(self) -> float:
+        """Возраст снимка в секундах."""
+        return time.monotonic() - self.created_at
+
+
+class AccountStateCache:
+    """
+    Общий кеш позиций и открытых ордеров счета для всех мониторов.
+    
+    Состояние всего счета запрашивается одним обновлением (позиции и ордера параллельно),
+    одновременные запросы ждут одно и то же обновление, а вызывающий код указывает
+    допустимый возраст данных. После собственных действий с ордерами кеш сбрасывается.
+    """
+    
+    def __init__(self, client: Any, max_age: float = ACCOUNT_STATE_MAX_AGE):
+        """
+        Args:
+            client: Клиент биржи с интерфейсом ccxt
+            max_age: Допустимый возраст снимка по умолчанию (секунды)
+        """
+        self._client = client
+        self.max_age = max_age
+        self._snapshot: Optional[AccountSnapshot] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._generation = 0
+        self._version = 0
+        
+        # Статистика использования
+        self.hits = 0
+        self.refreshes = 0
+    
+    def invalidate(self) -> None:
+        """Сбрасывает снимок: следующий запрос получит данные с биржи."""
+        self._snapshot = None
+        self._generation += 1
+        # Обновление, начатое до сброса, дорабатывает для своих ожидающих, новые запросы его не используют
+        self._refresh_task = None
+    
+    async def get(self, max_age: Optional[float] = None) -> AccountSnapshot:
+        """
+        Возвращает снимок состояния счета не старше max_age секунд.
+        
+        Args:
+            max_age: Допустимый возраст снимка (по умолчанию self.max_age, 0 - всегда свежий)
+            
+        Returns:
+            AccountSnapshot: Снимок состояния счета
+        """
+        if max_age is None:
+            max_age = self.max_age
+        
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age <= max_age:
+            self.hits += 1
+            return snapshot
+        
+        # Одно обновление на всех ожидающих
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(self._generation))
+        return await asyncio.shield(self._refresh_task)
+    
+    async def _refresh(self, generation: int) -> AccountSnapshot:
+        """
+        Запрашивает позиции и открытые ордера всего счета.
+        
+        Args:
+            generation: Поколение кеша на момент начала обновления
+            
+        Returns:
+            AccountSnapshot: Новый снимок
+        """
+        params = {
+            "instType": "swap",
+            "marginCoin": "USDT"
+        }
+        positions, orders = await asyncio.gather(
+            self._client.fetch_positions(params=params),
+            self._client.fetch_open_orders(params=params)
+        )
+        self.refreshes += 1
+        self._version += 1
+        snapshot = AccountSnapshot(positions or [], orders or [], self._version)
+        
+        # Если кеш сбросили во время запроса, снимок мог устареть - не сохраняем его
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+
+class MonitoredPosition:
+    """Позиция под наблюдением супервизора мониторинга и ее состояние."""
+    __slots__ = ('symbol', 'order_id', 'position_side', 'trail_activation', 'trail_callback',
+                 'state', 'trailing_order_id', 'contracts', 'created_at', 'updated_at')
+    
+    def __init__(self, symbol: str, order_id: str, position_side: str,
+                 trail_activation: Optional[float] = None, trail_callback: Optional[float] = None):
+        """
+        Args:
+            symbol: Символ в формате Bitget ('BTCUSDT')
+            order_id: ID ордера открытия позиции
+            position_side: Сторона позиции ('long' или 'short')
+            trail_activation: Цена активации трейлинг-стопа (абсолютное значение)
+            trail_callback: Шаг трейлинг-стопа (абсолютное значение)
+        """
+        self.symbol = symbol
+        self.order_id = order_id
+        self.position_side = position_side
+        self.trail_activation = trail_activation
+        self.trail_callback = trail_callback
+        self.state = MONITOR_PENDING_FILL
+        self.trailing_order_id: Optional[str] = None
+        self.contracts = 0.0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+    
+    @property
+    def is_closed(self) -> bool:
+        """Завершен ли мониторинг позиции."""
+        return self.state == MONITOR_CLOSED
+    
+    def transition(self, state: str, reason: str = "") -> None:
+        """
+        Переводит позицию в новое состояние.
+        
+        Args:
+            state: Новое состояние (одна из констант MONITOR_*)
+            reason: Причина перехода для лога
+        """
+        # Закрытие - конечное состояние: запись могли снять с мониторинга,
+        # пока супервизор ждал ответа биржи по ней
+        if self.state == MONITOR_CLOSED:
+            return
+        if state != self.state:
+            logger.info(f"Мониторинг {self.symbol} ({self.position_side}): {self.state} -> {state}"
+                        f"{f' ({reason})' if reason else ''}")
+        self.state = state
+        self.updated_at = time.time()
+
+
+class MonitorRegistry:
+    """
+    Индексированный реестр позиций под мониторингом.
+    
+    Индексы: символ -> множество записей, ID ордера открытия -> запись,
+    ID трейлинг-стопа -> запись. Все поиски и удаления выполняются за O(1).
+    Итерация идет по копии, поэтому реестр можно изменять во время обхода.
+    """
+    
+    def __init__(self):
+        """Создает пустой реестр."""
+        self._by_symbol: Dict[str, set] = {}
+        self._by_order_id: Dict[str, MonitoredPosition] = {}
+        self._by_trailing_id: Dict[str, MonitoredPosition] = {}
+    
+    def __len__(self) -> int:
+        return len(self._by_order_id)
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._by_symbol
+    
+    def add(self, record: MonitoredPosition) -> None:
+        """
+        Добавляет запись в реестр.
+        
+        Args:
+            record: Позиция под мониторингом
+        """
+        self._by_symbol.setdefault(record.symbol, set()).add(record)
+        self._by_order_id[record.order_id] = record
+        if record.trailing_order_id:
+            self._by_trailing_id[record.trailing_order_id] = record
+    
+    def remove(self, record: MonitoredPosition) -> bool:
+        """
+        Удаляет запись из всех индексов.
+        
+        Args:
+            record: Позиция под мониторингом
+            
+        Returns:
+            bool: True, если запись была в реестре
+        """
+        if self._by_order_id.get(record.order_id) is not record:
+            return False
+        
+        del self._by_order_id[record.order_id]
+        records = self._by_symbol.get(record.symbol)
+        if records is not None:
+            records.discard(record)
+            if not records:
+                del self._by_symbol[record.symbol]
+        if record.trailing_order_id and self._by_trailing_id.get(record.trailing_order_id) is record:
+            del self._by_trailing_id[record.trailing_order_id]
+        return True
+    
+    def set_trailing_order(self, record: MonitoredPosition, trailing_order_id: Optional[str]) -> None:
+        """
+        Обновляет ID трейлинг-стопа записи вместе с индексом.
+        
+        Args:
+            record: Позиция под мониторингом
+            trailing_order_id: Новый ID трейлинг-стопа или None
+        """
+        if record.trailing_order_id and self._by_trailing_id.get(record.trailing_order_id) is record:
+            del self._by_trailing_id[record.trailing_order_id]
+        record.trailing_order_id = trailing_order_id
+        if trailing_order_id and self._by_order_id.get(record.order_id) is record:
+            self._by_trailing_id[trailing_order_id] = record
+    
+    def for_symbol(self, symbol: str) -> List[MonitoredPosition]:
+        """
+        Возвращает записи символа.
+        
+        Args:
+            symbol: Символ в формате Bitget
+            
+        Returns:
+            List[MonitoredPosition]: Копия списка записей
+        """
+        return list(self._by_symbol.get(symbol, ()))
+    
+    def by_order_id(self, order_id: str) -> Optional[MonitoredPosition]:
+        """Возвращает запись по ID ордера открытия позиции."""
+        return self._by_order_id.get(order_id)
+    
+    def by_trailing_id(self, trailing_order_id: str) -> Optional[MonitoredPosition]:
+        """Возвращает запись по ID трейлинг-стопа."""
+        return self._by_trailing_id.get(trailing_order_id)
+    
+    def records(self) -> List[MonitoredPosition]:
+        """
+        Возвращает все записи.
+        
+        Returns:
+            List[MonitoredPosition]: Копия списка записей
+        """
+        return list(self._by_order_id.values())
+
+
 class BitgetExchange:
     """Класс для работы с биржей Bitget."""
     
-    def __init__(self):
-        """Инициализирует клиент Bitget с ключами из переменных окружения."""
+    def __init__(self, client: Optional[Any] = None):
+        """
+        Инициализирует клиент Bitget с ключами из переменных окружения.
+        
+        Args:
+            client: Готовый клиент с интерфейсом ccxt (например, trading.simulator.SimulatedExchange).
+                    Если не указан, создается ccxt.bitget, для которого нужны API ключи.
+        """
         self.api_key = os.getenv("API_KEY")
         self.secret_key = os.getenv("SECRET_KEY")
         self.passphrase = os.getenv("PASSPHRASE")
         
-        if not self.api_key or not self.secret_key or not self.passphrase:
+        if client is not None:
+            self.exchange = client
+        elif not self.api_key or not self.secret_key or not self.passphrase:
             raise ValueError("API keys are missing. Please check your .env file.")
-            
-        self.exchange = ccxt.bitget({
-            'apiKey': self.api_key,
-            'secret': self.secret_key,
-            'password': self.passphrase,
-            'options': {
-                'defaultType': 'swap',  # Фьючерсы Bitget
-                'defaultMarginMode': 'isolated',  # Изолированная маржа
-                'defaultContractType': 'perpetual'  # Бессрочные контракты
-            },
-            'enableRateLimit': True
-        })
+        else:
+            self.exchange = ccxt.bitget({
+                'apiKey': self.api_key,
+                'secret': self.secret_key,
+                'password': self.passphrase,
+                'options': {
+                    'defaultType': 'swap',  # Фьючерсы Bitget
+                    'defaultMarginMode': 'isolated',  # Изолированная маржа
+                    'defaultContractType': 'perpetual'  # Бессрочные контракты
+                },
+                'enableRateLimit': True
+            })
         
         # Base URL для API Bitget
         self.api_base_url = 'https://api.bitget.com'
         
-        # Словарь для хранения задач мониторинга ордеров
-        self._order_monitor_tasks = {}
+        # Общий кеш позиций и открытых ордеров счета
+        self._account_state = AccountStateCache(self.exchange)
+        
+        # Индексированный реестр позиций под наблюдением супервизора
+        self._monitors = MonitorRegistry()
+        self._monitor_wakeup = asyncio.Event()
+        
+        # Время подготовки и отправки рыночных ордеров (мс)
+        self._order_latencies = deque(maxlen=LATENCY_HISTORY)
         
-        # Запускаем задачу периодической проверки и очистки мониторинга
-        self._cleanup_task = asyncio.create_task(self._periodic_monitoring_cleanup())
+        # Плечо, установленное на бирже для каждого символа
+        self._leverage_by_symbol: Dict[str, int] = {}
+        # Последний полученный баланс USDT и время его получения
+        self._usdt_balance: Optional[float] = None
+        self._usdt_balance_at = 0.0
+        # Метаданные фьючерсных рынков (шаги объема и цены, минимумы), загружаются один раз
+        self._markets: Dict[str, Dict] = {}
+        self._markets_lock = asyncio.Lock()
+        
+        # Запускаем единый супервизор мониторинга позиций
+        self._supervisor_task = asyncio.create_task(self._monitoring_supervisor())
         
         logger.info("Инициализирован клиент Bitget для фьючерсной торговли")
         
@@ -79,10 +433,10 @@ class BitgetExchange:
         
     async def close(self):
         """Закрывает соединение с биржей."""
-        if hasattr(self, '_cleanup_task') and self._cleanup_task:
-            self._cleanup_task.cancel()
+        if hasattr(self, '_supervisor_task') and self._supervisor_task:
+            self._supervisor_task.cancel()
             try:
-                await self._cleanup_task
+                await self._supervisor_task
             except asyncio.CancelledError:
                 pass
         
@@ -109,36 +463,60 @@ class BitgetExchange:
             
         return await self.exchange.fetch_balance(default_params)
     
-    async def get_usdt_balance(self) -> float:
+    async def get_usdt_balance(self, max_age: Optional[float] = None) -> float:
         """
         Получает баланс USDT на фьючерсном счете.
         
+        Баланс кешируется на BALANCE_TTL секунд; кеш сбрасывается при исполнении
+        ордеров и закрытии позиций (invalidate_balance).
+        
+        Args:
+            max_age: Допустимый возраст данных в секундах (по умолчанию BALANCE_TTL, 0 - запрос к бирже)
+            
         Returns:
             float: Баланс USDT
         """
+        if max_age is None:
+            max_age = BALANCE_TTL
+        if self._usdt_balance is not None and time.monotonic() - self._usdt_balance_at <= max_age:
+            return self._usdt_balance
+        
         try:
             balance = await self.fetch_balance()
-            return balance['total'].get('USDT', 0)
+            self._usdt_balance = balance['total'].get('USDT', 0)
+            self._usdt_balance_at = time.monotonic()
+            return self._usdt_balance
         except Exception as e:
             logger.error(f"Ошибка при получении баланса USDT: {e}")
             return 0
     
-    async def set_leverage(self, leverage: int, symbol: str) -> Dict:
+    def invalidate_balance(self) -> None:
+        """Сбрасывает закешированный баланс (после исполнения ордера или закрытия позиции)."""
+        self._usdt_balance = None
+    
+    async def set_leverage(self, leverage: int, symbol: str, force: bool = False) -> Dict:
         """
         Устанавливает плечо для указанного символа.
         
+        Если это плечо уже установлено для символа этим клиентом, запрос не отправляется.
+        
         Args:
             leverage: Значение плеча (1-100)
             symbol: Торговый символ
+            force: Отправить запрос, даже если плечо не изменилось
             
         Returns:
-            Dict: Ответ биржи
+            Dict: Ответ биржи (или закешированное значение, если запрос не отправлялся)
         """
         try:
             if leverage < 1 or leverage > 100:
                 raise ValueError("Плечо должно быть в диапазоне от 1 до 100")
                 
             formatted_symbol = self._format_symbol(symbol)
+            if not force and self._leverage_by_symbol.get(formatted_symbol) == leverage:
+                logger.debug(f"Плечо {leverage} для {formatted_symbol} уже установлено")
+                return {'symbol': formatted_symbol, 'leverage': leverage, 'cached': True}
+            
             params = {
                 "instType": "swap",
                 "marginCoin": "USDT",
@@ -147,12 +525,131 @@ class BitgetExchange:
             }
             
             response = await self.exchange.set_leverage(leverage, formatted_symbol, params=params)
+            self._leverage_by_symbol[formatted_symbol] = leverage
             logger.info(f"Плечо для {formatted_symbol} установлено на {leverage}")
             return response
         except Exception as e:
+            # Состояние плеча на бирже неизвестно - следующий вызов отправит запрос
+            self._leverage_by_symbol.pop(self._format_symbol(symbol), None)
             logger.error(f"Ошибка при установке плеча для {symbol}: {e}")
             raise
     
+    async def load_markets(self, reload: bool = False) -> Dict[str, Dict]:
+        """
+        Загружает метаданные фьючерсных рынков USDT-M один раз за время работы.
+        
+        Args:
+            reload: Перезагрузить метаданные с биржи
+            
+        Returns:
+            Dict[str, Dict]: {символ Bitget: {symbol, active, amount_step, price_step, min_amount, min_notional}}
+        """
+        if self._markets and not reload:
+            return self._markets
+        
+        async with self._markets_lock:
+            if self._markets and not reload:
+                return self._markets
+            try:
+                markets = await self.exchange.load_markets(reload)
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке метаданных рынков: {e}")
+                return self._markets
+            
+            loaded = {}
+            for market in markets.values():
+                if not market.get('swap') or market.get('settle') != 'USDT':
+                    continue
+                precision = market.get('precision') or {}
+                limits = market.get('limits') or {}
+                loaded[self._format_symbol(market['symbol'])] = {
+                    'symbol': market['symbol'],
+                    'active': market.get('active', True) is not False,
+                    'amount_step': precision.get('amount'),
+                    'price_step': precision.get('price'),
+                    'min_amount': (limits.get('amount') or {}).get('min'),
+                    'min_notional': (limits.get('cost') or {}).get('min')
+                }
+            self._markets = loaded
+            logger.info(f"Загружены метаданные {len(loaded)} фьючерсных рынков")
+            return self._markets
+    
+    def get_market_info(self, symbol: str) -> Optional[Dict]:
+        """
+        Возвращает метаданные рынка из кеша (без запроса к бирже).
+        
+        Args:
+            symbol: Торговый символ
+            
+        Returns:
+            Optional[Dict]: Метаданные рынка или None, если они не загружены
+        """
+        return self._markets.get(self._format_symbol(symbol))
+    
+    def amount_to_precision(self, symbol: str, amount: float) -> float:
+        """
+        Округляет объем вниз до шага объема рынка.
+        
+        Args:
+            symbol: Торговый символ
+            amount: Объем в базовой валюте
+            
+        Returns:
+            float: Объем, кратный шагу (6 знаков, если метаданные не загружены)
+        """
+        market = self.get_market_info(symbol)
+        if not market or not market['amount_step']:
+            return round(amount, 6)
+        return round_to_step(amount, market['amount_step'], ROUND_DOWN)
+    
+    def price_to_precision(self, symbol: str, price: float) -> float:
+        """
+        Округляет цену до шага цены рынка.
+        
+        Args:
+            symbol: Торговый символ
+            price: Цена
+            
+        Returns:
+            float: Цена, кратная шагу (без изменений, если метаданные не загружены)
+        """
+        market = self.get_market_info(symbol)
+        if not market or not market['price_step']:
+            return price
+        return round_to_step(price, market['price_step'], ROUND_HALF_UP)
+    
+    def min_order_amount(self, symbol: str, price: float) -> float:
+        """
+        Рассчитывает минимальный допустимый объем ордера с учетом минимального
+        объема и минимальной суммы ордера.
+        
+        Args:
+            symbol: Торговый символ
+            price: Цена для пересчета минимальной суммы в объем
+            
+        Returns:
+            float: Минимальный объем (на 1 USDT, если метаданные не загружены)
+        """
+        market = self.get_market_info(symbol)
+        if not market:
+            return round(1 / price, 6)
+        
+        min_amount = market['min_amount'] or 0
+        if market['min_notional']:
+            min_amount = max(min_amount, market['min_notional'] / price)
+        if market['amount_step']:
+            min_amount = round_to_step(min_amount, market['amount_step'], ROUND_UP)
+        return min_amount
+    
+    async def fetch_time(self) -> int:
+        """
+        Получает текущее время сервера биржи.
+        
+        Returns:
+            int: Время сервера (мс)
+        """
+        return await self.exchange.fetch_time()
+
     async def get_ticker_price(self, symbol: str) -> Dict:
         """
         Получает актуальные данные о цене для указанного символа.
@@ -180,393 +677,300 @@ class BitgetExchange:
             logger.error(f"Ошибка при получении данных о цене для {symbol}: {e}")
             raise
 
-    async def _monitor_trailing_stop(self, symbol: str, position_side: str, trail_activation: float, trail_callback: float):
+    async def _monitoring_supervisor(self):
         """
-        Мониторит исполнение трейлинг-стопа. Если трейлинг-стоп сработал, но позиция осталась открытой,
-        создает новый трейлинг-стоп (не обновляет непрерывно).
+        Единый цикл мониторинга всех позиций.
         
-        Args:
-            symbol: Торговый символ
-            position_side: Сторона позиции ('long' или 'short')
-            trail_activation: Активационное значение для трейлинг-стопа
-            trail_callback: Значение шага трейлинг-стопа
+        На каждом тике берет один снимок состояния счета и продвигает автомат
+        состояний каждой позиции: ожидание исполнения -> стоп-лосс -> трейлинг-стоп
+        -> (повторный трейлинг-стоп) -> закрыта. Количество запросов к бирже на тик
+        не зависит от числа отслеживаемых позиций.
         """
-        try:
-            # Флаг для отслеживания наличия установленного трейлинг-стопа
-            trailing_stop_set = True  # Начинаем с True, поскольку трейлинг-стоп уже должен быть установлен
-            
-            # Сохраняем начальный размер позиции для отслеживания изменений
-            initial_positions = await self.fetch_positions(symbol)
-            if not initial_positions:
-                logger.warning(f"Позиция {symbol} не найдена при запуске мониторинга трейлинг-стопа")
-                # Отменяем все ордера на всякий случай
-                await self.cancel_all_orders(symbol)
-                # Отменяем задачи мониторинга
-                await self.cancel_trailing_stop_tasks(symbol)
-                return
-                
-            initial_position = initial_positions[0]
-            initial_contracts = float(initial_position['contracts'])
-            
-            logger.info(f"Начат мониторинг трейлинг-стопа для {symbol}, начальный размер позиции: {initial_contracts}")
-            
-            # Регистрируем идентификатор этой задачи в словаре
-            monitoring_key = f"{symbol}_{position_side}_trailing"
-            
-            # Получаем ID текущего трейлинг-стопа из словаря, если есть
-            trailing_info_key = f"{symbol}_trailing_info"
-            current_trailing_stop_id = None
-            if trailing_info_key in self._order_monitor_tasks:
-                trailing_info = self._order_monitor_tasks[trailing_info_key]
-                current_trailing_stop_id = trailing_info.get('order_id')
-            
-            while True:
-                # Проверяем текущие позиции
-                positions = await self.fetch_positions(symbol)
-                if not positions:
-                    logger.info(f"Позиция {symbol} закрыта, прекращаем мониторинг трейлинг-стопа")
-                    # Отменяем текущий трейлинг-стоп по ID, если известен
-                    if current_trailing_stop_id:
-                        await self.cancel_trailing_stop_by_id(current_trailing_stop_id, symbol)
-                    # Отменяем все связанные ордера, так как позиция закрыта
-                    await self.cancel_all_orders(symbol)
-                    return
-
-                position = positions[0]
-                current_contracts = float(position['contracts'])
+        failures = 0
+        while True:
+            try:
+                if not len(self._monitors):
+                    # Нет позиций под наблюдением - ждем регистрации без опроса биржи
+                    self._monitor_wakeup.clear()
+                    await self._monitor_wakeup.wait()
+                    continue
                 
-                if current_contracts <= 0:
-                    logger.info(f"Позиция {symbol} закрыта, прекращаем мониторинг трейлинг-стопа")
-                    # Отменяем текущий трейлинг-стоп по ID, если известен
-                    if current_trailing_stop_id:
-                        await self.cancel_trailing_stop_by_id(current_trailing_stop_id, symbol)
-                    # Отменяем все связанные ордера, так как позиция закрыта
-                    await self.cancel_all_orders(symbol)
-                    return
+                snapshot = await self._account_state.get(MONITOR_TICK_INTERVAL)
                 
-                # Проверяем, есть ли какое-то изменение позиции
-                if current_contracts != initial_contracts:
-                    logger.info(f"Изменение размера позиции {symbol}: было {initial_contracts}, стало {current_contracts}")
-                    
-                    # Если размер позиции уменьшился, это может означать, что трейлинг-стоп сработал частично
-                    if current_contracts < initial_contracts:
-                        # Отменяем текущий трейлинг-стоп по ID, если известен
-                        if current_trailing_stop_id:
-                            await self.cancel_trailing_stop_by_id(current_trailing_stop_id, symbol)
-                            current_trailing_stop_id = None
-                            
-                        # Проверяем все открытые ордера и отменяем их
-                        await self.cancel_all_orders(symbol)
-                        
-                        # Обновляем начальный размер позиции
-                        initial_contracts = current_contracts
-                        
-                        # Сбрасываем флаг трейлинг-стопа
-                        trailing_stop_set = False
-                    else:
-                        # Если размер позиции увеличился, просто обновляем отслеживаемый размер
-                        initial_contracts = current_contracts
-                    
-                # Если трейлинг-стоп активен, просто продолжаем мониторинг
-                if trailing_stop_set:
-                    logger.debug(f"Трейлинг-стоп для {symbol} активен, продолжаем мониторинг")
-                else:
-                    # Если флаг trailing_stop_set сбросился, это значит что трейлинг-стоп сработал
-                    logger.info(f"Трейлинг-стоп для {symbol} исполнен, но позиция осталась открытой. Создаем новый.")
-                    
-                    # Получаем текущую цену
-                    ticker_data = await self.get_ticker_price(symbol)
-                    current_price = ticker_data['mark']
-                    
+                for record in self._monitors.records():
+                    # Запись могли снять с мониторинга, пока обрабатывались предыдущие
+                    if record.is_closed:
+                        continue
                     try:
-                        # Пересчитываем параметры для нового трейлинг-стопа
-                        if position_side == 'long':
-                            # Для long активация должна быть на trail_callback пунктов выше текущей цены
-                            new_activation_price = current_price + trail_callback
-                        else:  # short
-                            # Для short активация должна быть на trail_callback пунктов ниже текущей цены
-                            new_activation_price = current_price - trail_callback
-                        
-                        # Вычисляем процент для API на основе абсолютного значения
-                        trail_callback_percent = (trail_callback / current_price) * 100
-                        
-                        logger.info(f"Пересчитанные параметры: текущая цена={current_price}, "
-                                    f"новая цена активации={new_activation_price}, "
-                                    f"шаг трейлинга={trail_callback} USDT ({trail_callback_percent:.2f}%)")
-
-                        params = {
-                            'instType': 'swap',
-                            'marginCoin': 'USDT',
-                            'symbol': self._format_symbol(symbol),
-                            'reduceOnly': True,
-                            'positionSide': position_side,
-                            'trailingTriggerPrice': new_activation_price,
-                            'trailingPercent': trail_callback_percent
-                        }
-                        
-                        # Создаем новый трейлинг-стоп
-                        trailing_order = await self.exchange.create_order(
-                            symbol=symbol,
-                            type='market',
-                            side='sell' if position_side == 'long' else 'buy',
-                            amount=position['contracts'],
-                            params=params
-                        )
-                        
-                        # Проверяем успешность создания ордера
-                        if 'id' in trailing_order:
-                            logger.info(f"Новый трейлинг-стоп установлен для позиции {symbol} с ID: {trailing_order['id']}")
-                            trailing_stop_set = True
-                            current_trailing_stop_id = trailing_order['id']
-                            
-                            # Обновляем информацию о трейлинг-стопе в словаре мониторинга
-                            trailing_info = {
-                                'order_id': trailing_order['id'],
-                                'symbol': symbol,
-                                'position_side': position_side,
-                                'current_contracts': current_contracts
-                            }
-                            self._order_monitor_tasks[f"{symbol}_trailing_info"] = trailing_info
-                        else:
-                            logger.warning(f"Новый трейлинг-стоп не был создан корректно. Ответ: {trailing_order}")
-                            trailing_stop_set = False
+                        await self._advance_monitor(record, snapshot)
                     except Exception as e:
-                        logger.error(f"Ошибка при создании нового трейлинг-стопа: {e}")
-                        trailing_stop_set = False
-
-                # Проверяем состояние позиции каждые 5 секунд
-                await asyncio.sleep(5)  # Пауза увеличена для снижения нагрузки на API
-
-                # Периодически проверяем, не отменена ли текущая задача
-                if monitoring_key not in self._order_monitor_tasks:
-                    logger.info(f"Задача мониторинга {monitoring_key} была отменена извне, завершаем работу")
-                    # Отменяем текущий трейлинг-стоп по ID перед выходом
-                    if current_trailing_stop_id:
-                        await self.cancel_trailing_stop_by_id(current_trailing_stop_id, symbol)
-                    return
-
-        except Exception as e:
-            logger.error(f"Ошибка при мониторинге трейлинг-стопа для {symbol}: {e}")
-        finally:
-            # Удаляем задачу из словаря
-            task_key = f"{symbol}_{position_side}_trailing"
-            if task_key in self._order_monitor_tasks:
-                del self._order_monitor_tasks[task_key]
-            
-            # Удаляем информацию о трейлинг-стопе
-            trailing_info_key = f"{symbol}_trailing_info"
-            if trailing_info_key in self._order_monitor_tasks:
-                del self._order_monitor_tasks[trailing_info_key]
+                        logger.error(f"Ошибка при мониторинге позиции {record.symbol} в состоянии {record.state}: {e}")
+                    
+                    if record.is_closed:
+                        self._unregister_monitor(record)
                 
-            # Удаляем флаг мониторинга символа
-            symbol_key = f"{symbol}_monitoring"
-            if symbol_key in self._order_monitor_tasks:
-                del self._order_monitor_tasks[symbol_key]
-
-    async def _monitor_order_execution(self, order_id: str, symbol: str, trail_activation: float = None, trail_callback: float = None):
+                failures = 0
+                await asyncio.sleep(MONITOR_TICK_INTERVAL)
+            except asyncio.CancelledError:
+                logger.info("Супервизор мониторинга позиций остановлен")
+                return
+            except Exception as e:
+                # Сбой тика (например, сетевая ошибка при получении снимка счета) не останавливает
+                # супервизор: без него ни одна позиция не получит стоп-лосс и трейлинг-стоп
+                failures += 1
+                delay = min(MONITOR_TICK_INTERVAL * 2 ** (failures - 1), MONITOR_ERROR_BACKOFF_MAX)
+                logger.error(f"Ошибка в супервизоре мониторинга позиций (повтор через {delay:.1f} с): {e}")
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    logger.info("Супервизор мониторинга позиций остановлен")
+                    return
+    
+    def _register_monitor(self, record: MonitoredPosition) -> None:
         """
-        Мониторит исполнение ордера и устанавливает трейлинг-стоп после исполнения.
+        Ставит позицию под наблюдение супервизора.
         
         Args:
-            order_id: ID ордера
-            symbol: Торговый символ
-            trail_activation: Активационная цена для трейлинг-стопа (абсолютное значение)
-            trail_callback: Шаг трейлинг-стопа (абсолютное значение)
+            record: Позиция для мониторинга
         """
-        try:
-            start_time = time.time()
-            timeout = 600  # 10 минут в секундах
-            
-            # Регистрируем символ как отслеживаемый
-            symbol_monitor_key = f"{symbol}_monitoring"
-            self._order_monitor_tasks[symbol_monitor_key] = True
-            
-            # Начальная проверка для определения исходного состояния
-            initial_positions = await self.fetch_positions(symbol)
-            initial_position_size = 0
-            if initial_positions:
-                for pos in initial_positions:
-                    if float(pos['contracts']) > 0:
-                        initial_position_size = float(pos['contracts'])
-                        break
-            
-            while time.time() - start_time < timeout:
-                # Проверяем статус ордера
-                try:
-                    order = await self.exchange.fetch_order(order_id, symbol)
-                except Exception as e:
-                    logger.error(f"Ошибка при получении статуса ордера {order_id}: {e}")
-                    # Проверяем, существует ли позиция
-                    positions = await self.fetch_positions(symbol)
-                    position_exists = False
-                    for pos in positions:
-                        if float(pos['contracts']) > 0:
-                            position_exists = True
-                            break
-                    
-                    if not position_exists:
-                        logger.warning(f"Позиция {symbol} закрыта, возможно по стоп-лоссу. Прекращаем мониторинг.")
-                        await self.force_clean_monitoring_tasks(symbol)
-                        return False
-                    
-                    # Продолжаем мониторинг, если позиция все еще существует
-                    await asyncio.sleep(1)
-                    continue
-                
-                # Проверяем, не закрылась ли позиция по стоп-лоссу
-                current_positions = await self.fetch_positions(symbol)
-                current_position_size = 0
-                if current_positions:
-                    for pos in current_positions:
-                        if float(pos['contracts']) > 0:
-                            current_position_size = float(pos['contracts'])
-                            break
-                
-                # Если позиция была, но теперь её нет или размер изменился - возможно закрытие по стоп-лоссу
-                if initial_position_size > 0 and (current_position_size == 0 or current_position_size < initial_position_size):
-                    logger.warning(f"Обнаружено изменение позиции {symbol}: было {initial_position_size}, стало {current_position_size}. Возможно закрытие по стоп-лоссу.")
-                    
-                    # При любом изменении размера позиции отменяем все трейлинг-стопы
-                    await self.cancel_all_trailing_stops_for_symbol(symbol)
-                    
-                    # Если позиция полностью закрыта
-                    if current_position_size == 0:
-                        logger.info(f"Позиция {symbol} закрыта, прекращаем мониторинг.")
-                        await self.force_clean_monitoring_tasks(symbol)
-                        return True
-                    
-                    # Обновляем размер позиции, если она была частично закрыта
-                    initial_position_size = current_position_size
-                
-                if order['status'] == 'closed':
-                    logger.info(f"Ордер {order_id} исполнен, устанавливаем трейлинг-стоп. trail_activation={trail_activation}, trail_callback={trail_callback}")
-                    
-                    # Если есть параметры для трейлинг-стопа, устанавливаем его
-                    if trail_activation and trail_callback:
-                        try:
-                            # Проверяем на наличие открытых стопов для этого символа
-                            open_orders = await self.fetch_open_orders(symbol)
-                            for open_order in open_orders:
-                                # Если это стоп или трейлинг, отменяем его
-                                if 'stop' in str(open_order['type']).lower() or 'trailing' in str(open_order['type']).lower():
-                                    logger.info(f"Отменяем существующий стоп для {symbol}: {open_order['id']}")
-                                    try:
-                                        await self.cancel_order(open_order['id'], symbol)
-                                    except Exception as cancel_error:
-                                        logger.error(f"Ошибка при отмене ордера: {cancel_error}")
-                            
-                            # Получаем текущую позицию
-                            positions = await self.fetch_positions(symbol)
-                            if not positions:
-                                logger.warning(f"Позиция для {symbol} не найдена после исполнения ордера")
-                                return True
-                                
-                            position = positions[0]
-                            if float(position['contracts']) <= 0:
-                                logger.warning(f"Позиция для {symbol} имеет нулевой размер после исполнения ордера")
-                                return True
-                                
-                            # Получаем текущую цену для расчета процента
-                            ticker_data = await self.get_ticker_price(symbol)
-                            current_price = ticker_data['mark']
-                            
-                            # Вычисляем процент для API на основе абсолютного значения
-                            trail_callback_percent = (trail_callback / current_price) * 100
-                            
-                            logger.info(f"Параметры трейлинг-стопа: цена активации={trail_activation}, "
-                                       f"шаг трейлинга={trail_callback} USDT ({trail_callback_percent:.2f}%)")
-                            
-                            # Устанавливаем трейлинг-стоп
-                            params = {
-                                'instType': 'swap',
-                                'marginCoin': 'USDT',
-                                'symbol': self._format_symbol(symbol),
-                                'reduceOnly': True,
-                                'positionSide': position['side'],
-                                'trailingTriggerPrice': trail_activation,
-                                'trailingPercent': trail_callback_percent
-                            }
-                            
-                            # Создаем ордер трейлинг-стопа
-                            trailing_order = await self.exchange.create_order(
-                                symbol=symbol,
-                                type='market',
-                                side='sell' if position['side'] == 'long' else 'buy',
-                                amount=position['contracts'],
-                                params=params
-                            )
-                            
-                            # Небольшая пауза для обновления информации на бирже
-                            await asyncio.sleep(3)
-
-                            logger.info(f"Трейлинг-стоп установлен для позиции {symbol}, ID: {trailing_order['id']}")
-                            
-                            # Проверяем наличие ID в ответе
-                            if 'id' in trailing_order:
-                                trailing_order_id = trailing_order['id']
-                                logger.info(f"Запускаем мониторинг трейлинг-стопа с ID: {trailing_order_id}")
-                                
-                                # Запускаем мониторинг трейлинг-стопа
-                                monitor_task = asyncio.create_task(
-                                    self._monitor_trailing_stop(
-                                        symbol,
-                                        position['side'],
-                                        trail_activation,
-                                        trail_callback
-                                    )
-                                )
-                                # Используем ID трейлинг-стопа для ключа задачи мониторинга
-                                task_key = f"{symbol}_{position['side']}_trailing"
-                                self._order_monitor_tasks[task_key] = monitor_task
-                                
-                                # Сохраняем информацию о трейлинг-стопе
-                                trailing_info = {
-                                    'order_id': trailing_order_id,
-                                    'symbol': symbol,
-                                    'position_side': position['side'],
-                                    'current_contracts': float(position['contracts'])
-                                }
-                                self._order_monitor_tasks[f"{symbol}_trailing_info"] = trailing_info
-                            else:
-                                logger.warning(f"Трейлинг-стоп был создан, но ID не получен. Ответ: {trailing_order}")
-                                
-                        except Exception as e:
-                            logger.error(f"Ошибка при установке трейлинг-стопа: {e}")
-                    
-                    return True
-                
-                # Проверяем, не отменен ли ордер
-                if order['status'] == 'canceled':
-                    logger.warning(f"Ордер {order_id} был отменен")
-                    # Удаляем мониторинг для этого символа
-                    if symbol_monitor_key in self._order_monitor_tasks:
-                        del self._order_monitor_tasks[symbol_monitor_key]
-                    return False
-                
-                await asyncio.sleep(1)  # Пауза между проверками
-            
-            # Если прошло 10 минут, отменяем ордер
-            logger.warning(f"Ордер {order_id} не исполнен за 10 минут, отменяем")
-            try:
-                await self.cancel_order(order_id, symbol)
-            except Exception as cancel_error:
-                logger.error(f"Ошибка при отмене ордера {order_id}: {cancel_error}")
+        self._monitors.add(record)
+        self._monitor_wakeup.set()
+        logger.info(f"Позиция {record.symbol} ({record.position_side}) поставлена на мониторинг, ордер {record.order_id}")
+    
+    def _unregister_monitor(self, record: MonitoredPosition) -> None:
+        """
+        Снимает позицию с наблюдения супервизора.
+        
+        Args:
+            record: Позиция, снимаемая с мониторинга
+        """
+        self._monitors.remove(record)
+        record.transition(MONITOR_CLOSED)
+    
+    def _snapshot_position(self, snapshot: AccountSnapshot, symbol: str,
+                           position_side: Optional[str] = None) -> Optional[Dict]:
+        """
+        Находит открытую позицию символа в снимке состояния счета.
+        
+        Args:
+            snapshot: Снимок состояния счета
+            symbol: Символ в формате Bitget
+            position_side: Сторона позиции ('long' или 'short', опционально)
             
-            # Удаляем мониторинг для этого символа
-            if symbol_monitor_key in self._order_monitor_tasks:
-                del self._order_monitor_tasks[symbol_monitor_key]
-                
-            return False
+        Returns:
+            Optional[Dict]: Позиция с ненулевым размером или None
+        """
+        for position in snapshot.positions:
+            if (self._format_symbol(position['symbol']) == symbol
+                    and float(position.get('contracts') or 0) > 0
+                    and (position_side is None or position.get('side') == position_side)):
+                return position
+        return None
+    
+    def _snapshot_orders(self, snapshot: AccountSnapshot, symbol: str) -> List:
+        """
+        Возвращает открытые ордера символа из снимка состояния счета.
+        
+        Args:
+            snapshot: Снимок состояния счета
+            symbol: Символ в формате Bitget
             
+        Returns:
+            List: Открытые ордера символа
+        """
+        return [order for order in snapshot.orders if self._format_symbol(order['symbol']) == symbol]
+    
+    @staticmethod
+    def _is_trailing_order(order: Dict) -> bool:
+        """Проверяет, является ли ордер трейлинг-стопом."""
+        return ('trailing' in str(order.get('type', '')).lower()
+                or 'trailing' in str(order.get('info', {}).get('ordType', '')).lower())
+    
+    async def _advance_monitor(self, record: MonitoredPosition, snapshot: AccountSnapshot) -> None:
+        """
+        Выполняет один шаг автомата состояний для позиции.
+        
+        Args:
+            record: Позиция под наблюдением
+            snapshot: Снимок состояния счета текущего тика
+        """
+        symbol = record.symbol
+        position = self._snapshot_position(snapshot, symbol, record.position_side)
+        contracts = float(position['contracts']) if position else 0.0
+        
+        if record.state == MONITOR_PENDING_FILL:
+            await self._check_order_fill(record, snapshot, position)
+            return
+        
+        # Позиция исчезла - закрыта по стоп-лоссу, трейлинг-стопу или вручную
+        if contracts <= 0:
+            logger.info(f"Позиция {symbol} закрыта, прекращаем мониторинг")
+            self.invalidate_balance()
+            if record.trailing_order_id:
+                await self.cancel_trailing_stop_by_id(record.trailing_order_id, symbol)
+            # Отменяем все связанные ордера, так как позиция закрыта
+            for order in self._snapshot_orders(snapshot, symbol):
+                try:
+                    await self.cancel_order(order['id'], symbol)
+                except Exception as e:
+                    logger.error(f"Не удалось отменить ордер {order['id']}: {e}")
+            record.transition(MONITOR_CLOSED, "позиция закрыта")
+            return
+        
+        if record.state == MONITOR_SL_ARMED:
+            # Позиция открыта - выставляем трейлинг-стоп, предварительно убрав старые
+            for order in self._snapshot_orders(snapshot, symbol):
+                if self._is_trailing_order(order):
+                    logger.info(f"Отменяем существующий трейлинг-стоп для {symbol}: {order['id']}")
+                    await self.cancel_trailing_stop_by_id(order['id'], symbol)
+            await self._place_trailing_stop(record, position, record.trail_activation)
+        
+        elif record.state == MONITOR_TRAILING_ARMED:
+            if contracts < record.contracts:
+                # Размер позиции уменьшился - трейлинг-стоп сработал частично
+                logger.info(f"Изменение размера позиции {symbol}: было {record.contracts}, стало {contracts}")
+                self.invalidate_balance()
+                if record.trailing_order_id:
+                    await self.cancel_trailing_stop_by_id(record.trailing_order_id, symbol)
+                    self._monitors.set_trailing_order(record, None)
+                record.contracts = contracts
+                record.transition(MONITOR_REARM_TRAILING, "трейлинг-стоп исполнен, позиция осталась открытой")
+            elif contracts > record.contracts:
+                # Если размер позиции увеличился, просто обновляем отслеживаемый размер
+                record.contracts = contracts
+        
+        elif record.state == MONITOR_REARM_TRAILING:
+            ticker_data = await self.get_ticker_price(symbol)
+            current_price = ticker_data['mark']
+            # Активация на trail_callback пунктов в сторону прибыли от текущей цены
+            if record.position_side == 'long':
+                new_activation_price = current_price + record.trail_callback
+            else:
+                new_activation_price = current_price - record.trail_callback
+            await self._place_trailing_stop(record, position, new_activation_price, current_price)
+    
+    async def _check_order_fill(self, record: MonitoredPosition, snapshot: AccountSnapshot,
+                                position: Optional[Dict]) -> None:
+        """
+        Проверяет исполнение ордера открытия позиции.
+        
+        Args:
+            record: Позиция под наблюдением
+            snapshot: Снимок состояния счета
+            position: Позиция символа из снимка (если есть)
+        """
+        symbol = record.symbol
+        
+        # Ордер еще в списке открытых - ждем, но не дольше ORDER_FILL_TIMEOUT
+        if any(order['id'] == record.order_id for order in snapshot.orders):
+            if time.time() - record.created_at > ORDER_FILL_TIMEOUT:
+                logger.warning(f"Ордер {record.order_id} не исполнен за {ORDER_FILL_TIMEOUT} секунд, отменяем")
+                try:
+                    await self.cancel_order(record.order_id, symbol)
+                except Exception as cancel_error:
+                    logger.error(f"Ошибка при отмене ордера {record.order_id}: {cancel_error}")
+                record.transition(MONITOR_CLOSED, "ордер не исполнен")
+            return
+        
+        # Ордера нет среди открытых - уточняем его статус одним запросом
+        try:
+            order = await self.exchange.fetch_order(record.order_id, symbol)
         except Exception as e:
-            logger.error(f"Ошибка при мониторинге ордера {order_id}: {e}")
-            # В случае ошибки очищаем задачи мониторинга для этого символа
-            await self.force_clean_monitoring_tasks(symbol)
-            return False
-        finally:
-            # Удаляем задачу из словаря
-            if order_id in self._order_monitor_tasks:
-                del self._order_monitor_tasks[order_id]
+            logger.error(f"Ошибка при получении статуса ордера {record.order_id}: {e}")
+            if position is None:
+                logger.warning(f"Позиция {symbol} не найдена, прекращаем мониторинг")
+                record.transition(MONITOR_CLOSED, "статус ордера неизвестен, позиции нет")
+            return
+        
+        if order['status'] == 'canceled':
+            logger.warning(f"Ордер {record.order_id} был отменен")
+            record.transition(MONITOR_CLOSED, "ордер отменен")
+            return
+        
+        if order['status'] != 'closed':
+            return
+        
+        if position is None:
+            # Снимок мог быть сделан до исполнения - проверяем по свежим данным
+            positions = await self.fetch_positions(symbol, max_age=0)
+            position = next((pos for pos in positions if pos.get('side') == record.position_side), None)
+        
+        if position is None or float(position['contracts']) <= 0:
+            logger.warning(f"Позиция для {symbol} не найдена после исполнения ордера {record.order_id}")
+            record.transition(MONITOR_CLOSED, "позиция не найдена после исполнения")
+            return
+        
+        self.invalidate_balance()
+        if record.is_closed:
+            return
+        record.contracts = float(position['contracts'])
+        record.transition(MONITOR_SL_ARMED, f"ордер {record.order_id} исполнен")
+        
+        # Трейлинг-стоп выставляем в том же тике
+        if record.trail_activation and record.trail_callback:
+            await self._place_trailing_stop(record, position, record.trail_activation)
+    
+    async def _place_trailing_stop(self, record: MonitoredPosition, position: Dict,
+                                   activation_price: float, current_price: Optional[float] = None) -> None:
+        """
+        Выставляет трейлинг-стоп для позиции и переводит ее в состояние MONITOR_TRAILING_ARMED.
+        
+        Args:
+            record: Позиция под наблюдением
+            position: Данные позиции с биржи
+            activation_price: Цена активации трейлинг-стопа
+            current_price: Текущая цена (если уже известна)
+        """
+        symbol = record.symbol
+        if current_price is None:
+            ticker_data = await self.get_ticker_price(symbol)
+            current_price = ticker_data['mark']
+        activation_price = self.price_to_precision(symbol, activation_price)
+        
+        # Позицию могли закрыть и снять с мониторинга, пока шли запросы этого тика
+        if record.is_closed:
+            logger.info(f"Позиция {symbol} снята с мониторинга, трейлинг-стоп не выставляется")
+            return
+        
+        # Вычисляем процент для API на основе абсолютного значения
+        trail_callback_percent = (record.trail_callback / current_price) * 100
+        
+        logger.info(f"Параметры трейлинг-стопа {symbol}: текущая цена={current_price}, цена активации={activation_price}, "
+                    f"шаг трейлинга={record.trail_callback} USDT ({trail_callback_percent:.2f}%)")
+        
+        params = {
+            'instType': 'swap',
+            'marginCoin': 'USDT',
+            'symbol': symbol,
+            'reduceOnly': True,
+            'positionSide': record.position_side,
+            'trailingTriggerPrice': activation_price,
+            'trailingPercent': trail_callback_percent
+        }
+        
+        try:
+            trailing_order = await self.exchange.create_order(
+                symbol=symbol,
+                type='market',
+                side='sell' if record.position_side == 'long' else 'buy',
+                amount=position['contracts'],
+                params=params
+            )
+            self._account_state.invalidate()
+        except Exception as e:
+            logger.error(f"Ошибка при создании трейлинг-стопа для {symbol}: {e}")
+            return
+        
+        if 'id' in trailing_order and record.is_closed:
+            # Позиция закрыта во время создания ордера - трейлинг-стоп больше не нужен
+            await self.cancel_trailing_stop_by_id(trailing_order['id'], symbol)
+        elif 'id' in trailing_order:
+            self._monitors.set_trailing_order(record, trailing_order['id'])
+            record.contracts = float(position['contracts'])
+            logger.info(f"Трейлинг-стоп установлен для позиции {symbol}, ID: {trailing_order['id']}")
+            record.transition(MONITOR_TRAILING_ARMED)
+        else:
+            logger.warning(f"Трейлинг-стоп не был создан корректно. Ответ: {trailing_order}")
 
     async def create_market_order(self, 
                                 symbol: str, 
@@ -576,7 +980,8 @@ class BitgetExchange:
                                 stop_loss: float = None,
                                 trail_activation: float = None,
                                 trail_callback: float = None,
-                                force: bool = False) -> Dict:
+                                force: bool = False,
+                                fast_path: bool = True) -> Dict:
         """
         Создает рыночный ордер с указанными параметрами и стоп-лоссом.
         
@@ -584,99 +989,55 @@ class BitgetExchange:
             symbol: Торговый символ
             side: Сторона сделки ('buy' или 'sell')
             amount: Объем сделки в базовой валюте
-            price: Цена для расчета quoteSize (опционально для рыночных ордеров)
+            price: Цена для расчета quoteSize (если не указана, запрашивается mark price)
             stop_loss: Цена стоп-лосса
             trail_activation: Активационная цена для трейлинг-стопа
             trail_callback: Процент отклонения для трейлинг-стопа
             force: Принудительное создание ордера, даже если есть блокирующие факторы
+            fast_path: Проверки по общему снимку счета и реестру мониторинга с параллельными
+                       запросами (False - прежняя последовательная цепочка запросов)
             
         Returns:
             Dict: Информация о созданном ордере
         """
+        started = time.monotonic()
+        ticker_task = None
         try:
             formatted_symbol = self._format_symbol(symbol)
             position_side = "long" if side == "buy" else "short"
             
-            # Проверяем позиции перед выполнением любых действий
-            positions = await self.fetch_positions(formatted_symbol)
-            has_real_position = False
-            
-            for pos in positions:
-                if float(pos['contracts']) > 0:
-                    has_real_position = True
-                    break
-            
-            # Если система считает, что есть мониторинг, но реальных позиций нет - очищаем задачи
-            is_monitored = await self.is_symbol_being_monitored(formatted_symbol)
-            if is_monitored and not has_real_position:
-                logger.warning(f"Обнаружено несоответствие: символ {formatted_symbol} отслеживается, но реальных позиций нет.")
-                logger.warning(f"Выполняется принудительная очистка задач мониторинга для {formatted_symbol}")
-                cleaned = await self.force_clean_monitoring_tasks(formatted_symbol)
-                logger.info(f"Очищено {cleaned} задач мониторинга для {formatted_symbol}")
-                # После очистки задач мониторинга, продолжаем выполнение
-            
-            # Проверяем возможность открытия ордера, если не указан флаг force
-            # После очистки задач мониторинга эта проверка не должна блокировать открытие
-            if not force:
-                can_open = await self.can_open_orders(formatted_symbol)
-                if not can_open:
-                    # Пробуем еще раз принудительно очистить задачи мониторинга
-                    logger.warning(f"Невозможно открыть ордер для {formatted_symbol}. Пробуем повторную очистку задач...")
-                    await self.force_clean_monitoring_tasks(formatted_symbol)
-                    
-                    # И проверяем снова
-                    can_open = await self.can_open_orders(formatted_symbol)
-                    if not can_open:
-                        logger.error(f"Невозможно открыть ордер для {formatted_symbol} даже после очистки задач")
-                        raise ValueError(f"Невозможно открыть ордер для {formatted_symbol}. Закройте существующие позиции и ордера или используйте force=True")
+            # Цена не зависит от проверок - запрашиваем ее параллельно с ними
+            if price is None and fast_path:
+                ticker_task = asyncio.create_task(self.get_ticker_price(formatted_symbol))
             
-            # Проверяем, есть ли открытые ордера для данного символа
-            open_orders = await self.fetch_open_orders(formatted_symbol)
-            if open_orders:
-                logger.warning(f"Обнаружены открытые ордера для {formatted_symbol}. Отменяем их перед созданием нового ордера.")
-                
-                # Проверяем, есть ли среди открытых ордеров трейлинг-стопы, и отменяем их по ID
-                for order in open_orders:
-                    if 'trailing' in str(order.get('type', '')).lower() or 'trailing' in str(order.get('info', {}).get('ordType', '')).lower():
-                        logger.info(f"Отменяем трейлинг-стоп {order['id']} для {formatted_symbol}")
-                        await self.cancel_trailing_stop_by_id(order['id'], formatted_symbol)
-                
-                # Отменяем все открытые ордера для данного символа
-                await self.cancel_all_orders(formatted_symbol)
-                # Немного ждем, чтобы биржа успела обработать отмену
-                await asyncio.sleep(1)
-                
-            # Проверяем и отменяем любые задачи мониторинга для этого символа
-            canceled_tasks = await self.cancel_trailing_stop_tasks(formatted_symbol)
-            if canceled_tasks > 0:
-                logger.warning(f"Отменено {canceled_tasks} задач мониторинга для {formatted_symbol} перед открытием новой позиции")
+            if fast_path:
+                await self._prepare_order_fast(formatted_symbol, force)
+            else:
+                await self._prepare_order_sequential(formatted_symbol, force)
             
-            # Проверяем трейлинг-стопы по их ID из словаря мониторинга
-            trailing_info_key = f"{formatted_symbol}_trailing_info"
-            if trailing_info_key in self._order_monitor_tasks:
-                trailing_info = self._order_monitor_tasks[trailing_info_key]
-                trail_order_id = trailing_info.get('order_id')
-                if trail_order_id:
-                    logger.warning(f"Обнаружен активный трейлинг-стоп {trail_order_id} для {formatted_symbol}. Отменяем его.")
-                    await self.cancel_trailing_stop_by_id(trail_order_id, formatted_symbol)
+            if price is not None:
+                current_price = price
+            else:
+                # Получаем актуальные данные о цене
+                if ticker_task is not None:
+                    ticker_data = await ticker_task
+                else:
+                    ticker_data = await self.get_ticker_price(formatted_symbol)
+                current_price = ticker_data['mark']  # Используем mark price для расчетов
             
-            # Получаем актуальные данные о цене
-            ticker_data = await self.get_ticker_price(formatted_symbol)
-            current_price = ticker_data['mark']  # Используем mark price для расчетов
+            # Приводим объем к шагу рынка и проверяем минимальный размер ордера
+            amount = self.amount_to_precision(formatted_symbol, amount)
+            min_amount = self.min_order_amount(formatted_symbol, current_price)
+            if amount < min_amount:
+                logger.warning(f"Объем {amount} меньше минимального для {formatted_symbol}, используем {min_amount}")
+                amount = min_amount
             
             # Рассчитываем quoteSize (сумма в USDT)
-            amount = round(amount, 6)
             quote_size = amount * current_price
             quote_size = round(quote_size, 8)
             
-            # Проверяем минимальный размер ордера (1 USDT)
-            if quote_size < 1:
-                amount = 1 / current_price
-                amount = round(amount, 6)
-                quote_size = 1
-            
             # Форматируем значения для избежания научной нотации
-            amount_str = f"{amount:.6f}".rstrip('0').rstrip('.') if '.' in f"{amount:.6f}" else f"{amount:.6f}"
+            amount_str = format_decimal(amount)
             quote_size_str = f"{quote_size:.8f}".rstrip('0').rstrip('.') if '.' in f"{quote_size:.8f}" else f"{quote_size:.8f}"
             
             logger.info(f"Создание ордера: baseSize={amount_str}, quoteSize={quote_size_str} USDT, mark price={current_price}")
@@ -693,6 +1054,7 @@ class BitgetExchange:
             
             # Добавляем стоп-лосс если указан
             if stop_loss:
+                stop_loss = self.price_to_precision(formatted_symbol, stop_loss)
                 stop_price_str = f"{stop_loss:.2f}"
                 logger.info(f"Добавлен стоп-лосс: {stop_price_str}")
                 order_params["stopLoss"] = {
@@ -708,32 +1070,195 @@ class BitgetExchange:
                 amount=amount,
                 params=order_params
             )
+            self._account_state.invalidate()
+            self.invalidate_balance()
             
-            logger.info(f"Создан рыночный ордер {side.upper()} для {formatted_symbol} на объем {amount_str}")
+            latency_ms = (time.monotonic() - started) * 1000
+            self._order_latencies.append(latency_ms)
+            logger.info(f"Создан рыночный ордер {side.upper()} для {formatted_symbol} на объем {amount_str} "
+                        f"(подготовка и отправка: {latency_ms:.0f} мс)")
             
-            # Запускаем мониторинг исполнения ордера
+            # Ставим позицию под наблюдение супервизора мониторинга
             if trail_activation and trail_callback:
                 logger.info(f"Установлены параметры для трейлинг-стопа: активация={trail_activation}, шаг={trail_callback}")
-                
-                monitor_task = asyncio.create_task(
-                    self._monitor_order_execution(
-                        order['id'],
-                        formatted_symbol,
-                        trail_activation,
-                        trail_callback
-                    )
-                )
-                self._order_monitor_tasks[order['id']] = monitor_task
-                
-                # Добавляем ключ мониторинга для этого символа
-                symbol_key = f"{formatted_symbol}_monitoring"
-                self._order_monitor_tasks[symbol_key] = True
+                self._register_monitor(MonitoredPosition(
+                    formatted_symbol,
+                    order['id'],
+                    position_side,
+                    trail_activation,
+                    trail_callback
+                ))
             
             return order
             
         except Exception as e:
+            if ticker_task is not None and not ticker_task.done():
+                ticker_task.cancel()
             logger.error(f"Ошибка при создании рыночного ордера для {symbol}: {e}")
             raise
+    
+    async def _prepare_order_fast(self, symbol: str, force: bool) -> None:
+        """
+        Проверки перед открытием позиции по общему снимку счета и реестру мониторинга.
+        
+        Позиции и открытые ордера берутся из одного снимка (без отдельных запросов
+        на каждую проверку), мешающие ордера отменяются параллельно, а вместо
+        фиксированной паузы ожидается подтверждение отмены.
+        
+        Args:
+            symbol: Символ в формате Bitget
+            force: Отменять мешающие ордера вместо отказа в открытии
+            
+        Raises:
+            ValueError: Если открытие запрещено и force не указан
+        """
+        snapshot = await self._account_state.get()
+        has_real_position = self._snapshot_position(snapshot, symbol) is not None
+        
+        # Если система считает, что есть мониторинг, но реальных позиций нет - очищаем задачи
+        if symbol in self._monitors and not has_real_position:
+            logger.warning(f"Обнаружено несоответствие: символ {symbol} отслеживается, но реальных позиций нет.")
+            cleaned = await self.force_clean_monitoring_tasks(symbol)
+            logger.info(f"Очищено {cleaned} задач мониторинга для {symbol}")
+            snapshot = await self._account_state.get()
+        
+        open_orders = self._snapshot_orders(snapshot, symbol)
+        
+        if not force and (symbol in self._monitors or has_real_position or open_orders):
+            # Снимок мог устареть - повторяем проверку по свежим данным биржи после очистки
+            logger.warning(f"Невозможно открыть ордер для {symbol}. Пробуем повторную очистку задач...")
+            await self.force_clean_monitoring_tasks(symbol)
+            snapshot = await self._account_state.get(0)
+            has_real_position = self._snapshot_position(snapshot, symbol) is not None
+            open_orders = self._snapshot_orders(snapshot, symbol)
+            if has_real_position or open_orders:
+                logger.error(f"Невозможно открыть ордер для {symbol} даже после очистки задач")
+                raise ValueError(f"Невозможно открыть ордер для {symbol}. Закройте существующие позиции и ордера или используйте force=True")
+        
+        # Трейлинг-стопы позиций под мониторингом отменяем по ID вместе с открытыми ордерами
+        trailing_ids = {record.trailing_order_id for record in self._monitors.for_symbol(symbol)
+                        if record.trailing_order_id}
+        cancels = []
+        for order in open_orders:
+            if self._is_trailing_order(order) or order['id'] in trailing_ids:
+                trailing_ids.discard(order['id'])
+                cancels.append(self.cancel_trailing_stop_by_id(order['id'], symbol))
+            else:
+                cancels.append(self.cancel_order(order['id'], symbol))
+        for trailing_order_id in trailing_ids:
+            logger.warning(f"Обнаружен активный трейлинг-стоп {trailing_order_id} для {symbol}. Отменяем его.")
+            cancels.append(self.cancel_trailing_stop_by_id(trailing_order_id, symbol))
+        
+        if cancels:
+            logger.warning(f"Отменяем {len(cancels)} ордеров для {symbol} перед созданием нового ордера.")
+            results = await asyncio.gather(*cancels, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Не удалось отменить ордер для {symbol}: {result}")
+        
+        canceled_tasks = await self.cancel_trailing_stop_tasks(symbol)
+        if canceled_tasks > 0:
+            logger.warning(f"Отменено {canceled_tasks} задач мониторинга для {symbol} перед открытием новой позиции")
+        
+        if open_orders:
+            await self._confirm_orders_canceled(symbol, {order['id'] for order in open_orders})
+    
+    async def _prepare_order_sequential(self, symbol: str, force: bool) -> None:
+        """
+        Прежняя последовательная цепочка проверок перед открытием позиции.
+        
+        Args:
+            symbol: Символ в формате Bitget
+            force: Принудительное создание ордера, даже если есть блокирующие факторы
+            
+        Raises:
+            ValueError: Если открытие запрещено и force не указан
+        """
+        # Проверяем позиции перед выполнением любых действий (по свежим данным биржи)
+        positions = await self.fetch_positions(symbol, max_age=0)
+        has_real_position = False
+        
+        for pos in positions:
+            if float(pos['contracts']) > 0:
+                has_real_position = True
+                break
+        
+        # Если система считает, что есть мониторинг, но реальных позиций нет - очищаем задачи
+        is_monitored = await self.is_symbol_being_monitored(symbol)
+        if is_monitored and not has_real_position:
+            logger.warning(f"Обнаружено несоответствие: символ {symbol} отслеживается, но реальных позиций нет.")
+            logger.warning(f"Выполняется принудительная очистка задач мониторинга для {symbol}")
+            cleaned = await self.force_clean_monitoring_tasks(symbol)
+            logger.info(f"Очищено {cleaned} задач мониторинга для {symbol}")
+            # После очистки задач мониторинга, продолжаем выполнение
+        
+        # Проверяем возможность открытия ордера, если не указан флаг force
+        # После очистки задач мониторинга эта проверка не должна блокировать открытие
+        if not force:
+            can_open = await self.can_open_orders(symbol)
+            if not can_open:
+                # Пробуем еще раз принудительно очистить задачи мониторинга
+                logger.warning(f"Невозможно открыть ордер для {symbol}. Пробуем повторную очистку задач...")
+                await self.force_clean_monitoring_tasks(symbol)
+                
+                # И проверяем снова
+                can_open = await self.can_open_orders(symbol)
+                if not can_open:
+                    logger.error(f"Невозможно открыть ордер для {symbol} даже после очистки задач")
+                    raise ValueError(f"Невозможно открыть ордер для {symbol}. Закройте существующие позиции и ордера или используйте force=True")
+        
+        # Проверяем, есть ли открытые ордера для данного символа
+        open_orders = await self.fetch_open_orders(symbol)
+        if open_orders:
+            logger.warning(f"Обнаружены открытые ордера для {symbol}. Отменяем их перед созданием нового ордера.")
+            
+            # Проверяем, есть ли среди открытых ордеров трейлинг-стопы, и отменяем их по ID
+            for order in open_orders:
+                if self._is_trailing_order(order):
+                    logger.info(f"Отменяем трейлинг-стоп {order['id']} для {symbol}")
+                    await self.cancel_trailing_stop_by_id(order['id'], symbol)
+            
+            # Отменяем все открытые ордера для данного символа и ждем подтверждения отмены
+            await self.cancel_all_orders(symbol)
+            await self._confirm_orders_canceled(symbol, {order['id'] for order in open_orders})
+            
+        # Проверяем и отменяем любые задачи мониторинга для этого символа
+        canceled_tasks = await self.cancel_trailing_stop_tasks(symbol)
+        if canceled_tasks > 0:
+            logger.warning(f"Отменено {canceled_tasks} задач мониторинга для {symbol} перед открытием новой позиции")
+    
+    async def _confirm_orders_canceled(self, symbol: str, order_ids: set,
+                                       timeout: float = CANCEL_CONFIRM_TIMEOUT) -> bool:
+        """
+        Ожидает, пока отмененные ордера исчезнут из открытых ордеров на бирже.
+        
+        Args:
+            symbol: Символ в формате Bitget
+            order_ids: ID отмененных ордеров
+            timeout: Максимальное время ожидания (секунды)
+            
+        Returns:
+            bool: True если отмена подтверждена, False по истечении времени ожидания
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = await self._account_state.get(0)
+            remaining = [order['id'] for order in self._snapshot_orders(snapshot, symbol) if order['id'] in order_ids]
+            if not remaining:
+                return True
+            if time.monotonic() >= deadline:
+                logger.warning(f"Отмена ордеров {remaining} для {symbol} не подтверждена за {timeout} с")
+                return False
+            await asyncio.sleep(CANCEL_CONFIRM_INTERVAL)
+    
+    def get_order_latency_stats(self) -> Dict:
+        """
+        Возвращает статистику времени от вызова create_market_order до ответа биржи.
+        
+        Returns:
+            Dict: count, last, avg, p50, p95, max (миллисекунды)
+        """
+        return summarize_latencies(self._order_latencies)
             
     async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 200, params: Optional[Dict] = None) -> List:
         """
@@ -780,114 +1305,48 @@ class BitgetExchange:
             logger.error(f"Ошибка при получении OHLCV данных для {symbol} ({timeframe}): {e}")
             raise
     
-    async def fetch_open_orders(self, symbol: Optional[str] = None) -> List:
+    async def fetch_open_orders(self, symbol: Optional[str] = None, max_age: Optional[float] = None) -> List:
         """
-        Получает список открытых ордеров.
+        Получает список открытых ордеров из общего снимка состояния счета.
         
         Args:
             symbol: Торговый символ (опционально)
+            max_age: Допустимый возраст данных в секундах (по умолчанию ACCOUNT_STATE_MAX_AGE, 0 - запрос к бирже)
             
         Returns:
             List: Список открытых ордеров
         """
         try:
-            params = {
-                "instType": "swap",
-                "marginCoin": "USDT"
-            }
+            snapshot = await self._account_state.get(max_age)
             if symbol:
                 formatted_symbol = self._format_symbol(symbol)
-                return await self.exchange.fetch_open_orders(symbol=formatted_symbol, params=params)
-            else:
-                return await self.exchange.fetch_open_orders(params=params)
+                return [order for order in snapshot.orders if self._format_symbol(order['symbol']) == formatted_symbol]
+            return list(snapshot.orders)
         except Exception as e:
             logger.error(f"Ошибка при получении открытых ордеров: {e}")
             return []
     
-    async def fetch_positions(self, symbol: Optional[str] = None) -> List:
+    async def fetch_positions(self, symbol: Optional[str] = None, max_age: Optional[float] = None) -> List:
         """
-        Получает список открытых позиций.
+        Получает список открытых позиций из общего снимка состояния счета.
         
         Args:
             symbol: Торговый символ (опционально)
+            max_age: Допустимый возраст данных в секундах (по умолчанию ACCOUNT_STATE_MAX_AGE, 0 - запрос к бирже)
             
         Returns:
             List: Список открытых позиций
         """
         try:
-            params = {
-                "instType": "swap",
-                "marginCoin": "USDT"
-            }
+            snapshot = await self._account_state.get(max_age)
             if symbol:
                 formatted_symbol = self._format_symbol(symbol)
-                params["symbol"] = formatted_symbol
-                
-            positions = await self.exchange.fetch_positions(params=params)
-            
-            # Проверяем и очищаем неактивные трейлинг-стопы из словаря
-            await self._cleanup_inactive_trailing_stops(positions, symbol)
-            
-            return positions
+                return [position for position in snapshot.positions if self._format_symbol(position['symbol']) == formatted_symbol]
+            return list(snapshot.positions)
         except Exception as e:
             logger.error(f"Ошибка при получении открытых позиций: {e}")
             return []
     
-    async def _cleanup_inactive_trailing_stops(self, positions: List, target_symbol: Optional[str] = None):
-        """
-        Очищает словарь мониторинга от трейлинг-стопов для символов без активных позиций.
-        
-        Args:
-            positions: Список активных позиций
-            target_symbol: Целевой символ для очистки (опционально)
-        """
-        try:
-            # Создаем множество символов с активными позициями
-            active_symbols = set()
-            for position in positions:
-                if float(position.get('contracts', 0)) > 0:
-                    symbol = position['symbol']
-                    # Удаляем суффикс ':USDT' если он присутствует
-                    if ':' in symbol:
-                        symbol = symbol.split(':')[0]
-                    formatted_symbol = self._format_symbol(symbol)
-                    active_symbols.add(formatted_symbol)
-            
-            # Проверяем трейлинг-стопы в словаре мониторинга
-            trailing_keys_to_remove = []
-            
-            for key in list(self._order_monitor_tasks.keys()):
-                if key.endswith('_trailing_info'):
-                    # Извлекаем символ из ключа
-                    symbol_from_key = key.replace('_trailing_info', '')
-                    
-                    # Если указан целевой символ, проверяем только его
-                    if target_symbol:
-                        target_formatted = self._format_symbol(target_symbol)
-                        if symbol_from_key != target_formatted:
-                            continue
-                    
-                    # Если для этого символа нет активной позиции, помечаем ключ для удаления
-                    if symbol_from_key not in active_symbols:
-                        trailing_keys_to_remove.append(key)
-                        logger.info(f"Обнаружен неактивный трейлинг-стоп для {symbol_from_key} - позиция закрыта")
-            
-            # Удаляем неактивные ключи
-            for key in trailing_keys_to_remove:
-                if key in self._order_monitor_tasks:
-                    trailing_info = self._order_monitor_tasks[key]
-                    trail_order_id = trailing_info.get('order_id')
-                    symbol_name = key.replace('_trailing_info', '')
-                    
-                    logger.info(f"Удаляем неактивный трейлинг-стоп {trail_order_id} для {symbol_name} из словаря мониторинга")
-                    del self._order_monitor_tasks[key]
-                    
-                    # Также отменяем связанные задачи мониторинга
-                    await self.cancel_trailing_stop_tasks(symbol_name)
-                    
-        except Exception as e:
-            logger.error(f"Ошибка при очистке неактивных трейлинг-стопов: {e}")
-    
     async def cancel_order(self, order_id: str, symbol: str) -> Dict:
         """
         Отменяет ордер по его ID.
@@ -906,6 +1365,7 @@ class BitgetExchange:
                 "marginCoin": "USDT"
             }
             result = await self.exchange.cancel_order(order_id, formatted_symbol, params=params)
+            self._account_state.invalidate()
             logger.info(f"Ордер {order_id} для {formatted_symbol} отменен")
             return result
         except Exception as e:
@@ -970,14 +1430,11 @@ class BitgetExchange:
                 await self.cancel_trailing_stop_tasks(formatted_symbol)
                 return True
             
-            # Перед закрытием позиции отменяем все трейлинг-стопы по ID
+            # Перед закрытием позиции отменяем трейлинг-стоп по ID
             try:
-                trailing_info_key = f"{formatted_symbol}_trailing_info"
-                if trailing_info_key in self._order_monitor_tasks:
-                    trailing_info = self._order_monitor_tasks[trailing_info_key]
-                    trail_order_id = trailing_info.get('order_id')
-                    if trail_order_id:
-                        await self.cancel_trailing_stop_by_id(trail_order_id, formatted_symbol)
+                for record in self._monitors.for_symbol(formatted_symbol):
+                    if record.position_side == position['side'] and record.trailing_order_id:
+                        await self.cancel_trailing_stop_by_id(record.trailing_order_id, formatted_symbol)
             except Exception as e:
                 logger.error(f"Ошибка при отмене трейлинг-стопа по ID перед закрытием позиции: {e}")
                 
@@ -1014,6 +1471,8 @@ class BitgetExchange:
                 amount=contracts,
                 params=params
             )
+            self._account_state.invalidate()
+            self.invalidate_balance()
             
             logger.info(f"Позиция {formatted_symbol} ({position['side']}) успешно закрыта")
             
@@ -1076,71 +1535,32 @@ class BitgetExchange:
 
     async def cancel_trailing_stop_tasks(self, symbol: str = None) -> int:
         """
-        Отменяет задачи мониторинга трейлинг-стопа для указанного символа или все задачи.
+        Снимает позиции с мониторинга для указанного символа или все позиции.
         
         Args:
             symbol: Торговый символ (опционально)
             
         Returns:
-            int: Количество отмененных задач
+            int: Количество снятых с мониторинга позиций
         """
-        canceled_count = 0
-        tasks_to_cancel = []
-        
         try:
-            # Если символ указан, ищем только задачи для этого символа
             if symbol:
-                formatted_symbol = self._format_symbol(symbol)
-                for task_key in list(self._order_monitor_tasks.keys()):
-                    # Проверяем, относится ли задача к указанному символу
-                    if formatted_symbol in task_key:
-                        tasks_to_cancel.append(task_key)
+                records = self._monitors.for_symbol(self._format_symbol(symbol))
             else:
-                # Отменяем все задачи мониторинга
-                tasks_to_cancel = list(self._order_monitor_tasks.keys())
-            
-            # Отменяем найденные задачи
-            for task_key in tasks_to_cancel:
-                task = self._order_monitor_tasks.get(task_key)
-                # Проверяем, что это действительно задача asyncio, а не другой тип данных
-                if task and hasattr(task, 'done') and hasattr(task, 'cancelled'):
-                    if not task.done() and not task.cancelled():
-                        task.cancel()
-                        logger.info(f"Задача мониторинга {task_key} отменена")
-                        canceled_count += 1
-                
-                # Удаляем задачу из словаря
-                if task_key in self._order_monitor_tasks:
-                    del self._order_monitor_tasks[task_key]
+                records = self._monitors.records()
             
-            return canceled_count
-        except Exception as e:
-            logger.error(f"Ошибка при отмене задач мониторинга: {e}")
-            return canceled_count
-
-    # Добавим новый метод для отслеживания ордеров по символу
-    def _get_symbol_monitoring_keys(self, symbol: str) -> list:
-        """
-        Получает ключи задач мониторинга для указанного символа.
-        
-        Args:
-            symbol: Торговый символ
+            for record in records:
+                self._unregister_monitor(record)
+                logger.info(f"Мониторинг позиции {record.symbol} остановлен")
             
-        Returns:
-            list: Список ключей задач мониторинга для символа
-        """
-        formatted_symbol = self._format_symbol(symbol) if symbol else ""
-        symbol_keys = []
-        
-        for task_key in self._order_monitor_tasks.keys():
-            if formatted_symbol and formatted_symbol in task_key:
-                symbol_keys.append(task_key)
-        
-        return symbol_keys
+            return len(records)
+        except Exception as e:
+            logger.error(f"Ошибка при остановке мониторинга: {e}")
+            return 0
         
     async def is_symbol_being_monitored(self, symbol: str) -> bool:
         """
-        Проверяет, отслеживается ли указанный символ какой-либо задачей.
+        Проверяет, находится ли символ под наблюдением супервизора.
         
         Args:
             symbol: Торговый символ
@@ -1148,8 +1568,7 @@ class BitgetExchange:
         Returns:
             bool: True если символ отслеживается, иначе False
         """
-        symbol_keys = self._get_symbol_monitoring_keys(symbol)
-        return len(symbol_keys) > 0 
+        return self._format_symbol(symbol) in self._monitors
 
     async def can_open_orders(self, symbol: str) -> bool:
         """
@@ -1194,69 +1613,38 @@ class BitgetExchange:
 
     async def force_clean_monitoring_tasks(self, symbol: str = None) -> int:
         """
-        Принудительно очищает все задачи мониторинга и ключи для указанного символа.
+        Принудительно снимает позиции с мониторинга и отменяет их трейлинг-стопы.
         Используется для восстановления после неожиданного закрытия позиции (например, по стоп-лоссу).
         
         Args:
-            symbol: Торговый символ (если None, очищаются все задачи)
+            symbol: Торговый символ (если None, очищаются все позиции)
             
         Returns:
-            int: Количество очищенных элементов
+            int: Количество снятых с мониторинга позиций
         """
         cleaned_count = 0
         try:
-            # Получаем все ключи для удаления
-            keys_to_remove = []
-            trailing_ids_to_cancel = []
-            
             if symbol:
-                formatted_symbol = self._format_symbol(symbol)
-                # Ищем все ключи, содержащие символ
-                for key in list(self._order_monitor_tasks.keys()):
-                    if formatted_symbol in key:
-                        keys_to_remove.append(key)
-                        # Если это trailing_info, сохраняем ID трейлинга для отмены через API
-                        if key == f"{formatted_symbol}_trailing_info":
-                            trailing_info = self._order_monitor_tasks[key]
-                            trail_order_id = trailing_info.get('order_id')
-                            if trail_order_id:
-                                trailing_ids_to_cancel.append((trail_order_id, formatted_symbol))
+                records = self._monitors.for_symbol(self._format_symbol(symbol))
             else:
-                # Очищаем все ключи
-                keys_to_remove = list(self._order_monitor_tasks.keys())
-                # Проверяем все ключи на наличие trailing_info
-                for key in keys_to_remove:
-                    if key.endswith("_trailing_info"):
-                        trailing_info = self._order_monitor_tasks[key]
-                        trail_order_id = trailing_info.get('order_id')
-                        symbol_from_key = key.replace("_trailing_info", "")
-                        if trail_order_id and symbol_from_key:
-                            trailing_ids_to_cancel.append((trail_order_id, symbol_from_key))
-            
-            # Сначала отменяем трейлинг-стопы через API
-            for trail_id, symb in trailing_ids_to_cancel:
-                try:
-                    await self.cancel_trailing_stop_by_id(trail_id, symb)
-                    logger.info(f"Принудительно отменен трейлинг-стоп {trail_id} для {symb}")
-                except Exception as e:
-                    logger.error(f"Ошибка при отмене трейлинг-стопа {trail_id}: {e}")
-            
-            # Отменяем задачи и удаляем ключи
-            for key in keys_to_remove:
-                task = self._order_monitor_tasks.get(key)
-                # Если это задача asyncio, отменяем её
-                if hasattr(task, 'cancel') and callable(task.cancel):
-                    if not hasattr(task, 'done') or not task.done():
-                        if not hasattr(task, 'cancelled') or not task.cancelled():
-                            task.cancel()
-                # Удаляем из словаря в любом случае
-                del self._order_monitor_tasks[key]
+                records = self._monitors.records()
+            
+            for record in records:
+                # Сначала отменяем трейлинг-стоп через API
+                if record.trailing_order_id:
+                    try:
+                        await self.cancel_trailing_stop_by_id(record.trailing_order_id, record.symbol)
+                        logger.info(f"Принудительно отменен трейлинг-стоп {record.trailing_order_id} для {record.symbol}")
+                    except Exception as e:
+                        logger.error(f"Ошибка при отмене трейлинг-стопа {record.trailing_order_id}: {e}")
+                
+                self._unregister_monitor(record)
                 cleaned_count += 1
-                logger.info(f"Принудительно удален ключ мониторинга: {key}")
+                logger.info(f"Позиция {record.symbol} принудительно снята с мониторинга")
             
             return cleaned_count
         except Exception as e:
-            logger.error(f"Ошибка при принудительной очистке задач мониторинга: {e}")
+            logger.error(f"Ошибка при принудительной очистке мониторинга: {e}")
             return cleaned_count
 
     async def cancel_trailing_stop_by_id(self, trailing_order_id: str, symbol: str) -> bool:
@@ -1292,7 +1680,13 @@ class BitgetExchange:
             
             # Отменяем ордер
             result = await self.exchange.cancel_order(trailing_order_id, formatted_symbol, params=params)
+            self._account_state.invalidate()
             logger.info(f"Трейлинг-стоп {trailing_order_id} для {formatted_symbol} успешно отменен")
+
+            # Отмененный трейлинг-стоп больше не привязан к позиции под мониторингом
+            record = self._monitors.by_trailing_id(trailing_order_id)
+            if record is not None:
+                self._monitors.set_trailing_order(record, None)
             return True
         except Exception as e:
             logger.error(f"Ошибка при отмене трейлинг-стопа {trailing_order_id} для {symbol}: {e}")
@@ -1317,7 +1711,7 @@ class BitgetExchange:
             
             for order in open_orders:
                 # Проверяем, является ли ордер трейлинг-стопом
-                if 'trailing' in str(order.get('type', '')).lower() or 'trailing' in str(order.get('info', {}).get('ordType', '')).lower():
+                if self._is_trailing_order(order):
                     try:
                         success = await self.cancel_trailing_stop_by_id(order['id'], formatted_symbol)
                         if success:
@@ -1325,18 +1719,17 @@ class BitgetExchange:
                     except Exception as e:
                         logger.error(f"Ошибка при отмене трейлинг-стопа {order['id']}: {e}")
             
-            # Также отменяем трейлинг-стопы по ID из словаря мониторинга
-            trailing_info_key = f"{formatted_symbol}_trailing_info"
-            if trailing_info_key in self._order_monitor_tasks:
-                trailing_info = self._order_monitor_tasks[trailing_info_key]
-                trail_order_id = trailing_info.get('order_id')
-                if trail_order_id:
-                    try:
-                        success = await self.cancel_trailing_stop_by_id(trail_order_id, formatted_symbol)
-                        if success:
-                            canceled_count += 1
-                    except Exception as e:
-                        logger.error(f"Ошибка при отмене трейлинг-стопа из мониторинга {trail_order_id}: {e}")
+            # Также отменяем трейлинг-стопы позиций под мониторингом
+            for record in self._monitors.for_symbol(formatted_symbol):
+                if not record.trailing_order_id:
+                    continue
+                try:
+                    success = await self.cancel_trailing_stop_by_id(record.trailing_order_id, formatted_symbol)
+                    if success:
+                        canceled_count += 1
+                    self._monitors.set_trailing_order(record, None)
+                except Exception as e:
+                    logger.error(f"Ошибка при отмене трейлинг-стопа из мониторинга {record.trailing_order_id}: {e}")
             
             if canceled_count > 0:
                 logger.info(f"Отменено {canceled_count} трейлинг-стопов для {formatted_symbol}")
@@ -1345,47 +1738,3 @@ class BitgetExchange:
         except Exception as e:
             logger.error(f"Ошибка при отмене всех трейлинг-стопов для {symbol}: {e}")
             return 0
-
-    async def _periodic_monitoring_cleanup(self):
-        """
-        Периодически проверяет и очищает зависшие задачи мониторинга,
-        сравнивая их с реальными открытыми позициями.
-        """
-        try:
-            while True:
-                # Проверяем все задачи мониторинга
-                symbols_with_monitoring = set()
-                
-                # Собираем все символы, для которых есть задачи мониторинга
-                for key in list(self._order_monitor_tasks.keys()):
-                    # Ищем ключи вида "BTCUSDT_monitoring" или "BTCUSDT_long_trailing"
-                    parts = key.split('_')
-                    if len(parts) >= 2:
-                        symbol = parts[0]
-                        if symbol and not symbol.isdigit():  # Исключаем ID ордеров
-                            symbols_with_monitoring.add(symbol)
-                
-                # Проверяем реальные позиции
-                for symbol in symbols_with_monitoring:
-                    try:
-                        positions = await self.fetch_positions(symbol)
-                        has_real_position = False
-                        
-                        for pos in positions:
-                            if float(pos['contracts']) > 0:
-                                has_real_position = True
-                                break
-                        
-                        # Если нет реальной позиции, но есть мониторинг - очищаем
-                        if not has_real_position:
-                            logger.warning(f"Обнаружен зависший мониторинг для {symbol} без реальной позиции. Очищаем.")
-                            await self.force_clean_monitoring_tasks(symbol)
-                    except Exception as e:
-                        logger.error(f"Ошибка при проверке позиций для {symbol}: {e}")
-                
-                # Проверка выполняется каждые 5 минут
-                await asyncio.sleep(300)
-        except asyncio.CancelledError:
-            logger.info("Задача периодической очистки мониторинга отменена")
-        except Exception as e:
-            logger.error(f"Ошибка в задаче периодической очистки мониторинга: {e}") 
\ No newline at end of file
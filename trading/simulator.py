@@ -0,0 +1,628 @@
+"""
+Локальный симулятор биржи Bitget для офлайн-прогонов и нагрузочного тестирования.
+
+SimulatedExchange реализует те асинхронные методы ccxt, которые вызывает бот
+(fetch_ohlcv, fetch_ticker, fetch_positions, fetch_open_orders, create_order,
+cancel_order, fetch_order, set_leverage, fetch_balance, fetch_my_trades, load_markets),
+и подставляется в BitgetExchange вместо ccxt.bitget:
+
+    simulator = SimulatedExchange({"BTC/USDT": candles}, balance=1000, latency=0.05)
+    exchange = BitgetExchange(client=simulator)
+
+Цена движется по заранее заданному пути свечей (replay). Внутри свечи цена
+проходит точки open -> low -> high -> close (или open -> high -> low -> close
+для медвежьей свечи), и на каждой точке срабатывают стоп-лоссы и трейлинг-стопы.
+Задержка ответов и лимит запросов настраиваются для имитации реального API.
+"""
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import ccxt.async_support as ccxt
+
+from bot_logging import logger
+
+# Комиссия тейкера Bitget USDT-M фьючерсов по умолчанию
+DEFAULT_TAKER_FEE = 0.0006
+# Метаданные рынков симулятора: шаг объема, шаг цены, минимальная сумма ордера (USDT)
+DEFAULT_AMOUNT_STEP = 0.0001
+DEFAULT_PRICE_STEP = 0.01
+DEFAULT_MIN_NOTIONAL = 5.0
+
+
+def _iso(timestamp: int) -> str:
+    """Преобразует время в мс в строку ISO 8601 (как в ccxt)."""
+    return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class SimulatedExchange:
+    """Симулятор фьючерсного счета Bitget с движком исполнения ордеров."""
+
+    def __init__(self,
+                 candles: Dict[str, Sequence[Sequence[float]]],
+                 balance: float = 1000.0,
+                 latency: float = 0.0,
+                 latency_jitter: float = 0.0,
+                 rate_limit: Optional[int] = None,
+                 fee_rate: float = DEFAULT_TAKER_FEE,
+                 history: int = 200,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            candles: Путь цены по символам: {"BTC/USDT": [[timestamp_ms, open, high, low, close, volume], ...]}
+            balance: Начальный баланс USDT
+            latency: Базовая задержка ответа на каждый запрос (секунды)
+            latency_jitter: Максимальная случайная добавка к задержке (секунды)
+            rate_limit: Максимальное число запросов в секунду (None - без ограничения)
+            fee_rate: Комиссия за исполнение (доля от объема сделки)
+            history: Количество свечей, доступных до начала прогона
+            seed: Начальное значение генератора случайных чисел для задержек
+        """
+        if not candles:
+            raise ValueError("Необходимо задать путь цены хотя бы для одного символа")
+
+        self.candles = {self._market(symbol): [list(map(float, c)) for c in rows] for symbol, rows in candles.items()}
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rate_limit = rate_limit
+        self.fee_rate = fee_rate
+
+        self.balance = float(balance)
+        self.leverage: Dict[str, int] = {}
+        self.positions: Dict[tuple, Dict] = {}  # {(symbol, 'long'|'short'): позиция}
+        self.orders: Dict[str, Dict] = {}
+        self.trades: List[Dict] = []
+
+        # Текущая свеча для каждого символа (все свечи до нее закрыты)
+        if any(not rows for rows in self.candles.values()):
+            raise ValueError("Путь цены не должен быть пустым")
+        self.cursor = {symbol: max(1, min(history, len(rows))) - 1 for symbol, rows in self.candles.items()}
+        self.prices = {symbol: self.candles[symbol][index][4] for symbol, index in self.cursor.items()}
+
+        # Статистика вызовов API
+        self.calls: Counter = Counter()
+        self.rejected_calls = 0
+        self._request_times = deque()
+        self._random = random.Random(seed)
+        self._next_id = 1
+
+        logger.info(f"Инициализирован симулятор биржи: символы {', '.join(self.candles)}, баланс {self.balance} USDT")
+
+    # ------------------------------------------------------------------
+    # Служебные методы
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _market(symbol: str) -> str:
+        """
+        Приводит символ к виду 'BTC/USDT' ('BTCUSDT', 'BTC/USDT:USDT' и т.п.).
+
+        Args:
+            symbol: Торговый символ в любом поддерживаемом формате
+
+        Returns:
+            str: Символ в формате 'BASE/USDT'
+        """
+        symbol = symbol.split(':')[0]
+        if '/' in symbol:
+            return symbol
+        if symbol.endswith('USDT'):
+            return f"{symbol[:-4]}/USDT"
+        return symbol
+
+    def _symbol_of(self, symbol: Optional[str]) -> str:
+        """Возвращает известный симулятору символ или выбрасывает BadSymbol."""
+        market = self._market(symbol or '')
+        if market not in self.candles:
+            raise ccxt.BadSymbol(f"bitget does not have market symbol {symbol}")
+        return market
+
+    async def _request(self, method: str) -> None:
+        """
+        Имитирует сетевой запрос: учитывает вызов, применяет лимит запросов и задержку.
+
+        Args:
+            method: Имя вызываемого метода API
+        """
+        self.calls[method] += 1
+
+        if self.rate_limit:
+            now = time.monotonic()
+            while self._request_times and now - self._request_times[0] >= 1.0:
+                self._request_times.popleft()
+            if len(self._request_times) >= self.rate_limit:
+                self.rejected_calls += 1
+                raise ccxt.RateLimitExceeded(f"bitget {method} 429 Too Many Requests")
+            self._request_times.append(now)
+
+        delay = self.latency
+        if self.latency_jitter:
+            delay += self._random.uniform(0, self.latency_jitter)
+        await asyncio.sleep(delay)
+
+    def _new_id(self) -> str:
+        """Генерирует числовой ID ордера/сделки (как у Bitget)."""
+        self._next_id += 1
+        return str(1000000000000 + self._next_id)
+
+    def _now(self, symbol: Optional[str] = None) -> int:
+        """Текущее время симуляции (мс): время открытия текущей свечи."""
+        symbol = symbol or next(iter(self.cursor))
+        return int(self.candles[symbol][self.cursor[symbol]][0])
+
+    # ------------------------------------------------------------------
+    # Движение цены и движок исполнения
+    # ------------------------------------------------------------------
+
+    def has_next(self, symbol: Optional[str] = None) -> bool:
+        """
+        Проверяет, остались ли свечи в пути цены.
+
+        Args:
+            symbol: Символ (по умолчанию - любой из символов)
+
+        Returns:
+            bool: True, если можно вызвать advance()
+        """
+        symbols = [self._symbol_of(symbol)] if symbol else list(self.candles)
+        return any(self.cursor[s] + 1 < len(self.candles[s]) for s in symbols)
+
+    def advance(self, steps: int = 1) -> int:
+        """
+        Переходит к следующей свече по всем символам и прогоняет движок исполнения
+        по внутрисвечному пути цены.
+
+        Args:
+            steps: Количество свечей
+
+        Returns:
+            int: Количество фактически пройденных свечей
+        """
+        done = 0
+        for _ in range(steps):
+            moved = False
+            for symbol, rows in self.candles.items():
+                if self.cursor[symbol] + 1 >= len(rows):
+                    continue
+                self.cursor[symbol] += 1
+                _, open_price, high, low, close, _ = rows[self.cursor[symbol]]
+                path = (open_price, low, high, close) if close >= open_price else (open_price, high, low, close)
+                for price in path:
+                    self.set_price(symbol, price)
+                moved = True
+            if not moved:
+                break
+            done += 1
+        return done
+
+    async def run(self, interval: float) -> None:
+        """
+        Проигрывает путь цены в реальном времени: одна свеча каждые interval секунд.
+
+        Args:
+            interval: Пауза между свечами (секунды)
+        """
+        while self.has_next():
+            await asyncio.sleep(interval)
+            self.advance()
+
+    def set_price(self, symbol: str, price: float) -> None:
+        """
+        Устанавливает текущую цену символа и проверяет срабатывание стоп-ордеров.
+
+        Args:
+            symbol: Торговый символ
+            price: Новая цена
+        """
+        symbol = self._symbol_of(symbol)
+        self.prices[symbol] = price
+
+        for order in list(self.orders.values()):
+            if order['status'] != 'open' or order['symbol'] != symbol:
+                continue
+            position_side = order['info']['posSide']
+            if order['type'] == 'stop_loss':
+                trigger = order['triggerPrice']
+                hit = price <= trigger if position_side == 'long' else price >= trigger
+                if hit:
+                    self._execute(order, trigger)
+            elif order['type'] == 'trailing_stop':
+                self._update_trailing(order, price)
+
+    def _update_trailing(self, order: Dict, price: float) -> None:
+        """
+        Обновляет трейлинг-стоп: активация по trailingTriggerPrice, затем
+        срабатывание при откате цены на trailingPercent от экстремума.
+
+        Args:
+            order: Ордер трейлинг-стопа
+            price: Текущая цена
+        """
+        info = order['info']
+        is_long = info['posSide'] == 'long'
+        if not info['activated']:
+            activated = price >= info['trailingTriggerPrice'] if is_long else price <= info['trailingTriggerPrice']
+            if not activated:
+                return
+            info['activated'] = True
+            info['extreme'] = price
+
+        callback = info['trailingPercent'] / 100
+        if is_long:
+            info['extreme'] = max(info['extreme'], price)
+            stop_price = info['extreme'] * (1 - callback)
+            if price <= stop_price:
+                self._execute(order, price)
+        else:
+            info['extreme'] = min(info['extreme'], price)
+            stop_price = info['extreme'] * (1 + callback)
+            if price >= stop_price:
+                self._execute(order, price)
+        order['triggerPrice'] = stop_price
+
+    def _execute(self, order: Dict, price: float) -> None:
+        """
+        Исполняет ордер по цене, изменяет позицию и баланс, записывает сделку.
+
+        Args:
+            order: Исполняемый ордер
+            price: Цена исполнения
+        """
+        symbol = order['symbol']
+        position_side = order['info']['posSide']
+        key = (symbol, position_side)
+        position = self.positions.get(key)
+        amount = order['amount']
+        opening = not order['reduceOnly']
+        realized = 0.0
+
+        if opening:
+            if position is None:
+                position = {'contracts': 0.0, 'entryPrice': price}
+                self.positions[key] = position
+            total = position['contracts'] + amount
+            position['entryPrice'] = (position['entryPrice'] * position['contracts'] + price * amount) / total
+            position['contracts'] = total
+        else:
+            if position is None or position['contracts'] <= 0:
+                order['status'] = 'canceled'
+                return
+            amount = min(amount, position['contracts'])
+            direction = 1 if position_side == 'long' else -1
+            realized = (price - position['entryPrice']) * amount * direction
+            position['contracts'] -= amount
+            if position['contracts'] <= 1e-12:
+                del self.positions[key]
+                self._cancel_reduce_orders(symbol, position_side)
+
+        fee = price * amount * self.fee_rate
+        self.balance += realized - fee
+
+        timestamp = self._now(symbol)
+        order.update({
+            'status': 'closed',
+            'filled': amount,
+            'remaining': 0.0,
+            'average': price,
+            'cost': price * amount,
+            'fee': {'cost': fee, 'currency': 'USDT'},
+            'lastTradeTimestamp': timestamp
+        })
+
+        self.trades.append({
+            'id': self._new_id(),
+            'order': order['id'],
+            'symbol': f"{symbol}:USDT",
+            'side': order['side'],
+            'type': 'market',
+            'takerOrMaker': 'taker',
+            'price': price,
+            'amount': amount,
+            'cost': price * amount,
+            'fee': {'cost': fee, 'currency': 'USDT'},
+            'timestamp': timestamp,
+            'datetime': _iso(timestamp),
+            'info': {
+                'tradeSide': 'open' if opening else 'close',
+                'posSide': position_side,
+                'profit': str(realized)
+            }
+        })
+        logger.debug(f"Симулятор: исполнен ордер {order['id']} {order['side']} {amount} {symbol} по {price}")
+
+    def _cancel_reduce_orders(self, symbol: str, position_side: str) -> None:
+        """Отменяет стоп-ордера закрытой позиции (как это делает биржа)."""
+        for order in self.orders.values():
+            if (order['status'] == 'open' and order['symbol'] == symbol
+                    and order['reduceOnly'] and order['info']['posSide'] == position_side):
+                order['status'] = 'canceled'
+
+    def _make_order(self, symbol: str, order_type: str, side: str, amount: float,
+                    position_side: str, reduce_only: bool, trigger_price: Optional[float] = None,
+                    info: Optional[Dict] = None) -> Dict:
+        """Создает запись ордера в формате ccxt."""
+        timestamp = self._now(symbol)
+        order = {
+            'id': self._new_id(),
+            'clientOrderId': None,
+            'symbol': symbol,  # Внутри без суффикса ':USDT', наружу отдается через _public
+            'type': order_type,
+            'side': side,
+            'amount': amount,
+            'filled': 0.0,
+            'remaining': amount,
+            'price': None,
+            'average': None,
+            'cost': 0.0,
+            'status': 'open',
+            'reduceOnly': reduce_only,
+            'triggerPrice': trigger_price,
+            'stopPrice': trigger_price,
+            'fee': None,
+            'timestamp': timestamp,
+            'datetime': _iso(timestamp),
+            'lastTradeTimestamp': None,
+            'info': {'posSide': position_side, 'ordType': order_type, **(info or {})}
+        }
+        self.orders[order['id']] = order
+        return order
+
+    @staticmethod
+    def _public(order: Dict) -> Dict:
+        """Возвращает копию ордера в формате ccxt (символ вида 'BTC/USDT:USDT')."""
+        result = dict(order)
+        result['info'] = dict(order['info'])
+        result['symbol'] = f"{order['symbol']}:USDT"
+        return result
+
+    # ------------------------------------------------------------------
+    # Поверхность ccxt
+    # ------------------------------------------------------------------
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Optional[Dict] = None) -> List[List[float]]:
+        """Возвращает свечи пути цены до текущей (незакрытой) включительно."""
+        await self._request('fetch_ohlcv')
+        symbol = self._symbol_of(symbol)
+        rows = self.candles[symbol][:self.cursor[symbol] + 1]
+        if since is not None:
+            rows = [row for row in rows if row[0] >= since]
+        if limit:
+            rows = rows[-limit:] if since is None else rows[:limit]
+        return [list(row) for row in rows]
+
+    async def fetch_time(self, params: Optional[Dict] = None) -> int:
+        """Возвращает время сервера (мс) - текущее время симуляции."""
+        await self._request('fetch_time')
+        return self._now()
+
+    async def fetch_ticker(self, symbol: str, params: Optional[Dict] = None) -> Dict:
+        """Возвращает тикер по текущей цене симуляции."""
+        await self._request('fetch_ticker')
+        symbol = self._symbol_of(symbol)
+        price = self.prices[symbol]
+        timestamp = self._now(symbol)
+        return {
+            'symbol': f"{symbol}:USDT",
+            'timestamp': timestamp,
+            'datetime': _iso(timestamp),
+            'last': price,
+            'close': price,
+            'bid': price,
+            'ask': price,
+            'mark': price,
+            'index': price,
+            'info': {}
+        }
+
+    async def fetch_balance(self, params: Optional[Dict] = None) -> Dict:
+        """Возвращает баланс USDT с учетом маржи открытых позиций."""
+        await self._request('fetch_balance')
+        used = self._used_margin()
+        total = self.balance
+        free = total - used
+        return {
+            'info': {},
+            'USDT': {'free': free, 'used': used, 'total': total},
+            'free': {'USDT': free},
+            'used': {'USDT': used},
+            'total': {'USDT': total}
+        }
+
+    async def load_markets(self, reload: bool = False, params: Optional[Dict] = None) -> Dict[str, Dict]:
+        """Возвращает метаданные фьючерсных рынков симулятора (в формате ccxt)."""
+        await self._request('load_markets')
+        markets = {}
+        for symbol in self.candles:
+            base, quote = symbol.split('/')
+            markets[f"{symbol}:{quote}"] = {
+                'id': f"{base}{quote}",
+                'symbol': f"{symbol}:{quote}",
+                'base': base,
+                'quote': quote,
+                'settle': quote,
+                'type': 'swap',
+                'spot': False,
+                'swap': True,
+                'contract': True,
+                'linear': True,
+                'active': True,
+                'contractSize': 1,
+                'precision': {'amount': DEFAULT_AMOUNT_STEP, 'price': DEFAULT_PRICE_STEP},
+                'limits': {
+                    'amount': {'min': DEFAULT_AMOUNT_STEP, 'max': None},
+                    'cost': {'min': DEFAULT_MIN_NOTIONAL, 'max': None}
+                },
+                'info': {}
+            }
+        return markets
+
+    async def set_leverage(self, leverage: int, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        """Устанавливает плечо для символа."""
+        await self._request('set_leverage')
+        symbol = self._symbol_of(symbol)
+        self.leverage[symbol] = int(leverage)
+        return {'symbol': symbol, 'leverage': int(leverage), 'info': {}}
+
+    async def fetch_positions(self, symbols: Optional[List[str]] = None, params: Optional[Dict] = None) -> List[Dict]:
+        """Возвращает открытые позиции (фильтр по symbols или params['symbol'])."""
+        await self._request('fetch_positions')
+        wanted = set()
+        if symbols:
+            wanted = {self._market(s) for s in symbols}
+        elif params and params.get('symbol'):
+            wanted = {self._market(params['symbol'])}
+
+        result = []
+        for (symbol, side), position in self.positions.items():
+            if wanted and symbol not in wanted:
+                continue
+            mark = self.prices[symbol]
+            contracts = position['contracts']
+            direction = 1 if side == 'long' else -1
+            leverage = self.leverage.get(symbol, 1)
+            result.append({
+                'symbol': f"{symbol}:USDT",
+                'side': side,
+                'contracts': contracts,
+                'contractSize': 1.0,
+                'entryPrice': position['entryPrice'],
+                'markPrice': mark,
+                'notional': contracts * mark,
+                'leverage': leverage,
+                'marginMode': 'isolated',
+                'initialMargin': contracts * position['entryPrice'] / leverage,
+                'unrealizedPnl': (mark - position['entryPrice']) * contracts * direction,
+                'timestamp': self._now(symbol),
+                'info': {'holdSide': side, 'marginCoin': 'USDT'}
+            })
+        return result
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float,
+                           price: Optional[float] = None, params: Optional[Dict] = None) -> Dict:
+        """
+        Создает ордер. Поддерживаются рыночные ордера (с вложенным stopLoss)
+        и трейлинг-стопы (trailingTriggerPrice + trailingPercent).
+        """
+        await self._request('create_order')
+        params = params or {}
+        symbol = self._symbol_of(symbol)
+        amount = float(amount)
+        if amount <= 0:
+            raise ccxt.InvalidOrder(f"bitget amount must be greater than 0: {amount}")
+
+        default_side = 'long' if side == 'buy' else 'short'
+        position_side = params.get('positionSide', default_side)
+        reduce_only = bool(params.get('reduceOnly')) or (side == 'buy') != (position_side == 'long')
+
+        # Трейлинг-стоп: ждет активации и отката цены
+        if 'trailingTriggerPrice' in params and 'trailingPercent' in params:
+            order = self._make_order(symbol, 'trailing_stop', side, amount, position_side, True, info={
+                'trailingTriggerPrice': float(params['trailingTriggerPrice']),
+                'trailingPercent': float(params['trailingPercent']),
+                'activated': False,
+                'extreme': None
+            })
+            self._update_trailing(order, self.prices[symbol])
+            return self._public(order)
+
+        price = self.prices[symbol]
+        if not reduce_only:
+            leverage = self.leverage.get(symbol, 1)
+            balance = self.balance - self._used_margin()
+            required = amount * price / leverage
+            if required > balance:
+                raise ccxt.InsufficientFunds(f"bitget insufficient balance: required {required:.4f}, available {balance:.4f}")
+
+        order = self._make_order(symbol, type, side, amount, position_side, reduce_only)
+        self._execute(order, price)
+
+        # Стоп-лосс, переданный вместе с ордером, становится отдельным стоп-ордером позиции
+        stop_loss = params.get('stopLoss')
+        if stop_loss and not reduce_only and order['status'] == 'closed':
+            trigger = stop_loss.get('triggerPrice') if isinstance(stop_loss, dict) else stop_loss
+            self._make_order(symbol, 'stop_loss', 'sell' if position_side == 'long' else 'buy',
+                             amount, position_side, True, trigger_price=float(trigger))
+
+        return self._public(order)
+
+    def _used_margin(self) -> float:
+        """Маржа, занятая открытыми позициями."""
+        return sum(
+            position['contracts'] * position['entryPrice'] / self.leverage.get(symbol, 1)
+            for (symbol, _), position in self.positions.items()
+        )
+
+    async def cancel_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        """Отменяет открытый ордер."""
+        await self._request('cancel_order')
+        order = self.orders.get(str(id))
+        if order is None or order['status'] != 'open':
+            raise ccxt.OrderNotFound(f"bitget Order does not exist: {id}")
+        order['status'] = 'canceled'
+        return self._public(order)
+
+    async def fetch_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        """Возвращает ордер по ID."""
+        await self._request('fetch_order')
+        order = self.orders.get(str(id))
+        if order is None:
+            raise ccxt.OrderNotFound(f"bitget Order does not exist: {id}")
+        return self._public(order)
+
+    async def fetch_open_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                                limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict]:
+        """Возвращает открытые ордера (в том числе стоп-ордера)."""
+        await self._request('fetch_open_orders')
+        market = self._market(symbol) if symbol else None
+        return [
+            self._public(order) for order in self.orders.values()
+            if order['status'] == 'open' and (market is None or order['symbol'] == market)
+        ]
+
+    async def fetch_closed_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                                  limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict]:
+        """Возвращает исполненные и отмененные ордера."""
+        await self._request('fetch_closed_orders')
+        market = self._market(symbol) if symbol else None
+        orders = [
+            self._public(order) for order in self.orders.values()
+            if order['status'] != 'open' and (market is None or order['symbol'] == market)
+            and (since is None or order['timestamp'] >= since)
+        ]
+        return orders[:limit] if limit else orders
+
+    async def fetch_my_trades(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                              limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict]:
+        """Возвращает исполненные сделки счета."""
+        await self._request('fetch_my_trades')
+        market = self._market(symbol) if symbol else None
+        trades = [
+            dict(trade) for trade in self.trades
+            if (market is None or trade['symbol'].split(':')[0] == market)
+            and (since is None or trade['timestamp'] >= since)
+        ]
+        return trades[:limit] if limit else trades
+
+    async def close(self) -> None:
+        """Совместимость с ccxt: закрывать нечего."""
+        return None
+
+    def get_stats(self) -> Dict:
+        """
+        Возвращает статистику симуляции.
+
+        Returns:
+            Dict: Количество вызовов по методам, отклоненные запросы, баланс, позиции и сделки
+        """
+        return {
+            'calls': dict(self.calls),
+            'total_calls': sum(self.calls.values()),
+            'rejected_calls': self.rejected_calls,
+            'balance': self.balance,
+            'open_positions': len(self.positions),
+            'trades': len(self.trades)
+        }
@@ -2,11 +2,13 @@
 Модуль для управления торговыми операциями.
 """
 import asyncio
+from collections import deque
+from contextlib import AsyncExitStack
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 
 from bot_logging import logger
-from trading.exchange import BitgetExchange
+from trading.exchange import BitgetExchange, LATENCY_HISTORY, summarize_latencies
 from config import POSITION_SIZE_PERCENT
 
 
@@ -24,11 +26,25 @@ class Trader:
         self.leverage = 20
         self.position_size_percent = POSITION_SIZE_PERCENT
         self.active_trades = {}
+        # Сделки по разным символам открываются параллельно, по одному символу - по очереди.
+        # Общая блокировка нужна только операциям над всеми символами сразу
         self._lock = asyncio.Lock()
+        self._symbol_locks = {}  # {symbol: Lock}
+        # Задержки от сигнала до отправленного ордера (мс)
+        self.signal_latencies = deque(maxlen=LATENCY_HISTORY)
+        # Журнал сделок (TradeLedger): открытые ордера записываются со стратегией и таймфреймом
+        self.ledger = None
 
         logger.info(
             f"Инициализирован трейдер с плечом {self.leverage} и размером позиции {self.position_size_percent}%")
 
+    def _symbol_lock(self, symbol: str) -> asyncio.Lock:
+        """Возвращает блокировку операций по символу (создается при первом обращении)."""
+        lock = self._symbol_locks.get(symbol)
+        if lock is None:
+            lock = self._symbol_locks[symbol] = asyncio.Lock()
+        return lock
+
     async def set_leverage(self, leverage: int) -> bool:
         """
         Устанавливает значение плеча для всех дальнейших сделок.
@@ -64,13 +80,14 @@ class Trader:
                     "trail_offset": float,
                     "trail_mode": bool,
                     "strategy_name": str,
-                    "timeframe": str
+                    "timeframe": str,
+                    "timestamp": datetime  # время сигнала, для замера задержки
                 }
                 
         Returns:
             str: Сообщение о результате
         """
-        async with self._lock:
+        async with self._symbol_lock(signal["symbol"]):
             symbol = signal["symbol"]
             side = signal["side"]  # "buy" или "sell"
             tradeSide = signal["tradeSide"]
@@ -99,16 +116,23 @@ class Trader:
                     logger.error(f"Сигнал отклонен: {error_msg}")
                     return f"⚠️ Ошибка: {error_msg}"
 
-                # Устанавливаем плечо
-                try:
-                    await self.exchange.set_leverage(self.leverage, symbol)
-                except Exception as e:
-                    error_msg = f"Не удалось установить плечо {self.leverage} для {symbol}: {str(e)}"
+                # Плечо, баланс и цена не зависят друг от друга - запрашиваем их параллельно.
+                # Неизменившееся плечо и свежий баланс берутся из кеша биржи без запросов
+                leverage_result, usdt_balance, ticker_data = await asyncio.gather(
+                    self.exchange.set_leverage(self.leverage, symbol),
+                    self.exchange.get_usdt_balance(),
+                    self.exchange.get_ticker_price(symbol),
+                    return_exceptions=True
+                )
+
+                if isinstance(leverage_result, Exception):
+                    error_msg = f"Не удалось установить плечо {self.leverage} для {symbol}: {str(leverage_result)}"
                     logger.error(f"Сигнал отклонен: {error_msg}")
                     return f"⚠️ Ошибка: {error_msg}"
 
-                # Получаем баланс фьючерсов
-                usdt_balance = await self.exchange.get_usdt_balance()
+                if isinstance(usdt_balance, Exception):
+                    logger.error(f"Ошибка при получении баланса USDT: {usdt_balance}")
+                    usdt_balance = 0
                 logger.info(f"📈 Баланс фьючерсов USDT: {usdt_balance:.2f}")
 
                 # Проверка баланса
@@ -117,16 +141,19 @@ class Trader:
                     logger.error(f"Сигнал отклонен: {error_msg}")
                     return f"⚠️ Ошибка: {error_msg}"
 
+                if isinstance(ticker_data, Exception):
+                    error_msg = f"Не удалось получить цену {symbol}: {str(ticker_data)}"
+                    logger.error(f"Сигнал отклонен: {error_msg}")
+                    return f"⚠️ Ошибка: {error_msg}"
+                current_price = ticker_data['mark']  # Используем mark price
+
                 # Если amount не указан в сигнале, рассчитываем его
                 if amount == 0:
                     try:
-                        # Получаем текущую цену для расчета объема
-                        ticker_data = await self.exchange.get_ticker_price(symbol)
-                        current_price = ticker_data['mark']  # Используем mark price
-                        
                         # Расчет объема ордера (% от баланса с учетом плеча)
                         amount = ((usdt_balance * self.leverage / 100) * self.position_size_percent) / current_price
-                        amount = round(amount, 6)
+                        # Объем округляется по шагу рынка из кеша метаданных (без запроса к бирже)
+                        amount = self.exchange.amount_to_precision(symbol, amount)
                         logger.info(f"Рассчитанный объем ордера: {amount} {symbol.split('/')[0]} ({(usdt_balance * self.leverage / 100) * self.position_size_percent} USDT)")
                     except Exception as e:
                         error_msg = f"Ошибка при расчете объема ордера: {str(e)}"
@@ -149,9 +176,6 @@ class Trader:
                 trail_activation = None
                 trail_callback = None
 
-                ticker_data = await self.exchange.get_ticker_price(symbol)
-                current_price = ticker_data['mark']  # Используем mark price
-                
                 if trail_mode:
                     # Настраиваем трейлинг-стоп в зависимости от типа сделки (long/short)
                     is_long = side == "buy"
@@ -178,6 +202,7 @@ class Trader:
                         symbol=symbol,
                         side=side,
                         amount=amount,
+                        price=current_price,
                         stop_loss=stop_loss,
                         trail_activation=trail_activation,
                         trail_callback=trail_callback
@@ -210,6 +235,14 @@ class Trader:
                     logger.error(f"Сигнал отклонен: {error_msg}")
                     return f"⚠️ Ошибка при создании ордера: не удалось получить ID ордера"
 
+                # Задержка от формирования сигнала до ответа биржи на ордер
+                signal_latency_ms = None
+                signal_time = signal.get("timestamp")
+                if isinstance(signal_time, datetime):
+                    signal_latency_ms = (datetime.now() - signal_time).total_seconds() * 1000
+                    self.signal_latencies.append(signal_latency_ms)
+                    logger.info(f"⏱ Задержка сигнал -> ордер для {symbol}: {signal_latency_ms:.0f} мс")
+
                 # Сохраняем информацию о трейде
                 self.active_trades[symbol] = {
                     'order_id': order['id'],
@@ -221,9 +254,26 @@ class Trader:
                     'trail_mode': trail_mode,
                     'start_time': datetime.now(),
                     'strategy_name': strategy_name,
-                    'timeframe': timeframe
+                    'timeframe': timeframe,
+                    'signal_latency_ms': signal_latency_ms
                 }
 
+                if self.ledger is not None:
+                    try:
+                        self.ledger.record_order({
+                            'order_id': order['id'],
+                            'symbol': symbol,
+                            'side': side,
+                            'amount': amount,
+                            'price': current_price,
+                            'status': order.get('status'),
+                            'strategy_name': strategy_name,
+                            'timeframe': timeframe,
+                            'timestamp': int(datetime.now().timestamp() * 1000)
+                        })
+                    except Exception as e:
+                        logger.error(f"Ошибка при записи ордера {order['id']} в журнал сделок: {e}")
+
                 trail_msg = f" с трейлинг-стопом (активация: {trail_activation:.2f}, отступ: {trail_callback:.6f} USDT)" if trail_mode else ""
                 logger.info(f"✅ Успешно открыта сделка {side.upper()} {symbol} на {amount:.4f}{trail_msg}")
                 return f"✅ Открыта сделка {side.upper()} {symbol} на {amount:.4f}{trail_msg}"
@@ -248,7 +298,7 @@ class Trader:
         Returns:
             str: Сообщение о результате
         """
-        async with self._lock:
+        async with self._symbol_lock(symbol):
             if symbol not in self.active_trades:
                 return f"⚠️ Нет активной сделки по {symbol}"
 
@@ -280,7 +330,10 @@ class Trader:
         Returns:
             Dict: Результат операции {closed_orders: int, closed_positions: int}
         """
-        async with self._lock:
+        async with self._lock, AsyncExitStack() as stack:
+            # Дожидаемся завершения операций по всем символам (в одном порядке, без взаимных блокировок)
+            for symbol in sorted(self._symbol_locks):
+                await stack.enter_async_context(self._symbol_locks[symbol])
             try:
                 # Отменяем все открытые ордера
                 canceled_orders = await self.exchange.cancel_all_orders()
@@ -304,6 +357,18 @@ class Trader:
                     "error": str(e)
                 }
 
+    def get_latency_stats(self) -> Dict:
+        """
+        Возвращает статистику задержек открытия сделок.
+        
+        Returns:
+            Dict: {"signal_to_order": ..., "order": ...} - сводки в миллисекундах
+        """
+        return {
+            "signal_to_order": summarize_latencies(self.signal_latencies),
+            "order": self.exchange.get_order_latency_stats()
+        }
+
     def get_active_trades(self) -> Dict:
         """
         Возвращает информацию о всех активных сделках.
@@ -0,0 +1,483 @@
+"""
+Локальное хранилище свечей на диске.
+
+Для каждой пары (символ, таймфрейм) хранится один файл свечей фиксированной ширины,
+который отображается в память (memory-mapped):
+
+    заголовок (64 байта): сигнатура, емкость, число записанных свечей, размер значения, поколение
+    timestamp: int64[емкость] - время открытия свечи (мс, как в ccxt)
+    open, high, low, close, volume: float64 или float32 [емкость] - по столбцу подряд
+
+Файл дописывается только в конец, число записанных свечей обновляется в заголовке
+после записи данных. Поэтому один процесс-писатель может обновлять файл, а стратегии
+в любых процессах - отображать его только для чтения и получать столбцы как
+представления NumPy без копирования.
+
+Файл никогда не подменяется другим (на Windows нельзя заменить файл, отображенный
+в память): при заполнении писатель увеличивает его на месте и переносит столбцы,
+при перезаписи - пишет свечи заново в тот же файл. На время этих изменений
+поколение в заголовке нечетное; читатели по изменению поколения или емкости
+переотображают файл в refresh() и по поколению проверяют, что чтение не
+пришлось на перезапись (как seqlock).
+
+Загрузчик истории читает хранилище при старте и запрашивает у биржи только более новые свечи.
+"""
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from bot_logging import logger
+
+# Столбцы матрицы свечей (как в ответе ccxt fetch_ohlcv)
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+VALUE_FIELDS = CANDLE_FIELDS[1:]
+
+CANDLE_FILE_EXTENSION = ".candles"
+# Сигнатура формата файла свечей (первое слово заголовка)
+CANDLE_FILE_MAGIC = int.from_bytes(b'CNDLv001', 'little')
+CANDLE_FILE_HEADER_SIZE = 64
+# Емкость нового файла свечей по умолчанию
+DEFAULT_FILE_CAPACITY = 4096
+
+# Позиции полей в заголовке (слова int64)
+_HEADER_MAGIC = 0
+_HEADER_CAPACITY = 1
+_HEADER_LENGTH = 2
+_HEADER_ITEMSIZE = 3
+_HEADER_GENERATION = 4
+
+
+class MappedCandleFile:
+    """Файл свечей, отображенный в память, со столбцами в виде представлений NumPy."""
+
+    def __init__(self, path: str, writable: bool = False, timeframe: Optional[str] = None):
+        """
+        Открывает существующий файл свечей.
+
+        Args:
+            path: Путь к файлу
+            writable: Открыть для записи (в системе должен быть один писатель на файл)
+            timeframe: Таймфрейм свечей файла (для проверки читателями)
+        """
+        self.path = path
+        self.writable = writable
+        self.timeframe = timeframe
+        # Вложенность изменений, меняющих раскладку или содержимое файла (у писателя)
+        self._rewrites = 0
+        self._map()
+        if writable and self.generation % 2:
+            # Прежний писатель завершился во время изменения файла
+            logger.warning(f"Файл свечей {path} не был дописан прежним писателем")
+            self._header[_HEADER_GENERATION] += 1
+            self._generation = self.generation
+
+    @classmethod
+    def create(cls, path: str, capacity: int = DEFAULT_FILE_CAPACITY,
+               dtype=np.float64) -> 'MappedCandleFile':
+        """
+        Создает пустой файл свечей (атомарно, через временный файл).
+        Существующий файл не заменяется: его перезаписывает CandleStore.save.
+
+        Args:
+            path: Путь к файлу
+            capacity: Емкость (свечей)
+            dtype: Тип значений OHLCV (np.float64 или np.float32)
+
+        Returns:
+            MappedCandleFile: Файл, открытый для записи
+        """
+        itemsize = np.dtype(dtype).itemsize
+        if itemsize not in (4, 8):
+            raise ValueError(f"Неподдерживаемый тип значений свечей: {dtype}")
+
+        size = CANDLE_FILE_HEADER_SIZE + capacity * (8 + itemsize * len(VALUE_FIELDS))
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.truncate(size)
+        header = np.memmap(temp_path, dtype=np.int64, mode='r+', shape=(CANDLE_FILE_HEADER_SIZE // 8,))
+        header[_HEADER_MAGIC] = CANDLE_FILE_MAGIC
+        header[_HEADER_CAPACITY] = capacity
+        header[_HEADER_LENGTH] = 0
+        header[_HEADER_ITEMSIZE] = itemsize
+        header.flush()
+        del header
+        if os.path.exists(path):
+            os.remove(temp_path)
+            raise FileExistsError(f"Файл свечей {path} уже существует")
+        os.replace(temp_path, path)
+        return cls(path, writable=True)
+
+    def _map(self) -> None:
+        """Отображает файл в память и создает представления заголовка и столбцов."""
+        raw = np.memmap(self.path, dtype=np.uint8, mode='r+' if self.writable else 'r')
+        header = raw[:CANDLE_FILE_HEADER_SIZE].view(np.int64)
+        if int(header[_HEADER_MAGIC]) != CANDLE_FILE_MAGIC:
+            raise ValueError(f"Файл {self.path} не является файлом свечей")
+
+        capacity = int(header[_HEADER_CAPACITY])
+        itemsize = int(header[_HEADER_ITEMSIZE])
+        value_dtype = np.float64 if itemsize == 8 else np.float32
+
+        offset = CANDLE_FILE_HEADER_SIZE
+        self._timestamps = raw[offset:offset + 8 * capacity].view(np.int64)
+        offset += 8 * capacity
+        self._columns: Dict[str, np.ndarray] = {}
+        for name in VALUE_FIELDS:
+            self._columns[name] = raw[offset:offset + itemsize * capacity].view(value_dtype)
+            offset += itemsize * capacity
+
+        self._raw = raw
+        self._header = header
+        self.capacity = capacity
+        self.dtype = np.dtype(value_dtype)
+        self._generation = int(header[_HEADER_GENERATION])
+
+    @property
+    def generation(self) -> int:
+        """Поколение файла: меняется при росте и перезаписи, нечетное - во время изменения."""
+        return int(self._header[_HEADER_GENERATION])
+
+    def refresh(self) -> bool:
+        """
+        Переотображает файл, если писатель увеличил или перезаписал его.
+        Во время изменения файла (нечетное поколение) сохраняется прежнее отображение.
+
+        Returns:
+            bool: True если файл был переотображен
+        """
+        generation = self.generation
+        if generation % 2 or (generation == self._generation
+                              and int(self._header[_HEADER_CAPACITY]) == self.capacity):
+            return False
+        self._map()
+        return True
+
+    def _begin_rewrite(self) -> None:
+        """Отмечает в заголовке начало изменения файла (поколение становится нечетным)."""
+        if not self._rewrites:
+            self._header[_HEADER_GENERATION] += 1
+            self._raw.flush()
+        self._rewrites += 1
+
+    def _end_rewrite(self) -> None:
+        """Отмечает завершение изменения файла (поколение снова четное)."""
+        self._rewrites -= 1
+        if not self._rewrites:
+            self._raw.flush()
+            self._header[_HEADER_GENERATION] += 1
+            self._generation = self.generation
+            self._raw.flush()
+
+    def __len__(self) -> int:
+        # Читается из отображения, поэтому видно добавление свечей другим процессом
+        return int(self._header[_HEADER_LENGTH])
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Время открытия свечей (int64, мс) - представление без копирования."""
+        return self._timestamps[:len(self)]
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Время последней свечи или None для пустого файла."""
+        length = len(self)
+        return int(self._timestamps[length - 1]) if length else None
+
+    def column(self, name: str, last: Optional[int] = None) -> np.ndarray:
+        """
+        Возвращает столбец OHLCV как представление без копирования
+        (только для чтения, если файл открыт читателем).
+
+        Args:
+            name: Имя столбца ('open', 'high', 'low', 'close', 'volume')
+            last: Количество последних свечей (по умолчанию все)
+
+        Returns:
+            np.ndarray: Значения столбца
+        """
+        length = len(self)
+        start = 0 if last is None else max(0, length - last)
+        return self._columns[name][start:length]
+
+    def append(self, candles: np.ndarray) -> None:
+        """
+        Дописывает свечи. Свечи, начиная со времени уже записанной, перезаписывают
+        хвост файла (последняя свеча могла быть записана до закрытия).
+
+        Args:
+            candles: Матрица свечей (N x 6) по возрастанию времени без повторов
+
+        Raises:
+            ValueError: Если свечи не покрывают перезаписываемый хвост файла
+        """
+        if not self.writable:
+            raise PermissionError(f"Файл свечей {self.path} открыт только для чтения")
+        if not len(candles):
+            return
+
+        length = len(self)
+        start = int(np.searchsorted(self._timestamps[:length], int(candles[0, 0])))
+        if start < length and not np.isin(self._timestamps[start:length], candles[:, 0]).all():
+            raise ValueError(f"Свечи не продолжают файл {self.path}: требуется перезапись")
+        end = start + len(candles)
+        if end > self.capacity:
+            self._grow(max(end, 2 * self.capacity))
+
+        self._timestamps[start:end] = candles[:, 0].astype(np.int64)
+        for i, name in enumerate(VALUE_FIELDS, start=1):
+            self._columns[name][start:end] = candles[:, i]
+        # Длину обновляем после данных: читатели не увидят недописанные свечи
+        self._header[_HEADER_LENGTH] = end
+        self._raw.flush()
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Увеличивает емкость файла на месте: расширяет файл и переносит столбцы
+        значений на новые смещения (время открытия остается на месте).
+
+        Args:
+            capacity: Новая емкость
+        """
+        length = len(self)
+        old_capacity = self.capacity
+        itemsize = self.dtype.itemsize
+        self._begin_rewrite()
+        try:
+            with open(self.path, 'r+b') as f:
+                f.truncate(CANDLE_FILE_HEADER_SIZE + capacity * (8 + itemsize * len(VALUE_FIELDS)))
+            raw = np.memmap(self.path, dtype=np.uint8, mode='r+')
+            # Новые смещения столбцов не меньше прежних, поэтому переносим с последнего
+            for i in reversed(range(len(VALUE_FIELDS))):
+                old_offset = CANDLE_FILE_HEADER_SIZE + 8 * old_capacity + i * itemsize * old_capacity
+                new_offset = CANDLE_FILE_HEADER_SIZE + 8 * capacity + i * itemsize * capacity
+                raw[new_offset:new_offset + itemsize * length] = raw[old_offset:old_offset + itemsize * length]
+            raw[:CANDLE_FILE_HEADER_SIZE].view(np.int64)[_HEADER_CAPACITY] = capacity
+            raw.flush()
+            del raw
+            self._map()
+        finally:
+            self._end_rewrite()
+
+    def rewrite(self, candles: np.ndarray) -> None:
+        """
+        Заменяет все свечи файла (на месте, файл не подменяется).
+
+        Args:
+            candles: Матрица свечей (N x 6) по возрастанию времени без повторов
+        """
+        if not self.writable:
+            raise PermissionError(f"Файл свечей {self.path} открыт только для чтения")
+        self._begin_rewrite()
+        try:
+            self._header[_HEADER_LENGTH] = 0
+            self.append(candles)
+        finally:
+            self._end_rewrite()
+
+    def to_matrix(self, last: Optional[int] = None) -> np.ndarray:
+        """
+        Копирует свечи в матрицу (N x 6, float64) в формате ccxt.
+
+        Args:
+            last: Количество последних свечей (по умолчанию все)
+
+        Returns:
+            np.ndarray: Матрица [время (мс), open, high, low, close, volume]
+        """
+        timestamps = self.timestamps if last is None else self.timestamps[-last:]
+        matrix = np.empty((len(timestamps), len(CANDLE_FIELDS)), dtype=np.float64)
+        matrix[:, 0] = timestamps
+        for i, name in enumerate(VALUE_FIELDS, start=1):
+            matrix[:, i] = self.column(name, len(timestamps))
+        return matrix
+
+    def to_frame(self, last: Optional[int] = None) -> pd.DataFrame:
+        """
+        Копирует свечи в DataFrame с индексом по времени открытия.
+
+        Args:
+            last: Количество последних свечей (по умолчанию все)
+
+        Returns:
+            pd.DataFrame: OHLCV данные
+        """
+        timestamps = self.timestamps if last is None else self.timestamps[-last:]
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name='timestamp')
+        data = {name: np.array(self.column(name, len(timestamps)), dtype=np.float64) for name in VALUE_FIELDS}
+        return pd.DataFrame(data, index=index)
+
+
+class CandleStore:
+    """Файловое хранилище свечей по символам и таймфреймам."""
+
+    def __init__(self, base_dir: str, dtype=np.float64):
+        """
+        Args:
+            base_dir: Каталог для файлов свечей (создается при необходимости)
+            dtype: Тип значений OHLCV в новых файлах (np.float64 или np.float32)
+        """
+        self.base_dir = base_dir
+        self.dtype = dtype
+        self._writers: Dict[str, MappedCandleFile] = {}
+        os.makedirs(base_dir, exist_ok=True)
+
+    def path(self, symbol: str, timeframe: str) -> str:
+        """
+        Возвращает путь к файлу свечей.
+
+        Args:
+            symbol: Торговый символ ('BTC/USDT', 'BTC/USDT:USDT' или 'BTCUSDT')
+            timeframe: Таймфрейм
+
+        Returns:
+            str: Путь к файлу
+        """
+        name = symbol.split(':')[0].replace('/', '')
+        return os.path.join(self.base_dir, f"{name}_{timeframe}{CANDLE_FILE_EXTENSION}")
+
+    def open_reader(self, symbol: str, timeframe: str) -> Optional[MappedCandleFile]:
+        """
+        Открывает файл свечей только для чтения (для стратегий в любом процессе).
+
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+
+        Returns:
+            Optional[MappedCandleFile]: Файл свечей или None, если его еще нет
+        """
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        return MappedCandleFile(path, timeframe=timeframe)
+
+    def _writer(self, symbol: str, timeframe: str) -> Optional[MappedCandleFile]:
+        """Возвращает открытый для записи файл свечей (или None, если файла нет)."""
+        path = self.path(symbol, timeframe)
+        writer = self._writers.get(path)
+        if writer is not None:
+            return writer
+        if not os.path.exists(path):
+            return self._migrate_legacy(symbol, timeframe)
+        try:
+            writer = MappedCandleFile(path, writable=True)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось открыть файл свечей {path}: {e}")
+            return None
+        self._writers[path] = writer
+        return writer
+
+    def _migrate_legacy(self, symbol: str, timeframe: str) -> Optional[MappedCandleFile]:
+        """Переносит свечи из файла .npy прежнего формата (если он есть) в файл свечей."""
+        path = self.path(symbol, timeframe)
+        legacy_path = f"{os.path.splitext(path)[0]}.npy"
+        if not os.path.exists(legacy_path):
+            return None
+        try:
+            candles = np.load(legacy_path)
+            self.save(symbol, timeframe, candles)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось перенести свечи из {legacy_path}: {e}")
+            return None
+        os.remove(legacy_path)
+        logger.info(f"Свечи {symbol} ({timeframe}) перенесены из {legacy_path} в {path}")
+        return self._writers[path]
+
+    def load(self, symbol: str, timeframe: str) -> Optional[np.ndarray]:
+        """
+        Читает сохраненные свечи.
+
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+
+        Returns:
+            Optional[np.ndarray]: Матрица свечей (N x 6) или None, если файла нет или он поврежден
+        """
+        writer = self._writer(symbol, timeframe)
+        if writer is None:
+            return None
+        return writer.to_matrix()
+
+    def save(self, symbol: str, timeframe: str, candles: np.ndarray) -> None:
+        """
+        Перезаписывает свечи файла целиком. Существующий файл перезаписывается
+        на месте: его могут отображать читатели, и подменить его нельзя.
+
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            candles: Матрица свечей (N x 6) по возрастанию времени
+        """
+        path = self.path(symbol, timeframe)
+        candles = np.asarray(candles, dtype=np.float64).reshape(-1, len(CANDLE_FIELDS))
+        writer = self._writers.get(path)
+        if writer is None and os.path.exists(path):
+            try:
+                writer = MappedCandleFile(path, writable=True)
+            except ValueError as e:
+                # Поврежденный файл создается заново
+                logger.error(f"Файл свечей {path} поврежден и будет создан заново: {e}")
+                os.remove(path)
+        if writer is None:
+            writer = MappedCandleFile.create(path, max(DEFAULT_FILE_CAPACITY, 2 * len(candles)), self.dtype)
+        writer.rewrite(candles)
+        self._writers[path] = writer
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """
+        Возвращает время открытия последней сохраненной свечи.
+
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+
+        Returns:
+            Optional[int]: Время в мс или None, если свечей нет
+        """
+        writer = self._writer(symbol, timeframe)
+        return writer.last_timestamp if writer is not None else None
+
+    def merge(self, symbol: str, timeframe: str, ohlcv: list,
+              stored: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Добавляет новые свечи к сохраненным.
+        Свеча с уже известным временем заменяется новой (последняя свеча
+        могла быть сохранена до закрытия). Свечи, продолжающие файл, дописываются
+        в конец; более ранние свечи приводят к перезаписи файла.
+
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            ohlcv: Новые свечи в формате ccxt
+            stored: Уже прочитанные сохраненные свечи (чтобы не читать файл повторно)
+
+        Returns:
+            np.ndarray: Все свечи после объединения, по возрастанию времени
+        """
+        fresh = np.asarray(ohlcv, dtype=np.float64).reshape(-1, len(CANDLE_FIELDS))
+        # Для повторяющегося времени оставляем последнее вхождение
+        _, index = np.unique(fresh[::-1, 0], return_index=True)
+        fresh = fresh[::-1][index]
+
+        writer = self._writer(symbol, timeframe)
+        if writer is not None and len(fresh):
+            try:
+                writer.append(fresh)
+                return writer.to_matrix()
+            except ValueError:
+                pass
+
+        if stored is None:
+            stored = self.load(symbol, timeframe)
+        if stored is None or not len(stored):
+            candles = fresh
+        else:
+            candles = np.concatenate([stored, fresh])
+            _, index = np.unique(candles[::-1, 0], return_index=True)
+            candles = candles[::-1][index]
+
+        self.save(symbol, timeframe, candles)
+        return candles
@@ -2,10 +2,37 @@
 Модуль для предварительной загрузки и подготовки исторических данных.
 """
 import asyncio
+import time
+import numpy as np
 import pandas as pd
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Union
 import traceback
+import ccxt.async_support as ccxt
 from bot_logging import logger
+from config import CANDLES_DIR
+from utils.candle_store import CandleStore
+from utils.time_utils import get_timeframe_seconds
+
+# Максимальное число одновременных загрузок истории (поверх лимитера запросов ccxt)
+PRELOAD_CONCURRENCY = 5
+# Количество повторов запроса при превышении лимита запросов биржи
+RATE_LIMIT_RETRIES = 3
+# Начальная пауза перед повтором после превышения лимита запросов (секунды)
+RATE_LIMIT_BACKOFF = 0.5
+
+# Максимум свечей за один запрос к бирже (ограничение API Bitget)
+OHLCV_REQUEST_LIMIT = 1000
+# Размер страницы при загрузке глубокой истории (эндпоинт истории Bitget отдает до 200 свечей)
+BACKFILL_PAGE_LIMIT = 200
+# Максимальный интервал одного запроса истории фьючерсов Bitget (дни, с запасом от 90)
+BACKFILL_MAX_SPAN_DAYS = 89
+# Максимальный пропуск в ответе биржи (свечей), который заполняется плоскими свечами
+BACKFILL_MAX_FILL_GAP = 3
+# Минимум непрерывных свечей после предзагрузки: прогрев индикаторов стратегий
+# (EMA200 ETHStrategy, VFI120 BTCStrategy) с запасом
+PRELOAD_MIN_CANDLES = 250
+# Интервал обновления общих файлов свечей процессом-писателем (секунды)
+CANDLE_FILE_REFRESH_INTERVAL = 30
 
 class HistoricalDataLoader:
     """
@@ -13,19 +40,26 @@ class HistoricalDataLoader:
     Загружает данные более мелкого таймфрейма и агрегирует их в 45-минутные свечи.
     """
     
-    def __init__(self, exchange):
+    def __init__(self, exchange, max_concurrency: int = PRELOAD_CONCURRENCY,
+                 store: Optional[CandleStore] = None):
         """
         Инициализация загрузчика данных.
         
         Args:
             exchange: Объект биржи для получения исторических данных
+            max_concurrency: Максимальное число одновременных запросов истории
+            store: Локальное хранилище свечей (если указано, с биржи загружаются только новые свечи)
         """
         self.exchange = exchange
+        self.store = store
         self.cached_data = {}  # {symbol: DataFrame}
+        self.load_errors = {}  # {symbol: причина последней неудачной загрузки}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
         logger.info("Инициализирован загрузчик исторических данных")
         
     async def preload_historical_data(self, symbol: str, base_timeframe: str = '15m', 
-                                    target_minutes: int = 45, limit: int = 1000) -> Optional[pd.DataFrame]:
+                                    target_minutes: int = 45, limit: int = 1000,
+                                    min_candles: int = PRELOAD_MIN_CANDLES) -> Optional[pd.DataFrame]:
         """
         Предзагрузка и агрегация исторических данных.
         
@@ -34,6 +68,7 @@ class HistoricalDataLoader:
             base_timeframe: Базовый таймфрейм для загрузки данных
             target_minutes: Целевой таймфрейм в минутах для агрегации (45 минут)
             limit: Количество свечей для загрузки
+            min_candles: Минимум непрерывных свечей (не больше limit), иначе загрузка неудачна
             
         Returns:
             DataFrame с агрегированными данными или None в случае ошибки
@@ -47,16 +82,21 @@ class HistoricalDataLoader:
                 "marginCoin": "USDT"
             }
             
-            # Загружаем данные мелкого таймфрейма
-            ohlcv = await self.exchange.fetch_ohlcv(
-                symbol=symbol,
-                timeframe=base_timeframe,
-                limit=limit,
-                params=params
-            )
+            # Загружаем данные мелкого таймфрейма (больше лимита одного запроса - постранично)
+            if self.store is not None:
+                ohlcv = await self._load_with_store(symbol, base_timeframe, limit, params)
+            elif limit > OHLCV_REQUEST_LIMIT:
+                ohlcv = await self.backfill_ohlcv(symbol, base_timeframe, limit, params)
+            else:
+                ohlcv = await self._fetch_ohlcv(symbol, base_timeframe, limit, params)
+                ohlcv = self._continuous_series(symbol, base_timeframe,
+                                                {int(candle[0]): list(candle) for candle in ohlcv or []}, limit)
             
-            if not ohlcv or len(ohlcv) < 10:
+            # Индикаторы на коротком ряду (например, после пропуска в истории биржи) недостоверны
+            required = min(min_candles, limit)
+            if not ohlcv or len(ohlcv) < required:
                 logger.warning(f"Не удалось получить достаточно данных для {symbol}")
+                self.load_errors[symbol] = f"Недостаточно данных ({len(ohlcv) if ohlcv else 0} свечей из {required} необходимых)"
                 return None
                 
             # Преобразуем в DataFrame
@@ -75,6 +115,7 @@ class HistoricalDataLoader:
             
             # Сохраняем в кеш
             self.cached_data[symbol] = df_resampled
+            self.load_errors.pop(symbol, None)
             
             # Логируем информацию о загруженных данных
             logger.info(f"Успешно загружено и агрегировано {len(df_resampled)} свечей для {symbol} "
@@ -91,8 +132,429 @@ class HistoricalDataLoader:
         except Exception as e:
             logger.error(f"Ошибка при предзагрузке данных для {symbol}: {e}")
             logger.error(traceback.format_exc())
+            self.load_errors[symbol] = str(e)
             return None
     
+    async def _fetch_ohlcv(self, symbol: str, timeframe: str, limit: int, params: Dict,
+                           since: Optional[int] = None) -> list:
+        """
+        Запрашивает свечи с ограничением числа одновременных запросов
+        и повтором при превышении лимита запросов биржи.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            limit: Количество свечей
+            params: Дополнительные параметры запроса
+            since: Время открытия первой свечи (мс, опционально)
+            
+        Returns:
+            list: Свечи в формате ccxt
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    return await self.exchange.fetch_ohlcv(
+                        symbol=symbol,
+                        timeframe=timeframe,
+                        since=since,
+                        limit=limit,
+                        params=params
+                    )
+            except ccxt.RateLimitExceeded as e:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                # Пауза растет с каждой попыткой, минимум - интервал лимитера ccxt
+                delay = max(getattr(self.exchange, 'rateLimit', 100) / 1000, RATE_LIMIT_BACKOFF) * 2 ** attempt
+                logger.warning(f"Превышен лимит запросов при загрузке {symbol}, повтор через {delay:.1f} с: {e}")
+                await asyncio.sleep(delay)
+    
+    async def _load_with_store(self, symbol: str, timeframe: str, limit: int, params: Dict) -> List[list]:
+        """
+        Загружает свечи из локального хранилища и догружает с биржи только новые.
+        
+        Последняя сохраненная свеча запрашивается повторно (она могла быть сохранена
+        до закрытия). Если сохраненной истории не хватает или она слишком старая,
+        история загружается целиком и заменяет файл: иначе между старыми и новыми
+        свечами остался бы разрыв. Без доступа к бирже используются сохраненные данные.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            limit: Количество свечей
+            params: Дополнительные параметры запроса
+            
+        Returns:
+            List[list]: Последние limit свечей в формате ccxt
+        """
+        stored = self.store.load(symbol, timeframe)
+        full_load = True
+        try:
+            if stored is None or len(stored) < limit:
+                ohlcv = await self.backfill_ohlcv(symbol, timeframe, limit, params)
+                source = "биржа (полная загрузка)"
+            else:
+                ohlcv = await self._fetch_since(symbol, timeframe, int(stored[-1, 0]), limit, params)
+                if ohlcv is None:
+                    ohlcv = await self.backfill_ohlcv(symbol, timeframe, limit, params)
+                    source = "биржа (сохраненные данные устарели)"
+                else:
+                    full_load = False
+                    source = f"диск + {len(ohlcv)} новых свечей"
+        except Exception as e:
+            if stored is None or not len(stored):
+                raise
+            logger.warning(f"Не удалось обновить свечи {symbol} ({timeframe}) с биржи, используем сохраненные: {e}")
+            return stored[-limit:].tolist()
+        
+        if full_load and ohlcv:
+            # Непрерывная история с биржи заменяет сохраненную целиком
+            candles = np.asarray(ohlcv, dtype=np.float64)
+            self.store.save(symbol, timeframe, candles)
+        else:
+            candles = self.store.merge(symbol, timeframe, ohlcv, stored)
+        logger.info(f"Свечи {symbol} ({timeframe}): {len(candles)} в хранилище, источник: {source}")
+        return candles[-limit:].tolist()
+    
+    async def _fetch_since(self, symbol: str, timeframe: str, since: int, limit: int,
+                           params: Dict) -> Optional[List[list]]:
+        """
+        Догружает свечи начиная с since, страницами вперед.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            since: Время открытия первой нужной свечи (мс)
+            limit: Количество свечей, которое нужно в итоге
+            params: Дополнительные параметры запроса
+            
+        Returns:
+            Optional[List[list]]: Новые свечи или None, если разрыв больше limit свечей
+            (дешевле загрузить историю целиком)
+        """
+        step = get_timeframe_seconds(timeframe) * 1000
+        page_size = max(1, min(BACKFILL_PAGE_LIMIT, BACKFILL_MAX_SPAN_DAYS * 86400000 // step))
+        
+        result = []
+        while len(result) <= limit:
+            page = await self._fetch_ohlcv(symbol, timeframe, page_size, params, since=since)
+            page = [candle for candle in page or [] if int(candle[0]) >= since]
+            result.extend(page)
+            if len(page) < page_size:
+                return result
+            since = int(page[-1][0]) + step
+        return None
+    
+    async def backfill_ohlcv(self, symbol: str, timeframe: str, count: int,
+                             params: Optional[Dict] = None) -> List[list]:
+        """
+        Загружает count последних свечей постранично, без ограничения в 1000 свечей.
+        
+        Сначала запрашивается последняя страница - она задает время последней свечи
+        на бирже. Остальные страницы рассчитываются назад от нее по since и загружаются
+        параллельно (с ограничением числа одновременных запросов). Страницы склеиваются
+        без дубликатов, пропущенные участки запрашиваются повторно. Свечи, которых
+        у биржи нет (до BACKFILL_MAX_FILL_GAP подряд), заполняются плоскими свечами;
+        при большем пропуске остается непрерывный хвост ряда.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм (например, '4h')
+            count: Количество свечей
+            params: Дополнительные параметры запроса
+            
+        Returns:
+            List[list]: Непрерывный ряд свечей в формате ccxt (count свечей, если
+            биржа хранит столько истории)
+        """
+        params = params or {}
+        step = get_timeframe_seconds(timeframe) * 1000
+        page_size = max(1, min(BACKFILL_PAGE_LIMIT, BACKFILL_MAX_SPAN_DAYS * 86400000 // step))
+        
+        # Последняя страница задает время последней (текущей) свечи
+        latest = await self._fetch_ohlcv(symbol, timeframe, min(count, page_size), params)
+        if not latest:
+            return []
+        last_open = int(latest[-1][0])
+        first_open = last_open - (count - 1) * step
+        
+        candles = {}
+        self._stitch_page(candles, latest, first_open, last_open)
+        
+        # Остальные страницы не зависят друг от друга - загружаем их параллельно
+        for attempt in range(2):
+            missing = [ts for ts in range(first_open, last_open + step, step) if ts not in candles]
+            if not missing:
+                break
+            windows = self._missing_windows(missing, step, page_size)
+            logger.info(f"Загрузка истории {symbol} ({timeframe}): {len(windows)} страниц, "
+                        f"{len(missing)} недостающих свечей")
+            pages = await asyncio.gather(*(
+                self._fetch_ohlcv(symbol, timeframe, limit, params, since=since) for since, limit in windows
+            ))
+            received = len(candles)
+            for page in pages:
+                self._stitch_page(candles, page, first_open, last_open)
+            if len(candles) == received:
+                # Биржа больше ничего не отдает (история символа начинается позже)
+                break
+        
+        return self._continuous_series(symbol, timeframe, candles, count)
+    
+    def _continuous_series(self, symbol: str, timeframe: str, candles: Dict[int, list],
+                           count: int) -> List[list]:
+        """
+        Делает ряд свечей непрерывным: короткие пропуски (до BACKFILL_MAX_FILL_GAP
+        свечей) заполняются плоскими свечами, при большем пропуске остается хвост
+        ряда после него - индикаторы рассчитываются без пропусков.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            candles: Свечи по времени открытия
+            count: Запрошенное количество свечей
+            
+        Returns:
+            List[list]: Непрерывный ряд свечей в формате ccxt
+        """
+        step = get_timeframe_seconds(timeframe) * 1000
+        filled = self._fill_gaps(candles, step, BACKFILL_MAX_FILL_GAP)
+        if filled:
+            logger.warning(f"В истории {symbol} ({timeframe}) заполнено {filled} отсутствующих свечей")
+        
+        timestamps = sorted(candles)
+        start = len(timestamps) - 1
+        while start > 0 and timestamps[start] - timestamps[start - 1] == step:
+            start -= 1
+        if start > 0:
+            logger.warning(f"Пропуск в истории {symbol} ({timeframe}) после "
+                           f"{pd.to_datetime(timestamps[start - 1], unit='ms')}, "
+                           f"отброшено {start} более ранних свечей")
+        result = [candles[ts] for ts in timestamps[start:]]
+        
+        if len(result) < count:
+            logger.warning(f"Для {symbol} ({timeframe}) доступно {len(result)} непрерывных свечей из {count} запрошенных")
+        return result
+    
+    @staticmethod
+    def _stitch_page(candles: Dict[int, list], page: list, first_open: int, last_open: int) -> None:
+        """
+        Добавляет страницу свечей в общий ряд без дубликатов (более поздний ответ
+        заменяет свечу с тем же временем).
+        
+        Args:
+            candles: Свечи по времени открытия
+            page: Страница свечей в формате ccxt
+            first_open: Время первой нужной свечи (мс)
+            last_open: Время последней нужной свечи (мс)
+        """
+        for candle in page or []:
+            timestamp = int(candle[0])
+            if first_open <= timestamp <= last_open:
+                candles[timestamp] = list(candle)
+    
+    @staticmethod
+    def _fill_gaps(candles: Dict[int, list], step: int, max_gap: int) -> int:
+        """
+        Заполняет короткие пропуски ряда плоскими свечами по цене закрытия
+        предыдущей свечи с нулевым объемом.
+        
+        Args:
+            candles: Свечи по времени открытия
+            step: Длительность свечи (мс)
+            max_gap: Максимальная длина заполняемого пропуска (свечей)
+            
+        Returns:
+            int: Количество добавленных свечей
+        """
+        timestamps = sorted(candles)
+        filled = 0
+        for prev, current in zip(timestamps, timestamps[1:]):
+            gap = (current - prev) // step - 1
+            if 0 < gap <= max_gap:
+                close = candles[prev][4]
+                for timestamp in range(prev + step, current, step):
+                    candles[timestamp] = [timestamp, close, close, close, close, 0.0]
+                filled += gap
+        return filled
+    
+    @staticmethod
+    def _missing_windows(missing: List[int], step: int, page_size: int) -> List[Tuple[int, int]]:
+        """
+        Группирует недостающие свечи в страницы запросов.
+        
+        Args:
+            missing: Время открытия недостающих свечей (по возрастанию)
+            step: Длительность свечи (мс)
+            page_size: Максимум свечей на страницу
+            
+        Returns:
+            List[Tuple[int, int]]: Страницы (since, limit)
+        """
+        windows = []
+        since = None
+        limit = 0
+        for timestamp in missing:
+            if since is not None and timestamp == since + limit * step and limit < page_size:
+                limit += 1
+            else:
+                if since is not None:
+                    windows.append((since, limit))
+                since = timestamp
+                limit = 1
+        if since is not None:
+            windows.append((since, limit))
+        return windows
+    
+    async def load_symbols(self, symbols: list, base_timeframe: str = '15m',
+                           target_minutes: Union[int, Dict[str, int]] = 45,
+                           limit: int = 1000) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Dict]]:
+        """
+        Параллельно загружает исторические данные для списка символов.
+        
+        Одновременно выполняется не больше max_concurrency запросов, поэтому время
+        загрузки растет с числом символов медленно, а лимит запросов биржи соблюдается.
+        
+        Args:
+            symbols: Список торговых символов
+            base_timeframe: Базовый таймфрейм для загрузки данных
+            target_minutes: Целевой таймфрейм в минутах (общий или {symbol: минуты})
+            limit: Количество свечей для загрузки
+            
+        Returns:
+            Tuple[Dict[str, pd.DataFrame], Dict[str, Dict]]: Загруженные данные и отчет по символам:
+                {symbol: {"candles", "from", "to", "seconds"}} или {symbol: {"error", "seconds"}}
+        """
+        async def load(symbol: str):
+            minutes = target_minutes.get(symbol, 240) if isinstance(target_minutes, dict) else target_minutes
+            started = time.monotonic()
+            df = await self.preload_historical_data(symbol, base_timeframe, minutes, limit)
+            return symbol, df, time.monotonic() - started
+        
+        started = time.monotonic()
+        loaded = await asyncio.gather(*(load(symbol) for symbol in symbols))
+        
+        results = {}
+        report = {}
+        for symbol, df, seconds in loaded:
+            if df is not None and not df.empty:
+                results[symbol] = df
+                report[symbol] = {
+                    "candles": len(df),
+                    "from": df.index[0].strftime("%Y-%m-%d %H:%M"),
+                    "to": df.index[-1].strftime("%Y-%m-%d %H:%M"),
+                    "seconds": round(seconds, 2)
+                }
+            else:
+                report[symbol] = {
+                    "error": self.load_errors.get(symbol, "Не удалось загрузить данные"),
+                    "seconds": round(seconds, 2)
+                }
+        
+        logger.info(f"Загружены данные для {len(results)} из {len(symbols)} символов "
+                    f"за {time.monotonic() - started:.2f} с")
+        return results, report
+    
+    async def fetch_latest(self, symbols: list, timeframe: str, limit: int = 5) -> Dict[str, list]:
+        """
+        Параллельно запрашивает последние свечи для списка символов
+        (с тем же ограничением числа одновременных запросов, что и загрузка истории).
+
+        Args:
+            symbols: Список торговых символов
+            timeframe: Таймфрейм
+            limit: Количество последних свечей
+
+        Returns:
+            Dict[str, list]: {symbol: свечи в формате ccxt} для успешно загруженных символов
+        """
+        params = {
+            "instType": "swap",
+            "marginCoin": "USDT"
+        }
+        results = await asyncio.gather(
+            *(self._fetch_ohlcv(symbol, timeframe, limit, params) for symbol in symbols),
+            return_exceptions=True
+        )
+
+        latest = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Не удалось получить последние свечи {symbol} ({timeframe}): {result}")
+            elif result:
+                latest[symbol] = result
+        return latest
+
+    async def update_store(self, symbol: str, timeframe: str) -> int:
+        """
+        Дописывает в файл свечей новые свечи с биржи (начиная с последней сохраненной).
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            
+        Returns:
+            int: Количество полученных свечей
+        """
+        params = {
+            "instType": "swap",
+            "marginCoin": "USDT"
+        }
+        last_timestamp = self.store.last_timestamp(symbol, timeframe)
+        if last_timestamp is None:
+            # Файла еще нет (например, стратегия переключена на новый таймфрейм) - загружаем историю
+            logger.info(f"Файл свечей {symbol} ({timeframe}) еще не создан, загружаем историю")
+            ohlcv = None
+        else:
+            ohlcv = await self._fetch_since(symbol, timeframe, last_timestamp, OHLCV_REQUEST_LIMIT, params)
+        if ohlcv is None:
+            # Разрыв больше лимита - файл догружается целиком
+            ohlcv = await self.backfill_ohlcv(symbol, timeframe, OHLCV_REQUEST_LIMIT, params)
+        if ohlcv:
+            self.store.merge(symbol, timeframe, ohlcv)
+        return len(ohlcv)
+    
+    async def keep_store_fresh(self, strategies: list,
+                               interval: float = CANDLE_FILE_REFRESH_INTERVAL) -> None:
+        """
+        Цикл процесса-писателя: периодически дописывает новые свечи в файлы хранилища,
+        чтобы стратегии (в том числе в других процессах) читали свечи из памяти.
+        Символ и таймфрейм стратегии берутся при каждом обновлении: после смены
+        таймфрейма обновляется (и при необходимости создается) файл нового таймфрейма,
+        и стратегия подключается к нему.
+        
+        Args:
+            strategies: Стратегии (атрибуты symbol, timeframe, candle_file и метод attach_candle_file)
+            interval: Пауза между обновлениями (секунды)
+        """
+        if self.store is None:
+            logger.warning("Хранилище свечей не задано, обновление файлов свечей не запущено")
+            return
+        logger.info(f"Запущено обновление файлов свечей для {len(strategies)} стратегий каждые {interval} с")
+        while True:
+            targets = list(dict.fromkeys((strategy.symbol, strategy.timeframe) for strategy in strategies))
+            results = await asyncio.gather(
+                *(self.update_store(symbol, timeframe) for symbol, timeframe in targets),
+                return_exceptions=True
+            )
+            for (symbol, timeframe), result in zip(targets, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Ошибка при обновлении файла свечей {symbol} ({timeframe}): {result}")
+            
+            # Стратегии без файла своего таймфрейма подключаются к нему, как только он появится
+            for strategy in strategies:
+                candle_file = strategy.candle_file
+                if candle_file is not None and candle_file.timeframe == strategy.timeframe:
+                    continue
+                try:
+                    reader = self.store.open_reader(strategy.symbol, strategy.timeframe)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Не удалось открыть файл свечей {strategy.symbol} ({strategy.timeframe}): {e}")
+                    continue
+                if reader is not None:
+                    strategy.attach_candle_file(reader)
+            await asyncio.sleep(interval)
+    
     async def get_historical_data(self, symbol: str) -> Optional[pd.DataFrame]:
         """
         Получение предзагруженных исторических данных.
@@ -123,12 +585,7 @@ class HistoricalDataLoader:
         Returns:
             Словарь {symbol: DataFrame} с загруженными данными
         """
-        results = {}
-        for symbol in symbols:
-            df = await self.preload_historical_data(symbol, base_timeframe, target_minutes, limit)
-            if df is not None:
-                results[symbol] = df
-                
+        results, _ = await self.load_symbols(symbols, base_timeframe, target_minutes, limit)
         return results
 
     async def verify_indicators(self, symbol: str) -> Dict:
@@ -190,7 +647,8 @@ async def preload_data_for_trading(exchange, symbols=["BTC/USDT", "ETH/USDT"], b
     Returns:
         Dict[str, pd.DataFrame]: Словарь с загруженными данными
     """
-    data_loader = HistoricalDataLoader(exchange)
+    # Свечи читаются с диска, с биржи догружаются только новые
+    data_loader = HistoricalDataLoader(exchange, store=CandleStore(CANDLES_DIR))
     
     # Определяем целевой таймфрейм для агрегации на основе символов
     target_timeframes = {
@@ -198,16 +656,15 @@ async def preload_data_for_trading(exchange, symbols=["BTC/USDT", "ETH/USDT"], b
         "ETH/USDT": 240   # 4 часа в минутах
     }
     
-    loaded_data = {}
-    for symbol in symbols:
-        target_minutes = target_timeframes.get(symbol, 240)  # По умолчанию 4 часа
-        df = await data_loader.preload_historical_data(
-            symbol=symbol, 
-            base_timeframe=base_timeframe, 
-            target_minutes=target_minutes
-        )
-        if df is not None:
-            loaded_data[symbol] = df
+    # Символы загружаются параллельно (по умолчанию 4 часа для неизвестных символов)
+    loaded_data, report = await data_loader.load_symbols(
+        symbols,
+        base_timeframe=base_timeframe,
+        target_minutes=target_timeframes
+    )
+    for symbol, details in report.items():
+        if "error" in details:
+            logger.warning(f"Не удалось предзагрузить данные для {symbol}: {details['error']}")
     
     logger.info(f"Предзагрузка данных завершена для {len(loaded_data)} символов")
     return loaded_data, data_loader 
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Построение Excel-отчетов вне цикла событий.
+
+Книга пишется в потоковом режиме openpyxl (write_only): строки сразу сериализуются
+в файл, а не хранятся как объекты ячеек. Стили создаются один раз как именованные,
+ширина столбцов считается по данным до записи строк. Сборка и сохранение книги
+выполняются в рабочем потоке, цикл событий лишь ожидает готовый файл.
+"""
+import asyncio
+import os
+from copy import copy
+from itertools import zip_longest
+from numbers import Number
+from typing import Any, Dict, List, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from bot_logging import logger
+from config import EXCEL_STYLES
+
+# Именованные стили отчета
+STYLE_HEADER = "report_header"
+STYLE_CELL = "report_cell"
+STYLE_PROFIT = "report_profit"
+STYLE_LOSS = "report_loss"
+
+# Запас ширины столбца к длине самого длинного значения (символов)
+COLUMN_WIDTH_PADDING = 4
+# Максимальная ширина столбца (символов)
+MAX_COLUMN_WIDTH = 60
+
+
+def build_named_styles() -> List[NamedStyle]:
+    """
+    Создает именованные стили отчета (заголовок, ячейка, прибыль, убыток).
+
+    Returns:
+        List[NamedStyle]: Стили для регистрации в книге
+    """
+    side = Side(style=EXCEL_STYLES['border_style'])
+    border = Border(left=side, right=side, top=side, bottom=side)
+    center = Alignment(horizontal='center', vertical='center')
+
+    def fill(color: str) -> PatternFill:
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    return [
+        NamedStyle(name=STYLE_HEADER, font=Font(bold=True, size=12, color=EXCEL_STYLES['font_color']),
+                   fill=fill(EXCEL_STYLES['header_color']), alignment=center, border=border),
+        NamedStyle(name=STYLE_CELL, alignment=center, border=border),
+        NamedStyle(name=STYLE_PROFIT, alignment=center, border=border, fill=fill(EXCEL_STYLES['profit_color'])),
+        NamedStyle(name=STYLE_LOSS, alignment=center, border=border, fill=fill(EXCEL_STYLES['loss_color']))
+    ]
+
+
+def column_widths(rows: Sequence[Sequence[Any]], padding: int = COLUMN_WIDTH_PADDING) -> List[int]:
+    """
+    Рассчитывает ширину столбцов по данным (длина самого длинного значения).
+
+    Args:
+        rows: Строки листа (могут быть разной длины)
+        padding: Запас ширины
+
+    Returns:
+        List[int]: Ширина каждого столбца
+    """
+    return [
+        min(max((len(str(value)) for value in column if value not in (None, '')), default=0) + padding,
+            MAX_COLUMN_WIDTH)
+        for column in zip_longest(*rows)
+    ]
+
+
+def _pnl_style(value: Any) -> str:
+    """Возвращает стиль ячейки PNL по знаку значения."""
+    if isinstance(value, Number) and value > 0:
+        return STYLE_PROFIT
+    if isinstance(value, Number) and value < 0:
+        return STYLE_LOSS
+    return STYLE_CELL
+
+
+def write_excel_report(path: str, sheets: List[Dict[str, Any]]) -> str:
+    """
+    Записывает книгу Excel в потоковом режиме (выполняется в рабочем потоке).
+
+    Args:
+        path: Путь к файлу отчета
+        sheets: Листы отчета, каждый - словарь:
+            "title" - название листа,
+            "rows" - строки значений,
+            "header_rows" - номера строк заголовков (по умолчанию [0]),
+            "pnl_column" - номер столбца PNL для подсветки по знаку (или None)
+
+    Returns:
+        str: Путь к сохраненному файлу
+    """
+    wb = Workbook(write_only=True)
+    for style in build_named_styles():
+        wb.add_named_style(style)
+
+    for sheet in sheets:
+        ws = wb.create_sheet(title=sheet["title"])
+        rows = sheet["rows"]
+        header_rows = set(sheet.get("header_rows", [0]))
+        pnl_column = sheet.get("pnl_column")
+
+        # В потоковом режиме ширина задается до записи строк
+        for col_idx, width in enumerate(column_widths(rows), 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        # Именованный стиль разрешается один раз, ячейкам копируется готовый набор индексов стиля
+        style_arrays = {}
+        for name in (STYLE_HEADER, STYLE_CELL, STYLE_PROFIT, STYLE_LOSS):
+            template = WriteOnlyCell(ws)
+            template.style = name
+            style_arrays[name] = template._style
+
+        for row_idx, row in enumerate(rows):
+            cells = []
+            for col_idx, value in enumerate(row):
+                cell = WriteOnlyCell(ws, value=value)
+                if row_idx in header_rows:
+                    style = STYLE_HEADER
+                elif col_idx == pnl_column:
+                    style = _pnl_style(value)
+                else:
+                    style = STYLE_CELL
+                cell._style = copy(style_arrays[style])
+                cells.append(cell)
+            ws.append(cells)
+
+    # Запись во временный файл и замена: отправляемый отчет никогда не бывает недописанным
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    wb.save(temp_path)
+    os.replace(temp_path, path)
+    return path
+
+
+async def generate_excel_report(path: str, sheets: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Строит Excel-отчет в рабочем потоке и ожидает готовый файл.
+
+    Args:
+        path: Путь к файлу отчета
+        sheets: Листы отчета (см. write_excel_report)
+
+    Returns:
+        Optional[str]: Путь к файлу или None в случае ошибки
+    """
+    try:
+        path = await asyncio.to_thread(write_excel_report, path, sheets)
+        logger.info(f"Отчет сохранен в {path}: {sum(len(sheet['rows']) for sheet in sheets)} строк")
+        return path
+    except Exception as e:
+        logger.error(f"Ошибка при создании Excel-отчета {path}: {e}")
+        return None
@@ -0,0 +1,403 @@
+"""
+Измерение задержки цикла событий.
+
+Все компоненты бота (сканер, Telegram, мониторинг стопов) работают в одном цикле
+событий, поэтому любая блокирующая операция задерживает остальные. Монитор
+периодически засыпает на фиксированный интервал и измеряет, насколько позже
+ожидаемого цикл событий вернул ему управление. Сторожевой таймер дополнительно
+находит блокировки цикла из фонового потока и запоминает функции, которые
+блокировали цикл; отчеты asyncio о медленных обратных вызовах (режим отладки
+цикла событий) включаются только по настройке LOOP_SLOW_CALLBACK_DURATION.
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from bot_logging import logger
+from config import LOOP_SLOW_CALLBACK_DURATION, LOOP_STALL_THRESHOLD
+
+# Интервал измерения задержки цикла событий (секунды)
+LOOP_LAG_INTERVAL = 0.25
+# Количество хранимых измерений
+LOOP_LAG_HISTORY = 2400
+# Интервал записи сводки задержки в лог (секунды)
+LOOP_LAG_REPORT_INTERVAL = 300
+# Количество хранимых медленных вызовов
+LOOP_SLOW_CALLBACK_HISTORY = 50
+
+# Сообщение asyncio о медленном обратном вызове (режим отладки цикла событий)
+SLOW_CALLBACK_MESSAGE = "Executing "
+# Количество функций стека в описании медленного вызова
+SLOW_CALLBACK_STACK_DEPTH = 4
+# Имя блокировки, стек которой не удалось описать
+UNKNOWN_STALL = "<неизвестно>"
+
+# Каталог asyncio: его кадры стека не описывают код бота
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+# Имя корутины задачи и имя функции обработчика в описании обратного вызова
+_CORO_PATTERN = re.compile(r"coro=<([^\s(>]+)")
+_HANDLE_PATTERN = re.compile(r"<(?:Timer)?Handle ([^\s(>]+)")
+
+
+class LoopLagMonitor:
+    """Периодически измеряет задержку планирования цикла событий."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, history: int = LOOP_LAG_HISTORY,
+                 report_interval: float = LOOP_LAG_REPORT_INTERVAL):
+        """
+        Args:
+            interval: Интервал между измерениями (секунды)
+            history: Количество хранимых измерений
+            report_interval: Интервал записи сводки в лог (секунды)
+        """
+        self.interval = interval
+        self.report_interval = report_interval
+        self.lags = deque(maxlen=history)
+        self.is_running = False
+
+    def record(self, lag: float) -> None:
+        """
+        Сохраняет измерение задержки.
+
+        Args:
+            lag: Задержка цикла событий (секунды)
+        """
+        self.lags.append(max(lag, 0.0))
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Возвращает статистику задержки цикла событий.
+
+        Returns:
+            Dict[str, float]: Количество измерений, последняя, средняя, p50, p99
+            и максимальная задержка (мс)
+        """
+        if not self.lags:
+            return {"count": 0}
+
+        lags = np.fromiter(self.lags, dtype=np.float64, count=len(self.lags)) * 1000
+        p50, p99 = np.percentile(lags, [50, 99])
+        return {
+            "count": len(lags),
+            "last_ms": round(float(lags[-1]), 2),
+            "avg_ms": round(float(lags.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(lags.max()), 2)
+        }
+
+    async def run(self) -> None:
+        """Измеряет задержку цикла событий до остановки монитора."""
+        self.is_running = True
+        last_report = time.monotonic()
+
+        while self.is_running:
+            try:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self.record(now - expected)
+
+                if now - last_report >= self.report_interval:
+                    last_report = now
+                    self.report()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ошибка измерения задержки цикла событий: {e}")
+
+        self.is_running = False
+
+    def report(self) -> None:
+        """Записывает сводку задержки в лог."""
+        logger.info(f"Задержка цикла событий: {self.get_stats()}")
+
+    def stop(self) -> None:
+        """Останавливает монитор."""
+        self.is_running = False
+
+
+def describe_stack(frame: Optional[FrameType]) -> Optional[str]:
+    """
+    Описывает стек потока цикла событий: функции бота от внешней к внутренней
+    (кадры самого asyncio и модулей верхнего уровня пропускаются).
+
+    Args:
+        frame: Текущий кадр потока цикла событий
+
+    Returns:
+        Optional[str]: Например, 'StrategyScanner.scan_symbol -> ... -> calculate_frama' или None
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        if not code.co_filename.startswith(_ASYNCIO_DIR) and code.co_name != '<module>':
+            names.append(getattr(code, 'co_qualname', code.co_name))
+        frame = frame.f_back
+    if not names:
+        return None
+
+    names.reverse()
+    if len(names) > SLOW_CALLBACK_STACK_DEPTH:
+        names = [names[0], '...'] + names[-(SLOW_CALLBACK_STACK_DEPTH - 1):]
+    return ' -> '.join(names)
+
+
+def describe_callback(callback: Any) -> str:
+    """
+    Возвращает короткое имя корутины или функции из описания обратного вызова asyncio.
+
+    Args:
+        callback: Обработчик или его строковое описание из сообщения asyncio
+
+    Returns:
+        str: Имя корутины (например, 'StrategyScanner._continuous_scan') или описание
+    """
+    text = str(callback)
+    for pattern in (_CORO_PATTERN, _HANDLE_PATTERN):
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return text[:120]
+
+
+class SlowCallbackHandler(logging.Handler):
+    """Перехватывает сообщения asyncio о медленных обратных вызовах и передает их сторожевому таймеру."""
+
+    def __init__(self, watchdog: 'LoopWatchdog'):
+        """
+        Args:
+            watchdog: Сторожевой таймер, получающий медленные вызовы
+        """
+        super().__init__(level=logging.WARNING)
+        self.watchdog = watchdog
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if isinstance(record.msg, str) and record.msg.startswith(SLOW_CALLBACK_MESSAGE) and len(record.args) == 2:
+                callback, duration = record.args
+                duration = float(duration)
+                # Стек, снятый во время блокировки, точнее описания задачи после ее шага
+                name = self.watchdog.take_stall_stack(duration) or describe_callback(callback)
+                self.watchdog.record_slow_callback(name, duration)
+            else:
+                # Остальные сообщения asyncio (например, необработанные исключения задач) - в лог бота
+                logger.log(record.levelno, f"asyncio: {record.getMessage()}")
+        except Exception:
+            self.handleError(record)
+
+
+class LoopWatchdog(LoopLagMonitor):
+    """
+    Сторожевой таймер цикла событий: задержка планирования и блокировки цикла
+    с именами функций, которые его блокировали.
+
+    Фоновый поток периодически отправляет в цикл событий пустой вызов и, если тот
+    не выполнен за порог, снимает стек потока цикла событий - в нем видна функция,
+    которая блокирует цикл; после освобождения цикла блокировка записывается.
+    Отчеты asyncio о медленных вызовах требуют режима отладки цикла событий, который
+    замедляет весь цикл, поэтому включаются только при заданном slow_callback_duration:
+    тогда длительность берется из отчета asyncio, а имя - из снятого стека.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, history: int = LOOP_LAG_HISTORY,
+                 report_interval: float = LOOP_LAG_REPORT_INTERVAL,
+                 slow_callback_duration: Optional[float] = LOOP_SLOW_CALLBACK_DURATION,
+                 slow_history: int = LOOP_SLOW_CALLBACK_HISTORY,
+                 stall_threshold: Optional[float] = LOOP_STALL_THRESHOLD):
+        """
+        Args:
+            interval: Интервал между измерениями задержки (секунды)
+            history: Количество хранимых измерений задержки
+            report_interval: Интервал записи сводки в лог (секунды)
+            slow_callback_duration: Порог отчетов asyncio о медленных вызовах (секунды,
+                None - без режима отладки цикла событий)
+            slow_history: Количество хранимых медленных вызовов
+            stall_threshold: Порог блокировки для фонового потока (секунды, None - не отслеживать)
+        """
+        super().__init__(interval, history, report_interval)
+        self.slow_callback_duration = slow_callback_duration
+        self.stall_threshold = stall_threshold
+        self.slow_callbacks = deque(maxlen=slow_history)
+        # Имя корутины -> {"count", "total", "max"} (секунды)
+        self.slow_callback_totals: Dict[str, Dict[str, float]] = {}
+        self._handler: Optional[SlowCallbackHandler] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+        # Последний стек, снятый во время блокировки: (описание, время снятия по monotonic)
+        self._stall_stack: Optional[tuple] = None
+
+    def install(self) -> None:
+        """
+        Запускает поиск блокировок в текущем цикле событий и, если задан
+        slow_callback_duration, отчеты asyncio о медленных обратных вызовах.
+        """
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+
+        if self.slow_callback_duration is not None:
+            self._loop.slow_callback_duration = self.slow_callback_duration
+            # asyncio сообщает о медленных вызовах только в режиме отладки
+            self._loop.set_debug(True)
+            self._handler = SlowCallbackHandler(self)
+            logging.getLogger("asyncio").addHandler(self._handler)
+            logger.info(f"Режим отладки цикла событий включен: отчеты о медленных вызовах "
+                        f"(порог {self.slow_callback_duration * 1000:.0f} мс)")
+
+        if self.stall_threshold is not None:
+            self._sampler_stop.clear()
+            self._sampler = threading.Thread(target=self._sample_stalls, name="loop-watchdog", daemon=True)
+            self._sampler.start()
+            logger.info(f"Отслеживание блокировок цикла событий включено (порог {self.stall_threshold * 1000:.0f} мс)")
+
+    def uninstall(self) -> None:
+        """Останавливает поиск блокировок и отключает отчеты о медленных обратных вызовах."""
+        if self._loop is None:
+            return
+
+        self._sampler_stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1.0)
+            self._sampler = None
+
+        if self._handler is not None:
+            logging.getLogger("asyncio").removeHandler(self._handler)
+            self._handler = None
+            if not self._loop.is_closed():
+                self._loop.set_debug(False)
+        self._loop = None
+
+    def _sample_stalls(self) -> None:
+        """Фоновый поток: снимает стек цикла событий, если он не отвечает дольше порога."""
+        threshold = self.stall_threshold
+        loop = self._loop
+        while not self._sampler_stop.is_set():
+            ping = threading.Event()
+            sent = time.monotonic()
+            try:
+                loop.call_soon_threadsafe(ping.set)
+            except RuntimeError:
+                # Цикл событий закрыт
+                break
+
+            if not ping.wait(threshold):
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = describe_stack(frame)
+                self._stall_stack = (stack, time.monotonic())
+                del frame
+                # Ждем, пока цикл событий освободится
+                while not ping.wait(threshold) and not self._sampler_stop.is_set():
+                    pass
+
+                if self._handler is None and ping.is_set():
+                    # Без режима отладки asyncio о блокировке не сообщит - записываем ее сами
+                    # (в потоке цикла событий, как и остальные изменения статистики)
+                    try:
+                        loop.call_soon_threadsafe(self.record_slow_callback, stack or UNKNOWN_STALL,
+                                                  time.monotonic() - sent)
+                    except RuntimeError:
+                        break
+
+            self._sampler_stop.wait(threshold)
+
+    def take_stall_stack(self, duration: float) -> Optional[str]:
+        """
+        Возвращает стек, снятый во время блокировки длительностью duration (если он есть).
+
+        Args:
+            duration: Длительность медленного вызова (секунды)
+
+        Returns:
+            Optional[str]: Описание стека или None
+        """
+        stall = self._stall_stack
+        self._stall_stack = None
+        if stall is None or stall[0] is None:
+            return None
+        # Стек должен быть снят во время этого вызова, а не одного из предыдущих
+        if stall[1] < time.monotonic() - duration:
+            return None
+        return stall[0]
+
+    def record_slow_callback(self, name: str, duration: float) -> None:
+        """
+        Сохраняет медленный обратный вызов.
+
+        Args:
+            name: Имя корутины или функции
+            duration: Длительность вызова (секунды)
+        """
+        self.slow_callbacks.append({"time": time.time(), "name": name, "duration": duration})
+
+        totals = self.slow_callback_totals.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        totals["count"] += 1
+        totals["total"] += duration
+        totals["max"] = max(totals["max"], duration)
+
+        logger.warning(f"Цикл событий заблокирован на {duration * 1000:.0f} мс: {name}")
+
+    def get_slow_callbacks(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Возвращает корутины, дольше всего блокировавшие цикл событий.
+
+        Args:
+            limit: Количество корутин
+
+        Returns:
+            List[Dict[str, Any]]: Имя, количество, суммарная и максимальная длительность (мс),
+            по убыванию суммарной длительности
+        """
+        ranked = sorted(self.slow_callback_totals.items(), key=lambda item: item[1]["total"], reverse=True)
+        return [
+            {
+                "name": name,
+                "count": totals["count"],
+                "total_ms": round(totals["total"] * 1000, 1),
+                "max_ms": round(totals["max"] * 1000, 1)
+            }
+            for name, totals in ranked[:limit]
+        ]
+
+    def get_health(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние цикла событий.
+
+        Returns:
+            Dict[str, Any]: Статистика задержки, последние и самые долгие медленные вызовы
+        """
+        threshold = self.slow_callback_duration if self.slow_callback_duration is not None else self.stall_threshold
+        return {
+            "lag": self.get_stats(),
+            "slow_callback_ms": None if threshold is None else threshold * 1000,
+            "slow_count": sum(totals["count"] for totals in self.slow_callback_totals.values()),
+            "recent": list(self.slow_callbacks)[-5:],
+            "top": self.get_slow_callbacks()
+        }
+
+    def report(self) -> None:
+        """Записывает в лог сводку задержки и корутины, блокировавшие цикл событий."""
+        super().report()
+        if self.slow_callback_totals:
+            logger.info(f"Медленные обратные вызовы цикла событий: {self.get_slow_callbacks()}")
+
+    async def run(self) -> None:
+        """Включает отслеживание блокировок и измеряет задержку до остановки."""
+        self.install()
+        try:
+            await super().run()
+        finally:
+            self.uninstall()
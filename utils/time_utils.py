@@ -2,12 +2,24 @@
 Утилиты для работы с временем и синхронизация свечей.
 """
 import asyncio
-from datetime import datetime, timedelta
+import time
 import logging
-from typing import Dict, Union, Optional
+from typing import Awaitable, Callable, Dict, List, Union, Optional
 
 logger = logging.getLogger(__name__)
 
+# Интервал опроса биржи после границы свечи, пока не появится закрытая свеча (секунды)
+CANDLE_POLL_INTERVAL = 0.5
+# Максимальное ожидание закрытой свечи от биржи после границы (секунды)
+CANDLE_CLOSE_TIMEOUT = 60.0
+
+# Интервал синхронизации со временем сервера биржи (секунды)
+SERVER_TIME_SYNC_INTERVAL = 300
+# Коэффициент сглаживания смещения и джиттера (доля нового замера)
+SERVER_TIME_SMOOTHING = 0.2
+# Замеры с большей задержкой ответа отбрасываются (секунды)
+SERVER_TIME_MAX_RTT = 2.0
+
 # Словарь с временными интервалами для каждого таймфрейма в секундах
 TIMEFRAME_SECONDS = {
     '1m': 60,
@@ -44,6 +56,124 @@ BITGET_TIMEFRAMES = {
     '1w': '1w',
 }
 
+class ServerClock:
+    """
+    Оценка смещения локальных часов относительно времени сервера биржи.
+    
+    Время сервера запрашивается (ccxt fetch_time), половина задержки ответа (RTT)
+    компенсируется: смещение = время сервера - (локальное время отправки + RTT / 2).
+    Смещение и джиттер (среднее отклонение замеров от смещения) сглаживаются
+    экспоненциально, чтобы единичный медленный ответ не сдвигал расписание.
+    """
+    
+    def __init__(self, fetch_time: Optional[Callable[[], Awaitable[int]]] = None,
+                 smoothing: float = SERVER_TIME_SMOOTHING):
+        """
+        Args:
+            fetch_time: Корутина, возвращающая время сервера биржи (мс)
+            smoothing: Коэффициент сглаживания (доля нового замера)
+        """
+        self.fetch_time = fetch_time
+        self.smoothing = smoothing
+        self.offset = 0.0  # Сглаженное смещение: время сервера - локальное время (секунды)
+        self.jitter = 0.0  # Сглаженный разброс замеров смещения (секунды)
+        self.last_rtt = None
+        self.samples = 0
+        self.rejected = 0
+        self.last_sync = None  # Локальное время последнего принятого замера
+    
+    def now(self) -> float:
+        """
+        Возвращает текущее время сервера биржи по локальным часам с поправкой.
+        
+        Returns:
+            float: Время в секундах UNIX
+        """
+        return time.time() + self.offset
+    
+    def add_sample(self, server_ms: int, sent_at: float, rtt: float) -> bool:
+        """
+        Учитывает замер времени сервера.
+        
+        Args:
+            server_ms: Время сервера из ответа (мс)
+            sent_at: Локальное время отправки запроса (секунды UNIX)
+            rtt: Задержка ответа (секунды)
+            
+        Returns:
+            bool: True если замер принят
+        """
+        if rtt > SERVER_TIME_MAX_RTT:
+            self.rejected += 1
+            logger.warning(f"Замер времени сервера отброшен: задержка ответа {rtt * 1000:.0f} мс")
+            return False
+        
+        offset = server_ms / 1000 - (sent_at + rtt / 2)
+        if self.samples == 0:
+            self.offset = offset
+        else:
+            self.jitter += self.smoothing * (abs(offset - self.offset) - self.jitter)
+            self.offset += self.smoothing * (offset - self.offset)
+        self.last_rtt = rtt
+        self.samples += 1
+        self.last_sync = time.time()
+        return True
+    
+    async def sync(self) -> bool:
+        """
+        Запрашивает время сервера и обновляет смещение.
+        
+        Returns:
+            bool: True если замер получен и принят
+        """
+        if self.fetch_time is None:
+            return False
+        try:
+            sent_at = time.time()
+            started = time.monotonic()
+            server_ms = await self.fetch_time()
+            rtt = time.monotonic() - started
+        except Exception as e:
+            logger.warning(f"Не удалось получить время сервера биржи: {e}")
+            return False
+        if server_ms is None:
+            return False
+        return self.add_sample(int(server_ms), sent_at, rtt)
+    
+    async def run(self, interval: float = SERVER_TIME_SYNC_INTERVAL) -> None:
+        """
+        Периодически синхронизирует смещение со временем сервера.
+        
+        Args:
+            interval: Интервал синхронизации (секунды)
+        """
+        while True:
+            if await self.sync():
+                logger.info(f"Время сервера биржи: смещение {self.offset * 1000:+.1f} мс, "
+                            f"джиттер {self.jitter * 1000:.1f} мс, RTT {self.last_rtt * 1000:.0f} мс")
+            await asyncio.sleep(interval)
+    
+    def get_metrics(self) -> Dict:
+        """
+        Возвращает метрики синхронизации времени.
+        
+        Returns:
+            Dict: offset_ms, jitter_ms, rtt_ms, samples, rejected, age (секунд с последнего замера)
+        """
+        return {
+            'offset_ms': round(self.offset * 1000, 1),
+            'jitter_ms': round(self.jitter * 1000, 1),
+            'rtt_ms': round(self.last_rtt * 1000, 1) if self.last_rtt is not None else None,
+            'samples': self.samples,
+            'rejected': self.rejected,
+            'age': round(time.time() - self.last_sync, 1) if self.last_sync is not None else None
+        }
+
+
+# Общие часы сервера биржи (источник времени задается при запуске бота)
+SERVER_CLOCK = ServerClock()
+
+
 def validate_timeframe(timeframe: str) -> bool:
     """
     Проверяет, что указанный таймфрейм поддерживается.
@@ -76,44 +206,157 @@ def get_timeframe_seconds(timeframe: str) -> int:
     return TIMEFRAME_SECONDS[timeframe]
 
 
-def get_next_candle_time(timeframe: str) -> datetime:
+class CandleClock:
     """
-    Вычисляет время следующего закрытия свечи для указанного таймфрейма.
+    Общие часы закрытия свечей.
     
-    Args:
-        timeframe: Строка с таймфреймом, например '1m', '1h', '1d'
-        
-    Returns:
-        datetime: Время следующего закрытия свечи
+    Для каждого таймфрейма работает одна задача: она ждет границы свечи по монотонным
+    часам цикла событий, затем коротким запросом опрашивает биржу по каждому символу,
+    пока не появится следующая свеча (значит, предыдущая закрыта), и публикует
+    событие всем подписчикам. Стратегии на одном символе и таймфрейме получают
+    один общий ответ биржи и начинают расчет сразу после появления данных.
+    
+    Событие - словарь:
+        symbol, timeframe: символ и таймфрейм
+        timestamp: время открытия закрытой свечи (мс)
+        candles: последние свечи в формате ccxt, полученные при опросе
+        delay: задержка публикации относительно границы свечи (секунды)
     """
-    if not validate_timeframe(timeframe):
-        raise ValueError(f"Таймфрейм {timeframe} не поддерживается")
     
-    seconds = get_timeframe_seconds(timeframe)
-    now = datetime.now()
+    def __init__(self, fetch_candles: Callable[[str, str], Awaitable[Optional[List[list]]]],
+                 poll_interval: float = CANDLE_POLL_INTERVAL,
+                 close_timeout: float = CANDLE_CLOSE_TIMEOUT,
+                 time_source: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            fetch_candles: Корутина (symbol, timeframe) -> последние свечи в формате ccxt
+            poll_interval: Интервал опроса биржи после границы свечи (секунды)
+            close_timeout: Максимальное ожидание закрытой свечи (секунды)
+            time_source: Источник текущего времени биржи (по умолчанию SERVER_CLOCK.now)
+        """
+        self.fetch_candles = fetch_candles
+        self.poll_interval = poll_interval
+        self.close_timeout = close_timeout
+        self.time_source = time_source or SERVER_CLOCK.now
+        self._subscribers: Dict[tuple, List[asyncio.Queue]] = {}  # {(symbol, timeframe): [Queue]}
+        self._tasks: Dict[str, asyncio.Task] = {}  # {timeframe: Task}
     
-    # Вычисляем время следующего закрытия свечи
-    timestamp = now.timestamp()
-    next_close = (timestamp // seconds + 1) * seconds
+    def subscribe(self, symbol: str, timeframe: str) -> asyncio.Queue:
+        """
+        Подписывается на закрытие свечей символа. Должен вызываться из работающего цикла событий.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            
+        Returns:
+            asyncio.Queue: Очередь событий закрытия свечей
+        """
+        # Проверяем таймфрейм сразу, а не в задаче часов
+        get_timeframe_seconds(timeframe)
+        queue = asyncio.Queue()
+        self._subscribers.setdefault((symbol, timeframe), []).append(queue)
+        
+        task = self._tasks.get(timeframe)
+        if task is None or task.done():
+            self._tasks[timeframe] = asyncio.create_task(self._run_timeframe(timeframe))
+        return queue
     
-    return datetime.fromtimestamp(next_close)
-
-
-async def wait_for_candle_close(timeframe: str) -> None:
-    """
-    Ожидает закрытия текущей свечи для указанного таймфрейма + 1 секунда.
+    def unsubscribe(self, symbol: str, timeframe: str, queue: asyncio.Queue) -> None:
+        """
+        Отменяет подписку. Задача таймфрейма без подписчиков останавливается.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            queue: Очередь, полученная в subscribe()
+        """
+        key = (symbol, timeframe)
+        queues = self._subscribers.get(key, [])
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            self._subscribers.pop(key, None)
+        
+        if not any(tf == timeframe for _, tf in self._subscribers):
+            task = self._tasks.pop(timeframe, None)
+            if task is not None and not task.done():
+                task.cancel()
     
-    Args:
-        timeframe: Строка с таймфреймом, например '1m', '1h', '1d'
-    """
-    next_candle = get_next_candle_time(timeframe)
-    now = datetime.now()
+    async def stop(self) -> None:
+        """Останавливает задачи всех таймфреймов и удаляет подписки."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        self._subscribers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
     
-    # Вычисляем время до следующего закрытия свечи + 1 секунда (для гарантии)
-    wait_seconds = (next_candle - now).total_seconds() + 1
+    async def _run_timeframe(self, timeframe: str) -> None:
+        """
+        Цикл таймфрейма: ожидание границы свечи и опрос символов подписчиков.
+        
+        Args:
+            timeframe: Таймфрейм
+        """
+        loop = asyncio.get_running_loop()
+        seconds = get_timeframe_seconds(timeframe)
+        
+        while True:
+            # Время до границы берется один раз, дальше ожидание идет по монотонным часам
+            now = self.time_source()
+            boundary = (now // seconds + 1) * seconds
+            deadline = loop.time() + (boundary - now)
+            logger.info(f"Ожидание {boundary - now:.2f} секунд до закрытия свечи {timeframe}")
+            while loop.time() < deadline:
+                await asyncio.sleep(deadline - loop.time())
+            
+            symbols = [symbol for symbol, tf in self._subscribers if tf == timeframe]
+            await asyncio.gather(
+                *(self._poll_closed_candle(symbol, timeframe, int(boundary * 1000), deadline)
+                  for symbol in symbols)
+            )
     
-    logger.info(f"Ожидание {wait_seconds:.2f} секунд до закрытия свечи {timeframe} и начала сканирования")
-    await asyncio.sleep(wait_seconds)
+    async def _poll_closed_candle(self, symbol: str, timeframe: str, boundary_ms: int,
+                                  deadline: float) -> None:
+        """
+        Опрашивает биржу, пока не появится свеча, открытая на границе, и публикует событие.
+        
+        Args:
+            symbol: Торговый символ
+            timeframe: Таймфрейм
+            boundary_ms: Граница свечи - время открытия новой свечи (мс)
+            deadline: Момент границы по монотонным часам цикла событий
+        """
+        loop = asyncio.get_running_loop()
+        candles = None
+        polls = 0
+        while True:
+            polls += 1
+            try:
+                candles = await self.fetch_candles(symbol, timeframe)
+            except Exception as e:
+                logger.warning(f"Ошибка опроса свечей {symbol} ({timeframe}): {e}")
+            
+            if candles and int(candles[-1][0]) >= boundary_ms:
+                break
+            if loop.time() - deadline >= self.close_timeout:
+                logger.warning(f"Биржа не вернула закрытую свечу {symbol} ({timeframe}) "
+                               f"за {self.close_timeout:.0f} с, публикуем имеющиеся данные")
+                break
+            await asyncio.sleep(self.poll_interval)
+        
+        event = {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'timestamp': boundary_ms - get_timeframe_seconds(timeframe) * 1000,
+            'candles': candles,
+            'delay': loop.time() - deadline
+        }
+        logger.info(f"Свеча {symbol} ({timeframe}) закрыта: данные получены через "
+                    f"{event['delay']:.2f} с после границы ({polls} запросов)")
+        for queue in self._subscribers.get((symbol, timeframe), []):
+            queue.put_nowait(event)
 
 
 def get_all_supported_timeframes() -> Dict[str, str]:
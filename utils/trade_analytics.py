@@ -0,0 +1,310 @@
+"""
+Инкрементальная аналитика закрытых сделок.
+
+Для всего счета, каждой стратегии, символа и таймфрейма хранятся накопленные
+показатели: кривая капитала, максимальная просадка и ее длительность, дневной PnL
+для коэффициентов Шарпа и Сортино, ожидание сделки и серии. Новая закрытая сделка
+обновляет показатели своих групп за O(1), без пересчета всей истории; при запуске
+показатели один раз строятся по закрытым сделкам из журнала. Сделка, закрытая
+раньше уже учтенных, приводит к пересчету показателей в порядке закрытия.
+
+Капитал бота неизвестен, поэтому доходность дня - дневной PnL в USDT: при постоянном
+капитале коэффициенты Шарпа и Сортино от его размера не зависят.
+"""
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Дней в году для годовых коэффициентов (криптовалютный рынок работает ежедневно)
+TRADING_DAYS_PER_YEAR = 365
+MS_PER_DAY = 24 * 60 * 60 * 1000
+
+# Группы аналитики: весь счет и группа -> столбец закрытой сделки
+GROUP_ALL = "all"
+GROUP_COLUMNS = {
+    "strategy": "strategy_name",
+    "symbol": "symbol",
+    "timeframe": "timeframe"
+}
+# Имя группы для сделок без стратегии или таймфрейма (не открыты ботом)
+UNKNOWN_GROUP = "Unknown"
+
+# Учтенная сделка: (id, PnL, комиссии, время закрытия, ключи групп)
+TripRecord = Tuple[str, float, float, int, List[Tuple[str, str]]]
+
+
+class RunningStats:
+    """Накопленные показатели одной группы закрытых сделок (обновление за O(1))."""
+
+    def __init__(self):
+        self.trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.fees = 0.0
+
+        # Кривая капитала (время закрытия, накопленный PnL) и просадка от пика
+        self.equity = 0.0
+        self.equity_curve: List[Tuple[int, float]] = []
+        self.peak = 0.0
+        self.peak_time: Optional[int] = None
+        self.last_time: Optional[int] = None
+        self.max_drawdown = 0.0
+        self.max_drawdown_duration = 0
+
+        # Серия: положительная - прибыльные сделки подряд, отрицательная - убыточные
+        self.streak = 0
+        self.max_win_streak = 0
+        self.max_loss_streak = 0
+
+        # PnL по дням (UTC) и суммы для среднего, дисперсии и нисходящего отклонения
+        self.daily_pnl: Dict[int, float] = {}
+        self.day_sum = 0.0
+        self.day_sum_sq = 0.0
+        self.day_downside_sq = 0.0
+
+    def update(self, pnl: float, close_time: int, fees: float = 0.0) -> None:
+        """
+        Учитывает закрытую сделку.
+
+        Args:
+            pnl: Реализованный PnL сделки за вычетом комиссий (USDT)
+            close_time: Время закрытия (мс)
+            fees: Комиссии сделки (USDT)
+        """
+        self.trades += 1
+        self.fees += fees
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.max_win_streak = max(self.max_win_streak, self.streak)
+        elif pnl < 0:
+            self.losses += 1
+            self.gross_loss -= pnl
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            self.max_loss_streak = max(self.max_loss_streak, -self.streak)
+        else:
+            self.streak = 0
+
+        if self.peak_time is None:
+            self.peak_time = close_time
+        in_drawdown = self.equity < self.peak
+        self.equity += pnl
+        self.equity_curve.append((close_time, self.equity))
+        self.last_time = close_time
+
+        if self.equity >= self.peak:
+            if in_drawdown:
+                # Выход из просадки: ее длительность - от пика до восстановления
+                self.max_drawdown_duration = max(self.max_drawdown_duration, close_time - self.peak_time)
+            self.peak = self.equity
+            self.peak_time = close_time
+        else:
+            self.max_drawdown = max(self.max_drawdown, self.peak - self.equity)
+
+        # Изменение PnL дня меняет суммы квадратов только на разницу квадратов
+        day = close_time // MS_PER_DAY
+        old = self.daily_pnl.get(day, 0.0)
+        new = old + pnl
+        self.daily_pnl[day] = new
+        self.day_sum += pnl
+        self.day_sum_sq += new * new - old * old
+        self.day_downside_sq += min(new, 0.0) ** 2 - min(old, 0.0) ** 2
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Возвращает показатели группы.
+
+        Returns:
+            Dict[str, Any]: Количество сделок, винрейт (%), средние прибыль и убыток,
+            фактор прибыли, общий PnL и комиссии, ожидание сделки, просадка (USDT)
+            и ее длительность (мс), коэффициенты Шарпа и Сортино (годовые), серии
+        """
+        # Дни без сделок входят в ряд с нулевым PnL
+        days = (max(self.daily_pnl) - min(self.daily_pnl) + 1) if self.daily_pnl else 0
+        sharpe = sortino = 0.0
+        if days > 1:
+            mean = self.day_sum / days
+            variance = max((self.day_sum_sq - days * mean * mean) / (days - 1), 0.0)
+            downside = math.sqrt(self.day_downside_sq / days)
+            annualization = math.sqrt(TRADING_DAYS_PER_YEAR)
+            if variance > 0:
+                sharpe = mean / math.sqrt(variance) * annualization
+            if downside > 0:
+                sortino = mean / downside * annualization
+
+        drawdown_duration = self.max_drawdown_duration
+        if self.equity < self.peak:
+            # Незавершенная просадка - до последней сделки
+            drawdown_duration = max(drawdown_duration, self.last_time - self.peak_time)
+
+        total_pnl = self.gross_profit - self.gross_loss
+        return {
+            'total_trades': self.trades,
+            'winning_trades': self.wins,
+            'losing_trades': self.losses,
+            'win_rate': self.wins / self.trades * 100 if self.trades else 0,
+            'average_profit': self.gross_profit / self.wins if self.wins else 0,
+            'average_loss': -self.gross_loss / self.losses if self.losses else 0,
+            'profit_factor': self.gross_profit / self.gross_loss if self.gross_loss > 0 else float('inf'),
+            'total_pnl': total_pnl,
+            'total_fees': self.fees,
+            'expectancy': total_pnl / self.trades if self.trades else 0,
+            'max_drawdown': self.max_drawdown,
+            'current_drawdown': self.peak - self.equity,
+            'max_drawdown_duration_ms': drawdown_duration,
+            'sharpe': sharpe,
+            'sortino': sortino,
+            'days': days,
+            'current_streak': self.streak,
+            'max_win_streak': self.max_win_streak,
+            'max_loss_streak': self.max_loss_streak
+        }
+
+
+class TradeAnalytics:
+    """Показатели закрытых сделок по счету, стратегиям, символам и таймфреймам."""
+
+    def __init__(self):
+        # (группа, имя) -> показатели; весь счет - (GROUP_ALL, GROUP_ALL)
+        self._stats: Dict[Tuple[str, str], RunningStats] = {}
+        self._trip_ids = set()
+        # Учтенные сделки по времени закрытия - для пересчета при сделке не по порядку
+        self._trips: List[TripRecord] = []
+        # Сделки добавляются в рабочем потоке, показатели читаются в цикле событий
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _record(trip: Dict[str, Any]) -> TripRecord:
+        """Данные закрытой сделки, нужные показателям, с ключами ее групп."""
+        keys = [(GROUP_ALL, GROUP_ALL)]
+        for group, column in GROUP_COLUMNS.items():
+            name = trip.get(column)
+            keys.append((group, name if isinstance(name, str) and name else UNKNOWN_GROUP))
+        return trip['trip_id'], float(trip['pnl'] or 0), float(trip.get('fees') or 0), int(trip['close_time']), keys
+
+    def _apply(self, record: TripRecord) -> None:
+        """Обновляет показатели групп сделки (под блокировкой)."""
+        _, pnl, fees, close_time, keys = record
+        for key in keys:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = RunningStats()
+            stats.update(pnl, close_time, fees)
+        self._trips.append(record)
+
+    def _add_records(self, records: List[TripRecord]) -> int:
+        """
+        Учитывает сделки, упорядоченные по времени закрытия.
+
+        Обновление за O(1) верно, только если сделка закрылась не раньше уже
+        учтенных: кривая капитала, просадка и серии зависят от порядка сделок.
+        Сделки из истории, догруженной позже (курсор символа отстал после сбоя),
+        приводят к пересчету показателей по всем сделкам в порядке закрытия.
+        """
+        with self._lock:
+            new = []
+            for record in records:
+                if record[0] not in self._trip_ids:
+                    self._trip_ids.add(record[0])
+                    new.append(record)
+            if not new:
+                return 0
+
+            total = self._stats.get((GROUP_ALL, GROUP_ALL))
+            replay = new
+            if total is not None and new[0][3] < total.last_time:
+                replay = sorted(self._trips + new, key=lambda record: record[3])
+                self._stats = {}
+                self._trips = []
+            for record in replay:
+                self._apply(record)
+            return len(new)
+
+    def add_trip(self, trip: Dict[str, Any]) -> bool:
+        """
+        Учитывает закрытую сделку во всех ее группах.
+
+        Args:
+            trip: Закрытая сделка (trip_id, pnl, fees, close_time, strategy_name, symbol, timeframe)
+
+        Returns:
+            bool: False, если сделка уже учтена
+        """
+        return self._add_records([self._record(trip)]) == 1
+
+    def add_trips(self, trips: pd.DataFrame) -> int:
+        """
+        Учитывает закрытые сделки по времени закрытия.
+
+        Args:
+            trips: Закрытые сделки (столбцы журнала round_trips)
+
+        Returns:
+            int: Количество новых учтенных сделок
+        """
+        if trips is None or trips.empty:
+            return 0
+        ordered = trips.sort_values('close_time', kind='stable')
+        return self._add_records([self._record(trip) for trip in ordered.to_dict('records')])
+
+    def rebuild(self, trips: pd.DataFrame) -> int:
+        """
+        Строит показатели заново по всем закрытым сделкам (при запуске).
+
+        Args:
+            trips: Все закрытые сделки из журнала
+
+        Returns:
+            int: Количество учтенных сделок
+        """
+        with self._lock:
+            self._stats = {}
+            self._trip_ids = set()
+            self._trips = []
+        return self.add_trips(trips)
+
+    def get(self, group: str = GROUP_ALL, name: str = GROUP_ALL) -> Dict[str, Any]:
+        """
+        Возвращает показатели группы.
+
+        Args:
+            group: GROUP_ALL или ключ GROUP_COLUMNS ("strategy", "symbol", "timeframe")
+            name: Имя стратегии, символа или таймфрейма (для GROUP_ALL - GROUP_ALL)
+
+        Returns:
+            Dict[str, Any]: Показатели (см. RunningStats.snapshot), нулевые для группы без сделок
+        """
+        with self._lock:
+            stats = self._stats.get((group, name))
+            return (stats or RunningStats()).snapshot()
+
+    def breakdown(self, group: str) -> List[Dict[str, Any]]:
+        """
+        Показатели всех имен группы по убыванию общего PnL.
+
+        Args:
+            group: Ключ GROUP_COLUMNS ("strategy", "symbol", "timeframe")
+
+        Returns:
+            List[Dict[str, Any]]: Показатели с именем в ключе 'name'
+        """
+        with self._lock:
+            rows = [dict(stats.snapshot(), name=name)
+                    for (stats_group, name), stats in self._stats.items() if stats_group == group]
+        return sorted(rows, key=lambda row: row['total_pnl'], reverse=True)
+
+    def equity_curve(self, group: str = GROUP_ALL, name: str = GROUP_ALL) -> List[Tuple[int, float]]:
+        """
+        Кривая капитала группы.
+
+        Returns:
+            List[Tuple[int, float]]: (время закрытия сделки в мс, накопленный PnL)
+        """
+        with self._lock:
+            stats = self._stats.get((group, name))
+            return list(stats.equity_curve) if stats is not None else []
@@ -0,0 +1,190 @@
+"""
+Сбор истории исполнений (fetch_my_trades) с постраничной загрузкой.
+
+Биржа отдает ограниченную страницу исполнений за запрос, поэтому история
+загружается окнами по времени вперед от сохраненного курсора символа. Если
+страница заполнена целиком, окно делится пополам, пока каждая часть не поместится
+в одну страницу - так загружается вся история независимо от порядка, в котором
+биржа отдает исполнения. Символы загружаются параллельно: число одновременных
+запросов ограничено семафором, а частоту запросов ограничивает общий лимитер ccxt
+экземпляра биржи. После записи каждого окна в журнал сохраняется курсор символа,
+поэтому после сбоя загрузка продолжается с места остановки.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+
+import ccxt.async_support as ccxt
+
+from bot_logging import logger
+from trade_ledger import TradeLedger
+from utils.data_loader import RATE_LIMIT_BACKOFF, RATE_LIMIT_RETRIES
+
+# Максимальное число одновременных запросов истории исполнений
+TRADE_HISTORY_CONCURRENCY = 4
+# Размер страницы исполнений (ограничение API Bitget)
+TRADE_HISTORY_PAGE_LIMIT = 100
+# Максимальный интервал одного запроса исполнений (мс, ограничение API Bitget - 7 дней)
+TRADE_HISTORY_WINDOW_MS = 7 * 24 * 60 * 60 * 1000
+# Курсор не сдвигается ближе этого интервала к текущему времени: последние исполнения
+# могут появиться в истории биржи с задержкой (мс)
+TRADE_HISTORY_SETTLE_MS = 60 * 1000
+
+# Префикс ключа курсора символа в служебной таблице журнала
+CURSOR_KEY_PREFIX = "trade_cursor:"
+
+
+class TradeHistoryCollector:
+    """Постраничный параллельный сбор исполнений по символам с курсором в журнале сделок."""
+
+    def __init__(self, exchange, ledger: TradeLedger, max_concurrency: int = TRADE_HISTORY_CONCURRENCY,
+                 page_limit: int = TRADE_HISTORY_PAGE_LIMIT, window_ms: int = TRADE_HISTORY_WINDOW_MS):
+        """
+        Args:
+            exchange: Объект биржи ccxt (его лимитер запросов общий для всех символов)
+            ledger: Журнал сделок (хранит курсоры символов)
+            max_concurrency: Максимальное число одновременных запросов
+            page_limit: Размер страницы исполнений
+            window_ms: Максимальный интервал одного запроса (мс)
+        """
+        self.exchange = exchange
+        self.ledger = ledger
+        self.page_limit = page_limit
+        self.window_ms = window_ms
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def get_cursor(self, symbol: str, default: int) -> int:
+        """
+        Возвращает время, с которого нужно загружать исполнения символа.
+
+        Args:
+            symbol: Торговый символ
+            default: Время по умолчанию для символа без курсора (мс)
+
+        Returns:
+            int: Время начала загрузки (мс)
+        """
+        return int(self.ledger.get_meta(f"{CURSOR_KEY_PREFIX}{symbol}", default))
+
+    def _commit_cursor(self, symbol: str, timestamp: int) -> None:
+        """Сохраняет курсор символа (время следующей загрузки, мс)."""
+        self.ledger.set_meta(f"{CURSOR_KEY_PREFIX}{symbol}", int(timestamp))
+
+    async def _fetch_page(self, symbol: str, since: int, until: int) -> list:
+        """
+        Запрашивает страницу исполнений за интервал [since, until]
+        с повтором при превышении лимита запросов биржи.
+
+        Args:
+            symbol: Торговый символ
+            since: Начало интервала (мс)
+            until: Конец интервала (мс)
+
+        Returns:
+            list: Исполнения в формате ccxt
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    return await self.exchange.fetch_my_trades(
+                        symbol=symbol,
+                        since=since,
+                        limit=self.page_limit,
+                        params={"marginCoin": "USDT", "until": until}
+                    )
+            except ccxt.RateLimitExceeded as e:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                delay = max(getattr(self.exchange, 'rateLimit', 100) / 1000, RATE_LIMIT_BACKOFF) * 2 ** attempt
+                logger.warning(f"Превышен лимит запросов при загрузке сделок {symbol}, повтор через {delay:.1f} с: {e}")
+                await asyncio.sleep(delay)
+
+    async def _fetch_window(self, symbol: str, since: int, until: int) -> list:
+        """
+        Загружает все исполнения за интервал: заполненная страница означает,
+        что исполнений может быть больше, и интервал делится пополам.
+
+        Args:
+            symbol: Торговый символ
+            since: Начало интервала (мс)
+            until: Конец интервала (мс)
+
+        Returns:
+            list: Исполнения за интервал (возможны повторы на границах)
+        """
+        page = await self._fetch_page(symbol, since, until)
+        if len(page) < self.page_limit:
+            return page
+
+        if until <= since:
+            logger.warning(f"Больше {self.page_limit} исполнений {symbol} в одну миллисекунду {since}, часть может быть пропущена")
+            return page
+
+        middle = (since + until) // 2
+        return await self._fetch_window(symbol, since, middle) + await self._fetch_window(symbol, middle + 1, until)
+
+    async def collect_symbol(self, symbol: str, since: int, until: int,
+                             record: Callable[[List[Dict]], None]) -> List[Dict]:
+        """
+        Загружает исполнения символа окнами вперед от курсора. После записи
+        каждого окна курсор сохраняется в журнале.
+
+        Args:
+            symbol: Торговый символ
+            since: Время начала для символа без курсора (мс)
+            until: Время окончания загрузки (мс)
+            record: Функция записи исполнений окна в журнал
+
+        Returns:
+            List[Dict]: Исполнения символа без повторов
+        """
+        cursor = self.get_cursor(symbol, since)
+        trades: Dict[str, Dict] = {}
+
+        while cursor <= until:
+            window_end = min(cursor + self.window_ms - 1, until)
+            window_trades = {str(trade['id']): trade for trade in await self._fetch_window(symbol, cursor, window_end)}
+
+            if window_trades:
+                record(list(window_trades.values()))
+                trades.update(window_trades)
+
+            cursor = window_end + 1
+            self._commit_cursor(symbol, cursor)
+
+        logger.info(f"Загружено {len(trades)} исполнений для {symbol}")
+        return list(trades.values())
+
+    async def collect(self, symbols: List[str], since: int, record: Callable[[List[Dict]], None],
+                      until: Optional[int] = None) -> List[Dict]:
+        """
+        Загружает исполнения всех символов параллельно.
+
+        Args:
+            symbols: Торговые символы
+            since: Время начала для символов без курсора (мс)
+            record: Функция записи исполнений в журнал (вызывается для каждого окна)
+            until: Время окончания загрузки (мс, по умолчанию - текущее время с запасом)
+
+        Returns:
+            List[Dict]: Все загруженные исполнения без повторов, по времени
+        """
+        if until is None:
+            until = int(time.time() * 1000) - TRADE_HISTORY_SETTLE_MS
+
+        results = await asyncio.gather(
+            *(self.collect_symbol(symbol, since, until, record) for symbol in symbols),
+            return_exceptions=True
+        )
+
+        trades: Dict[str, Dict] = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                # Курсор символа остался на последнем записанном окне
+                logger.error(f"Ошибка при загрузке сделок для {symbol}: {result}")
+                continue
+            for trade in result:
+                trades[str(trade['id'])] = trade
+
+        logger.info(f"Загружено {len(trades)} исполнений по {len(symbols)} символам")
+        return sorted(trades.values(), key=lambda trade: trade['timestamp'])